@@ -43,6 +43,7 @@ class AdminUserController:
 
         :return: 退出登录结果
         """
+        await self.admin_user_service.logout()
         return ResponseUtil.success()
 
     @router.get("/codes", summary="获取后台权限码")
@@ -10,3 +10,5 @@ class AdminContextVars:
 
     token_user_id: ContextVar[int | None] = ContextVar("admin_token_user_id", default=None)
     request: ContextVar[Request | None] = ContextVar("admin_request", default=None)
+    # 白名单中间件校验后的 token 声明，None 表示未校验，空字典表示未携带或无效
+    token_claims: ContextVar[dict | None] = ContextVar("admin_token_claims", default=None)
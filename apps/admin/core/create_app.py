@@ -1,28 +1,32 @@
 import importlib
-import json
 import pkgutil
-import time
 from contextlib import asynccontextmanager
-from json import JSONDecodeError
 from typing import AsyncGenerator
 
 from fastapi import APIRouter, FastAPI
-from fastapi.concurrency import iterate_in_threadpool
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp
 
 from apps.admin.config.logger_config import logger
 from apps.admin.config.server_config import init_container_config
 from apps.admin.core.context_vars import AdminContextVars
 from apps.admin.utils.depends_util import AdminDependsUtil
-from apps.base.core.depend_inject import GetValue
+from apps.admin.utils.permission_cache import AdminPermissionCache
+from apps.base.core.depend_inject import GetBean, GetValue
+from apps.base.core.http_log import BaseHttpLogMiddleware
+from apps.base.core.metrics import MetricsMiddleware, MetricsServer
+from apps.base.core.query_stats import QueryStatsMiddleware
+from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.core.sqlalchemy.middleware import RequestSessionMiddleware
 from apps.base.core.sqlalchemy.session import close_sqlalchemy_engine, init_sqlalchemy_engine
 from apps.base.enum.error_code import ErrorCode
 from apps.base.exception.my_exception import MyException
 from apps.base.utils.response_util import ResponseUtil
+from apps.base.utils.snowflake import SnowflakeIDGenerator
 
 init_container_config()
 
@@ -65,10 +69,25 @@ class AdminCreateApp:
         :return: 生命周期异步生成器
         """
         init_sqlalchemy_engine()
+        # 列表分页游标需要签名密钥，缺少配置时启动失败
+        db.cursor_secret()
+        # 启动时申请雪花算法机器 ID 租约，请求中生成 ID 不再同步访问 Redis
+        SnowflakeIDGenerator.start()
+        # 指标只在独立端口提供，不经过业务路由和白名单
+        metrics_server = MetricsServer.from_config(reuse_port=True)
         try:
+            if metrics_server:
+                await metrics_server.start()
+            await GetBean(AdminPermissionCache).start()
             yield
         finally:
-            await close_sqlalchemy_engine()
+            try:
+                await GetBean(AdminPermissionCache).stop()
+                if metrics_server:
+                    await metrics_server.stop()
+            finally:
+                await close_sqlalchemy_engine()
+                SnowflakeIDGenerator.close()
 
     def _register_router(self, router_name: str = "router", prefix: str = GetValue("app.context-path")) -> None:
         """
@@ -147,81 +166,28 @@ class AdminCreateApp:
 
         :return: None
         """
+        self.app.add_middleware(RequestSessionMiddleware)  # type: ignore
+        self.app.add_middleware(QueryStatsMiddleware)  # type: ignore
         self.app.add_middleware(AdminHttpLogMiddleware)  # type: ignore
+        self.app.add_middleware(MetricsMiddleware, app_name="admin")  # type: ignore
         self.app.add_middleware(AdminWhiteListMiddleware)  # type: ignore
 
 
-class AdminHttpLogMiddleware(BaseHTTPMiddleware):
+class AdminHttpLogMiddleware(BaseHttpLogMiddleware):
     """
     记录后台管理请求日志。
     """
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """
-        记录请求和响应摘要。
+    LOG_PREFIX = "admin|"
 
-        :param request: 请求对象
-        :param call_next: 下一个请求处理器
-        :return: 响应对象
+    def __init__(self, app: ASGIApp) -> None:
         """
-        start_time = time.time()
-        self.add_context_vars(request)
-        request_body = await self.set_request_body(request)
-
-        response = await call_next(request)
+        初始化后台管理请求日志中间件。
 
-        if getattr(request.state, "log_request", None) is False:
-            request_data = "-"
-        else:
-            try:
-                request_data = json.dumps(json.loads(request_body), ensure_ascii=False)
-            except JSONDecodeError, UnicodeDecodeError:
-                request_data = await request.form()
-                if not request_data:
-                    request_data = "-"
-
-        response_body = await self.set_response_body(response)
-        if getattr(request.state, "log_response", None) is False:
-            response_data = "-"
-        else:
-            try:
-                response_data = json.dumps(json.loads(response_body), ensure_ascii=False)
-            except JSONDecodeError, UnicodeDecodeError:
-                response_data = response_body or "-"
-        request_data = request_data[:500]
-        response_data = response_data[:500]
-        process_time = time.time() - start_time
-        logger.info(
-            f"[admin|{request.client.host}|{response.status_code}|{request.method}|{request.scope['path']}|"
-            f"{request_data}|{response_data}|耗时:{process_time}]"
-        )
-        return response
-
-    async def set_request_body(self, request: Request) -> bytes:
-        """
-        将请求数据变成可多次读取。
-
-        :param request: 请求对象
-        :return: 请求体字节
-        """
-        request_body = await request.body()
-        return request_body
-
-    async def set_response_body(self, response: Response) -> bytes:
-        """
-        将响应数据变成可多次读取。
-
-        :param response: 响应对象
-        :return: 响应体字节
+        :param app: 下游 ASGI 应用
+        :return: None
         """
-        response_body = b""
-        if hasattr(response, "body_iterator"):
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            response.body_iterator = iterate_in_threadpool([response_body])
-        else:
-            response_body = response.body
-        return response_body
+        super().__init__(app, logger)
 
     def add_context_vars(self, request: Request) -> None:
         """
@@ -256,10 +222,11 @@ class AdminWhiteListMiddleware(BaseHTTPMiddleware):
         """
         config_whitelist = GetValue("app.admin.whitelist") or []
         whitelist: list[str] = config_whitelist + self.base_whitelist
-        if not await self.is_in_whitelist(request, whitelist):
-            try:
-                AdminDependsUtil.get_user_id_from_request(request, nullable=False)
-            except MyException as e:
+        try:
+            # 每个请求只在这里校验一次 token，后续中间件和接口从上下文读取声明
+            await AdminDependsUtil.verify_request_token(request)
+        except MyException as e:
+            if not await self.is_in_whitelist(request, whitelist):
                 return ResponseUtil.fail_cmd(e.code, e.message)
         return await call_next(request)
 
@@ -1,6 +1,6 @@
 from typing import Any, TypeVar
 
-from sqlalchemy import Select, delete, func, select, update
+from sqlalchemy import Select, delete, update
 
 from apps.base.core.sqlalchemy.base_model import BaseModel
 from apps.base.core.sqlalchemy.db_helper import db
@@ -19,9 +19,33 @@ async def _paginate(stmt: Select[tuple[T]], current: int, size: int, *order_by:
     :return: 数据列表和总数。
     """
     offset, limit = db.page(current, size)
-    total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    total = await db.count(stmt)
     records = await db.model_all(stmt.order_by(*order_by).offset(offset).limit(limit))
-    return list(records), int(total or 0)
+    return list(records), total
+
+
+async def _keyset_paginate(
+    stmt: Select[tuple[T]], current: int, size: int, *order_by: Any, cursor: str | None = None
+) -> tuple[list[T], int, str | None]:
+    """
+    执行后台列表游标分页查询。
+
+    传入游标时按 keyset 定位，深分页不再扫描并丢弃前面的行；未传游标时按页码定位，
+    同时返回下一页游标，前端可以从任意页开始改用游标翻页。总数使用短时缓存的近似值。
+
+    :param stmt: 查询语句。
+    :param current: 当前页码，传入游标时忽略。
+    :param size: 每页条数。
+    :param order_by: 排序字段，最后一个字段必须唯一。
+    :param cursor: 上一页返回的游标。
+    :return: 数据列表、总数和下一页游标。
+    """
+    if not cursor:
+        offset, _ = db.page(current, size)
+        stmt = stmt.offset(offset)
+    page = await db.keyset_page(stmt, order_by, after=cursor, size=size)
+    total = await db.count(stmt, db.COUNT_CACHE_TTL)
+    return page.records, total, page.next_cursor
 
 
 async def _create(model: type[T], data: dict[str, Any]) -> T:
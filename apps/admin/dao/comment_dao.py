@@ -2,7 +2,7 @@ from typing import Any
 
 from sqlalchemy import delete, select, update
 
-from apps.admin.dao.base_dao import _paginate
+from apps.admin.dao.base_dao import _keyset_paginate
 from apps.base.core.depend_inject import Component
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.enum.action import ObjectTypeEnum
@@ -26,7 +26,8 @@ class AdminCommentDao:
         obj_type: int | None = None,
         status: int | None = None,
         user_id: int | None = None,
-    ) -> tuple[list[Comment], int]:
+        cursor: str | None = None,
+    ) -> tuple[list[Comment], int, str | None]:
         """
         分页查询评论。
 
@@ -37,7 +38,8 @@ class AdminCommentDao:
         :param obj_type: 对象类型。
         :param status: 评论状态。
         :param user_id: 用户 ID。
-        :return: 评论列表和总数。
+        :param cursor: 上一页返回的游标。
+        :return: 评论列表、总数和下一页游标。
         """
         stmt = select(Comment)
         if keyword:
@@ -50,7 +52,7 @@ class AdminCommentDao:
             stmt = stmt.where(Comment.status == status)
         if user_id:
             stmt = stmt.where(Comment.user_id == user_id)
-        return await _paginate(stmt, current, size, Comment.id.desc())
+        return await _keyset_paginate(stmt, current, size, Comment.id.desc(), cursor=cursor)
 
     async def get_comment_by_id(self, comment_id: int) -> Comment | None:
         """
@@ -2,7 +2,7 @@ from typing import Any
 
 from sqlalchemy import or_, select
 
-from apps.admin.dao.base_dao import _delete, _paginate, _update
+from apps.admin.dao.base_dao import _delete, _keyset_paginate, _update
 from apps.base.core.depend_inject import Component
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.models.message import Message
@@ -20,7 +20,8 @@ class AdminMessageDao:
         keyword: str | None = None,
         user_id: int | None = None,
         parent_id: int | None = None,
-    ) -> tuple[list[Message], int]:
+        cursor: str | None = None,
+    ) -> tuple[list[Message], int, str | None]:
         """
         分页查询留言。
 
@@ -29,7 +30,8 @@ class AdminMessageDao:
         :param keyword: 留言内容、昵称或邮箱关键词。
         :param user_id: 用户 ID。
         :param parent_id: 父留言 ID。
-        :return: 留言列表和总数。
+        :param cursor: 上一页返回的游标。
+        :return: 留言列表、总数和下一页游标。
         """
         stmt = select(Message)
         if keyword:
@@ -44,7 +46,7 @@ class AdminMessageDao:
             stmt = stmt.where(Message.user_id == user_id)
         if parent_id is not None:
             stmt = stmt.where(Message.parent_id == parent_id)
-        return await _paginate(stmt, current, size, Message.id.desc())
+        return await _keyset_paginate(stmt, current, size, Message.id.desc(), cursor=cursor)
 
     async def get_message_by_id(self, message_id: int) -> Message | None:
         """
@@ -2,7 +2,7 @@ from typing import Any
 
 from sqlalchemy import or_, select
 
-from apps.admin.dao.base_dao import _delete, _paginate, _update
+from apps.admin.dao.base_dao import _delete, _keyset_paginate, _update
 from apps.base.core.depend_inject import Component
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.models.notice import Notice
@@ -20,7 +20,8 @@ class AdminNoticeDao:
         user_id: int | None = None,
         notice_type: int | None = None,
         is_read: bool | None = None,
-    ) -> tuple[list[Notice], int]:
+        cursor: str | None = None,
+    ) -> tuple[list[Notice], int, str | None]:
         """
         分页查询通知。
 
@@ -30,7 +31,8 @@ class AdminNoticeDao:
         :param user_id: 用户 ID。
         :param notice_type: 通知类型。
         :param is_read: 是否已读。
-        :return: 通知列表和总数。
+        :param cursor: 上一页返回的游标。
+        :return: 通知列表、总数和下一页游标。
         """
         stmt = select(Notice)
         if keyword:
@@ -41,7 +43,7 @@ class AdminNoticeDao:
             stmt = stmt.where(Notice.notice_type == notice_type)
         if is_read is not None:
             stmt = stmt.where(Notice.is_read == is_read)
-        return await _paginate(stmt, current, size, Notice.id.desc())
+        return await _keyset_paginate(stmt, current, size, Notice.id.desc(), cursor=cursor)
 
     async def get_notice_by_id(self, notice_id: int) -> Notice | None:
         """
@@ -46,3 +46,18 @@ class AdminBaseService:
             "size": size,
             "total": total,
         }
+
+    def _keyset_page_result(
+        self, current: int, size: int, total: int, records: Sequence[BaseDTO], next_cursor: str | None
+    ) -> dict:
+        """
+        构建带下一页游标的分页响应。
+
+        :param current: 当前页码
+        :param size: 每页条数
+        :param total: 总数
+        :param records: 数据列表
+        :param next_cursor: 下一页游标，没有下一页时为 None
+        :return: 分页响应
+        """
+        return {**self._page_result(current, size, total, records), "next_cursor": next_cursor}
@@ -22,7 +22,7 @@ class AdminCommentService(AdminBaseService):
         :param query_vo: 评论查询参数
         :return: 评论分页数据
         """
-        comments, total = await self.admin_comment_dao.list_comments(
+        comments, total, next_cursor = await self.admin_comment_dao.list_comments(
             query_vo.current,
             query_vo.size,
             query_vo.keyword,
@@ -30,6 +30,7 @@ class AdminCommentService(AdminBaseService):
             query_vo.obj_type,
             query_vo.status,
             query_vo.user_id,
+            query_vo.cursor,
         )
         user_map = await self.admin_comment_dao.list_comment_users(list({comment.user_id for comment in comments}))
         object_content_map = await self.admin_comment_dao.list_comment_object_contents(comments)
@@ -43,7 +44,7 @@ class AdminCommentService(AdminBaseService):
             )
             for comment in comments
         ]
-        return self._page_result(query_vo.current, query_vo.size, total, records)
+        return self._keyset_page_result(query_vo.current, query_vo.size, total, records, next_cursor)
 
     def _dump_comment(
         self,
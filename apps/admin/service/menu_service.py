@@ -3,6 +3,7 @@ from sqlalchemy import select
 from apps.admin.core.context_vars import AdminContextVars
 from apps.admin.dao.menu_dao import AdminMenuDao
 from apps.admin.dto.menu_dto import AdminMenuDTO, AdminRoleDTO
+from apps.admin.utils.permission_cache import AdminPermissionCache
 from apps.admin.vo.menu_vo import (
     AdminMenuCreateVO,
     AdminMenuUpdateVO,
@@ -25,6 +26,7 @@ class AdminMenuService:
     """
 
     admin_menu_dao: AdminMenuDao = Autowired()
+    admin_permission_cache: AdminPermissionCache = Autowired()
 
     async def list_menu_tree(self, active_only: bool = False) -> list[AdminMenuDTO]:
         """
@@ -76,6 +78,7 @@ class AdminMenuService:
         if not data:
             return AdminMenuDTO.model_validate(menu)
         menu = await self.admin_menu_dao.update_menu(menu, data)
+        await self.admin_permission_cache.invalidate()
         return AdminMenuDTO.model_validate(menu)
 
     async def delete_menu(self, menu_id: int) -> None:
@@ -95,6 +98,7 @@ class AdminMenuService:
             menu_ids.extend(await self.admin_menu_dao.list_child_ids(menu_ids[cursor]))
             cursor += 1
         await self.admin_menu_dao.delete_menus(menu_ids)
+        await self.admin_permission_cache.invalidate()
 
     async def list_roles(self) -> list[AdminRoleDTO]:
         """
@@ -131,6 +135,7 @@ class AdminMenuService:
         if not data:
             return AdminRoleDTO.model_validate(role)
         role = await self.admin_menu_dao.update_role(role, data)
+        await self.admin_permission_cache.invalidate()
         return AdminRoleDTO.model_validate(role)
 
     async def delete_role(self, role_id: int) -> None:
@@ -145,6 +150,7 @@ class AdminMenuService:
         if not role:
             raise MyException(ErrorCode.DATA_NOT_EXISTS)
         await self.admin_menu_dao.delete_role(role_id)
+        await self.admin_permission_cache.invalidate()
 
     async def get_role_menu_ids(self, role_id: int) -> list[int]:
         """
@@ -172,6 +178,7 @@ class AdminMenuService:
         if not role:
             raise MyException(ErrorCode.DATA_NOT_EXISTS)
         await self.admin_menu_dao.update_role_menus(role_id, role_menu_vo.menu_ids)
+        await self.admin_permission_cache.invalidate()
 
     async def get_current_route_menus(self, user: User) -> list[dict]:
         """
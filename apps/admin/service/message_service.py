@@ -22,13 +22,13 @@ class AdminMessageService(AdminBaseService):
         :param query_vo: 留言查询参数
         :return: 留言分页数据
         """
-        messages, total = await self.admin_message_dao.list_messages(
-            query_vo.current, query_vo.size, query_vo.keyword, query_vo.user_id, query_vo.parent_id
+        messages, total, next_cursor = await self.admin_message_dao.list_messages(
+            query_vo.current, query_vo.size, query_vo.keyword, query_vo.user_id, query_vo.parent_id, query_vo.cursor
         )
         user_map = await self.admin_message_dao.list_message_users(list({message.user_id for message in messages}))
         parent_content_map = await self.admin_message_dao.list_parent_message_contents(messages)
         records = [self._dump_message(message, user_map, parent_content_map) for message in messages]
-        return self._page_result(query_vo.current, query_vo.size, total, records)
+        return self._keyset_page_result(query_vo.current, query_vo.size, total, records, next_cursor)
 
     def _dump_message(
         self,
@@ -20,11 +20,17 @@ class AdminNoticeService(AdminBaseService):
         :param query_vo: 通知查询参数
         :return: 通知分页数据
         """
-        notices, total = await self.admin_notice_dao.list_notices(
-            query_vo.current, query_vo.size, query_vo.keyword, query_vo.user_id, query_vo.notice_type, query_vo.is_read
+        notices, total, next_cursor = await self.admin_notice_dao.list_notices(
+            query_vo.current,
+            query_vo.size,
+            query_vo.keyword,
+            query_vo.user_id,
+            query_vo.notice_type,
+            query_vo.is_read,
+            query_vo.cursor,
         )
         records = AdminNoticeDTO.bulk_model_validate(notices)
-        return self._page_result(query_vo.current, query_vo.size, total, records)
+        return self._keyset_page_result(query_vo.current, query_vo.size, total, records, next_cursor)
 
     async def get_notice(self, notice_id: int) -> AdminNoticeDTO:
         """
@@ -1,6 +1,4 @@
 import json
-import math
-import re
 from datetime import datetime
 
 from pydantic import ValidationError
@@ -10,14 +8,15 @@ from apps.admin.dao.config_dao import AdminConfigDao
 from apps.admin.utils.es_util import AdminESUtil
 from apps.admin.utils.redis_util import AdminRedisUtil
 from apps.admin.vo.search_analysis_vo import SearchAnalysisConfigVO, SearchAnalysisPreviewVO
-from apps.base.constant.es_constant import BaseESConstant
 from apps.base.core.depend_inject import Autowired, Component
+from apps.base.core.es_reindex import ArticleReindexer
 from apps.base.dto.search_analysis_dto import (
     SearchAnalysisConfigDTO,
     SearchAnalysisPreviewDTO,
     SearchAnalysisStateDTO,
     SearchIndexRebuildDTO,
 )
+from apps.base.models.article import Article
 
 
 @Component()
@@ -102,57 +101,31 @@ class AdminSearchAnalysisService:
 
         :return: 新索引名称和写入文档数。
         """
-        index_name = f"article_v{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
-        await self.es_util.client.indices.create(
-            index=index_name,
-            mappings=BaseESConstant.ARTICLE_INDEX_MAPPING,
-        )
-        size = 500
-        total = await self.article_dao.count_index_articles()
-        for current in range(1, math.ceil(total / size) + 1):
-            articles = await self.article_dao.list_index_articles(current, size)
-            author_map = await self.article_dao.list_article_authors(list({article.user_id for article in articles}))
-            actions = [
-                self._build_article_index_action(article, index_name, author_map.get(article.user_id))
-                for article in articles
-            ]
-            if actions:
-                await self.es_util.helpers.async_bulk(self.es_util.client, actions)
-        await self._switch_article_alias(index_name)
+        reindexer = ArticleReindexer(self.es_util.client, self.redis_util.redis, self._build_article_documents)
+        index_name, progress = await reindexer.run()
         await self.redis_util.clear_search_cache()
-        return SearchIndexRebuildDTO(index_name=index_name, document_count=total)
+        return SearchIndexRebuildDTO(index_name=index_name, document_count=progress.done)
 
-    async def _switch_article_alias(self, index_name: str) -> None:
+    async def _build_article_documents(self, articles: list[Article]) -> list[dict[str, object]]:
         """
-        将 article 别名切换到新物理索引。
+        将一批文章转换为索引文档。
 
-        :param index_name: 新物理索引名称。
-        :return: None。
+        :param articles: 文章列表。
+        :return: 索引文档列表。
         """
-        alias = BaseESConstant.ARTICLE_INDEX
-        actions: list[dict[str, dict[str, object]]] = []
-        if await self.es_util.client.indices.exists_alias(name=alias):
-            aliases = await self.es_util.client.indices.get_alias(name=alias)
-            actions.extend({"remove": {"index": old_index, "alias": alias}} for old_index in aliases)
-        elif await self.es_util.client.indices.exists(index=alias):
-            actions.append({"remove_index": {"index": alias}})
-        actions.append({"add": {"index": index_name, "alias": alias, "is_write_index": True}})
-        await self.es_util.client.indices.update_aliases(actions=actions)
+        author_map = await self.article_dao.list_article_authors(list({article.user_id for article in articles}))
+        return [self._build_article_document(article, author_map.get(article.user_id)) for article in articles]
 
     @staticmethod
-    def _build_article_index_action(article: object, index_name: str, user: object | None) -> dict[str, object]:
+    def _build_article_document(article: object, user: object | None) -> dict[str, object]:
         """
-        构造文章批量索引动作。
+        构造文章索引文档，HTML 由重建器统一清洗。
 
         :param article: 文章模型。
-        :param index_name: 目标物理索引名称。
         :param user: 文章作者模型。
-        :return: Elasticsearch 批量写入动作。
+        :return: Elasticsearch 文档。
         """
-        content = re.sub(r"<[^>]+>", "", str(getattr(article, "content", "")).replace("\n", " "))
-        action = {
-            "_index": index_name,
-            "_id": getattr(article, "id"),
+        document = {
             "id": getattr(article, "id"),
             "user_id": getattr(article, "user_id"),
             "title": getattr(article, "title"),
@@ -160,7 +133,7 @@ class AdminSearchAnalysisService:
             "cover_thumb": getattr(article, "cover_thumb", ""),
             "category_id": getattr(article, "category_id"),
             "tag_list": getattr(article, "tag_list", []),
-            "content": content,
+            "content": str(getattr(article, "content", "")),
             "is_markdown": getattr(article, "is_markdown", False),
             "is_original": getattr(article, "is_original"),
             "status": getattr(article, "status"),
@@ -174,7 +147,7 @@ class AdminSearchAnalysisService:
             "hot_score": float(getattr(article, "hot_score", 0) or 0),
         }
         if user:
-            action["user"] = {
+            document["user"] = {
                 "id": getattr(user, "id"),
                 "nickname": getattr(user, "nickname", None),
                 "avatar": getattr(user, "avatar", None),
@@ -182,7 +155,7 @@ class AdminSearchAnalysisService:
                 "gender": getattr(user, "gender", None),
                 "summary": getattr(user, "summary", None),
             }
-        return action
+        return document
 
     @staticmethod
     def _parse_config(value: str | None) -> SearchAnalysisConfigDTO:
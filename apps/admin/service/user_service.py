@@ -7,6 +7,8 @@ from apps.admin.core.context_vars import AdminContextVars
 from apps.admin.dao.user_dao import AdminUserDao
 from apps.admin.dto.user_dto import AdminUserDTO, AdminUserInfoDTO
 from apps.admin.service.menu_service import AdminMenuService
+from apps.admin.utils.depends_util import AdminDependsUtil
+from apps.admin.utils.permission_cache import AdminPermissionCache
 from apps.admin.utils.redis_util import AdminRedisUtil
 from apps.admin.utils.token_util import AdminTokenUtil
 from apps.admin.vo.user_vo import (
@@ -33,6 +35,7 @@ class AdminUserService:
     admin_user_dao: AdminUserDao = Autowired()
     admin_menu_service: AdminMenuService = Autowired()
     redis_util: AdminRedisUtil = Autowired()
+    admin_permission_cache: AdminPermissionCache = Autowired()
 
     async def login(self, login_vo: AdminLoginVO) -> dict[str, str]:
         """
@@ -55,6 +58,17 @@ class AdminUserService:
             "accessToken": token,
         }
 
+    async def logout(self) -> None:
+        """
+        后台管理员退出登录，吊销当前 token。
+
+        :return: None
+        """
+        request = AdminContextVars.request.get()
+        token = request.headers.get(AdminDependsUtil.TOKEN_NAME) if request is not None else None
+        if token:
+            await AdminTokenUtil.verifier.revoke(token, self.redis_util.redis)
+
     async def codes(self) -> list[str]:
         """
         获取后台管理员权限码。
@@ -148,6 +162,8 @@ class AdminUserService:
         data["password"] = EncryptUtil.encrypt(data["password"])
         data["uid"] = self.redis_util.User.gen_uid()
         user = await self.admin_user_dao.create_user(data, user_vo.role_ids)
+        if user_vo.role_ids:
+            await self.admin_permission_cache.invalidate()
         return self._dump_user(user, user_vo.role_ids)
 
     async def update_user(self, user_id: int, user_vo: AdminUserUpdateVO) -> AdminUserDTO:
@@ -171,6 +187,8 @@ class AdminUserService:
         user = await self.admin_user_dao.update_user(user, data, role_ids)
         if role_ids is None:
             role_ids = await self.admin_user_dao.get_user_role_ids(user_id)
+        else:
+            await self.admin_permission_cache.invalidate()
         return self._dump_user(user, role_ids)
 
     async def delete_user(self, user_id: int) -> None:
@@ -188,6 +206,7 @@ class AdminUserService:
         if not user:
             raise MyException(ErrorCode.DATA_NOT_EXISTS)
         await self.admin_user_dao.delete_user(user_id)
+        await self.admin_permission_cache.invalidate()
 
     async def get_user_role_ids(self, user_id: int) -> list[int]:
         """
@@ -215,6 +234,7 @@ class AdminUserService:
         if not user:
             raise MyException(ErrorCode.DATA_NOT_EXISTS)
         await self.admin_user_dao.update_user_roles(user_id, user_role_vo.role_ids)
+        await self.admin_permission_cache.invalidate()
 
     async def _check_unique_fields(self, data: dict, exclude_user_id: int | None = None) -> None:
         """
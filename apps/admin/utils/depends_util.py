@@ -3,15 +3,14 @@ from collections.abc import Awaitable, Callable
 from typing import Any, TypeVar
 
 from fastapi import Header, Query
-from sqlalchemy import func, select
 from starlette.requests import Request
 
 from apps.admin.core.context_vars import AdminContextVars
+from apps.admin.utils.permission_cache import AdminPermissionCache
 from apps.admin.utils.token_util import AdminTokenUtil
-from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.core.depend_inject import GetBean
 from apps.base.enum.error_code import ErrorCode
 from apps.base.exception.my_exception import MyException
-from apps.base.models.user import Menu, Role, RoleMenu, UserRole
 
 F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
 
@@ -24,17 +23,22 @@ class AdminDependsUtil:
     TOKEN_NAME = "admin_token"
 
     @classmethod
-    def get_user_id_from_token(cls, nullable: bool = False, token: str = Header(alias=TOKEN_NAME)) -> int | None:
+    async def get_user_id_from_token(cls, nullable: bool = False, token: str = Header(alias=TOKEN_NAME)) -> int | None:
         """
-        从后台 token 中解析用户 ID。
+        从后台 token 中解析用户 ID，优先使用白名单中间件校验后的声明，未经过中间件时完整校验（含吊销检查）。
 
         :param nullable: 是否允许为空
         :param token: 后台 token
         :return: 用户 ID
-        :raises MyException: token 缺失或无效时抛出
+        :raises MyException: token 缺失、无效或已吊销时抛出
         """
         try:
-            user_id = AdminTokenUtil.get_user_id(token)
+            claims = AdminContextVars.token_claims.get()
+            if claims is None:
+                claims = await AdminTokenUtil.verifier.verify(token, GetBean("adminRedisUtil").redis)
+            user_id = claims.get("user_id")
+            if user_id is None:
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
             return user_id
         except Exception as e:
             if nullable:
@@ -51,6 +55,23 @@ class AdminDependsUtil:
         """
         return functools.partial(cls.get_user_id_from_token, nullable=nullable)
 
+    @classmethod
+    async def verify_request_token(cls, request: Request) -> dict:
+        """
+        校验请求 token（含吊销检查）并将声明保存到上下文，同一请求后续获取用户 ID 时不再解析 token。
+
+        :param request: 请求对象
+        :return: token 声明
+        :raises MyException: token 缺失、无效或已吊销时抛出
+        """
+        AdminContextVars.token_claims.set({})
+        token = request.headers.get(cls.TOKEN_NAME)
+        if not token:
+            raise MyException(ErrorCode.TOKEN_IS_EMPTY)
+        claims = await AdminTokenUtil.verifier.verify(token, GetBean("adminRedisUtil").redis)
+        AdminContextVars.token_claims.set(claims)
+        return claims
+
     @classmethod
     def get_user_id_from_request(cls, request: Request, nullable: bool = True) -> int | None:
         """
@@ -65,7 +86,12 @@ class AdminDependsUtil:
             token = request.headers.get(cls.TOKEN_NAME)
             if not token:
                 raise MyException(ErrorCode.TOKEN_IS_EMPTY)
-            user_id = AdminTokenUtil.get_user_id(token)
+            claims = AdminContextVars.token_claims.get()
+            if claims is None:
+                claims = AdminTokenUtil.verifier.decode(token)
+            user_id = claims.get("user_id")
+            if user_id is None:
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
             return user_id
         except Exception as e:
             if nullable:
@@ -73,15 +99,16 @@ class AdminDependsUtil:
             raise e
 
     @classmethod
-    def ws_user_id(cls, token: str = Query()) -> int | None:
+    async def ws_user_id(cls, token: str = Query()) -> int | None:
         """
         从 WebSocket token 参数解析后台用户 ID。
 
         :param token: 后台 token
         :return: 用户 ID
+        :raises MyException: token 无效或已吊销时抛出
         """
-        user_id = AdminTokenUtil.get_user_id(token)
-        return user_id
+        claims = await AdminTokenUtil.verifier.verify(token, GetBean("adminRedisUtil").redis)
+        return claims.get("user_id")
 
     @classmethod
     async def check_permission(cls, code: str) -> None:
@@ -105,26 +132,13 @@ class AdminDependsUtil:
     @classmethod
     async def has_permission(cls, user_id: int, code: str) -> bool:
         """
-        判断后台用户是否拥有指定权限码。
+        判断后台用户是否拥有指定权限码，结果来自权限缓存。
 
         :param user_id: 用户 ID。
         :param code: 权限标识。
         :return: 拥有权限返回 True，否则返回 False。
         """
-        stmt = (
-            select(func.count(Menu.id))
-            .select_from(UserRole)
-            .join(Role, Role.id == UserRole.role_id)
-            .join(RoleMenu, RoleMenu.role_id == Role.id)
-            .join(Menu, Menu.id == RoleMenu.menu_id)
-            .where(
-                UserRole.user_id == user_id,
-                Role.is_active.is_(True),
-                Menu.code == code,
-                Menu.is_active.is_(True),
-            )
-        )
-        return bool(await db.scalar(stmt))
+        return await GetBean(AdminPermissionCache).has_permission(user_id, code)
 
 
 def permission(code: str) -> Callable[[F], F]:
@@ -0,0 +1,218 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any
+
+from sqlalchemy import select
+
+from apps.admin.utils.redis_util import AdminRedisUtil
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.depend_inject import Autowired, Component, logger
+from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.models.user import Menu, Role, RoleMenu, UserRole
+
+
+@Component()
+class AdminPermissionCache:
+    """
+    后台用户权限缓存。
+
+    用户权限码集合物化到 Redis Set，进程内再加一层带 TTL 的 LRU 缓存。
+    缓存 key 带全局版本号，菜单、角色或用户角色变更后递增版本号并通过 Pub/Sub 通知各 worker 清空本地缓存，
+    旧版本的 Redis key 不再被读取，等待过期即可。
+    """
+
+    redis_util: AdminRedisUtil = Autowired()
+
+    LOCAL_TTL = 60
+    LOCAL_MAX_SIZE = 1024
+    REDIS_TTL = 3600
+    EMPTY_MEMBER = ""
+
+    def __init__(self) -> None:
+        """
+        初始化后台权限缓存。
+
+        :return: None
+        """
+        self._local: OrderedDict[int, tuple[float, int, frozenset[str]]] = OrderedDict()
+        self._version: int | None = None
+        self._pubsub: Any | None = None
+        self._subscriber_task: asyncio.Task[None] | None = None
+
+    async def has_permission(self, user_id: int, code: str) -> bool:
+        """
+        判断后台用户是否拥有指定权限码。
+
+        :param user_id: 用户 ID
+        :param code: 权限标识
+        :return: 拥有权限返回 True，否则返回 False
+        """
+        return code in await self.get_permissions(user_id)
+
+    async def get_permissions(self, user_id: int) -> frozenset[str]:
+        """
+        查询后台用户的权限码集合，依次读取本地缓存、Redis 和数据库。
+
+        :param user_id: 用户 ID
+        :return: 权限码集合
+        """
+        version = await self._current_version()
+        now = time.monotonic()
+        entry = self._local.get(user_id)
+        if entry is not None and entry[0] > now and entry[1] == version:
+            self._local.move_to_end(user_id)
+            return entry[2]
+
+        redis = self.redis_util.redis
+        key = f"{RedisConstant.ADMIN_PERMISSION_CACHE_KEY_PREFIX}:{version}:{user_id}"
+        members = await redis.smembers(key)
+        if members:
+            codes = frozenset(member for member in members if member != self.EMPTY_MEMBER)
+        else:
+            codes = frozenset(await self._load_permissions(user_id))
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.sadd(key, self.EMPTY_MEMBER, *codes)
+                pipe.expire(key, self.REDIS_TTL)
+                await pipe.execute()
+
+        self._local[user_id] = (now + self.LOCAL_TTL, version, codes)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.LOCAL_MAX_SIZE:
+            self._local.popitem(last=False)
+        return codes
+
+    async def invalidate(self) -> None:
+        """
+        使全部用户的权限缓存失效，需在权限相关数据提交后调用。
+
+        :return: None
+        """
+        redis = self.redis_util.redis
+        version = await redis.incr(RedisConstant.ADMIN_PERMISSION_VERSION_KEY)
+        self._apply_version(version)
+        await redis.publish(RedisConstant.ADMIN_PERMISSION_CHANGED_CHANNEL, version)
+
+    async def start(self) -> None:
+        """
+        启动权限变更订阅。
+
+        :return: None
+        """
+        if self._subscriber_task and not self._subscriber_task.done():
+            return
+        await self._open_pubsub()
+        self._subscriber_task = asyncio.create_task(self._subscribe(), name="admin-permission-subscriber")
+
+    async def stop(self) -> None:
+        """
+        停止权限变更订阅。
+
+        :return: None
+        """
+        if self._subscriber_task:
+            self._subscriber_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._subscriber_task
+            self._subscriber_task = None
+        await self._close_pubsub()
+
+    async def _current_version(self) -> int:
+        """
+        获取当前权限版本号，订阅未就绪时直接读取 Redis。
+
+        :return: 权限版本号
+        """
+        if self._version is not None:
+            return self._version
+        return int(await self.redis_util.redis.get(RedisConstant.ADMIN_PERMISSION_VERSION_KEY) or 0)
+
+    def _apply_version(self, version: int | str) -> None:
+        """
+        应用新的权限版本号并清空本地缓存。
+
+        :param version: 权限版本号
+        :return: None
+        """
+        version = int(version)
+        if self._version is not None and version <= self._version:
+            return
+        if self._pubsub is not None:
+            self._version = version
+        self._local.clear()
+
+    async def _load_permissions(self, user_id: int) -> list[str]:
+        """
+        从数据库查询用户启用角色下的启用菜单权限码。
+
+        :param user_id: 用户 ID
+        :return: 权限码列表
+        """
+        stmt = (
+            select(Menu.code)
+            .distinct()
+            .select_from(UserRole)
+            .join(Role, Role.id == UserRole.role_id)
+            .join(RoleMenu, RoleMenu.role_id == Role.id)
+            .join(Menu, Menu.id == RoleMenu.menu_id)
+            .where(
+                UserRole.user_id == user_id,
+                Role.is_active.is_(True),
+                Menu.is_active.is_(True),
+            )
+        )
+        return [code for code in await db.model_all(stmt) if code]
+
+    async def _open_pubsub(self) -> None:
+        """
+        订阅权限变更频道，订阅成功后同步最新版本号。
+
+        :return: None
+        """
+        redis = self.redis_util.redis
+        self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(RedisConstant.ADMIN_PERMISSION_CHANGED_CHANNEL)
+        # 订阅建立前的变更不会收到消息，重新读取版本号
+        self._version = int(await redis.get(RedisConstant.ADMIN_PERMISSION_VERSION_KEY) or 0)
+        self._local.clear()
+
+    async def _close_pubsub(self) -> None:
+        """
+        关闭权限变更订阅，关闭后回退为每次读取 Redis 版本号。
+
+        :return: None
+        """
+        self._version = None
+        if self._pubsub is None:
+            return
+        with suppress(Exception):
+            await self._pubsub.unsubscribe(RedisConstant.ADMIN_PERMISSION_CHANGED_CHANNEL)
+        with suppress(Exception):
+            await self._pubsub.aclose()
+        self._pubsub = None
+
+    async def _subscribe(self) -> None:
+        """
+        持续消费权限变更消息，异常时自动重连。
+
+        :return: None
+        """
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._open_pubsub()
+                async for item in self._pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    try:
+                        self._apply_version(item.get("data"))
+                    except TypeError, ValueError:
+                        logger.warning("收到无效的后台权限变更消息")
+                raise ConnectionError("后台权限变更订阅已结束")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"后台权限变更订阅异常，准备重连 {e}")
+                await self._close_pubsub()
+                await asyncio.sleep(1)
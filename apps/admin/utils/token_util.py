@@ -1,6 +1,11 @@
+import time
+
 from jose import jwt
 from jose.constants import ALGORITHMS
 
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.utils.token_verifier import TokenVerifier
+
 
 class AdminTokenUtil:
     """
@@ -9,6 +14,9 @@ class AdminTokenUtil:
 
     secret_key = "nAm1aVIe"
     algorithm = ALGORITHMS.HS256
+    # Token 有效期秒数，带 exp 的 token 吊销记录过期后可以从吊销列表清理
+    expire_seconds = 7 * 24 * 3600
+    verifier = TokenVerifier(secret_key, algorithm, RedisConstant.ADMIN_TOKEN_DENY_KEY)
 
     @classmethod
     def create_token(cls, user_id: int, username: str) -> str:
@@ -19,7 +27,7 @@ class AdminTokenUtil:
         :param username: 用户名。
         :return: JWT Token。
         """
-        payload = {"username": username, "user_id": user_id}
+        payload = {"username": username, "user_id": user_id, "exp": int(time.time()) + cls.expire_seconds}
         token = jwt.encode(payload, key=cls.secret_key, algorithm=cls.algorithm)
         return token
 
@@ -31,7 +39,7 @@ class AdminTokenUtil:
         :param token: JWT Token。
         :return: 用户 ID。
         """
-        payload = jwt.decode(token, key=cls.secret_key)
+        payload = cls.verifier.decode(token)
         return payload.get("user_id")
 
     @classmethod
@@ -42,5 +50,5 @@ class AdminTokenUtil:
         :param token: JWT Token。
         :return: 用户名。
         """
-        payload = jwt.decode(token, key=cls.secret_key)
+        payload = cls.verifier.decode(token)
         return payload.get("username")
@@ -10,6 +10,7 @@ class AdminNoticeQueryVO(BaseVO):
 
     current: int = Field(default=1, ge=1)
     size: int = Field(default=10, ge=1, le=100)
+    cursor: str | None = Field(default=None, max_length=512)
     keyword: str | None = Field(default=None, max_length=100)
     user_id: int | None = None
     notice_type: int | None = Field(default=None, ge=1, le=7)
@@ -2,10 +2,22 @@ class RedisConstant:
 
     # 行为计数同步
     ACTION_COUNT_DIRTY_SET_KEY = "action_count_dirty_set"
+    ARTICLE_SCORE_DIRTY_SET_KEY = "article_score_dirty_set"
+
+    # token 吊销列表
+    ADMIN_TOKEN_DENY_KEY = "token:deny:admin"
+
+    # 雪花算法机器 ID 租约
+    SNOWFLAKE_WORKER_KEY_PREFIX = "snowflake:worker"
 
     # 定时任务同步
     SCHEDULER_JOB_CHANGED_CHANNEL = "scheduler:job:changed"
 
+    # 后台权限缓存
+    ADMIN_PERMISSION_CACHE_KEY_PREFIX = "admin:permission"
+    ADMIN_PERMISSION_VERSION_KEY = "admin:permission:version"
+    ADMIN_PERMISSION_CHANGED_CHANNEL = "admin:permission:changed"
+
     # 网站相关
     WEBSITE_VIEW_COUNT_KEY = "website_view_count"
     WEBSITE_VIEW_COUNT_THROTTLE_KEY = "website_view_count_throttle"
@@ -49,8 +61,11 @@ class RedisConstant:
     HOT_KEYWORDS_SEARCH_KEY = "hot_search_phrases"
     RECOMMEND_ARTICLE_SEARCH_KEY = "recommend_article_search"
     KEYWORDS_SEARCH_ARTICLE_CACHE_KEY = "keywords_search_article_cache"
+    KEYWORDS_SEARCH_ARTICLE_LOCK_KEY = "keywords_search_article_lock"
+    ARTICLE_REINDEX_DUAL_WRITE_KEY = "es:reindex:article"
 
     # 聊天相关
     CONVERSATION_UNREAD_COUNT_MAP_KEY = "conversation_unread_count_map"
     USER_CONTACT_SET_KEY = "user_contact_set"
     USER_BLACKLIST_SET_KEY = "user_blacklist_set"
+    GROUP_MEMBER_SET_KEY = "group_member_set"
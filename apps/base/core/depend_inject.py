@@ -36,6 +36,9 @@ container = Container()
 class ContainerUtil[T]:
     """
     依赖注入工具类
+
+    已创建的单例 Bean 和启动完成后读取的配置值保存在只读快照字典中，读取时不加锁；
+    快照未命中时加锁创建并以写时复制方式整体替换快照，配置刷新时同样整体替换。
     """
 
     ENV_VAR = {
@@ -48,6 +51,8 @@ class ContainerUtil[T]:
     NULL = object()
     _base_config: dict[str, Any] = {}
     _lock = threading.RLock()
+    _beans: dict[str | type, Any] = {}
+    _values: dict[str, Any] | None = None
 
     @classmethod
     def init(cls, resource_dir: str, server_config_class: Type[T], server_config_class_name: str = None):
@@ -99,6 +104,8 @@ class ContainerUtil[T]:
         server_config = cls.autowired(server_config_class_name)
         config = server_config.get_config()
         container.config.from_dict(config)
+        # 配置中心配置加载完成后才开始缓存配置值
+        cls._values = {}
         logger.info(f"容器初始化配置，当前配置:[{server_config}]")
         server_config.add_watcher(cls._update_config_and_bean)
 
@@ -140,6 +147,12 @@ class ContainerUtil[T]:
                 cls._resolve_rv_dependent(clazz, update_component_set)
 
             container.config = new_config
+            # 先替换快照，刷新期间未命中的读取会等待锁并获取新实例
+            update_name_set = {cls.get_name_from_class(clazz) for clazz in update_component_set}
+            cls._beans = {
+                name: bean for name, bean in cls._beans.items() if cls.get_name_from_class(name) not in update_name_set
+            }
+            cls._values = {}
             try:
                 for clazz in update_component_set:
                     logger.info(f"组件[{clazz}]更新")
@@ -149,6 +162,7 @@ class ContainerUtil[T]:
                         provider_bean.reset()
             except Exception as e:
                 container.config = old_config
+                cls._values = {}
                 logger.exception(f"组件刷新失败，已恢复原配置 {e}")
 
     @classmethod
@@ -219,21 +233,29 @@ class ContainerUtil[T]:
         :param name: bean name or class
         :return: bean
         """
+        bean = cls._beans.get(name, cls.NULL)
+        if bean is not cls.NULL:
+            return bean
         with cls._lock:
-            name = cls.get_name_from_class(name)
+            bean_name = cls.get_name_from_class(name)
+            provider = container.providers.get(bean_name)
             try:
-                bean = container.providers.get(name)()
-                return bean
+                bean = provider()
             except Exception as e:
-                raise ValueError(f"get bean [{name}] error: {e}")
+                raise ValueError(f"get bean [{bean_name}] error: {e}")
+            if isinstance(provider, BaseSingleton):
+                cls._beans = {**cls._beans, name: bean}
+            return bean
 
     @classmethod
     def get_bean_func(cls, name: str | Type[T]):
         """
         返回一个获取bean的方法，用于FastAPI调用注入参数
+
+        使用异步函数，FastAPI 会直接在事件循环中调用，不再为每个请求切换到线程池
         """
 
-        def wrapper():
+        async def wrapper():
             return cls.autowired(name)
 
         return wrapper
@@ -246,11 +268,18 @@ class ContainerUtil[T]:
         :param required: 是否必须
         :return: 配置值
         """
+        values = cls._values
+        if values is not None:
+            val = values.get(key)
+            if val is not None:
+                return val
         with cls._lock:
             try:
                 val = container.config.get(key, required=required)
             except Error:
                 raise ValueError(f"配置[{key}]不存在，请检查配置是否正确")
+            if val is not None and cls._values is not None:
+                cls._values = {**cls._values, key: val}
             return val
 
     @classmethod
@@ -319,20 +348,22 @@ class Component[T]:
         attr_type_dict = get_type_hints(cls)
         origin_init = cls.__init__
 
+        # 注入计划在注册时计算一次，实例化时只按计划取值
+        inject_plan: list[tuple[str, Any, str | type]] = []
         for attr, attr_type in attr_type_dict.items():
-            if not isinstance(getattr(cls, attr, None), Autowired):
+            v = getattr(cls, attr, None)
+            if isinstance(v, Value):
+                inject_plan.append((attr, ContainerUtil.get_config_value, v.key))
+            if not isinstance(v, Autowired):
                 continue
+            inject_plan.append((attr, ContainerUtil.autowired, v.name or attr_type))
             rv_dependent_set = set(container.rv_dependent_dict.kwargs.get(attr_type) or [])
             rv_dependent_set.add(cls)
             container.rv_dependent_dict.add_kwargs({attr_type: rv_dependent_set})
 
         def new_init(_self, *_args, **_kwargs):
-            for attr, attr_type in attr_type_dict.items():
-                v = getattr(cls, attr)
-                if isinstance(v, Autowired):
-                    setattr(_self, attr, GetBean(v.name or attr_type))
-                elif isinstance(v, Value):
-                    setattr(_self, attr, GetValue(v.key))
+            for attr, resolve, key in inject_plan:
+                setattr(_self, attr, resolve(key))
             origin_init(_self, *_args, **_kwargs)
 
         cls.__init__ = new_init
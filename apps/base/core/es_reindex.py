@@ -0,0 +1,274 @@
+import asyncio
+import json
+import multiprocessing
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import aclosing, suppress
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from elasticsearch import AsyncElasticsearch, helpers
+from redis.asyncio import Redis
+from sqlalchemy import func, select
+
+from apps.base.constant.es_constant import BaseESConstant
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.depend_inject import logger
+from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.models.article import Article
+from apps.base.utils.html_util import HtmlUtil
+
+
+@dataclass
+class ReindexProgress:
+    """
+    索引重建进度。
+    """
+
+    total: int
+    done: int = 0
+    failed: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        """
+        生成进度和吞吐量报告。
+
+        :return: 报告文本
+        """
+        elapsed = max(time.perf_counter() - self.started_at, 1e-6)
+        docs_per_sec = self.done / elapsed
+        remain = max(self.total - self.done - self.failed, 0)
+        eta = remain / docs_per_sec if docs_per_sec else float("inf")
+        return (
+            f"{self.done + self.failed}/{self.total} 篇, 失败 {self.failed} 篇, "
+            f"{docs_per_sec:.0f} docs/s, {self.bytes / elapsed / 1024:.0f} KB/s, "
+            f"已用 {elapsed:.1f}s, 预计剩余 {eta:.1f}s"
+        )
+
+
+class ArticleReindexer:
+    """
+    文章索引零停机重建。
+
+    1. 以加载期设置（不刷新、无副本）创建新物理索引，并在 Redis 登记双写标记，
+       之后发件箱中继会把文章变更同时写入新索引；
+    2. 按文章 ID 做 keyset 分片，各分片并行流式读取，HTML 清洗放到进程池，
+       再经 async_streaming_bulk 写入新索引；写入使用 external_gte 版本 0，不会覆盖双写的新数据；
+    3. 恢复索引设置并刷新，原子切换别名后移除双写标记。
+    """
+
+    DUAL_WRITE_TTL = 2 * 60 * 60
+    LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+    RESTORE_SETTINGS = {"refresh_interval": None, "number_of_replicas": None}
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        redis: Redis,
+        build_documents: Callable[[list[Article]], Awaitable[list[dict[str, Any]]]],
+        slices: int = 4,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        report_interval: float = 5,
+    ) -> None:
+        """
+        初始化文章索引重建器。
+
+        :param client: Elasticsearch 客户端
+        :param redis: Redis 客户端
+        :param build_documents: 将文章批量转换为 ES 文档的函数，文档需包含 id 和 content
+        :param slices: 并行分片数
+        :param chunk_size: 每批读取和写入的文档数
+        :param max_chunk_bytes: 单个 bulk 请求最大字节数
+        :param report_interval: 进度日志间隔秒数
+        :return: None
+        """
+        self.client = client
+        self.redis = redis
+        self.build_documents = build_documents
+        self.slices = max(slices, 1)
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.report_interval = report_interval
+        self.alias = BaseESConstant.ARTICLE_INDEX
+
+    async def run(self) -> tuple[str, ReindexProgress]:
+        """
+        执行索引重建。
+
+        :return: 新索引名称和重建进度
+        :raises RuntimeError: 有文档写入失败时抛出，此时不切换别名
+        """
+        index_name = f"{self.alias}_v{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        await self.client.indices.create(
+            index=index_name, mappings=BaseESConstant.ARTICLE_INDEX_MAPPING, settings=self.LOAD_SETTINGS
+        )
+        await self.redis.set(RedisConstant.ARTICLE_REINDEX_DUAL_WRITE_KEY, index_name, ex=self.DUAL_WRITE_TTL)
+        reporter: asyncio.Task[None] | None = None
+        try:
+            bounds, total = await self._partition()
+            progress = ReindexProgress(total=total)
+            reporter = asyncio.create_task(self._report(progress))
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.slices, mp_context=context) as pool:
+                await asyncio.gather(
+                    *(self._load_slice(index_name, start, end, pool, progress) for start, end in bounds)
+                )
+            if progress.failed:
+                raise RuntimeError(f"文章索引重建失败 {progress.failed} 篇")
+            await self.client.indices.put_settings(index=index_name, settings=self.RESTORE_SETTINGS)
+            await self.client.indices.refresh(index=index_name)
+            await self._switch_alias(index_name)
+        except BaseException:
+            with suppress(Exception):
+                await self.client.indices.delete(index=index_name, ignore_unavailable=True)
+            raise
+        finally:
+            if reporter:
+                reporter.cancel()
+            with suppress(Exception):
+                if await self.redis.get(RedisConstant.ARTICLE_REINDEX_DUAL_WRITE_KEY) == index_name:
+                    await self.redis.delete(RedisConstant.ARTICLE_REINDEX_DUAL_WRITE_KEY)
+        logger.info(f"文章索引重建完成 {index_name}: {progress.report()}")
+        return index_name, progress
+
+    async def _partition(self) -> tuple[list[tuple[int, int | None]], int]:
+        """
+        按文章数量均分 ID 区间。
+
+        :return: 左闭右开的 ID 区间列表（最后一个区间无上界）和文章总数
+        """
+        where = Article.is_deleted.is_(False)
+        total = int(await db.scalar(select(func.count(Article.id)).where(where)) or 0)
+        if not total:
+            return [], 0
+        slices = min(self.slices, total)
+        starts = [0]
+        for i in range(1, slices):
+            stmt = select(Article.id).where(where).order_by(Article.id).offset(i * total // slices).limit(1)
+            starts.append(await db.scalar(stmt))
+        ends: list[int | None] = [*starts[1:], None]
+        return list(zip(starts, ends)), total
+
+    async def _load_slice(
+        self, index_name: str, start: int, end: int | None, pool: Executor, progress: ReindexProgress
+    ) -> None:
+        """
+        流式读取一个 ID 区间的文章并写入新索引。
+
+        :param index_name: 新索引名称
+        :param start: 起始 ID（含）
+        :param end: 结束 ID（不含），None 表示无上界
+        :param pool: HTML 清洗进程池
+        :param progress: 重建进度
+        :return: None
+        """
+        actions = self._slice_actions(index_name, start, end, pool, progress)
+        async for ok, item in helpers.async_streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+            max_retries=3,
+        ):
+            result = next(iter(item.values()))
+            # 409: 重建期间双写已写入更新版本
+            if ok or result.get("status") == 409:
+                progress.done += 1
+            else:
+                progress.failed += 1
+                if progress.failed <= 10:
+                    logger.warning(f"文章索引重建写入失败: {result.get('_id')} {result.get('error')}")
+
+    async def _slice_actions(
+        self, index_name: str, start: int, end: int | None, pool: Executor, progress: ReindexProgress
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        """
+        生成一个 ID 区间的 bulk 写入动作。
+
+        :param index_name: 新索引名称
+        :param start: 起始 ID（含）
+        :param end: 结束 ID（不含），None 表示无上界
+        :param pool: HTML 清洗进程池
+        :param progress: 重建进度
+        :return: bulk 动作异步生成器
+        """
+        stmt = select(Article).where(Article.is_deleted.is_(False), Article.id >= start)
+        if end is not None:
+            stmt = stmt.where(Article.id < end)
+        batch: list[Article] = []
+        async with aclosing(db.stream_scalars(stmt.order_by(Article.id), chunk_size=self.chunk_size)) as stream:
+            async for article in stream:
+                batch.append(article)
+                if len(batch) >= self.chunk_size:
+                    for action in await self._build_actions(index_name, batch, pool, progress):
+                        yield action
+                    batch = []
+        if batch:
+            for action in await self._build_actions(index_name, batch, pool, progress):
+                yield action
+
+    async def _build_actions(
+        self, index_name: str, articles: list[Article], pool: Executor, progress: ReindexProgress
+    ) -> list[dict[str, Any]]:
+        """
+        将一批文章转换为 bulk 写入动作，HTML 清洗在进程池中执行。
+
+        :param index_name: 新索引名称
+        :param articles: 文章列表
+        :param pool: HTML 清洗进程池
+        :param progress: 重建进度
+        :return: bulk 动作列表
+        """
+        documents = await self.build_documents(articles)
+        contents = await asyncio.get_running_loop().run_in_executor(
+            pool, HtmlUtil.remove_html_tags_batch, [document.get("content") for document in documents]
+        )
+        actions = []
+        for document, content in zip(documents, contents):
+            document["content"] = content
+            progress.bytes += len(json.dumps(document, ensure_ascii=False, default=str).encode("utf-8"))
+            actions.append(
+                {
+                    "_op_type": "index",
+                    "_index": index_name,
+                    "_id": document["id"],
+                    "version": 0,
+                    "version_type": "external_gte",
+                    "_source": document,
+                }
+            )
+        return actions
+
+    async def _report(self, progress: ReindexProgress) -> None:
+        """
+        定时输出重建进度。
+
+        :param progress: 重建进度
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(f"文章索引重建中: {progress.report()}")
+
+    async def _switch_alias(self, index_name: str) -> None:
+        """
+        将文章别名原子切换到新物理索引。
+
+        :param index_name: 新物理索引名称
+        :return: None
+        """
+        actions: list[dict[str, dict[str, object]]] = []
+        if await self.client.indices.exists_alias(name=self.alias):
+            aliases = await self.client.indices.get_alias(name=self.alias)
+            actions.extend({"remove": {"index": old_index, "alias": self.alias}} for old_index in aliases)
+        elif await self.client.indices.exists(index=self.alias):
+            actions.append({"remove_index": {"index": self.alias}})
+        actions.append({"add": {"index": index_name, "alias": self.alias, "is_write_index": True}})
+        await self.client.indices.update_aliases(actions=actions)
@@ -4,14 +4,14 @@
 import inspect
 from typing import Any, Type
 
-import aiohttp
 from fastapi import UploadFile
 from fastapi.dependencies.models import Dependant
 from fastapi.routing import APIRoute
 from pydantic import BaseModel
 from typing_extensions import TypeVar
 
-from .depend_inject import Component, ContainerUtil
+from .depend_inject import Component, ContainerUtil, GetBean
+from .http_client import HttpClientPool
 
 T = TypeVar("T")
 
@@ -87,8 +87,9 @@ class Request:
         if param_vo.errors:
             raise Exception(param_vo.print_errors())
         url = f"{self.url}{self.path}".format(**param_vo.path)
-        async with aiohttp.ClientSession() as session:
-            ret = await session.request(self.method, url=url, headers=headers, **param_vo.json)
+        async with GetBean(HttpClientPool).request(self.method, url, headers=headers, **param_vo.json) as ret:
+            # 在连接归还连接池前读取响应体，之后仍可调用 json()/text()
+            await ret.read()
         if issubclass(self.return_annotation, BaseModel):
             return self.return_annotation(**await ret.json())
         return ret
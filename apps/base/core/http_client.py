@@ -0,0 +1,206 @@
+import asyncio
+import random
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import aiohttp
+from yarl import URL
+
+from apps.base.core.depend_inject import Component, RefreshScope, Value, logger
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """
+    上游主机熔断中，请求未发出。
+    """
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    单个上游主机的熔断状态。
+
+    连续失败达到阈值后打开，打开期间直接拒绝请求；冷却时间过后放行请求（半开），
+    成功则关闭，再次失败则重新打开。
+    """
+
+    failure_threshold: int
+    reset_timeout: float
+    failures: int = 0
+    opened_at: float | None = None
+
+    def allow(self) -> bool:
+        """
+        判断是否放行请求。
+
+        :return: 是否放行
+        """
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self) -> None:
+        """
+        记录一次成功。
+
+        :return: None
+        """
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        """
+        记录一次失败。
+
+        :return: None
+        """
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+@Component()
+@RefreshScope("app.http-client")
+class HttpClientPool:
+    """
+    应用级共享的出站 HTTP 客户端。
+
+    所有调用方复用同一个 aiohttp 会话和连接池，保持长连接并缓存 DNS；幂等请求在连接错误、超时
+    和 502/503/504 时按带抖动的指数退避重试；按上游主机熔断，避免故障主机拖慢整个进程。
+
+    配置项 app.http-client:
+        limit: 连接池总连接数，默认 100
+        limit-per-host: 每个主机的连接数，默认 20
+        keepalive-timeout: 空闲连接保持秒数，默认 30
+        dns-ttl: DNS 缓存秒数，默认 300
+        connect-timeout: 连接超时秒数，默认 5
+        total-timeout: 请求总超时秒数，默认 30
+        retries: 幂等请求重试次数，默认 2
+        backoff-base: 退避基础秒数，默认 0.2
+        backoff-max: 退避最大秒数，默认 2
+        breaker-failures: 熔断连续失败次数，默认 5
+        breaker-reset: 熔断冷却秒数，默认 30
+    """
+
+    config: dict = Value("app.http-client")
+
+    def __init__(self) -> None:
+        """
+        初始化 HTTP 客户端配置，会话在首次使用时创建。
+
+        :return: None
+        """
+        config = self.config or {}
+        self.limit = int(config.get("limit") or 100)
+        self.limit_per_host = int(config.get("limit-per-host") or 20)
+        self.keepalive_timeout = float(config.get("keepalive-timeout") or 30)
+        self.dns_ttl = int(config.get("dns-ttl") or 300)
+        self.timeout = aiohttp.ClientTimeout(
+            total=float(config.get("total-timeout") or 30), connect=float(config.get("connect-timeout") or 5)
+        )
+        self.retries = int(config.get("retries") if config.get("retries") is not None else 2)
+        self.backoff_base = float(config.get("backoff-base") or 0.2)
+        self.backoff_max = float(config.get("backoff-max") or 2)
+        self.breaker_failures = int(config.get("breaker-failures") or 5)
+        self.breaker_reset = float(config.get("breaker-reset") or 30)
+        self._session: aiohttp.ClientSession | None = None
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        获取共享会话。
+
+        :return: aiohttp 会话
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_ttl,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    def _get_breaker(self, host: str) -> CircuitBreaker:
+        """
+        获取主机熔断器。
+
+        :param host: 主机名
+        :return: 熔断器
+        """
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+        return breaker
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        计算带完全抖动的退避时间。
+
+        :param attempt: 已失败次数，从 0 开始
+        :return: 退避秒数
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    @asynccontextmanager
+    async def request(
+        self, method: str, url: str | URL, retries: int | None = None, **kwargs: Any
+    ) -> AsyncGenerator[aiohttp.ClientResponse, None]:
+        """
+        发送请求，退出上下文时释放连接回连接池。
+
+        :param method: 请求方法
+        :param url: 请求地址
+        :param retries: 重试次数，默认幂等请求使用配置值，非幂等请求不重试
+        :param kwargs: aiohttp 请求参数
+        :return: 响应异步上下文
+        :raises CircuitOpenError: 上游主机熔断中时抛出
+        """
+        method = method.upper()
+        url = URL(url)
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        breaker = self._get_breaker(url.host or "")
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"{url.host} 熔断中")
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, TimeoutError) as e:
+                breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                logger.warning(f"请求 {method} {url.host}{url.path} 失败，第 {attempt + 1} 次重试: {e!r}")
+            else:
+                if response.status not in RETRY_STATUSES:
+                    breaker.record_success()
+                    break
+                breaker.record_failure()
+                if attempt >= retries:
+                    break
+                response.release()
+                logger.warning(f"请求 {method} {url.host}{url.path} 返回 {response.status}，第 {attempt + 1} 次重试")
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+        try:
+            yield response
+        finally:
+            response.release()
+
+    async def close(self) -> None:
+        """
+        关闭共享会话，应用退出或刷新配置时调用。
+
+        :return: None
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
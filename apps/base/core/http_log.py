@@ -0,0 +1,302 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from json import JSONDecodeError
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.base.core.depend_inject import GetValue
+
+
+class BodyTee:
+    """
+    请求/响应体前缀缓冲区，只保留前 limit 字节。
+    """
+
+    def __init__(self, limit: int) -> None:
+        """
+        初始化缓冲区。
+
+        :param limit: 最大保留字节数
+        :return: None
+        """
+        self.limit = limit
+        self.buffer = bytearray()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        """
+        写入数据块，超过上限的部分只计数不保留。
+
+        :param chunk: 数据块
+        :return: None
+        """
+        self.size += len(chunk)
+        remain = self.limit - len(self.buffer)
+        if remain > 0 and chunk:
+            self.buffer += chunk[:remain]
+
+    @property
+    def truncated(self) -> bool:
+        """
+        是否发生了截断。
+
+        :return: 是否截断
+        """
+        return self.size > len(self.buffer)
+
+
+@dataclass
+class HttpLogRecord:
+    """
+    待格式化的请求日志记录。
+    """
+
+    client_host: str
+    method: str
+    path: str
+    status_code: int = 0
+    process_time: float = 0.0
+    request_body: BodyTee | None = None
+    response_body: BodyTee | None = None
+    request_skipped: bool = False
+    response_skipped: bool = False
+
+
+class BaseHttpLogMiddleware:
+    """
+    纯 ASGI 请求日志中间件。
+
+    不缓存完整请求和响应，只截取 body 前缀；二进制和流式内容不截取；
+    日志格式化交给后台队列处理，支持按路由配置采样率。
+
+    配置项 app.http-log:
+        max-body-size: 截取的 body 最大字节数，默认 4096
+        sample-rates: 路由到采样率(0~1)的映射，路由支持以 * 结尾的前缀匹配
+    """
+
+    LOG_PREFIX = ""
+    CONFIG_KEY = "app.http-log"
+    DEFAULT_MAX_BODY_SIZE = 4096
+    MAX_LOG_DATA_LENGTH = 500
+    QUEUE_SIZE = 10000
+    SKIP_BODY_CONTENT_TYPES = (
+        "multipart/",
+        "application/octet-stream",
+        "application/zip",
+        "application/pdf",
+        "image/",
+        "audio/",
+        "video/",
+        "font/",
+        "text/event-stream",
+    )
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger) -> None:
+        """
+        初始化中间件。
+
+        :param app: 下游 ASGI 应用
+        :param logger: 日志记录器
+        :return: None
+        """
+        self.app = app
+        self.logger = logger
+        self._queue: asyncio.Queue[HttpLogRecord | None] | None = None
+        self._worker_task: asyncio.Task[None] | None = None
+        self.dropped_count = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        处理 ASGI 调用。
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive
+        :param send: ASGI send
+        :return: None
+        """
+        if scope["type"] == "lifespan":
+            await self.app(scope, receive, self._wrap_lifespan_send(send))
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        config = GetValue(self.CONFIG_KEY) or {}
+        client = scope.get("client")
+        record = HttpLogRecord(client_host=client[0] if client else "-", method=scope["method"], path=scope["path"])
+        sampled = self._is_sampled(scope["path"], config.get("sample-rates") or {})
+        max_body_size = int(config.get("max-body-size") or self.DEFAULT_MAX_BODY_SIZE)
+        if sampled:
+            if self._should_skip_body(Headers(scope=scope).get("content-type")):
+                record.request_skipped = True
+            else:
+                record.request_body = BodyTee(max_body_size)
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            if record.request_body is not None and message["type"] == "http.request":
+                record.request_body.write(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                record.status_code = message["status"]
+                if sampled:
+                    if self._should_skip_body(Headers(raw=message.get("headers", [])).get("content-type")):
+                        record.response_skipped = True
+                    else:
+                        record.response_body = BodyTee(max_body_size)
+            elif message["type"] == "http.response.body" and record.response_body is not None:
+                record.response_body.write(message.get("body", b""))
+            await send(message)
+
+        self.add_context_vars(Request(scope, receive_wrapper))
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.after_request()
+            if sampled:
+                record.process_time = time.perf_counter() - start_time
+                state = scope.get("state") or {}
+                record.request_skipped |= state.get("log_request") is False
+                record.response_skipped |= state.get("log_response") is False
+                self._enqueue(record)
+
+    def add_context_vars(self, request: Request) -> None:
+        """
+        添加请求上下文变量，由子类实现。
+
+        :param request: 请求对象
+        :return: None
+        """
+
+    def after_request(self) -> None:
+        """
+        请求处理完成后的回调，由子类按需实现。
+
+        :return: None
+        """
+
+    def _is_sampled(self, path: str, sample_rates: dict[str, float]) -> bool:
+        """
+        按路由采样率判断本次请求是否记录日志。
+
+        :param path: 请求路径
+        :param sample_rates: 路由采样率配置
+        :return: 是否记录
+        """
+        rate = sample_rates.get(path)
+        if rate is None:
+            matched = [
+                (len(route), value)
+                for route, value in sample_rates.items()
+                if route.endswith("*") and path.startswith(route.rstrip("*"))
+            ]
+            rate = max(matched)[1] if matched else 1
+        rate = float(rate)
+        return rate >= 1 or random.random() < rate
+
+    def _should_skip_body(self, content_type: str | None) -> bool:
+        """
+        判断内容类型是否为二进制或流式内容。
+
+        :param content_type: Content-Type 头
+        :return: 是否跳过 body
+        """
+        return bool(content_type) and content_type.lower().startswith(self.SKIP_BODY_CONTENT_TYPES)
+
+    def _enqueue(self, record: HttpLogRecord) -> None:
+        """
+        将日志记录放入后台队列，队列满时丢弃。
+
+        :param record: 日志记录
+        :return: None
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.QUEUE_SIZE)
+            self._worker_task = asyncio.create_task(self._consume(), name="http-log-writer")
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped_count += 1
+
+    async def _consume(self) -> None:
+        """
+        后台消费并输出日志。
+
+        :return: None
+        """
+        while True:
+            record = await self._queue.get()
+            if record is None:
+                return
+            try:
+                self.logger.info(self.format_record(record))
+            except Exception as e:
+                self.logger.warning(f"请求日志格式化失败 {e}")
+
+    def format_record(self, record: HttpLogRecord) -> str:
+        """
+        格式化日志记录。
+
+        :param record: 日志记录
+        :return: 日志文本
+        """
+        request_data = "-" if record.request_skipped else self._format_body(record.request_body)
+        response_data = "-" if record.response_skipped else self._format_body(record.response_body)
+        return (
+            f"[{self.LOG_PREFIX}{record.client_host}|{record.status_code}|{record.method}|{record.path}|"
+            f"{request_data}|{response_data}|耗时:{record.process_time}]"
+        )
+
+    def _format_body(self, body: BodyTee | None) -> str:
+        """
+        将截取的 body 转为日志文本。
+
+        :param body: body 缓冲区
+        :return: 日志文本
+        """
+        if body is None or not body.buffer:
+            return "-"
+        text = bytes(body.buffer).decode("utf-8", errors="replace")
+        if not body.truncated:
+            with suppress(JSONDecodeError):
+                text = json.dumps(json.loads(text), ensure_ascii=False)
+        return text[: self.MAX_LOG_DATA_LENGTH]
+
+    def _wrap_lifespan_send(self, send: Send) -> Send:
+        """
+        包装 lifespan send，在应用关闭时刷出剩余日志。
+
+        :param send: ASGI send
+        :return: 包装后的 send
+        """
+
+        async def wrapper(message: Message) -> None:
+            if message["type"] == "lifespan.shutdown.complete":
+                await self.close()
+            await send(message)
+
+        return wrapper
+
+    async def close(self) -> None:
+        """
+        刷出队列中的日志并停止后台任务。
+
+        :return: None
+        """
+        if self._queue is None or self._worker_task is None:
+            return
+        await self._queue.put(None)
+        with suppress(Exception):
+            await self._worker_task
+        self._queue = None
+        self._worker_task = None
@@ -0,0 +1,774 @@
+import asyncio
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.base.core.depend_inject import GetValue, logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MULTIPROC_DIR_ENV = "METRICS_MULTIPROC_DIR"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MmapedDict:
+    """
+    基于 mmap 文件的 key -> float 存储，每个进程独占写一个文件，抓取时由任意进程读取全部文件汇总。
+
+    文件格式：4 字节已用长度 + 4 字节保留，之后为若干条目：4 字节 key 长度、key、补齐到 8 字节、8 字节 double。
+    先写条目再更新已用长度，读取方不会读到写了一半的条目。
+    """
+
+    INITIAL_SIZE = 1 << 16
+    HEADER_SIZE = 8
+
+    def __init__(self, path: str | Path) -> None:
+        """
+        打开或创建 mmap 文件。
+
+        :param path: 文件路径
+        :return: None
+        """
+        self._file = open(path, "a+b")
+        capacity = os.fstat(self._file.fileno()).st_size
+        if capacity == 0:
+            capacity = self.INITIAL_SIZE
+            self._file.truncate(capacity)
+        self._capacity = capacity
+        self._mmap = mmap.mmap(self._file.fileno(), capacity)
+        self._used = struct.unpack_from("<i", self._mmap, 0)[0] or self.HEADER_SIZE
+        struct.pack_into("<i", self._mmap, 0, self._used)
+        self._positions = {key: pos for key, _, pos in self.iter_entries(self._mmap, self._used)}
+
+    @classmethod
+    def iter_entries(cls, data: bytes | mmap.mmap, used: int) -> Iterator[tuple[str, float, int]]:
+        """
+        遍历存储中的条目。
+
+        :param data: 文件内容
+        :param used: 已用长度
+        :return: (key, 值, 值偏移量) 迭代器
+        """
+        pos = cls.HEADER_SIZE
+        while pos < used:
+            (key_len,) = struct.unpack_from("<i", data, pos)
+            key = bytes(data[pos + 4 : pos + 4 + key_len]).decode("utf-8")
+            value_pos = pos + 4 + key_len + (8 - (key_len + 4) % 8) % 8
+            (value,) = struct.unpack_from("<d", data, value_pos)
+            yield key, value, value_pos
+            pos = value_pos + 8
+
+    @classmethod
+    def read_file(cls, path: str | Path) -> Iterator[tuple[str, float]]:
+        """
+        读取其他进程的存储文件。
+
+        :param path: 文件路径
+        :return: (key, 值) 迭代器
+        """
+        data = Path(path).read_bytes()
+        if len(data) < cls.HEADER_SIZE:
+            return
+        used = min(struct.unpack_from("<i", data, 0)[0], len(data))
+        for key, value, _ in cls.iter_entries(data, used):
+            yield key, value
+
+    def read(self, key: str) -> float:
+        """
+        读取值。
+
+        :param key: 存储 key
+        :return: 值，不存在时为 0
+        """
+        pos = self._positions.get(key)
+        return struct.unpack_from("<d", self._mmap, pos)[0] if pos is not None else 0.0
+
+    def write(self, key: str, value: float) -> None:
+        """
+        写入值。
+
+        :param key: 存储 key
+        :param value: 值
+        :return: None
+        """
+        pos = self._positions.get(key)
+        if pos is None:
+            pos = self._init_key(key)
+        struct.pack_into("<d", self._mmap, pos, value)
+
+    def items(self) -> Iterator[tuple[str, float]]:
+        """
+        遍历本进程的全部值。
+
+        :return: (key, 值) 迭代器
+        """
+        for key, value, _ in self.iter_entries(self._mmap, self._used):
+            yield key, value
+
+    def _init_key(self, key: str) -> int:
+        """
+        追加新条目。
+
+        :param key: 存储 key
+        :return: 值偏移量
+        """
+        encoded = key.encode("utf-8")
+        padding = (8 - (len(encoded) + 4) % 8) % 8
+        entry = struct.pack(f"<i{len(encoded)}s{padding}xd", len(encoded), encoded, 0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._file.truncate(self._capacity)
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._mmap[self._used : self._used + len(entry)] = entry
+        pos = self._used + len(entry) - 8
+        self._used += len(entry)
+        struct.pack_into("<i", self._mmap, 0, self._used)
+        self._positions[key] = pos
+        return pos
+
+    def close(self) -> None:
+        """
+        关闭文件。
+
+        :return: None
+        """
+        self._mmap.close()
+        self._file.close()
+
+
+class MetricValues:
+    """
+    本进程的指标值存储。
+
+    设置环境变量 METRICS_MULTIPROC_DIR 时写入该目录下以 pid 命名的 mmap 文件，gunicorn 多个 worker
+    共享同一目录，任一 worker 抓取时汇总全部进程的值；未设置时只保存在内存中。
+    目录需要在主进程启动前清空。
+    """
+
+    def __init__(self) -> None:
+        """
+        初始化指标值存储。
+
+        :return: None
+        """
+        self._lock = threading.Lock()
+        self._local: dict[str, float] = {}
+        self._mmaped: MmapedDict | None = None
+        self._pid: int | None = None
+
+    @staticmethod
+    def multiproc_dir() -> str | None:
+        """
+        获取多进程共享目录。
+
+        :return: 目录路径，未开启多进程模式时为 None
+        """
+        return os.getenv(MULTIPROC_DIR_ENV) or None
+
+    def _store(self) -> MmapedDict | None:
+        """
+        获取本进程的 mmap 存储，fork 后的子进程重新创建自己的文件。
+
+        :return: mmap 存储，未开启多进程模式时为 None
+        """
+        directory = self.multiproc_dir()
+        if not directory:
+            return None
+        pid = os.getpid()
+        if self._pid != pid:
+            self._mmaped = MmapedDict(Path(directory) / f"metrics_{pid}.db")
+            self._pid = pid
+        return self._mmaped
+
+    def inc(self, key: str, amount: float) -> None:
+        """
+        增加值。
+
+        :param key: 存储 key
+        :param amount: 增量
+        :return: None
+        """
+        with self._lock:
+            store = self._store()
+            if store is None:
+                self._local[key] = self._local.get(key, 0.0) + amount
+            else:
+                store.write(key, store.read(key) + amount)
+
+    def set(self, key: str, value: float) -> None:
+        """
+        设置值。
+
+        :param key: 存储 key
+        :param value: 值
+        :return: None
+        """
+        with self._lock:
+            store = self._store()
+            if store is None:
+                self._local[key] = value
+            else:
+                store.write(key, value)
+
+    def collect(self, live_only_prefixes: tuple[str, ...]) -> dict[str, float]:
+        """
+        汇总所有进程的值。
+
+        :param live_only_prefixes: 只统计存活进程的 key 前缀（gauge），已退出进程的残留值会被忽略
+        :return: key 到汇总值的映射
+        """
+        directory = self.multiproc_dir()
+        if not directory:
+            with self._lock:
+                return dict(self._local)
+        with self._lock:
+            self._store()
+        totals: dict[str, float] = {}
+        for path in Path(directory).glob("metrics_*.db"):
+            try:
+                pid = int(path.stem.rsplit("_", 1)[1])
+                alive = self._pid_alive(pid)
+                for key, value in MmapedDict.read_file(path):
+                    if not alive and key.startswith(live_only_prefixes):
+                        continue
+                    totals[key] = totals.get(key, 0.0) + value
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"读取指标文件 {path} 失败: {e}")
+        return totals
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        """
+        判断进程是否存活。
+
+        :param pid: 进程 ID
+        :return: 是否存活
+        """
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+class MetricRegistry:
+    """
+    指标注册表。
+    """
+
+    def __init__(self) -> None:
+        """
+        初始化注册表。
+
+        :return: None
+        """
+        self.values = MetricValues()
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: "Metric") -> None:
+        """
+        注册指标。
+
+        :param metric: 指标
+        :return: None
+        :raises ValueError: 指标名重复时抛出
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"指标 {metric.name} 已注册")
+        self._metrics[metric.name] = metric
+
+    def generate_latest(self) -> str:
+        """
+        生成 Prometheus 文本格式的全部指标。
+
+        :return: 指标文本
+        """
+        # gauge 只统计存活进程，key 是 json 数组，以 ["指标名", 开头
+        gauges = tuple(
+            f"{json.dumps([name])[:-1]}," for name, metric in self._metrics.items() if metric.type == "gauge"
+        )
+        samples: dict[str, list[tuple[str, dict[str, str], float]]] = {}
+        for key, value in self.values.collect(gauges).items():
+            name, suffix, labels = json.loads(key)
+            samples.setdefault(name, []).append((suffix, dict(labels), value))
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            documentation = metric.documentation.replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            lines.extend(metric.expose(samples.get(name, [])))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricRegistry()
+
+
+def _escape(value: str) -> str:
+    """
+    转义标签值和说明文本中的反斜杠、换行和双引号。
+
+    :param value: 原始文本
+    :return: 转义后的文本
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    """
+    格式化标签。
+
+    :param labels: 标签
+    :return: 标签文本
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    """
+    格式化样本值。
+
+    :param value: 样本值
+    :return: 值文本
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class MetricChild:
+    """
+    带具体标签值的指标。
+    """
+
+    def __init__(self, metric: "Metric", labels: tuple[tuple[str, str], ...]) -> None:
+        """
+        初始化指标子项。
+
+        :param metric: 所属指标
+        :param labels: 标签键值对
+        :return: None
+        """
+        self._metric = metric
+        self._labels = labels
+        self._keys: dict[str, str] = {}
+
+    def _key(self, suffix: str = "", extra: tuple[tuple[str, str], ...] = ()) -> str:
+        """
+        生成存储 key。
+
+        :param suffix: 样本名后缀
+        :param extra: 额外标签
+        :return: 存储 key
+        """
+        cache_key = suffix + repr(extra)
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = json.dumps([self._metric.name, suffix, [list(item) for item in self._labels + extra]])
+            self._keys[cache_key] = key
+        return key
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        增加计数器或仪表值。
+
+        :param amount: 增量
+        :return: None
+        :raises ValueError: 计数器增量为负时抛出
+        """
+        if self._metric.type == "counter" and amount < 0:
+            raise ValueError("计数器只能增加")
+        self._metric.registry.values.inc(self._key(), amount)
+
+    def dec(self, amount: float = 1) -> None:
+        """
+        减少仪表值。
+
+        :param amount: 减量
+        :return: None
+        """
+        self._metric.registry.values.inc(self._key(), -amount)
+
+    def set(self, value: float) -> None:
+        """
+        设置仪表值。
+
+        :param value: 值
+        :return: None
+        """
+        self._metric.registry.values.set(self._key(), value)
+
+    def observe(self, value: float) -> None:
+        """
+        记录直方图观测值。
+
+        :param value: 观测值
+        :return: None
+        """
+        metric = self._metric
+        values = metric.registry.values
+        index = bisect_left(metric.buckets, value)
+        if index < len(metric.buckets):
+            values.inc(self._key("_bucket", (("le", metric.bucket_labels[index]),)), 1)
+        values.inc(self._key("_sum"), value)
+        values.inc(self._key("_count"), 1)
+
+
+class Metric:
+    """
+    指标基类。
+    """
+
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: MetricRegistry = REGISTRY,
+    ) -> None:
+        """
+        初始化并注册指标。
+
+        :param name: 指标名
+        :param documentation: 指标说明
+        :param labelnames: 标签名
+        :param registry: 注册表
+        :return: None
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self._children: dict[tuple[str, ...], MetricChild] = {}
+        self._children_lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, *values: Any, **kwargs: Any) -> MetricChild:
+        """
+        获取指定标签值的指标子项。
+
+        :param values: 按标签名顺序的标签值
+        :param kwargs: 按标签名指定的标签值
+        :return: 指标子项
+        :raises ValueError: 标签数量或名称不匹配时抛出
+        """
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}")
+        label_values = tuple(str(value) for value in values)
+        child = self._children.get(label_values)
+        if child is None:
+            with self._children_lock:
+                child = self._children.setdefault(
+                    label_values, MetricChild(self, tuple(zip(self.labelnames, label_values)))
+                )
+        return child
+
+    def expose(self, samples: list[tuple[str, dict[str, str], float]]) -> list[str]:
+        """
+        生成本指标的样本行。
+
+        :param samples: (样本名后缀, 标签, 值) 列表
+        :return: 样本行
+        """
+        return [
+            f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}" for suffix, labels, value in samples
+        ]
+
+
+class Counter(Metric):
+    """
+    只增计数器。
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        增加无标签计数器。
+
+        :param amount: 增量
+        :return: None
+        """
+        self.labels().inc(amount)
+
+    def expose(self, samples: list[tuple[str, dict[str, str], float]]) -> list[str]:
+        """
+        生成本指标的样本行，计数器样本名以 _total 结尾。
+
+        :param samples: (样本名后缀, 标签, 值) 列表
+        :return: 样本行
+        """
+        sample_name = self.name if self.name.endswith("_total") else f"{self.name}_total"
+        return [f"{sample_name}{_format_labels(labels)} {_format_value(value)}" for _, labels, value in samples]
+
+
+class Gauge(Metric):
+    """
+    可增可减的仪表，多进程模式下为所有存活进程的和。
+    """
+
+    type = "gauge"
+
+    def set(self, value: float) -> None:
+        """
+        设置无标签仪表值。
+
+        :param value: 值
+        :return: None
+        """
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        增加无标签仪表值。
+
+        :param amount: 增量
+        :return: None
+        """
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        """
+        减少无标签仪表值。
+
+        :param amount: 减量
+        :return: None
+        """
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    """
+    直方图，存储各桶的非累计计数，导出时转换为累计计数。
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        registry: MetricRegistry = REGISTRY,
+    ) -> None:
+        """
+        初始化并注册直方图。
+
+        :param name: 指标名
+        :param documentation: 指标说明
+        :param labelnames: 标签名
+        :param buckets: 桶上界，升序，不含 +Inf
+        :param registry: 注册表
+        :return: None
+        """
+        self.buckets = tuple(sorted(float(bucket) for bucket in buckets if not math.isinf(bucket)))
+        self.bucket_labels = tuple(_format_value(bucket) for bucket in self.buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float) -> None:
+        """
+        记录无标签直方图观测值。
+
+        :param value: 观测值
+        :return: None
+        """
+        self.labels().observe(value)
+
+    def expose(self, samples: list[tuple[str, dict[str, str], float]]) -> list[str]:
+        """
+        生成本指标的样本行。
+
+        :param samples: (样本名后缀, 标签, 值) 列表
+        :return: 样本行
+        """
+        series: dict[tuple[tuple[str, str], ...], dict[str, Any]] = {}
+        for suffix, labels, value in samples:
+            le = labels.pop("le", None)
+            item = series.setdefault(tuple(labels.items()), {"buckets": {}, "_sum": 0.0, "_count": 0.0})
+            if suffix == "_bucket":
+                item["buckets"][le] = value
+            else:
+                item[suffix] = value
+        lines = []
+        for labels, item in series.items():
+            cumulative = 0.0
+            for bucket_label in self.bucket_labels:
+                cumulative += item["buckets"].get(bucket_label, 0.0)
+                bucket_labels = _format_labels({**dict(labels), "le": bucket_label})
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            inf_labels = _format_labels({**dict(labels), "le": "+Inf"})
+            lines.append(f"{self.name}_bucket{inf_labels} {_format_value(item['_count'])}")
+            lines.append(f"{self.name}_sum{_format_labels(dict(labels))} {_format_value(item['_sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(dict(labels))} {_format_value(item['_count'])}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时", ("app", "method", "route", "status")
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "数据库连接池已签出连接数", ("engine",))
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds",
+    "Redis 命令耗时",
+    ("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+KAFKA_CONSUMER_LAG = Gauge("kafka_consumer_lag", "Kafka 消费延迟消息数", ("topic", "partition", "group"))
+WEBSOCKET_CONNECTIONS = Gauge("websocket_connections", "WebSocket 连接数")
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "定时任务执行耗时",
+    ("job", "status"),
+    buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0),
+)
+
+
+class MetricsMiddleware:
+    """
+    按路由模板统计请求耗时，未匹配路由的请求归入 unmatched，避免路径参数造成标签爆炸。
+    """
+
+    def __init__(self, app: ASGIApp, app_name: str) -> None:
+        """
+        初始化中间件。
+
+        :param app: 下游 ASGI 应用
+        :param app_name: 应用名称标签
+        :return: None
+        """
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        处理 ASGI 调用。
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive
+        :param send: ASGI send
+        :return: None
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(self.app_name, scope["method"], template, status).observe(
+                time.perf_counter() - start
+            )
+
+
+class MetricsServer:
+    """
+    独立端口的最小 /metrics 服务，不经过业务应用的路由和鉴权，只应在内网暴露给 Prometheus。
+
+    gunicorn 多个 worker 以 reuse_port 共享同一端口，任一 worker 都从多进程目录汇总全部进程的指标。
+    """
+
+    def __init__(self, host: str, port: int, reuse_port: bool = False) -> None:
+        """
+        初始化指标服务。
+
+        :param host: 监听地址
+        :param port: 监听端口
+        :param reuse_port: 是否允许多个进程监听同一端口
+        :return: None
+        """
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self._server: asyncio.Server | None = None
+
+    @classmethod
+    def from_config(cls, reuse_port: bool = False) -> "MetricsServer | None":
+        """
+        按 app.metrics 配置创建指标服务。
+
+        :param reuse_port: 是否允许多个进程监听同一端口
+        :return: 指标服务，未配置端口时返回 None
+        """
+        config = GetValue("app.metrics") or {}
+        if not config.get("port"):
+            return None
+        return cls(config.get("host") or "0.0.0.0", int(config["port"]), reuse_port)
+
+    async def start(self) -> None:
+        """
+        启动指标服务。
+
+        :return: None
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, reuse_port=self.reuse_port)
+        logger.info(f"指标服务已启动 http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        """
+        停止指标服务。
+
+        :return: None
+        """
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        处理一次 HTTP 请求。
+
+        :param reader: 输入流
+        :param writer: 输出流
+        :return: None
+        """
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, REGISTRY.generate_latest().encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"not found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except asyncio.TimeoutError, ConnectionError, UnicodeDecodeError:
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
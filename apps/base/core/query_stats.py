@@ -0,0 +1,222 @@
+import re
+import time
+from collections import Counter
+from collections.abc import Generator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.base.core.depend_inject import GetValue, logger
+
+CONFIG_KEY = "app.query-stats"
+DEFAULT_SLOW_SQL_MS = 200
+DEFAULT_SLOW_REDIS_MS = 50
+DEFAULT_REPEAT_THRESHOLD = 5
+STATS_HEADER = "X-Query-Stats"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|:\w+|%\(\w+\)s)\s*,?)+\)", re.IGNORECASE)
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\b\d+(?:\.\d+)?\b")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+@dataclass
+class QueryStats:
+    """
+    一次请求内的 SQL 和 Redis 调用统计。
+    """
+
+    sql_count: int = 0
+    sql_time: float = 0.0
+    redis_count: int = 0
+    redis_time: float = 0.0
+    fingerprints: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        获取重复次数超过阈值的语句指纹，通常意味着循环内逐条查询（N+1）。
+
+        :param threshold: 重复次数阈值
+        :return: 指纹和次数列表
+        """
+        return [(fingerprint, count) for fingerprint, count in self.fingerprints.most_common() if count > threshold]
+
+    def summary(self) -> str:
+        """
+        生成统计摘要。
+
+        :return: 摘要文本
+        """
+        return (
+            f"sql={self.sql_count};sql_ms={self.sql_time * 1000:.1f};"
+            f"redis={self.redis_count};redis_ms={self.redis_time * 1000:.1f}"
+        )
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _config() -> dict[str, Any]:
+    """
+    获取查询统计配置。
+
+    :return: 配置字典
+    """
+    return GetValue(CONFIG_KEY) or {}
+
+
+def sql_fingerprint(statement: str) -> str:
+    """
+    归一化 SQL 语句，IN 列表、字面量和空白差异不影响指纹。
+
+    :param statement: SQL 语句
+    :return: 语句指纹
+    """
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    statement = _IN_LIST_RE.sub("IN (?)", statement)
+    return _LITERAL_RE.sub("?", statement)
+
+
+def redis_fingerprint(args: Sequence[Any]) -> str:
+    """
+    归一化 Redis 命令，只保留命令名和去掉数字后的第一个 key。
+
+    :param args: 命令参数
+    :return: 命令指纹
+    """
+    if not args:
+        return "REDIS"
+    command = str(args[0]).upper()
+    if len(args) < 2:
+        return f"REDIS {command}"
+    return f"REDIS {command} {_DIGITS_RE.sub('?', str(args[1]))}"
+
+
+def _record(fingerprint: str, elapsed: float, is_sql: bool) -> None:
+    """
+    记录一次调用并输出慢调用日志。
+
+    :param fingerprint: 调用指纹
+    :param elapsed: 耗时秒数
+    :param is_sql: 是否为 SQL
+    :return: None
+    """
+    stats = _query_stats.get()
+    if stats is not None:
+        if is_sql:
+            stats.sql_count += 1
+            stats.sql_time += elapsed
+        else:
+            stats.redis_count += 1
+            stats.redis_time += elapsed
+        stats.fingerprints[fingerprint] += 1
+    config = _config()
+    if is_sql:
+        threshold = float(config.get("slow-sql-ms") or DEFAULT_SLOW_SQL_MS)
+    else:
+        threshold = float(config.get("slow-redis-ms") or DEFAULT_SLOW_REDIS_MS)
+    if elapsed * 1000 >= threshold:
+        logger.warning(f"慢{'查询' if is_sql else ' Redis 命令'} {elapsed * 1000:.1f}ms: {fingerprint[:500]}")
+
+
+def record_redis_command(args: Sequence[Any], elapsed: float) -> None:
+    """
+    记录一次 Redis 命令。
+
+    :param args: 命令参数
+    :param elapsed: 耗时秒数
+    :return: None
+    """
+    _record(redis_fingerprint(args), elapsed, is_sql=False)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    为 Engine 注册语句计时事件。
+
+    :param engine: 同步 Engine，异步 Engine 传入其 sync_engine
+    :return: None
+    """
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, *_: Any) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn: Any, cursor: Any, statement: str, *_: Any) -> None:
+        starts = conn.info.get("query_start_time")
+        if starts:
+            _record(sql_fingerprint(statement), time.perf_counter() - starts.pop(), is_sql=True)
+
+    def handle_error(context: Any) -> None:
+        starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+@contextmanager
+def track_queries() -> Generator[QueryStats, None, None]:
+    """
+    在上下文内统计 SQL 和 Redis 调用，可用于在测试中校验接口的查询次数。
+
+    :return: 统计对象
+    """
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class QueryStatsMiddleware:
+    """
+    请求级查询统计中间件。
+
+    配置项 app.query-stats:
+        slow-sql-ms: 慢查询阈值毫秒数，默认 200
+        slow-redis-ms: 慢 Redis 命令阈值毫秒数，默认 50
+        repeat-threshold: 同一语句指纹在一次请求中超过该次数时告警，默认 5
+        header: 是否在响应头 X-Query-Stats 中返回统计摘要，仅用于调试
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        初始化中间件。
+
+        :param app: 下游 ASGI 应用
+        :return: None
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        处理 ASGI 调用。
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive
+        :param send: ASGI send
+        :return: None
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        config = _config()
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and config.get("header"):
+                    MutableHeaders(scope=message).append(STATS_HEADER, stats.summary())
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+        threshold = int(config.get("repeat-threshold") or DEFAULT_REPEAT_THRESHOLD)
+        for fingerprint, count in stats.repeated(threshold):
+            logger.warning(f"疑似 N+1 查询 {scope['path']}: 同一语句执行 {count} 次: {fingerprint[:500]}")
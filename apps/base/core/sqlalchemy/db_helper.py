@@ -1,18 +1,144 @@
-from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Sequence, Type, TypeVar
-
-from sqlalchemy import Result, Row, Select, select
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, AsyncGenerator, Callable, Generic, Sequence, Type, TypeVar
+
+from sqlalchemy import ColumnElement, Result, Row, Select, and_, func, or_, select, tuple_
 from sqlalchemy.dialects.mysql import insert
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
 
+from apps.base.core.depend_inject import GetValue
 from apps.base.core.sqlalchemy.base_model import BaseModel
-from apps.base.core.sqlalchemy.session import get_session_factory
+from apps.base.core.sqlalchemy.session import (
+    ReplicaEngine,
+    SqlAlchemySessionManager,
+    get_session_factory,
+    get_session_manager,
+    mark_primary_write,
+    pin_primary,
+)
+from apps.base.exception.my_exception import MyException
 
 T = TypeVar("T", bound=BaseModel)
 
 
+class RequestSessionScope:
+    """
+    请求级只读会话作用域。
+
+    每个目标库（主库或本请求选中的副本）最多占用一个 AUTOCOMMIT 连接，
+    每条语句都能读到最新提交的数据，不影响读己之写；查询结果在返回前从会话中移出，
+    与每次新建会话时的对象状态一致。
+
+    作用域关闭后不再分配会话，继承了该上下文的后台任务（如请求内 create_task 的通知推送）
+    改走非作用域路径，避免在请求结束后打开无人归还的连接。
+    """
+
+    def __init__(self) -> None:
+        """
+        初始化请求级会话作用域。
+
+        :return: None。
+        """
+        self.lock = asyncio.Lock()
+        self.sessions: dict[str, AsyncSession] = {}
+        self.replica: ReplicaEngine | None = None
+        self.reused = 0
+        self.connections = 0
+        self.wait_time = 0.0
+        self.closed = False
+
+    async def acquire(self, manager: SqlAlchemySessionManager) -> tuple[AsyncSession, ReplicaEngine | None]:
+        """
+        获取作用域会话，同一请求固定使用第一次选中的副本。
+
+        :param manager: SQLAlchemy Session 管理器。
+        :return: 会话和所在副本，读主库时副本为 None。
+        """
+        replica = manager.pick_read_replica()
+        if replica is not None:
+            pinned = self.replica
+            if pinned is not None and pinned.healthy and pinned.lag <= manager.replica_max_lag:
+                replica = pinned
+            else:
+                self.replica = replica
+        name = replica.name if replica else manager.PRIMARY_NAME
+        session = self.sessions.get(name)
+        if session is not None:
+            self.reused += 1
+            return session, replica
+        start = time.perf_counter()
+        engine = replica.engine if replica else manager.engine
+        conn = await engine.connect()
+        try:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+        except BaseException:
+            await conn.close()
+            raise
+        self.wait_time += time.perf_counter() - start
+        self.connections += 1
+        factory = replica.session_factory if replica else manager.session_factory
+        session = factory(bind=conn)
+        session.info.update(replica=replica is not None, scope_key=name, connection=conn)
+        self.sessions[name] = session
+        return session, replica
+
+    async def discard(self, session: AsyncSession) -> None:
+        """
+        关闭并移除出错的作用域会话。
+
+        :param session: 作用域会话。
+        :return: None。
+        """
+        self.sessions.pop(session.info.get("scope_key"), None)
+        with suppress(Exception):
+            await session.close()
+        with suppress(Exception):
+            await session.info["connection"].close()
+
+    async def close(self) -> None:
+        """
+        关闭作用域并归还连接，等待正在使用作用域会话的查询结束后再关闭。
+
+        :return: None。
+        """
+        self.closed = True
+        async with self.lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+            for session in sessions:
+                await self.discard(session)
+
+
+_request_scope: ContextVar[RequestSessionScope | None] = ContextVar("db_request_scope", default=None)
+
+
+@dataclass
+class KeysetPage(Generic[T]):
+    """
+    keyset 分页结果。
+    """
+
+    records: list[T]
+    next_cursor: str | None
+    total: int | None = None
+
+
 class AsyncDBHelper:
+    CURSOR_SECRET_KEY = "app.db.cursor-secret"
+    COUNT_CACHE_TTL = 30
+    COUNT_CACHE_SIZE = 1024
+
     def __init__(self, session_factory: async_sessionmaker[AsyncSession] | None = None) -> None:
         """
         初始化异步数据库助手。
@@ -21,6 +147,7 @@ class AsyncDBHelper:
         :return: None。
         """
         self._session_factory = session_factory
+        self._count_cache: dict[str, tuple[float, int]] = {}
 
     @property
     def session_factory(self) -> async_sessionmaker[AsyncSession]:
@@ -58,10 +185,100 @@ class AsyncDBHelper:
         """
         提供事务自动提交上下文。
 
+        事务内的只读查询走主库，提交后在读己之写窗口内的只读查询也走主库。
+
         :return: SQLAlchemy 异步 Session。
         """
-        async with self.session_factory.begin() as session:
-            yield session
+        with pin_primary():
+            async with self.session_factory.begin() as session:
+                yield session
+        mark_primary_write()
+
+    @asynccontextmanager
+    async def request_scope(self) -> AsyncGenerator[RequestSessionScope, None]:
+        """
+        开启请求级会话作用域，作用域内的只读查询复用同一个连接，结束时统一归还。
+
+        :return: 请求级会话作用域。
+        """
+        scope = RequestSessionScope()
+        token = _request_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _request_scope.reset(token)
+            await scope.close()
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        提供只读 Session 上下文，按读写分离规则选择副本或主库。
+
+        处于请求级作用域且作用域会话空闲时复用作用域会话；作用域会话正被其他并发任务
+        （如 asyncio.gather 中的其他查询）占用或作用域已关闭时，使用独立的子会话，互不阻塞。
+
+        :return: SQLAlchemy 异步 Session。
+        """
+        if self._session_factory is not None:
+            async with self._session_factory() as session:
+                yield session
+            return
+        manager = get_session_manager()
+        scope = _request_scope.get()
+        if scope is not None and not scope.closed and not scope.lock.locked():
+            async with scope.lock:
+                # 等待锁期间作用域可能已关闭
+                if not scope.closed:
+                    replica = None
+                    session = None
+                    try:
+                        session, replica = await scope.acquire(manager)
+                        yield session
+                    except (OperationalError, InterfaceError) as e:
+                        if replica is not None:
+                            manager.mark_replica_down(replica, e)
+                        if session is not None:
+                            await scope.discard(session)
+                        raise
+                    except Exception:
+                        if session is not None:
+                            with suppress(Exception):
+                                await session.rollback()
+                        raise
+                    finally:
+                        if session is not None:
+                            session.expunge_all()
+                    return
+        replica = manager.pick_read_replica()
+        factory = replica.session_factory if replica else manager.session_factory
+        try:
+            async with factory() as session:
+                session.info["replica"] = replica is not None
+                yield session
+        except (OperationalError, InterfaceError) as e:
+            if replica is not None:
+                manager.mark_replica_down(replica, e)
+            raise
+
+    async def _read(self, stmt: Select, extract: Callable[[Result[Any]], Any]) -> Any:
+        """
+        执行只读查询，副本连接失败时改读主库。
+
+        :param stmt: SQLAlchemy 查询语句。
+        :param extract: 从执行结果中取值的函数。
+        :return: 查询结果。
+        """
+        used_replica = False
+        try:
+            async with self.read_session() as session:
+                used_replica = session.info.get("replica", False)
+                return extract(await session.execute(stmt))
+        except OperationalError, InterfaceError:
+            if not used_replica:
+                raise
+        with pin_primary():
+            async with self.read_session() as session:
+                return extract(await session.execute(stmt))
 
     async def execute(self, stmt: Any, session: AsyncSession | None = None) -> Result[Any]:
         """
@@ -91,6 +308,19 @@ class AsyncDBHelper:
             await session.flush()
             return data
 
+    async def bulk_create(self, model: Type[T], rows: list[dict[str, Any]]) -> None:
+        """
+        使用一条多行 INSERT 批量插入数据。
+
+        :param model: 模型类
+        :param rows: 待插入的行数据
+        :return: None。
+        """
+        if not rows:
+            return
+        async with self.atomic() as session:
+            await session.execute(insert(model), rows)
+
     async def create_or_update(self, model: Type[T], data: dict[str, Any], update_columns: list[str]) -> Result[Any]:
         """
         创建或更新对象
@@ -153,9 +383,7 @@ class AsyncDBHelper:
         :param stmt: SQLAlchemy 查询语句。
         :return: 行列表。
         """
-        async with self.session_factory() as session:
-            result = await session.execute(stmt)
-            return result.all()
+        return await self._read(stmt, lambda result: result.all())
 
     async def model_all(self, stmt: Select) -> Sequence[Any]:
         """
@@ -164,9 +392,7 @@ class AsyncDBHelper:
         :param stmt: SQLAlchemy 查询语句。
         :return: 模型结果列表。
         """
-        async with self.session_factory() as session:
-            result = await session.execute(stmt)
-            return result.scalars().all()
+        return await self._read(stmt, lambda result: result.scalars().all())
 
     async def first(self, stmt: Select) -> Any:
         """
@@ -175,9 +401,7 @@ class AsyncDBHelper:
         :param stmt: SQLAlchemy 查询语句。
         :return: Row对象。
         """
-        async with self.session_factory() as session:
-            result = await session.execute(stmt)
-            return result.first()
+        return await self._read(stmt, lambda result: result.first())
 
     async def model_first(self, stmt: Select) -> Any:
         """
@@ -186,9 +410,7 @@ class AsyncDBHelper:
         :param stmt: SQLAlchemy 查询语句。
         :return: 实例或None。
         """
-        async with self.session_factory() as session:
-            result = await session.execute(stmt)
-            return result.scalars().first()
+        return await self._read(stmt, lambda result: result.scalars().first())
 
     async def scalar(self, stmt: Select) -> Any:
         """
@@ -197,8 +419,7 @@ class AsyncDBHelper:
         :param stmt: SQLAlchemy 查询语句。
         :return:
         """
-        async with self.session_factory() as session:
-            return await session.scalar(stmt)
+        return await self._read(stmt, lambda result: result.scalar())
 
     async def stream_rows(self, stmt: Select, chunk_size: int = 1000) -> AsyncGenerator[Row, None]:
         """
@@ -208,7 +429,7 @@ class AsyncDBHelper:
         :param chunk_size: 流式大小。
         :return: Row 异步生成器。
         """
-        async with self.session_factory() as session:
+        async with self.read_session() as session:
             result = await session.stream(stmt.execution_options(yield_per=chunk_size))
 
             async for row in result:
@@ -222,11 +443,195 @@ class AsyncDBHelper:
         :param chunk_size: 流式大小。
         :return: 模型对象异步生成器。
         """
-        async with self.session_factory() as session:
+        async with self.read_session() as session:
             result = await session.stream_scalars(stmt.execution_options(yield_per=chunk_size))
 
             async for item in result:
                 yield item
 
+    async def count(self, stmt: Select, cache_ttl: float = 0) -> int:
+        """
+        统计查询结果总数。
+
+        :param stmt: SQLAlchemy 查询语句。
+        :param cache_ttl: 进程内缓存秒数，0 表示不缓存；缓存的总数为近似值。
+        :return: 总数。
+        """
+        count_stmt = select(func.count()).select_from(stmt.order_by(None).limit(None).offset(None).subquery())
+        if cache_ttl <= 0:
+            return int(await self.scalar(count_stmt) or 0)
+        compiled = count_stmt.compile()
+        key = f"{compiled}|{sorted(compiled.params.items(), key=lambda item: item[0])!r}"
+        now = time.monotonic()
+        cached = self._count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        total = int(await self.scalar(count_stmt) or 0)
+        if len(self._count_cache) >= self.COUNT_CACHE_SIZE:
+            self._count_cache = {k: v for k, v in self._count_cache.items() if v[0] > now}
+            if len(self._count_cache) >= self.COUNT_CACHE_SIZE:
+                self._count_cache.clear()
+        self._count_cache[key] = (now + cache_ttl, total)
+        return total
+
+    async def keyset_page(
+        self,
+        stmt: Select,
+        order_cols: Sequence[ColumnElement[Any]],
+        after: str | None = None,
+        size: int = 10,
+        with_total: bool = False,
+        count_cache_ttl: float = COUNT_CACHE_TTL,
+    ) -> KeysetPage[Any]:
+        """
+        keyset 分页查询。
+
+        按 order_cols 的值定位下一页起点，不随页码增大扫描并丢弃前面的行。
+        order_cols 可以混合升降序，最后一个排序字段必须唯一（通常是主键），保证排序值重复时顺序稳定。
+        游标是签名后的排序值，只能用于相同排序字段的查询。
+
+        :param stmt: 返回模型对象的 SQLAlchemy 查询语句，不需要包含排序和 limit。
+        :param order_cols: 排序字段或表达式，支持 column.desc() / column.asc()。
+        :param after: 上一页返回的游标，None 表示从头开始。
+        :param size: 每页数量。
+        :param with_total: 是否同时返回总数。
+        :param count_cache_ttl: 总数的进程内缓存秒数。
+        :return: 当前页数据、下一页游标和总数。
+        :raises MyException: 游标无效时抛出。
+        """
+        size = size if size > 0 else 10
+        columns = [self._keyset_column(col) for col in order_cols]
+        fingerprint = self._keyset_fingerprint(columns)
+        # 排序值随查询一起选出，排序字段是表达式、label 或关联表字段时也能生成游标
+        page_stmt = stmt.add_columns(*(column.label(f"keyset_{i}") for i, (column, _) in enumerate(columns)))
+        page_stmt = page_stmt.order_by(*order_cols).limit(size + 1)
+        if after:
+            values = self._decode_keyset_cursor(after, fingerprint, len(columns))
+            page_stmt = page_stmt.where(self._keyset_predicate(columns, values))
+        rows = list(await self.all(page_stmt))
+        records = [row[0] for row in rows[:size]]
+        next_cursor = None
+        if len(rows) > size:
+            values = list(rows[size - 1][-len(columns) :])
+            next_cursor = self._encode_keyset_cursor(fingerprint, values)
+        total = await self.count(stmt, count_cache_ttl) if with_total else None
+        return KeysetPage(records=records, next_cursor=next_cursor, total=total)
+
+    @staticmethod
+    def _keyset_column(order_col: ColumnElement[Any]) -> tuple[ColumnElement[Any], bool]:
+        """
+        拆分排序表达式。
+
+        :param order_col: 排序表达式。
+        :return: 排序字段和是否降序。
+        """
+        if isinstance(order_col, UnaryExpression) and order_col.modifier in (operators.desc_op, operators.asc_op):
+            return order_col.element, order_col.modifier is operators.desc_op
+        return order_col, False
+
+    @staticmethod
+    def _keyset_predicate(columns: list[tuple[ColumnElement[Any], bool]], values: list[Any]) -> ColumnElement[bool]:
+        """
+        构造定位到游标之后的条件。
+
+        排序方向一致时使用行值比较 (a, b) > (x, y)，否则展开为 a > x OR (a = x AND b > y) ...
+
+        :param columns: 排序字段和是否降序。
+        :param values: 游标中的排序值。
+        :return: 查询条件。
+        """
+        directions = {desc for _, desc in columns}
+        if len(directions) == 1:
+            left = tuple_(*(column for column, _ in columns))
+            right = tuple_(*values)
+            return left < right if directions.pop() else left > right
+        clauses = []
+        for i, (column, desc) in enumerate(columns):
+            equals = [columns[j][0] == values[j] for j in range(i)]
+            clauses.append(and_(*equals, column < values[i] if desc else column > values[i]))
+        return or_(*clauses)
+
+    @staticmethod
+    def _keyset_fingerprint(columns: list[tuple[ColumnElement[Any], bool]]) -> str:
+        """
+        计算排序字段指纹，防止游标用于其他排序。
+
+        :param columns: 排序字段和是否降序。
+        :return: 排序字段指纹。
+        """
+        raw = ",".join(f"{column}:{'desc' if desc else 'asc'}" for column, desc in columns)
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()[:8]
+
+    def cursor_secret(self) -> bytes:
+        """
+        获取游标签名密钥，使用 keyset 分页的应用启动时调用，未配置时启动失败。
+
+        :return: 签名密钥。
+        :raises ValueError: 未配置签名密钥时抛出。
+        """
+        secret = GetValue(self.CURSOR_SECRET_KEY, required=True)
+        if not secret:
+            raise ValueError(f"配置[{self.CURSOR_SECRET_KEY}]不能为空")
+        return str(secret).encode("utf-8")
+
+    def _cursor_signature(self, payload: bytes) -> str:
+        """
+        计算游标签名。
+
+        :param payload: 游标内容。
+        :return: 签名。
+        """
+        digest = hmac.new(self.cursor_secret(), payload, hashlib.sha256).digest()[:12]
+        return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+    def _encode_keyset_cursor(self, fingerprint: str, values: list[Any]) -> str:
+        """
+        生成签名的 keyset 游标。
+
+        :param fingerprint: 排序字段指纹。
+        :param values: 当前页最后一条记录的排序值。
+        :return: 游标。
+        """
+        encoded = []
+        for value in values:
+            if isinstance(value, datetime):
+                encoded.append({"dt": value.isoformat()})
+            elif isinstance(value, date):
+                encoded.append({"d": value.isoformat()})
+            elif isinstance(value, Decimal):
+                encoded.append({"dec": str(value)})
+            else:
+                encoded.append(value)
+        raw = json.dumps({"k": fingerprint, "v": encoded}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        payload = base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+        return f"{payload}.{self._cursor_signature(payload.encode('ascii'))}"
+
+    def _decode_keyset_cursor(self, cursor: str, fingerprint: str, length: int) -> list[Any]:
+        """
+        校验并解析 keyset 游标。
+
+        :param cursor: 游标。
+        :param fingerprint: 排序字段指纹。
+        :param length: 排序字段数量。
+        :return: 排序值列表。
+        :raises MyException: 游标无效时抛出。
+        """
+        try:
+            payload, signature = cursor.rsplit(".", 1)
+            if not hmac.compare_digest(signature, self._cursor_signature(payload.encode("ascii"))):
+                raise ValueError("signature mismatch")
+            data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            if data["k"] != fingerprint or len(data["v"]) != length:
+                raise ValueError("cursor mismatch")
+            values = []
+            for value in data["v"]:
+                if isinstance(value, dict):
+                    (tag, raw), *_ = value.items()
+                    value = {"dt": datetime.fromisoformat, "d": date.fromisoformat, "dec": Decimal}[tag](raw)
+                values.append(value)
+            return values
+        except (ValueError, TypeError, KeyError, ArithmeticError) as e:
+            raise MyException.param_err("无效的分页游标") from e
+
 
 db = AsyncDBHelper()
@@ -0,0 +1,43 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from apps.base.core.depend_inject import GetValue, logger
+from apps.base.core.sqlalchemy.db_helper import db
+
+
+class RequestSessionMiddleware:
+    """
+    请求级数据库会话中间件。
+
+    配置 app.db.sqlalchemy.request_scope 为 true 时生效，一次请求内的只读查询复用同一个连接，
+    减少连接池签出次数；并发查询自动使用独立子会话。
+    """
+
+    CONFIG_KEY = "app.db.sqlalchemy.request_scope"
+
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        初始化中间件。
+
+        :param app: 下游 ASGI 应用
+        :return: None
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        处理 ASGI 调用。
+
+        :param scope: ASGI scope
+        :param receive: ASGI receive
+        :param send: ASGI send
+        :return: None
+        """
+        if scope["type"] != "http" or not GetValue(self.CONFIG_KEY):
+            await self.app(scope, receive, send)
+            return
+        async with db.request_scope() as session_scope:
+            await self.app(scope, receive, send)
+        logger.debug(
+            f"请求数据库会话 {scope['path']}: 新建连接 {session_scope.connections} 个, "
+            f"复用 {session_scope.reused} 次, 等待连接 {session_scope.wait_time * 1000:.1f}ms"
+        )
@@ -1,9 +1,38 @@
-from contextlib import asynccontextmanager
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Generator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any, AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-from apps.base.core.depend_inject import Component, GetBean, RefreshScope, Value, container
+from apps.base.core.depend_inject import Component, GetBean, RefreshScope, Value, container, logger
+from apps.base.core.metrics import DB_POOL_CHECKED_OUT
+from apps.base.core.query_stats import instrument_engine
+
+# 当前上下文是否强制读主库（事务内）
+_primary_pinned: ContextVar[bool] = ContextVar("db_primary_pinned", default=False)
+# 当前上下文最近一次写主库的时间，用于读己之写
+_last_write_at: ContextVar[float] = ContextVar("db_last_write_at", default=float("-inf"))
+
+
+@dataclass
+class ReplicaEngine:
+    """
+    只读副本连接。
+    """
+
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    weight: int = 1
+    healthy: bool = True
+    lag: float = 0.0
+    current_weight: int = 0
 
 
 @Component()
@@ -25,6 +54,11 @@ class SqlAlchemySessionManager:
         }
     )
     _SESSION_OPTION_KEYS = frozenset({"expire_on_commit", "autoflush", "autobegin"})
+    PRIMARY_NAME = "primary"
+    DEFAULT_READ_YOUR_WRITES_WINDOW = 2.0
+    DEFAULT_REPLICA_MAX_LAG = 5.0
+    DEFAULT_REPLICA_CHECK_INTERVAL = 5.0
+    REPLICA_CHECK_TIMEOUT = 3.0
 
     def __init__(self) -> None:
         """
@@ -35,6 +69,18 @@ class SqlAlchemySessionManager:
         sqlalchemy_url, engine_options, session_options = self._build_sqlalchemy_config()
         self.engine = create_async_engine(sqlalchemy_url, **engine_options)
         self.session_factory = async_sessionmaker(self.engine, **session_options)
+        self.query_counts: Counter[str] = Counter()
+        self.checkout_counts: Counter[str] = Counter()
+        self._instrument_engine(self.engine, self.PRIMARY_NAME)
+        self.replicas = self._build_replicas(engine_options, session_options)
+        self.read_your_writes_window = float(
+            self.config.get("read_your_writes_window", self.DEFAULT_READ_YOUR_WRITES_WINDOW)
+        )
+        self.replica_max_lag = float(self.config.get("replica_max_lag", self.DEFAULT_REPLICA_MAX_LAG))
+        self.replica_check_interval = float(
+            self.config.get("replica_check_interval", self.DEFAULT_REPLICA_CHECK_INTERVAL)
+        )
+        self._health_task: asyncio.Task[None] | None = None
         self.closed = False
 
     def _build_sqlalchemy_config(self) -> tuple[str, dict[str, Any], dict[str, Any]]:
@@ -115,6 +161,61 @@ class SqlAlchemySessionManager:
             return connection.replace("mysql+aiomysql://", "mysql+asyncmy://", 1)
         return connection
 
+    def _build_replicas(self, engine_options: dict[str, Any], session_options: dict[str, Any]) -> list[ReplicaEngine]:
+        """
+        根据 replicas 配置创建只读副本连接，配置项可以是连接字符串或 {url, weight, name} 字典。
+
+        :param engine_options: 与主库共用的 Engine 参数。
+        :param session_options: 与主库共用的 Session 参数。
+        :return: 只读副本列表。
+        :raises ValueError: 副本配置格式不正确时抛出。
+        """
+        replicas = []
+        for i, item in enumerate(self.config.get("replicas") or []):
+            if isinstance(item, str):
+                item = {"url": item}
+            if not isinstance(item, dict) or not item.get("url"):
+                raise ValueError(f"不支持的只读副本配置: {item}")
+            name = str(item.get("name") or f"replica{i + 1}")
+            engine = create_async_engine(self._normalize_connection_url(item["url"]), **engine_options)
+            self._instrument_engine(engine, name)
+            replicas.append(
+                ReplicaEngine(
+                    name=name,
+                    engine=engine,
+                    session_factory=async_sessionmaker(engine, **session_options),
+                    weight=max(int(item.get("weight", 1)), 1),
+                )
+            )
+        return replicas
+
+    def _instrument_engine(self, engine: AsyncEngine, name: str) -> None:
+        """
+        统计 Engine 执行的语句数和连接池签出次数，并注册请求级查询统计。
+
+        :param engine: 异步 Engine。
+        :param name: Engine 名称。
+        :return: None。
+        """
+
+        def before_cursor_execute(*_: Any) -> None:
+            self.query_counts[name] += 1
+
+        pool = engine.sync_engine.pool
+        pool_gauge = DB_POOL_CHECKED_OUT.labels(name)
+
+        def checkout(*_: Any) -> None:
+            self.checkout_counts[name] += 1
+            pool_gauge.set(pool.checkedout())
+
+        def checkin(*_: Any) -> None:
+            pool_gauge.set(pool.checkedout())
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(pool, "checkout", checkout)
+        event.listen(pool, "checkin", checkin)
+        instrument_engine(engine.sync_engine)
+
     def get_session_factory(self) -> async_sessionmaker[AsyncSession]:
         """
         获取 SQLAlchemy 异步 Session 工厂。
@@ -123,6 +224,137 @@ class SqlAlchemySessionManager:
         """
         return self.session_factory
 
+    def pick_read_replica(self) -> ReplicaEngine | None:
+        """
+        为只读查询选择副本。
+
+        事务内或当前上下文刚写过主库（读己之写窗口内）时返回 None 表示读主库；
+        否则在健康且延迟未超限的副本中按平滑加权轮询选择，没有可用副本时同样读主库。
+
+        :return: 选中的副本，None 表示读主库。
+        """
+        if not self.replicas or _primary_pinned.get():
+            return None
+        if time.monotonic() - _last_write_at.get() < self.read_your_writes_window:
+            return None
+        self._ensure_health_check()
+        candidates = [r for r in self.replicas if r.healthy and r.lag <= self.replica_max_lag]
+        if not candidates:
+            return None
+        total = 0
+        for replica in candidates:
+            replica.current_weight += replica.weight
+            total += replica.weight
+        selected = max(candidates, key=lambda r: r.current_weight)
+        selected.current_weight -= total
+        return selected
+
+    def mark_replica_down(self, replica: ReplicaEngine, error: BaseException) -> None:
+        """
+        将查询失败的副本标记为不可用，等待健康检查恢复。
+
+        :param replica: 只读副本。
+        :param error: 查询异常。
+        :return: None。
+        """
+        if replica.healthy:
+            logger.warning(f"只读副本[{replica.name}]不可用，切换到主库: {error}")
+        replica.healthy = False
+
+    def engine_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        获取各 Engine 的语句数、连接池签出次数、连接池状态和副本状态。
+
+        :return: Engine 名称到统计信息的映射。
+        """
+        stats: dict[str, dict[str, Any]] = {
+            self.PRIMARY_NAME: {
+                "queries": self.query_counts[self.PRIMARY_NAME],
+                "checkouts": self.checkout_counts[self.PRIMARY_NAME],
+                "pool": self.engine.pool.status(),
+                "healthy": True,
+                "lag": 0.0,
+            }
+        }
+        for replica in self.replicas:
+            stats[replica.name] = {
+                "queries": self.query_counts[replica.name],
+                "checkouts": self.checkout_counts[replica.name],
+                "pool": replica.engine.pool.status(),
+                "healthy": replica.healthy,
+                "lag": replica.lag,
+            }
+        return stats
+
+    def _ensure_health_check(self) -> None:
+        """
+        在事件循环中按需启动副本健康检查任务。
+
+        :return: None。
+        """
+        if self.closed or (self._health_task and not self._health_task.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._health_task = loop.create_task(self._health_check_loop(), name="sqlalchemy-replica-health-check")
+
+    async def _health_check_loop(self) -> None:
+        """
+        定时检查副本可用性和复制延迟。
+
+        :return: None。
+        """
+        while True:
+            await asyncio.gather(*(self.check_replica(replica) for replica in self.replicas))
+            await asyncio.sleep(self.replica_check_interval)
+
+    async def check_replica(self, replica: ReplicaEngine) -> None:
+        """
+        检查单个副本的可用性和复制延迟。
+
+        :param replica: 只读副本。
+        :return: None。
+        """
+        try:
+            async with asyncio.timeout(self.REPLICA_CHECK_TIMEOUT):
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    replica.lag = await self._replica_lag(conn)
+        except Exception as e:
+            self.mark_replica_down(replica, e)
+            return
+        if not replica.healthy:
+            logger.info(f"只读副本[{replica.name}]已恢复")
+        replica.healthy = True
+        if replica.lag > self.replica_max_lag:
+            logger.warning(f"只读副本[{replica.name}]复制延迟 {replica.lag}s，暂停读取")
+
+    @staticmethod
+    async def _replica_lag(conn: Any) -> float:
+        """
+        查询 MySQL 副本复制延迟，非 MySQL 或无权限查询时视为无延迟。
+
+        :param conn: 副本连接。
+        :return: 延迟秒数，复制中断时返回 inf。
+        """
+        if conn.dialect.name != "mysql":
+            return 0.0
+        for sql, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = (await conn.execute(text(sql))).mappings().first()
+            except Exception:
+                continue
+            if row is None:
+                return 0.0
+            lag = row.get(column)
+            return float("inf") if lag is None else float(lag)
+        return 0.0
+
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         """
@@ -141,8 +373,13 @@ class SqlAlchemySessionManager:
         """
         if self.closed:
             return
-        await self.engine.dispose()
         self.closed = True
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+        await self.engine.dispose()
 
 
 def get_session_factory() -> async_sessionmaker[AsyncSession]:
@@ -154,6 +391,38 @@ def get_session_factory() -> async_sessionmaker[AsyncSession]:
     return GetBean(SqlAlchemySessionManager).get_session_factory()
 
 
+def get_session_manager() -> SqlAlchemySessionManager:
+    """
+    获取全局 SQLAlchemy Session 管理器。
+
+    :return: SQLAlchemy Session 管理器。
+    """
+    return GetBean(SqlAlchemySessionManager)
+
+
+@contextmanager
+def pin_primary() -> Generator[None, None, None]:
+    """
+    在上下文内强制只读查询走主库。
+
+    :return: 上下文生成器。
+    """
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def mark_primary_write() -> None:
+    """
+    记录当前上下文写过主库，读己之写窗口内的只读查询走主库。
+
+    :return: None。
+    """
+    _last_write_at.set(time.monotonic())
+
+
 def init_sqlalchemy_engine() -> SqlAlchemySessionManager:
     """
     初始化 SQLAlchemy Engine 和 Session 工厂。
@@ -0,0 +1,10 @@
+from enum import IntEnum
+
+
+class EsOutboxStatusEnum(IntEnum):
+    """
+    ES 同步发件箱状态（1:待同步 2:死信）
+    """
+
+    PENDING = 1
+    DEAD = 2
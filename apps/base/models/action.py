@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Boolean, Integer
+from sqlalchemy import BigInteger, Boolean, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 
 from apps.base.core.sqlalchemy.base_model import BaseModel
@@ -25,7 +25,10 @@ class ActionCount(BaseModel):
     """
 
     __tablename__ = "t_action_count"
-    __table_args__ = {"comment": "行为统计表"}
+    __table_args__ = (
+        Index("uk_obj_id_together", "obj_id", "obj_type", "action_type", unique=True),
+        {"comment": "行为统计表"},
+    )
 
     obj_id: Mapped[int] = mapped_column(BigInteger, comment="对象id")
     obj_type: Mapped[int] = mapped_column(Integer, comment="对象类型 1:文章 2:评论 3:用户")
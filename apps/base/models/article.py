@@ -35,3 +35,4 @@ class Article(BaseModel):
     recommend_weight: Mapped[int] = mapped_column(Integer, default=0, comment="人工推荐权重")
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, comment="是否已删除(实现逻辑删除)")
     edit_time: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, comment="最后编辑时间")
+    es_version: Mapped[int] = mapped_column(BigInteger, default=0, comment="ES同步版本号")
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from apps.base.core.sqlalchemy.base_model import BaseModel
+from apps.base.enum.es_outbox import EsOutboxStatusEnum
+
+
+class EsOutbox(BaseModel):
+    """
+    ES 同步发件箱，与业务数据在同一事务中写入，由中继任务异步同步到 ES。
+    """
+
+    __tablename__ = "t_es_outbox"
+    __table_args__ = (
+        Index("idx_es_outbox_claim", "status", "next_retry_time", "id"),
+        {"comment": "ES同步发件箱表"},
+    )
+
+    index_name: Mapped[str] = mapped_column(String(64), comment="ES索引名")
+    doc_id: Mapped[int] = mapped_column(BigInteger, comment="文档id")
+    status: Mapped[int] = mapped_column(
+        Integer, default=EsOutboxStatusEnum.PENDING.value, comment="状态(1:待同步 2:死信)"
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, comment="已重试次数")
+    next_retry_time: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, comment="下次可领取时间")
+    last_error: Mapped[str] = mapped_column(String(500), default="", comment="最近一次失败原因")
@@ -0,0 +1,70 @@
+# @Time    : 2024/10/15 14:11
+# @Author  : frank
+# @File    : html_util.py
+import html
+import re
+
+# 单次扫描的词法规则：跳过的片段（script/style 及其内容、注释、标签、Markdown 代码围栏行）、实体、换行
+_TOKEN_RE = re.compile(
+    r"(?P<skip><(?P<raw>script|style)\b[^>]*>.*?</(?P=raw)\s*>|<!--.*?-->|<[^>]+>|^[ \t]*(?:`{3,}|~{3,})[^\n]*)"
+    r"|(?P<entity>&(?:#\d+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);)"
+    r"|(?P<newline>\n)",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL,
+)
+_SPECIAL_CHARS = frozenset("<&\n`~")
+
+
+class HtmlUtil:
+    """
+    HTML 转纯文本工具
+    """
+
+    @classmethod
+    def remove_html_tags(cls, text: str | None, max_length: int | None = None) -> str:
+        """
+        去除 HTML 标签，得到用于索引和摘要的纯文本。
+
+        使用预编译的正则单次扫描：跳过 script/style 内容和注释，解码 HTML 实体，
+        去掉 Markdown 代码围栏行但保留代码内容，换行替换为空格。
+        指定 max_length 时输出达到长度后立即停止扫描。
+
+        :param text: HTML 或 Markdown 文本
+        :param max_length: 最大输出长度，None 表示不限制
+        :return: 纯文本
+        """
+        if not text:
+            return ""
+        if _SPECIAL_CHARS.isdisjoint(text):
+            return text[:max_length] if max_length is not None else text
+        parts: list[str] = []
+        length = 0
+        pos = 0
+        for match in _TOKEN_RE.finditer(text):
+            if match.start() > pos:
+                parts.append(text[pos : match.start()])
+                length += match.start() - pos
+            pos = match.end()
+            kind = match.lastgroup
+            if kind == "entity":
+                parts.append(html.unescape(match.group()))
+                length += len(parts[-1])
+            elif kind == "newline":
+                parts.append(" ")
+                length += 1
+            if max_length is not None and length >= max_length:
+                break
+        else:
+            parts.append(text[pos:])
+        result = "".join(parts)
+        return result[:max_length] if max_length is not None else result
+
+    @classmethod
+    def remove_html_tags_batch(cls, texts: list[str | None], max_length: int | None = None) -> list[str]:
+        """
+        批量去除 HTML 标签，可作为进程池任务执行。
+
+        :param texts: 文本列表
+        :param max_length: 最大输出长度，None 表示不限制
+        :return: 纯文本列表
+        """
+        return [cls.remove_html_tags(text, max_length) for text in texts]
@@ -0,0 +1,149 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps
+
+from apps.base.core.depend_inject import Component, RefreshScope, Value, logger
+
+
+class ImagePipelineBusyError(RuntimeError):
+    """
+    图片处理排队已满，在准入等待时间内没有空位。
+    """
+
+
+@dataclass(frozen=True)
+class ThumbnailVariant:
+    """
+    WebP 压缩图规格。
+
+    max_width: 最大宽度
+    quality: WebP 质量
+    method: WebP 编码强度 0~6，越大越慢、体积越小，None 表示使用管线默认值
+    """
+
+    max_width: int
+    quality: int = 82
+    method: int | None = None
+
+
+def render_thumbnails(body: bytes, variants: tuple[tuple[int, int, int], ...]) -> list[bytes]:
+    """
+    解码一次图片并按从大到小的顺序在上一级结果上逐级缩放、编码出多个 WebP 压缩图，在进程池中执行。
+
+    :param body: 原始图片二进制内容
+    :param variants: (最大宽度, 质量, 编码强度) 元组
+    :return: 与 variants 顺序一致的压缩图二进制内容
+    """
+    results: dict[int, bytes] = {}
+    with Image.open(io.BytesIO(body)) as source:
+        largest = max(max_width for max_width, _, _ in variants)
+        # JPEG 解码时直接按比例缩小，减少解码和缩放开销
+        source.draft(None, (largest, largest * 10))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        order = sorted(range(len(variants)), key=lambda i: variants[i][0], reverse=True)
+        for i in order:
+            max_width, quality, method = variants[i]
+            image.thumbnail((max_width, max_width * 10))
+            output = io.BytesIO()
+            image.save(output, format="WEBP", quality=quality, method=method)
+            results[i] = output.getvalue()
+    return [results[i] for i in range(len(variants))]
+
+
+@Component()
+@RefreshScope("app.image-pipeline")
+class ImagePipeline:
+    """
+    图片处理管线。
+
+    解码、缩放和 WebP 编码在独立进程池中执行，不阻塞事件循环。同时排队和处理的任务数有上限，
+    超出时在准入等待时间内等待空位，超时抛出 ImagePipelineBusyError，避免上传高峰时任务无限堆积。
+
+    配置项 app.image-pipeline:
+        workers: 进程数，默认 min(4, CPU 数)
+        max-pending: 最大排队和处理中的任务数，默认进程数的 4 倍
+        admission-timeout: 准入等待秒数，默认 5
+        webp-method: 默认 WebP 编码强度，默认 4
+    """
+
+    config: dict = Value("app.image-pipeline")
+
+    def __init__(self) -> None:
+        """
+        初始化图片处理管线，进程池在首次使用时创建。
+
+        :return: None
+        """
+        config = self.config or {}
+        self.workers = int(config.get("workers") or min(4, os.cpu_count() or 1))
+        self.max_pending = int(config.get("max-pending") or self.workers * 4)
+        self.admission_timeout = float(config.get("admission-timeout") or 5)
+        self.default_method = int(config.get("webp-method") or 4)
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """
+        获取进程池。
+
+        :return: 进程池
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def render(self, body: bytes, variants: list[ThumbnailVariant]) -> list[bytes]:
+        """
+        从一次解码中生成多个规格的 WebP 压缩图。
+
+        :param body: 原始图片二进制内容
+        :param variants: 压缩图规格列表
+        :return: 与 variants 顺序一致的压缩图二进制内容
+        :raises ImagePipelineBusyError: 排队已满且等待超时时抛出
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.admission_timeout)
+        except TimeoutError:
+            raise ImagePipelineBusyError(f"图片处理排队已满({self.max_pending})") from None
+        args: tuple[tuple[int, int, int], ...] = tuple(
+            (v.max_width, v.quality, self.default_method if v.method is None else v.method) for v in variants
+        )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), render_thumbnails, body, args)
+        except BrokenProcessPool:
+            logger.error("图片处理进程池异常退出，将在下次使用时重建")
+            self._pool = None
+            raise
+        finally:
+            self._slots.release()
+
+    async def thumbnail(self, body: bytes, variant: ThumbnailVariant) -> bytes:
+        """
+        生成单个规格的 WebP 压缩图。
+
+        :param body: 原始图片二进制内容
+        :param variant: 压缩图规格
+        :return: 压缩图二进制内容
+        :raises ImagePipelineBusyError: 排队已满且等待超时时抛出
+        """
+        return (await self.render(body, [variant]))[0]
+
+    def close(self) -> None:
+        """
+        关闭进程池，刷新配置时由容器调用。
+
+        :return: None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,7 +1,7 @@
 from starlette.requests import Request
 
 from apps.base.utils.path_util import PathUtil
-from apps.base.utils.xdb_search import XdbSearcher
+from apps.base.utils.xdb_search import InvalidIpError, XdbSearcher
 
 
 class AddressInfo:
@@ -22,11 +22,19 @@ class AddressInfo:
 
 
 class IpUtil:
-    _inited = False
     dbPath = PathUtil.get_resource_path("ip2region.xdb")
-    cb = XdbSearcher.loadContentFromFile(dbfile=dbPath)
-    # 2. 创建查询对象
-    searcher = XdbSearcher(contentBuff=cb)
+    _searcher: XdbSearcher | None = None
+
+    @classmethod
+    def get_searcher(cls) -> XdbSearcher:
+        """
+        获取当前进程的 xdb 查询器，首次调用时映射文件
+
+        :return: xdb 查询器
+        """
+        if cls._searcher is None:
+            cls._searcher = XdbSearcher(cls.dbPath)
+        return cls._searcher
 
     @classmethod
     def get_ip_address(cls, request: Request):
@@ -57,7 +65,10 @@ class IpUtil:
         :param ip:
         :return:
         """
-        region = cls.searcher.searchByIPStr(ip)
+        try:
+            region = cls.get_searcher().search(ip)
+        except InvalidIpError:
+            return ""
         region = region.replace("|0", "").replace("0|", "")
         split = region.split("|")
         address = AddressInfo()
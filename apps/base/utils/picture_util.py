@@ -1,12 +1,10 @@
-import io
 import json
 from json import JSONDecodeError
 
-import aiohttp
-from PIL import Image, ImageOps
-
 from apps.base.core.depend_inject import Autowired, Component, RefreshScope, Value, logger
+from apps.base.core.http_client import HttpClientPool
 from apps.base.enum.oss import DirType
+from apps.base.utils.image_pipeline import ImagePipeline, ThumbnailVariant
 from apps.base.utils.oss_util import OssUtil
 
 
@@ -16,6 +14,8 @@ class PictureUtil:
     """获取随机头像或图片，并按需生成压缩图。"""
 
     oss_util: OssUtil = Autowired()
+    image_pipeline: ImagePipeline = Autowired()
+    http_client: HttpClientPool = Autowired()
     random_img_url_api_list: list[str] = Value("app.web.random-img-url-api-list")
     random_avatar_url_api_list: list[str] = Value("app.web.random-avatar-url-api-list")
 
@@ -81,38 +81,33 @@ class PictureUtil:
         :param only_thumb: 是否只返回压缩图地址。
         :return: 图片地址或原图、压缩图地址元组。
         """
-        async with aiohttp.ClientSession() as session:
-            for api_url in api_list:
-                try:
-                    body, remote_url = await self._fetch_random_source(session, api_url, json_key)
-                    if not body and not remote_url:
-                        continue
-                    return await self._prepare_result(
-                        session=session,
-                        body=body,
-                        remote_url=remote_url,
-                        source_dir_type=source_dir_type,
-                        thumb_dir_type=thumb_dir_type,
-                        max_width=max_width,
-                        with_thumb=with_thumb,
-                        only_thumb=only_thumb,
-                    )
-                except Exception as exc:
-                    logger.exception(f"{api_url}随机图片获取失败: {exc}")
+        for api_url in api_list:
+            try:
+                body, remote_url = await self._fetch_random_source(api_url, json_key)
+                if not body and not remote_url:
+                    continue
+                return await self._prepare_result(
+                    body=body,
+                    remote_url=remote_url,
+                    source_dir_type=source_dir_type,
+                    thumb_dir_type=thumb_dir_type,
+                    max_width=max_width,
+                    with_thumb=with_thumb,
+                    only_thumb=only_thumb,
+                )
+            except Exception as exc:
+                logger.exception(f"{api_url}随机图片获取失败: {exc}")
         return self._format_result("", "", with_thumb, only_thumb)
 
-    async def _fetch_random_source(
-        self, session: aiohttp.ClientSession, api_url: str, json_key: str
-    ) -> tuple[bytes, str]:
+    async def _fetch_random_source(self, api_url: str, json_key: str) -> tuple[bytes, str]:
         """
         从随机图片接口读取二进制图片或远程图片地址。
 
-        :param session: aiohttp 会话。
         :param api_url: 随机图片接口地址。
         :param json_key: JSON 响应中的图片地址字段。
         :return: 图片二进制内容和远程图片地址，未获取到时返回空值。
         """
-        async with session.get(api_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+        async with self.http_client.request("GET", api_url) as response:
             if response.status >= 400:
                 logger.warning(f"{api_url}随机图片接口请求失败，状态码: {response.status}")
                 return b"", ""
@@ -134,7 +129,6 @@ class PictureUtil:
 
     async def _prepare_result(
         self,
-        session: aiohttp.ClientSession,
         body: bytes,
         remote_url: str,
         source_dir_type: DirType,
@@ -146,7 +140,6 @@ class PictureUtil:
         """
         上传原图并按返回模式生成压缩图。
 
-        :param session: aiohttp 会话。
         :param body: 图片二进制内容。
         :param remote_url: 远程原图地址。
         :param source_dir_type: 原图上传目录类型。
@@ -161,7 +154,7 @@ class PictureUtil:
 
         file_name = self._get_image_name_from_url(remote_url) if remote_url else self._random_image_name()
         if remote_url and not body:
-            body = await self._download_image(session, remote_url)
+            body = await self._download_image(remote_url)
             if not body:
                 return self._format_result(remote_url, "", with_thumb, only_thumb)
 
@@ -174,7 +167,7 @@ class PictureUtil:
                 return "", ""
 
         try:
-            thumb_body = self._build_thumbnail(body, max_width=max_width)
+            thumb_body = await self.image_pipeline.thumbnail(body, ThumbnailVariant(max_width=max_width))
             thumb_url = await self.oss_util.upload_file(
                 thumb_body, self._get_thumb_name(file_name), dir_type=thumb_dir_type
             )
@@ -185,16 +178,15 @@ class PictureUtil:
             original_url = await self.oss_util.upload_file(body, file_name, dir_type=source_dir_type) or ""
         return self._format_result(original_url, thumb_url or "", with_thumb, only_thumb)
 
-    async def _download_image(self, session: aiohttp.ClientSession, url: str) -> bytes:
+    async def _download_image(self, url: str) -> bytes:
         """
         下载远程图片。
 
-        :param session: aiohttp 会话。
         :param url: 远程图片地址。
         :return: 图片二进制内容，下载失败时返回空字节。
         """
         try:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with self.http_client.request("GET", url) as response:
                 if response.status != 200:
                     logger.warning(f"{url}图片下载失败，状态码: {response.status}")
                     return b""
@@ -234,24 +226,6 @@ class PictureUtil:
         if with_thumb and only_thumb:
             raise ValueError("with_thumb 和 only_thumb 不能同时为 True")
 
-    def _build_thumbnail(self, body: bytes, max_width: int, quality: int = 82) -> bytes:
-        """
-        生成 WebP 压缩图。
-
-        :param body: 原始图片二进制内容。
-        :param max_width: 压缩图最大宽度。
-        :param quality: WebP 图片质量。
-        :return: 压缩图二进制内容。
-        """
-        with Image.open(io.BytesIO(body)) as image:
-            image = ImageOps.exif_transpose(image)
-            if image.mode not in ("RGB", "RGBA"):
-                image = image.convert("RGB")
-            image.thumbnail((max_width, max_width * 10))
-            output = io.BytesIO()
-            image.save(output, format="WEBP", quality=quality, method=6)
-            return output.getvalue()
-
     def _get_image_name_from_url(self, url: str) -> str:
         """
         从图片地址中提取文件名。
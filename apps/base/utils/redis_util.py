@@ -1,4 +1,5 @@
 import asyncio
+import time
 from typing import Any, Optional
 
 import redis.asyncio as redis
@@ -7,6 +8,30 @@ from redis.asyncio.lock import Lock
 from redis.exceptions import LockNotOwnedError
 
 from apps.base.core.depend_inject import Component, RefreshScope, Value, logger
+from apps.base.core.metrics import REDIS_COMMAND_DURATION
+from apps.base.core.query_stats import record_redis_command
+
+
+class InstrumentedRedis(Redis):
+    """
+    记录命令耗时的 Redis 客户端，用于请求级查询统计、慢命令日志和命令耗时指标。
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        """
+        执行 Redis 命令并记录耗时。
+
+        :param args: 命令参数。
+        :param options: 命令选项。
+        :return: 命令结果。
+        """
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_redis_command(args, elapsed)
+            REDIS_COMMAND_DURATION.labels(str(args[0]).upper() if args else "").observe(elapsed)
 
 
 @Component()
@@ -25,7 +50,7 @@ class RedisUtil:
         :return: None。
         """
         pool = redis.ConnectionPool(decode_responses=True, **self.config)
-        self.redis = redis.Redis(connection_pool=pool)
+        self.redis = InstrumentedRedis(connection_pool=pool)
 
     async def get(self, key: str) -> Any:
         """
@@ -0,0 +1,95 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+from uuid import uuid4
+
+from redis.asyncio import Redis
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    缓存回源合并器。
+
+    同一进程内相同 key 的并发调用共享一个回源任务；跨进程用 Redis 锁保证只有一个进程回源，
+    其余进程轮询缓存等待结果，等待超时后自行回源。
+    """
+
+    RELEASE_LOCK_SCRIPT = """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, redis: Redis, lock_prefix: str, lock_ttl_ms: int = 10000, poll_interval_ms: int = 50) -> None:
+        """
+        初始化缓存回源合并器。
+
+        :param redis: Redis 客户端
+        :param lock_prefix: Redis 锁 key 前缀
+        :param lock_ttl_ms: 锁过期毫秒数，也是等待其他进程回源的最长时间
+        :param poll_interval_ms: 等待其他进程回源时轮询缓存的间隔毫秒数
+        :return: None
+        """
+        self._redis = redis
+        self.lock_prefix = lock_prefix
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_interval = poll_interval_ms / 1000
+        self._tasks: dict[str, asyncio.Task[T]] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[T]], cached: Callable[[], Awaitable[T | None]]) -> T:
+        """
+        执行合并回源。
+
+        :param key: 合并 key
+        :param loader: 回源函数，负责查询并写入缓存
+        :param cached: 读缓存函数，未命中返回 None
+        :return: 回源或缓存结果
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader, cached))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task[T]) -> None:
+        """
+        回源任务结束后移除登记。
+
+        :param key: 合并 key
+        :param task: 已结束的回源任务
+        :return: None
+        """
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[T]], cached: Callable[[], Awaitable[T | None]]) -> T:
+        """
+        获取 Redis 锁后回源，未获取到锁时等待持锁进程写入缓存。
+
+        :param key: 合并 key
+        :param loader: 回源函数
+        :param cached: 读缓存函数
+        :return: 回源或缓存结果
+        """
+        loop = asyncio.get_running_loop()
+        lock_key = f"{self.lock_prefix}:{key}"
+        token = uuid4().hex
+        deadline = loop.time() + self.lock_ttl_ms / 1000
+        while True:
+            if await self._redis.set(lock_key, token, px=self.lock_ttl_ms, nx=True):
+                try:
+                    # 持锁前其他进程可能刚写完缓存
+                    result = await cached()
+                    return result if result is not None else await loader()
+                finally:
+                    await self._redis.eval(self.RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            result = await cached()
+            if result is not None:
+                return result
+            if loop.time() >= deadline:
+                return await loader()
+            await asyncio.sleep(self.poll_interval)
@@ -1,16 +1,53 @@
+import atexit
 import logging
+import os
 import random
+import secrets
+import socket
+import tempfile
+import threading
 import time
+from pathlib import Path
+from typing import Any, TextIO
+
+from redis import Redis
+from redis.exceptions import RedisError
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.depend_inject import GetValue
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# 5 位数据中心 ID + 5 位机器 ID 合并后的取值范围
+MAX_NODE_ID = 1023
+
+
+def _current_millis() -> int:
+    """
+    获取当前毫秒时间戳。
+
+    :return: 毫秒时间戳
+    """
+    return time.time_ns() // 1_000_000
+
 
 class Snowflake:
+    EPOCH = 1288834974657
+    MAX_SEQUENCE = 4095
+    # 允许等待追平的时钟回拨毫秒数，超过时抛出异常
+    MAX_BACKWARD_MILLIS = 5
+
     def __init__(self, worker_id: int, data_center_id: int):
         """
         生成雪花算法ID
         1符号位+41位时间戳+5位数据中心id+5位机器id+12位序列号
         :param worker_id: 机器ID
+        :param data_center_id: 数据中心ID
         """
         logger.info(f"Snowflake config worker_id: {worker_id} data_center_id: {data_center_id}")
         # 机器标识ID
@@ -19,42 +56,368 @@ class Snowflake:
         self.data_center_id = data_center_id
         self.sequence: int = 0
         self.last_timestamp: int = -1
-        self.epoch = 1288834974657
+        self.epoch = self.EPOCH
+        self.node_id = (data_center_id << 5) | worker_id
+        self._node_bits = (data_center_id << 17) | (worker_id << 12)
+        self._lock = threading.Lock()
 
     @staticmethod
-    def _wait_next_millis(last_timestamp) -> int:
-        timestamp = int(time.time() * 1000)
-        while timestamp <= last_timestamp:
-            timestamp = int(time.time() * 1000)
+    def _wait_until(target_timestamp: int) -> int:
+        """
+        休眠到指定毫秒，不再忙等。
+
+        :param target_timestamp: 目标毫秒时间戳
+        :return: 当前毫秒时间戳
+        """
+        timestamp = _current_millis()
+        while timestamp < target_timestamp:
+            time.sleep((target_timestamp - timestamp) / 1000)
+            timestamp = _current_millis()
         return timestamp
 
+    def next_ids(self, n: int) -> list[int]:
+        """
+        批量生成递增的 ID，同一毫秒内的 ID 一次性预留，整批只加一次锁。
+
+        :param n: ID 数量
+        :return: ID 列表
+        :raises Exception: 时钟回拨超过允许范围时抛出
+        """
+        ids: list[int] = []
+        with self._lock:
+            while len(ids) < n:
+                timestamp = _current_millis()
+                if timestamp < self.last_timestamp:
+                    if self.last_timestamp - timestamp > self.MAX_BACKWARD_MILLIS:
+                        raise Exception("Clock moved backwards")
+                    timestamp = self._wait_until(self.last_timestamp)
+                if timestamp == self.last_timestamp and self.sequence >= self.MAX_SEQUENCE:
+                    timestamp = self._wait_until(self.last_timestamp + 1)
+                start = self.sequence + 1 if timestamp == self.last_timestamp else 0
+                count = min(n - len(ids), self.MAX_SEQUENCE + 1 - start)
+                prefix = ((timestamp - self.epoch) << 22) | self._node_bits
+                ids.extend(range(prefix | start, (prefix | start) + count))
+                self.sequence = start + count - 1
+                self.last_timestamp = timestamp
+        return ids
+
     @property
     def generate_id(self) -> int:
-        timestamp = int(time.time() * 1000)
-        if timestamp < self.last_timestamp:
-            raise Exception("Clock moved backwards")
-        if timestamp == self.last_timestamp:
-            self.sequence = (self.sequence + 1) & 4095
-            if self.sequence == 0:
-                timestamp = self._wait_next_millis(self.last_timestamp)
-        else:
-            self.sequence = 0
-        self.last_timestamp = timestamp
-        snow_id = (
-            ((timestamp - self.epoch) << 22) | (self.data_center_id << 17) | (self.worker_id << 12) | self.sequence
-        )
-        logger.info(f"=====check snowflake id: {(timestamp, self.last_timestamp, self.sequence)} snow_id: {snow_id}")
-        return snow_id
+        return self.next_ids(1)[0]
+
+
+class WorkerIdLease:
+    """
+    雪花算法机器 ID 租约。
+
+    配置了 Redis 时以 SET NX EX 抢占 0~1023 中的一个 ID 作为数据中心 ID 和机器 ID，后台线程定期续期，
+    ID 被其他进程占用时由后台线程重新抢占；未配置 Redis 时使用本机文件锁，只保证单机内不重复。
+    有效期从发出请求前开始计算并预留安全余量，本进程认为租约失效时 Redis 中的 key 一定还未过期。
+    """
+
+    RENEW_SCRIPT = """
+    local value = redis.call('GET', KEYS[1])
+    if value == ARGV[1] then
+        return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    if not value then
+        return redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) and 1 or 0
+    end
+    return 0
+    """
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+    # 租约有效期的安全余量秒数，覆盖 Redis 与本机计时误差
+    SAFETY_MARGIN = 5
+
+    def __init__(self, ttl: int = 60, lock_dir: str | None = None) -> None:
+        """
+        初始化租约。
+
+        :param ttl: Redis 租约秒数
+        :param lock_dir: 文件锁目录，默认取环境变量 SNOWFLAKE_LOCK_DIR，其次为系统临时目录
+        :return: None
+        """
+        self.ttl = ttl
+        self.lock_dir = Path(lock_dir or os.environ.get("SNOWFLAKE_LOCK_DIR") or tempfile.gettempdir()) / "snowflake"
+        self.node_id: int | None = None
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._valid_until = 0.0
+        self._redis: Redis | None = None
+        self._lock_file: TextIO | None = None
+        self._stop = threading.Event()
+
+    @property
+    def valid(self) -> bool:
+        """
+        租约是否仍然有效。
+
+        :return: 是否有效
+        """
+        return self.node_id is not None and time.monotonic() < self._valid_until
+
+    def acquire(self) -> int:
+        """
+        申请机器 ID。
+
+        :return: 0~1023 的机器 ID
+        :raises RuntimeError: 没有可用 ID 时抛出
+        :raises RedisError: 配置了 Redis 但访问失败时抛出，此时不退回文件锁以免跨机器重复
+        """
+        config = self._redis_config()
+        node_id = self._acquire_redis(config) if config else self._acquire_file()
+        logger.info(f"雪花算法机器 ID 租约: {node_id} ({'redis' if config else 'file'})")
+        return node_id
+
+    @staticmethod
+    def _redis_config() -> dict[str, Any] | None:
+        """
+        获取 Redis 配置，容器未初始化时视为未配置。
+
+        :return: Redis 配置
+        """
+        try:
+            return GetValue("redis")
+        except Exception:
+            return None
+
+    def _key(self, node_id: int) -> str:
+        """
+        获取机器 ID 租约 key。
+
+        :param node_id: 机器 ID
+        :return: Redis key
+        """
+        return f"{RedisConstant.SNOWFLAKE_WORKER_KEY_PREFIX}:{node_id}"
+
+    def _acquire_redis(self, config: dict[str, Any]) -> int:
+        """
+        在 Redis 中抢占机器 ID 并启动续期线程。
+
+        :param config: Redis 配置
+        :return: 机器 ID
+        """
+        client = Redis(**{"decode_responses": True, "socket_timeout": 3, **config})
+        try:
+            node_id = self._claim(client)
+        except BaseException:
+            client.close()
+            raise
+        self._redis = client
+        threading.Thread(target=self._renew_loop, name="snowflake-lease", daemon=True).start()
+        return node_id
+
+    def _claim(self, client: Redis) -> int:
+        """
+        从随机位置开始依次抢占空闲的机器 ID。
+
+        :param client: Redis 客户端
+        :return: 机器 ID
+        :raises RuntimeError: 没有可用 ID 时抛出
+        """
+        start = random.randint(0, MAX_NODE_ID)
+        for offset in range(MAX_NODE_ID + 1):
+            node_id = (start + offset) % (MAX_NODE_ID + 1)
+            requested_at = time.monotonic()
+            if client.set(self._key(node_id), self._token, nx=True, ex=self.ttl):
+                self.node_id = node_id
+                self._valid_until = requested_at + self.ttl - self.SAFETY_MARGIN
+                return node_id
+        raise RuntimeError("雪花算法机器 ID 已全部被占用")
+
+    def _renew_loop(self) -> None:
+        """
+        定期续期 Redis 租约，ID 被其他进程占用时重新抢占。
+
+        :return: None
+        """
+        while not self._stop.wait(max(self.ttl / 3, 1)):
+            requested_at = time.monotonic()
+            try:
+                if self._redis.eval(self.RENEW_SCRIPT, 1, self._key(self.node_id), self._token, self.ttl):
+                    self._valid_until = requested_at + self.ttl - self.SAFETY_MARGIN
+                    continue
+                logger.error(f"雪花算法机器 ID {self.node_id} 已被其他进程占用，重新申请")
+                self._valid_until = 0.0
+                node_id = self._claim(self._redis)
+                logger.info(f"雪花算法机器 ID 租约: {node_id} (redis)")
+            except (RedisError, RuntimeError) as e:
+                logger.warning(f"雪花算法机器 ID {self.node_id} 续期失败: {e}")
+
+    def _acquire_file(self) -> int:
+        """
+        通过本机文件锁抢占机器 ID，锁随进程退出自动释放。
+
+        :return: 机器 ID
+        """
+        if fcntl is None:
+            logger.warning("当前平台不支持文件锁且未配置 Redis，雪花算法机器 ID 随机分配")
+            self.node_id = random.randint(0, MAX_NODE_ID)
+            self._valid_until = float("inf")
+            return self.node_id
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        for node_id in range(MAX_NODE_ID + 1):
+            lock_file = open(self.lock_dir / f"{node_id}.lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            self.node_id = node_id
+            self._valid_until = float("inf")
+            return node_id
+        raise RuntimeError("雪花算法机器 ID 已全部被占用")
+
+    def release(self) -> None:
+        """
+        释放租约。
+
+        :return: None
+        """
+        self._stop.set()
+        self._valid_until = 0.0
+        if self._redis is not None:
+            try:
+                self._redis.eval(self.RELEASE_SCRIPT, 1, self._key(self.node_id), self._token)
+            except RedisError as e:
+                logger.warning(f"雪花算法机器 ID {self.node_id} 释放失败: {e}")
+            self._redis.close()
+            self._redis = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def abandon(self) -> None:
+        """
+        fork 后的子进程放弃继承的租约，不访问父进程的 Redis 连接，也不删除父进程仍在使用的 key。
+
+        :return: None
+        """
+        self._stop.set()
+        self._valid_until = 0.0
+        self._redis = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
 
 
 class SnowflakeIDGenerator:
-    snowflake = Snowflake(random.randint(0, 31), random.randint(0, 31))
+    """
+    进程级雪花算法 ID 生成器。
+
+    应用启动时调用 start 申请机器 ID 租约，之后生成 ID 不访问 Redis；未调用 start 的脚本在首次生成 ID 时申请。
+    租约由后台线程续期和重新申请，失效期间生成 ID 直接报错而不是阻塞等待，fork 出的子进程会申请自己的机器 ID。
+    每个线程从本线程预留的连续 ID 块中取号，块用完或跨毫秒后才加锁预留新块，
+    同一毫秒内取完整块时块大小翻倍，否则回到 1，避免低频调用浪费序列号。
+    """
+
+    MAX_BLOCK_SIZE = 256
+    _snowflake: Snowflake | None = None
+    _lease: WorkerIdLease | None = None
+    _init_lock = threading.Lock()
+    _local = threading.local()
+
+    @classmethod
+    def start(cls) -> int:
+        """
+        申请机器 ID 租约，在应用生命周期启动阶段调用，避免在事件循环中同步访问 Redis。
+
+        :return: 机器 ID
+        """
+        return cls._get_snowflake().node_id
 
     @classmethod
-    def generate_id(cls):
-        return cls.snowflake.generate_id
+    def _get_snowflake(cls) -> Snowflake:
+        """
+        获取当前租约对应的生成器，后台线程换到新 ID 时切换生成器。
+
+        :return: 雪花算法生成器
+        :raises RuntimeError: 租约已失效且尚未重新申请到 ID 时抛出
+        """
+        snowflake, lease = cls._snowflake, cls._lease
+        if snowflake is not None and lease.valid and snowflake.node_id == lease.node_id:
+            return snowflake
+        with cls._init_lock:
+            if cls._lease is None:
+                lease = WorkerIdLease()
+                lease.acquire()
+                cls._lease = lease
+            lease = cls._lease
+            node_id = lease.node_id
+            if not lease.valid:
+                raise RuntimeError(f"雪花算法机器 ID {node_id} 租约已失效，等待续期或重新申请")
+            old = cls._snowflake
+            if old is None or old.node_id != node_id:
+                snowflake = Snowflake(node_id & 31, node_id >> 5)
+                if old is not None:
+                    # 从旧生成器的下一毫秒开始，换回曾用过的 ID 时也不重复
+                    snowflake.last_timestamp = old.last_timestamp
+                    snowflake.sequence = Snowflake.MAX_SEQUENCE
+                cls._snowflake = snowflake
+        return cls._snowflake
+
+    @classmethod
+    def generate_id(cls) -> int:
+        """
+        生成一个 ID。
+
+        :return: ID
+        """
+        local = cls._local
+        now = _current_millis()
+        ids = getattr(local, "ids", None)
+        if ids and local.timestamp == now:
+            return ids.pop()
+        size = min(local.size * 2, cls.MAX_BLOCK_SIZE) if ids == [] and local.timestamp == now else 1
+        ids = cls._get_snowflake().next_ids(size)
+        ids.reverse()
+        first = ids.pop()
+        local.ids, local.size, local.timestamp = ids, size, (first >> 22) + Snowflake.EPOCH
+        return first
+
+    @classmethod
+    def next_ids(cls, n: int) -> list[int]:
+        """
+        批量生成 ID，用于批量插入。
+
+        :param n: ID 数量
+        :return: 递增的 ID 列表
+        """
+        return cls._get_snowflake().next_ids(n)
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        释放机器 ID 租约。
+
+        :return: None
+        """
+        with cls._init_lock:
+            if cls._lease is not None:
+                cls._lease.release()
+            cls._lease = None
+            cls._snowflake = None
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        """
+        fork 后在子进程中重置状态。
+
+        :return: None
+        """
+        if cls._lease is not None:
+            cls._lease.abandon()
+        cls._lease = None
+        cls._snowflake = None
+        cls._init_lock = threading.Lock()
+        cls._local = threading.local()
 
 
-if __name__ == "__main__":
-    for i in range(1000):
-        print(SnowflakeIDGenerator.generate_id())
+atexit.register(SnowflakeIDGenerator.close)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=SnowflakeIDGenerator._after_fork)
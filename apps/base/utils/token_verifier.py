@@ -0,0 +1,261 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from jose import jwt
+from jose.exceptions import JOSEError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from apps.base.core.depend_inject import logger
+from apps.base.enum.error_code import ErrorCode
+from apps.base.exception.my_exception import MyException
+
+
+class BloomFilter:
+    """
+    本地布隆过滤器。
+    """
+
+    def __init__(self, size_bits: int = 1 << 20, hash_count: int = 7) -> None:
+        """
+        初始化布隆过滤器。
+
+        :param size_bits: 位数
+        :param hash_count: 哈希函数个数
+        :return: None
+        """
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bytearray(size_bits // 8)
+
+    def _positions(self, digest: bytes) -> list[int]:
+        """
+        用双重哈希从 16 字节摘要计算位下标。
+
+        :param digest: 摘要
+        :return: 位下标列表
+        """
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+    def add(self, digest: bytes) -> None:
+        """
+        添加摘要。
+
+        :param digest: 摘要
+        :return: None
+        """
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        """
+        判断摘要是否可能存在。
+
+        :param digest: 摘要
+        :return: 可能存在返回 True，一定不存在返回 False
+        """
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class TokenVerifier:
+    """
+    JWT 校验器。
+
+    校验通过的声明按 token 摘要做有界 LRU 缓存，缓存到 exp 为止，没有 exp 的 token 最多缓存 max_age 秒，
+    同一 token 在缓存期内不再重复验签和解析 JSON；被篡改的 token 摘要不同，不会命中缓存。
+
+    吊销的 token 摘要记录在 Redis 有序集合中，分值是吊销时在 Redis 中递增的序号，各进程按序号定期增量拉取到
+    本地布隆过滤器，不受各机器时钟差异影响；校验时先查本地布隆过滤器，命中后再到 Redis 精确确认，
+    未吊销的 token 不产生 Redis 请求。另一个有序集合记录 token 的 exp，吊销时顺带清理已过期的条目。
+    未配置吊销列表时只验签和检查过期时间。
+    """
+
+    # 分配序号、写入吊销记录并清理过期条目在同一脚本中完成，序号更大的记录提交时更小的序号一定已经可见；
+    # 序号不存在时（首次使用或数据被清空）从现有最大分值继续，兼容以时间戳为分值的旧记录
+    REVOKE_SCRIPT = """
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+        local top = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+        if top[2] then
+            redis.call('SET', KEYS[2], string.format('%d', math.ceil(tonumber(top[2]))))
+        end
+    end
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[3], 'LIMIT', 0, ARGV[4])
+    if #expired > 0 then
+        redis.call('ZREM', KEYS[1], unpack(expired))
+        redis.call('ZREM', KEYS[3], unpack(expired))
+    end
+    local seq = redis.call('INCR', KEYS[2])
+    redis.call('ZADD', KEYS[1], seq, ARGV[1])
+    redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+    return seq
+    """
+    # exp 过后再保留的秒数，覆盖各机器的时钟误差
+    DENY_TRIM_GRACE = 300
+    # 每次吊销最多清理的过期条目数
+    DENY_TRIM_BATCH = 500
+
+    def __init__(
+        self,
+        secret_key: str,
+        algorithm: str,
+        deny_key: str | None = None,
+        cache_size: int = 10000,
+        max_age: float = 300,
+        deny_refresh_interval: float = 5,
+    ) -> None:
+        """
+        初始化 JWT 校验器。
+
+        :param secret_key: 签名密钥
+        :param algorithm: 签名算法
+        :param deny_key: 吊销列表 Redis key，序号和过期时间分别保存在 {deny_key}:seq 和 {deny_key}:exp，为 None 时不支持吊销
+        :param cache_size: 声明缓存最大条目数
+        :param max_age: 没有 exp 的 token 最长缓存秒数
+        :param deny_refresh_interval: 吊销列表同步间隔秒数
+        :return: None
+        """
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.deny_key = deny_key
+        self.deny_seq_key = f"{deny_key}:seq"
+        self.deny_exp_key = f"{deny_key}:exp"
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.deny_refresh_interval = deny_refresh_interval
+        self._cache: OrderedDict[bytes, tuple[dict[str, Any], float]] = OrderedDict()
+        self._deny_bloom = BloomFilter()
+        self._deny_synced_seq = 0
+        self._deny_synced_at = float("-inf")
+        self._deny_syncing = False
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """
+        计算 token 摘要。
+
+        :param token: JWT Token
+        :return: 16 字节摘要
+        """
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """
+        验签并解析 token，不检查吊销状态。
+
+        :param token: JWT Token
+        :return: token 声明
+        :raises MyException: token 无效或已过期时抛出
+        """
+        key = self.digest(token)
+        now = time.time()
+        cached = self._cache.get(key)
+        if cached is not None:
+            claims, expires_at = cached
+            if now < expires_at:
+                self._cache.move_to_end(key)
+                return claims
+            self._cache.pop(key, None)
+        try:
+            claims = jwt.decode(token, key=self.secret_key, algorithms=[self.algorithm])
+        except JOSEError as e:
+            raise MyException(ErrorCode.TOKEN_IS_INVALID) from e
+        expires_at = now + self.max_age
+        if isinstance(claims.get("exp"), (int, float)):
+            # jose 按整秒比较，exp 所在的那一秒仍会放行
+            if now >= claims["exp"]:
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
+            expires_at = min(expires_at, claims["exp"])
+        self._cache[key] = (claims, expires_at)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return claims
+
+    async def verify(self, token: str, redis: Redis) -> dict[str, Any]:
+        """
+        验签、解析 token 并检查吊销状态。
+
+        :param token: JWT Token
+        :param redis: Redis 客户端
+        :return: token 声明
+        :raises MyException: token 无效、已过期或已吊销时抛出
+        """
+        claims = self.decode(token)
+        if self.deny_key is None:
+            return claims
+        await self._sync_deny_list(redis)
+        key = self.digest(token)
+        if key in self._deny_bloom:
+            try:
+                revoked = await redis.zscore(self.deny_key, key.hex()) is not None
+            except RedisError as e:
+                logger.warning(f"token 吊销状态确认失败，按已吊销处理: {e}")
+                revoked = True
+            if revoked:
+                self._cache.pop(key, None)
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
+        return claims
+
+    async def revoke(self, token: str, redis: Redis) -> None:
+        """
+        吊销 token，当前进程立即生效，其他进程在下次同步吊销列表后生效。
+
+        无效或已过期的 token 本身就无法通过校验，不再记录。
+
+        :param token: JWT Token
+        :param redis: Redis 客户端
+        :return: None
+        :raises RuntimeError: 未配置吊销列表时抛出
+        """
+        if self.deny_key is None:
+            raise RuntimeError("未配置 token 吊销列表")
+        try:
+            claims = self.decode(token)
+        except MyException:
+            return
+        key = self.digest(token)
+        exp = claims.get("exp")
+        await redis.eval(
+            self.REVOKE_SCRIPT,
+            3,
+            self.deny_key,
+            self.deny_seq_key,
+            self.deny_exp_key,
+            key.hex(),
+            exp if isinstance(exp, (int, float)) else "+inf",
+            int(time.time()) - self.DENY_TRIM_GRACE,
+            self.DENY_TRIM_BATCH,
+        )
+        self._deny_bloom.add(key)
+        self._cache.pop(key, None)
+
+    async def _sync_deny_list(self, redis: Redis) -> None:
+        """
+        按间隔增量拉取上次同步序号之后的吊销记录到本地布隆过滤器，Redis 不可用时沿用本地数据。
+
+        Redis 中的序号小于已同步序号时（数据被清空后重新吊销）从头同步。
+
+        :param redis: Redis 客户端
+        :return: None
+        """
+        now = time.monotonic()
+        if self._deny_syncing or now - self._deny_synced_at < self.deny_refresh_interval:
+            return
+        self._deny_syncing = True
+        try:
+            current_seq = await redis.get(self.deny_seq_key)
+            if current_seq is not None and int(current_seq) < self._deny_synced_seq:
+                self._deny_synced_seq = 0
+            entries = await redis.zrangebyscore(self.deny_key, f"({self._deny_synced_seq}", "+inf", withscores=True)
+            for member, score in entries:
+                self._deny_bloom.add(bytes.fromhex(member))
+                self._deny_synced_seq = max(self._deny_synced_seq, int(score))
+            self._deny_synced_at = now
+        except (RedisError, ValueError) as e:
+            logger.warning(f"同步 token 吊销列表失败: {e}")
+            self._deny_synced_at = now
+        finally:
+            self._deny_syncing = False
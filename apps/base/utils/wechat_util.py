@@ -1,9 +1,8 @@
 import base64
 import json
 
-import aiohttp
-
 from apps.base.core.depend_inject import Autowired, Component, Value, logger
+from apps.base.core.http_client import HttpClientPool
 from apps.base.exception.my_exception import MyException
 from apps.base.utils.redis_util import RedisUtil
 from apps.base.utils.snowflake import SnowflakeIDGenerator
@@ -16,6 +15,7 @@ class WechatUtil:
     env_version: str = Value("wx.env-version")
     page: str = Value("wx.page")
     redis_util: RedisUtil = Autowired()
+    http_client: HttpClientPool = Autowired()
     TYPE_AUTHORIZATION_CODE = "authorization_code"
     TYPE_CLIENT_CREDENTIAL = "client_credential"
     GET_OPEN_ID_URL = "https://api.weixin.qq.com/sns/jscode2session"
@@ -41,8 +41,7 @@ class WechatUtil:
         if not code:
             return
         url = self._get_base_url(self.GET_OPEN_ID_URL, self.TYPE_AUTHORIZATION_CODE) + f"&js_code={code}"
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(url)
+        async with self.http_client.request("GET", url) as response:
             ret: str = await response.text()
             ret: dict = json.loads(ret)
             logger.info(f"url:{url} | response:{ret}")
@@ -61,19 +60,18 @@ class WechatUtil:
             if access_token:
                 return access_token
             url = self._get_base_url(self.GET_ACCESS_TOKEN_URL, self.TYPE_CLIENT_CREDENTIAL)
-            async with aiohttp.ClientSession() as session:
-                try:
-                    response = await session.get(url)
+            try:
+                async with self.http_client.request("GET", url) as response:
                     ret: dict = await response.json()
-                    logger.info(f"url:{url} | response:{ret}")
-                    access_token: str = ret.get("access_token")
-                    if not access_token:
-                        raise MyException()
-                    await self.redis_util.set(self.ACCESS_TOKEN_KEY, access_token, ex=2 * 60 * 60)
-                    return access_token
-                except Exception as e:
-                    logger.error(f"获取access_token出错: {e}")
-                    raise e
+                logger.info(f"url:{url} | response:{ret}")
+                access_token: str = ret.get("access_token")
+                if not access_token:
+                    raise MyException()
+                await self.redis_util.set(self.ACCESS_TOKEN_KEY, access_token, ex=2 * 60 * 60)
+                return access_token
+            except Exception as e:
+                logger.error(f"获取access_token出错: {e}")
+                raise e
 
     async def get_applet_code(self, scene: str) -> str:
         access_token = await self.get_access_token()
@@ -84,20 +82,19 @@ class WechatUtil:
             "env_version": self.env_version,
             "check_path": self.env_version != "develop",
         }
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(url, json=data)
+        async with self.http_client.request("POST", url, json=data) as response:
             ret: bytes = await response.read()
-            logger.info(f"url:{url} | body: {data} | response:{ret[:100]}")
-            if ret.find(b"errcode") > -1:
-                await self.refresh_access_token()
-                logger.info(f"accessToken过期，重新获取, {ret}")
-                access_token = await self.get_access_token()
-                url = f"{self.GET_WXA_CODE_URL}?access_token={access_token}"
-                response = await session.post(url, json=data)
+        logger.info(f"url:{url} | body: {data} | response:{ret[:100]}")
+        if ret.find(b"errcode") > -1:
+            await self.refresh_access_token()
+            logger.info(f"accessToken过期，重新获取, {ret}")
+            access_token = await self.get_access_token()
+            url = f"{self.GET_WXA_CODE_URL}?access_token={access_token}"
+            async with self.http_client.request("POST", url, json=data) as response:
                 ret: bytes = await response.read()
-                if ret.find(b"errcode") > -1:
-                    raise RuntimeError(f"刷新access_token出错: {ret.decode()}")
-            return base64.b64encode(ret).decode()
+            if ret.find(b"errcode") > -1:
+                raise RuntimeError(f"刷新access_token出错: {ret.decode()}")
+        return base64.b64encode(ret).decode()
 
     async def refresh_access_token(self):
         await self.redis_util.delete(self.ACCESS_TOKEN_KEY)
@@ -6,10 +6,11 @@
 #  Copyright © 2022年 luckydog. All rights reserved.
 #
 
-import io
+import mmap
 import socket
 import struct
-import sys
+from collections.abc import Iterable
+from functools import lru_cache
 
 # xdb默认参数
 HeaderInfoLength = 256
@@ -18,175 +19,147 @@ VectorIndexCols = 256
 VectorIndexSize = 8
 SegmentIndexSize = 14
 
+_SEGMENT_IP = struct.Struct("<II")
+_SEGMENT_DATA = struct.Struct("<HI")
 
-class XdbSearcher(object):
-    __f = None
 
-    # the minimal memory allocation.
-    vectorIndex = None
-    # 整个读取xdb，保存在内存中
-    contentBuff = None
+class XdbError(Exception):
+    """
+    ip2region 查询异常基类。
+    """
 
-    @staticmethod
-    def loadVectorIndexFromFile(dbfile):
-        try:
-            f = io.open(dbfile, "rb")
-            f.seek(HeaderInfoLength)
-            vi_len = VectorIndexRows * VectorIndexCols * SegmentIndexSize
-            vector_data = f.read(vi_len)
-            f.close()
-            return vector_data
-        except IOError as e:
-            print("[Error]: %s" % e)
 
-    @staticmethod
-    def loadContentFromFile(dbfile):
+class XdbFileError(XdbError):
+    """
+    xdb 文件无法打开或格式不正确。
+    """
+
+
+class InvalidIpError(XdbError, ValueError):
+    """
+    IP 地址格式不正确，当前只支持 IPv4。
+    """
+
+
+class XdbSearcher:
+    """
+    ip2region xdb 查询器。
+
+    xdb 文件以只读 mmap 映射，同一台机器上的多个 worker 进程通过页缓存共享同一份数据；
+    向量索引在加载时一次解码为整数数组，段索引用 struct.unpack_from 直接在映射内存上二分查找，
+    查询结果按整数 IP 做有界 LRU 缓存。
+    """
+
+    def __init__(self, dbfile: str, cache_size: int = 4096) -> None:
+        """
+        打开并映射 xdb 文件。
+
+        :param dbfile: xdb 文件路径
+        :param cache_size: LRU 缓存条目数，0 表示不缓存
+        :return: None
+        :raises XdbFileError: 文件无法打开或长度不足时抛出
+        """
         try:
-            f = io.open(dbfile, "rb")
-            all_data = f.read()
-            f.close()
-            return all_data
-        except IOError as e:
-            print("[Error]: %s" % e)
-
-    def __init__(self, dbfile=None, vectorIndex=None, contentBuff=None):
-        self.initDatabase(dbfile, vectorIndex, contentBuff)
-
-    def search(self, ip):
-        if isinstance(ip, str):
-            if not ip.isdigit():
-                ip = self.ip2long(ip)
-            return self.searchByIPLong(ip)
-        else:
-            return self.searchByIPLong(ip)
-
-    def searchByIPStr(self, ip):
-        if not ip.isdigit():
-            ip = self.ip2long(ip)
-        return self.searchByIPLong(ip)
-
-    def searchByIPLong(self, ip):
-        # locate the segment index block based on the vector index
-        sPtr = ePtr = 0
-        il0 = (int)((ip >> 24) & 0xFF)
-        il1 = (int)((ip >> 16) & 0xFF)
-        idx = il0 * VectorIndexCols * VectorIndexSize + il1 * VectorIndexSize
-
-        if self.vectorIndex is not None:
-            sPtr = self.getLong(self.vectorIndex, idx)
-            ePtr = self.getLong(self.vectorIndex, idx + 4)
-        elif self.contentBuff is not None:
-            sPtr = self.getLong(self.contentBuff, HeaderInfoLength + idx)
-            ePtr = self.getLong(self.contentBuff, HeaderInfoLength + idx + 4)
-        else:
-            self.__f.seek(HeaderInfoLength + idx)
-            buffer_ptr = self.__f.read(8)
-            sPtr = self.getLong(buffer_ptr, 0)
-            ePtr = self.getLong(buffer_ptr, 4)
-
-        # binary search the segment index block to get the region info
-        dataLen = dataPtr = int(-1)
-        l = int(0)
-        h = int((ePtr - sPtr) / SegmentIndexSize)
-        while l <= h:
-            m = int((l + h) >> 1)
-            p = int(sPtr + m * SegmentIndexSize)
-            # read the segment index
-            buffer_sip = self.readBuffer(p, SegmentIndexSize)
-            sip = self.getLong(buffer_sip, 0)
-            if ip < sip:
-                h = m - 1
+            with open(dbfile, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise XdbFileError(f"无法加载 xdb 文件 {dbfile}: {e}") from e
+        vector_end = HeaderInfoLength + VectorIndexRows * VectorIndexCols * VectorIndexSize
+        if len(self._mmap) < vector_end:
+            self._mmap.close()
+            raise XdbFileError(f"xdb 文件 {dbfile} 长度不足")
+        self._vector_index = struct.unpack_from(
+            f"<{VectorIndexRows * VectorIndexCols * 2}I", self._mmap, HeaderInfoLength
+        )
+        self._cached_search = lru_cache(maxsize=cache_size)(self._search_long) if cache_size else self._search_long
+
+    def search(self, ip: str | int) -> str:
+        """
+        查询 IP 所属地区。
+
+        :param ip: 点分 IPv4 字符串或整数 IP
+        :return: 地区字符串，未命中时返回空字符串
+        :raises InvalidIpError: IP 格式不正确时抛出
+        """
+        return self._cached_search(self.ip2long(ip))
+
+    def search_many(self, ips: Iterable[str | int]) -> list[str]:
+        """
+        批量查询 IP 所属地区。
+
+        :param ips: IP 列表
+        :return: 与输入顺序一致的地区字符串列表
+        :raises InvalidIpError: 任一 IP 格式不正确时抛出
+        """
+        search = self._cached_search
+        return [search(self.ip2long(ip)) for ip in ips]
+
+    def _search_long(self, ip: int) -> str:
+        """
+        查询整数 IP 所属地区。
+
+        :param ip: 整数 IP
+        :return: 地区字符串，未命中时返回空字符串
+        """
+        idx = ((ip >> 24) & 0xFF) * VectorIndexCols * 2 + ((ip >> 16) & 0xFF) * 2
+        s_ptr = self._vector_index[idx]
+        e_ptr = self._vector_index[idx + 1]
+        buffer = self._mmap
+        low, high = 0, (e_ptr - s_ptr) // SegmentIndexSize
+        while low <= high:
+            middle = (low + high) >> 1
+            offset = s_ptr + middle * SegmentIndexSize
+            start_ip, end_ip = _SEGMENT_IP.unpack_from(buffer, offset)
+            if ip < start_ip:
+                high = middle - 1
+            elif ip > end_ip:
+                low = middle + 1
             else:
-                eip = self.getLong(buffer_sip, 4)
-                if ip > eip:
-                    l = m + 1
-                else:
-                    dataLen = self.getInt2(buffer_sip, 8)
-                    dataPtr = self.getLong(buffer_sip, 10)
-                    break
-
-        # empty match interception
-        if dataPtr < 0:
-            return ""
-
-        buffer_string = self.readBuffer(dataPtr, dataLen)
-        return_string = buffer_string.decode("utf-8")
-        return return_string
-
-    def readBuffer(self, offset, length):
-        buffer = None
-        # check the in-memory buffer first
-        if self.contentBuff is not None:
-            buffer = self.contentBuff[offset : offset + length]
-            return buffer
-
-        # read from the file handle
-        if self.__f is not None:
-            self.__f.seek(offset)
-            buffer = self.__f.read(length)
-        return buffer
-
-    def initDatabase(self, dbfile, vi, cb):
+                data_len, data_ptr = _SEGMENT_DATA.unpack_from(buffer, offset + 8)
+                return buffer[data_ptr : data_ptr + data_len].decode("utf-8")
+        return ""
+
+    @staticmethod
+    def ip2long(ip: str | int) -> int:
         """
-        " initialize the database for search
-        " param: dbFile, vectorIndex, contentBuff
+        将 IPv4 地址转换为整数。
+
+        :param ip: 点分 IPv4 字符串、数字字符串或整数 IP
+        :return: 整数 IP
+        :raises InvalidIpError: IP 格式不正确时抛出
         """
+        if isinstance(ip, str) and ip.isdigit():
+            ip = int(ip)
+        if isinstance(ip, int):
+            if 0 <= ip <= 0xFFFFFFFF:
+                return ip
+            raise InvalidIpError(f"IP 超出 IPv4 范围: {ip}")
         try:
-            if cb is not None:
-                self.__f = None
-                self.vectorIndex = None
-                self.contentBuff = cb
-            else:
-                self.__f = io.open(dbfile, "rb")
-                self.vectorIndex = vi
-        except IOError as e:
-            print("[Error]: %s" % e)
-            sys.exit()
-
-    def ip2long(self, ip):
-        _ip = socket.inet_aton(ip)
-        return struct.unpack("!L", _ip)[0]
-
-    def isip(self, ip):
-        p = ip.split(".")
-
-        if len(p) != 4:
-            return False
-        for pp in p:
-            if not pp.isdigit():
-                return False
-            if len(pp) > 3:
-                return False
-            if int(pp) > 255:
-                return False
-        return True
-
-    def getLong(self, b, offset):
-        if len(b[offset : offset + 4]) == 4:
-            return struct.unpack("I", b[offset : offset + 4])[0]
-        return 0
-
-    def getInt2(self, b, offset):
-        return (b[offset] & 0x000000FF) | (b[offset + 1] << 8)
-
-    def close(self):
-        if self.__f is not None:
-            self.__f.close()
-        self.vectorIndex = None
-        self.contentBuff = None
+            return struct.unpack("!L", socket.inet_aton(ip))[0]
+        except (OSError, TypeError) as e:
+            raise InvalidIpError(f"无效的 IPv4 地址: {ip!r}") from e
+
+    def cache_info(self):
+        """
+        查询 LRU 缓存统计。
+
+        :return: functools 缓存统计，未启用缓存时返回 None
+        """
+        cache_info = getattr(self._cached_search, "cache_info", None)
+        return cache_info() if cache_info else None
+
+    def close(self) -> None:
+        """
+        关闭文件映射。
+
+        :return: None
+        """
+        if not self._mmap.closed:
+            self._mmap.close()
 
 
 if __name__ == "__main__":
-    ip_array = ["1.2.3.4", "192.168.1.1"]
-    # 1. 缓存
-    dbPath = "../resources/ip2region.xdb"
-    cb = XdbSearcher.loadContentFromFile(dbfile=dbPath)
-    # 2. 创建查询对象
-    searcher = XdbSearcher(contentBuff=cb)
-
-    # 3. 执行查询
-    # ip = "1.2.3.4"
-    for ip in ip_array:
-        region_str = searcher.searchByIPStr(ip)
-        print(region_str)
+    searcher = XdbSearcher("../resources/ip2region.xdb")
+    for region in searcher.search_many(["1.2.3.4", "192.168.1.1"]):
+        print(region)
     searcher.close()
@@ -30,6 +30,7 @@ class ArticleSearchVO(BaseSearchVO):
     """
 
     order_type: OrderTypeEnum = OrderTypeEnum.BY_RELEVANCE
+    cursor: str | None = None
 
 
 class ArticleRecommendVO(BaseVO):
@@ -131,6 +131,7 @@ create table t_article
     recommend_weight int      not null default 0 comment '人工推荐权重',
     is_deleted   bool         not null default false comment '是否已删除(实现逻辑删除)',
     edit_time    datetime comment '最后编辑时间',
+    es_version   bigint       not null default 0 comment 'ES同步版本号',
     create_time  datetime     not null comment '创建时间',
     update_time  datetime     not null comment '更新时间',
     index idx_user_id_is_deleted_status (user_id, is_deleted, status),
@@ -214,9 +215,23 @@ create table t_action_count
     count       int      not null default 0 comment '统计数量',
     create_time datetime not null comment '创建时间',
     update_time datetime not null comment '更新时间',
-    index idx_obj_id_together (obj_id, obj_type, action_type)
+    unique index uk_obj_id_together (obj_id, obj_type, action_type)
 ) comment '行为统计表';
 
+create table t_es_outbox
+(
+    id              bigint primary key comment '记录id',
+    index_name      varchar(64)  not null comment 'ES索引名',
+    doc_id          bigint       not null comment '文档id',
+    status          int          not null default 1 comment '状态(1:待同步 2:死信)',
+    attempts        int          not null default 0 comment '已重试次数',
+    next_retry_time datetime     not null comment '下次可领取时间',
+    last_error      varchar(500) not null default '' comment '最近一次失败原因',
+    create_time     datetime     not null comment '创建时间',
+    update_time     datetime     not null comment '更新时间',
+    index idx_es_outbox_claim (status, next_retry_time, id)
+) comment 'ES同步发件箱表';
+
 
 create table t_job
 (
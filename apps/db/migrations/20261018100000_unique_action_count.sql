@@ -0,0 +1,15 @@
+use ltw_db;
+
+-- 同一对象同一行为只保留最新的一条统计
+delete action_count
+from t_action_count as action_count
+join t_action_count as newer
+    on newer.obj_id = action_count.obj_id
+    and newer.obj_type = action_count.obj_type
+    and newer.action_type = action_count.action_type
+    and (newer.update_time > action_count.update_time
+        or (newer.update_time = action_count.update_time and newer.id > action_count.id));
+
+alter table t_action_count
+    drop index idx_obj_id_together,
+    add unique index uk_obj_id_together (obj_id, obj_type, action_type);
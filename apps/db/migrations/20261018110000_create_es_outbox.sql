@@ -0,0 +1,15 @@
+use ltw_db;
+
+create table t_es_outbox
+(
+    id              bigint primary key comment '记录id',
+    index_name      varchar(64)  not null comment 'ES索引名',
+    doc_id          bigint       not null comment '文档id',
+    status          int          not null default 1 comment '状态(1:待同步 2:死信)',
+    attempts        int          not null default 0 comment '已重试次数',
+    next_retry_time datetime     not null comment '下次可领取时间',
+    last_error      varchar(500) not null default '' comment '最近一次失败原因',
+    create_time     datetime     not null comment '创建时间',
+    update_time     datetime     not null comment '更新时间',
+    index idx_es_outbox_claim (status, next_retry_time, id)
+) comment 'ES同步发件箱表';
@@ -0,0 +1,9 @@
+use ltw_db;
+
+alter table t_article
+    add column es_version bigint not null default 0 comment 'ES同步版本号' after edit_time;
+
+-- ES 中已有文档的外部版本号是发件箱记录的雪花 ID，已有文章的版本号从迁移时刻对应的雪花 ID 起算，
+-- 保证大于已写入 ES 的版本号
+update t_article
+set es_version = (cast(unix_timestamp(now(3)) * 1000 as signed) - 1288834974657 + 1) << 22;
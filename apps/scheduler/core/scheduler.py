@@ -1,25 +1,36 @@
 import asyncio
 import hashlib
 import json
+import time
 from contextlib import suppress
+from datetime import datetime
 from typing import Any
 
-from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_MISSED, JobExecutionEvent
+from apscheduler.events import (
+    EVENT_JOB_ERROR,
+    EVENT_JOB_EXECUTED,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_SUBMITTED,
+    JobEvent,
+    JobExecutionEvent,
+)
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from sqlalchemy import select
 
 from apps.base.constant.redis_constant import RedisConstant
 from apps.base.core.depend_inject import GetBean, GetValue, logger
+from apps.base.core.metrics import SCHEDULER_JOB_DURATION
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.enum.job import JobStatusEnum, MisfirePolicyEnum
 from apps.base.models.job import Job
 from apps.base.utils.redis_util import RedisUtil
 from apps.scheduler.core.cron import build_cron_trigger
 from apps.scheduler.core.invoke import invoke_target, resolve_invoke_target
-from apps.scheduler.tasks.article_score import refresh_article_scores
+from apps.scheduler.tasks.article_score import refresh_article_scores, refresh_dirty_article_scores
 
 RECONCILE_JOB_ID = "system-job-reconciler"
 ARTICLE_SCORE_JOB_ID = "article-score-refresh"
+ARTICLE_SCORE_DIRTY_JOB_ID = "article-score-dirty-refresh"
 
 
 def build_job_options(job: Job) -> dict[str, Any]:
@@ -59,6 +70,7 @@ class DatabaseScheduler:
         self.timezone = timezone
         self.redis_util = redis_util
         self._fingerprints: dict[str, str] = {}
+        self._job_started: dict[tuple[str, datetime], float] = {}
         self._subscriber_task: asyncio.Task[None] | None = None
         self._pubsub: Any = None
         self._stopping = False
@@ -70,17 +82,30 @@ class DatabaseScheduler:
         :return: None
         """
         self.scheduler.add_listener(self._handle_job_event, EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+        self.scheduler.add_listener(
+            self._record_job_duration, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR
+        )
         self.scheduler.start()
         self.redis_util = self.redis_util or GetBean(RedisUtil)
         await self._open_subscription()
         self._subscriber_task = asyncio.create_task(self._listen_job_changes(), name="scheduler-job-change-subscriber")
         await self.reconcile_jobs()
+        self.scheduler.add_job(
+            refresh_dirty_article_scores,
+            trigger="interval",
+            minutes=1,
+            id=ARTICLE_SCORE_DIRTY_JOB_ID,
+            name="增量刷新文章排序分数并同步 ES 指标",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
         self.scheduler.add_job(
             refresh_article_scores,
             trigger="interval",
-            minutes=5,
+            minutes=30,
             id=ARTICLE_SCORE_JOB_ID,
-            name="刷新文章排序分数并同步 ES 指标",
+            name="全量刷新文章排序分数（时间衰减）",
             replace_existing=True,
             coalesce=True,
             max_instances=1,
@@ -322,6 +347,22 @@ class DatabaseScheduler:
         """
         return f"db-job-{job_id}"
 
+    def _record_job_duration(self, event: JobEvent) -> None:
+        """按提交和完成事件记录任务执行耗时指标。
+
+        :param event: APScheduler 任务事件
+        :return: None
+        """
+        if event.code == EVENT_JOB_SUBMITTED:
+            now = time.perf_counter()
+            for run_time in getattr(event, "scheduled_run_times", []):
+                self._job_started[(event.job_id, run_time)] = now
+            return
+        started = self._job_started.pop((event.job_id, getattr(event, "scheduled_run_time", None)), None)
+        if started is not None:
+            status = "error" if getattr(event, "exception", None) else "success"
+            SCHEDULER_JOB_DURATION.labels(event.job_id, status).observe(time.perf_counter() - started)
+
     def _handle_job_event(self, event: JobExecutionEvent) -> None:
         """记录任务错过或执行失败事件。
 
@@ -15,7 +15,9 @@ if module_path not in sys.path:
 load_dotenv(module_path / ".env", override=False)
 
 import apps.scheduler.config.logger_config  # noqa: F401
+from apps.base.core.metrics import MetricsServer
 from apps.base.core.sqlalchemy.session import close_sqlalchemy_engine, init_sqlalchemy_engine
+from apps.base.utils.snowflake import SnowflakeIDGenerator
 from apps.scheduler.config.server_config import init_container_config
 from apps.scheduler.core.scheduler import DatabaseScheduler
 
@@ -27,17 +29,25 @@ async def run_scheduler() -> None:
     """
     init_container_config()
     init_sqlalchemy_engine()
+    # 启动时申请雪花算法机器 ID 租约，任务中生成 ID 不再同步访问 Redis
+    SnowflakeIDGenerator.start()
     scheduler = DatabaseScheduler()
+    metrics_server = MetricsServer.from_config()
     stop_event = asyncio.Event()
     loop = asyncio.get_running_loop()
     for stop_signal in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(stop_signal, stop_event.set)
     try:
+        if metrics_server:
+            await metrics_server.start()
         await scheduler.start()
         await stop_event.wait()
     finally:
         await scheduler.shutdown()
+        if metrics_server:
+            await metrics_server.stop()
         await close_sqlalchemy_engine()
+        SnowflakeIDGenerator.close()
 
 
 def run_scheduler_process() -> None:
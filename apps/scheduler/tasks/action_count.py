@@ -1,4 +1,7 @@
-from sqlalchemy import select, update
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.dialects.mysql import insert
 
 from apps.base.constant.redis_constant import RedisConstant
 from apps.base.core.depend_inject import Autowired, Component, GetBean, logger
@@ -8,6 +11,8 @@ from apps.base.models.action import ActionCount
 from apps.base.models.picture import Picture
 from apps.base.utils.action_count_util import ActionCountDirtyItem, parse_action_count_dirty_member
 from apps.base.utils.redis_util import RedisUtil
+from apps.base.utils.snowflake import SnowflakeIDGenerator
+from apps.scheduler.tasks.article_score import ARTICLE_SCORE_ACTION_TYPES
 
 
 @Component()
@@ -16,98 +21,153 @@ class ActionCountSyncTask:
 
     redis_util: RedisUtil = Autowired()
 
+    # KEYS[1]: dirty 集合，KEYS[i + 1]: 第 i 个成员的计数哈希；ARGV 每 3 个一组: 哈希字段、已同步计数值、dirty 成员
+    REMOVE_SYNCED_SCRIPT = """
+    local removed = 0
+    for i = 2, #KEYS do
+        local j = (i - 2) * 3
+        if redis.call("HGET", KEYS[i], ARGV[j + 1]) == ARGV[j + 2] then
+            removed = removed + redis.call("SREM", KEYS[1], ARGV[j + 3])
+        end
+    end
+    return removed
+    """
+
     async def execute(self, batch_size: int = 500) -> int:
         """
-        将 Redis dirty 计数同步到行为统计表。
+        将 Redis dirty 计数分批同步到行为统计表。
 
-        :param batch_size: 单次最多同步数量。
+        使用 SSCAN 分批遍历 dirty 集合，每批一次 pipeline 读取计数、一条 upsert 写库、一次 Lua 移除 dirty 标记。
+
+        :param batch_size: 每批同步数量。
         :return: 成功同步的计数项数量。
         """
         redis = self.redis_util.redis
-        members = await redis.smembers(RedisConstant.ACTION_COUNT_DIRTY_SET_KEY)
         synced_count = 0
-        for member in list(members)[:batch_size]:
-            dirty_item = parse_action_count_dirty_member(str(member))
-            if not dirty_item:
-                await redis.srem(RedisConstant.ACTION_COUNT_DIRTY_SET_KEY, member)
-                continue
-            count = await redis.hget(dirty_item.redis_hash_key, str(dirty_item.obj_id))
-            if count is None:
-                await redis.srem(RedisConstant.ACTION_COUNT_DIRTY_SET_KEY, member)
-                continue
-            await self._save_action_count(dirty_item, int(count))
-            await self._remove_synced_dirty_member(dirty_item, str(count), str(member))
-            synced_count += 1
+        cursor = 0
+        while True:
+            cursor, members = await redis.sscan(RedisConstant.ACTION_COUNT_DIRTY_SET_KEY, cursor, count=batch_size)
+            if members:
+                try:
+                    synced_count += await self._sync_members([str(member) for member in members])
+                except Exception as e:
+                    # 单批失败不影响其他批次，失败批次的 dirty 标记保留，下次同步重试
+                    logger.exception(f"同步行为计数批次失败，共 {len(members)} 条 {e}")
+            if not cursor:
+                break
         if synced_count:
             logger.info(f"同步行为计数完成，共同步 {synced_count} 条")
         return synced_count
 
-    async def _save_action_count(self, dirty_item: ActionCountDirtyItem, count: int) -> None:
+    async def _sync_members(self, members: list[str]) -> int:
         """
-        保存单个行为统计计数。
+        同步一批 dirty 集合成员。
 
-        :param dirty_item: dirty 计数项。
-        :param count: 当前 Redis 计数值。
-        :return: None。
+        :param members: dirty 集合成员。
+        :return: 成功同步的计数项数量。
         """
-        count = max(count, 0)
-        action_count = await db.model_first(
-            select(ActionCount).where(
-                ActionCount.obj_id == dirty_item.obj_id,
-                ActionCount.obj_type == dirty_item.obj_type,
-                ActionCount.action_type == dirty_item.action_type,
-            )
+        redis = self.redis_util.redis
+        invalid_members = []
+        dirty_items: dict[str, ActionCountDirtyItem] = {}
+        for member in members:
+            dirty_item = parse_action_count_dirty_member(member)
+            if dirty_item:
+                dirty_items[member] = dirty_item
+            else:
+                invalid_members.append(member)
+
+        hash_fields: dict[str, list[str]] = {}
+        for member, dirty_item in dirty_items.items():
+            hash_fields.setdefault(dirty_item.redis_hash_key, []).append(member)
+        async with redis.pipeline(transaction=False) as pipe:
+            for hash_key, hash_members in hash_fields.items():
+                pipe.hmget(hash_key, [str(dirty_items[member].obj_id) for member in hash_members])
+            results = await pipe.execute()
+        counts: dict[str, str] = {}
+        for hash_members, values in zip(hash_fields.values(), results):
+            for member, value in zip(hash_members, values):
+                if value is None:
+                    invalid_members.append(member)
+                else:
+                    counts[member] = value
+
+        if invalid_members:
+            await redis.srem(RedisConstant.ACTION_COUNT_DIRTY_SET_KEY, *invalid_members)
+        if not counts:
+            return 0
+        await self._save_action_counts({dirty_items[member]: int(count) for member, count in counts.items()})
+        await self._remove_synced_dirty_members(
+            {member: (dirty_items[member], count) for member, count in counts.items()}
         )
-        if action_count:
-            action_count.count = count
-        else:
-            action_count = ActionCount(
-                obj_id=dirty_item.obj_id,
-                obj_type=dirty_item.obj_type,
-                action_type=dirty_item.action_type,
-                count=count,
-            )
+        return len(counts)
+
+    async def _save_action_counts(self, counts: dict[ActionCountDirtyItem, int]) -> None:
+        """
+        使用一条 upsert 保存一批行为统计计数，同步图片点赞数冗余字段，并标记需要重算排序分数的文章。
+
+        :param counts: dirty 计数项到当前 Redis 计数值的映射。
+        :return: None。
+        """
+        now = datetime.now()
+        ids = SnowflakeIDGenerator.next_ids(len(counts))
+        rows = [
+            {
+                "id": row_id,
+                "obj_id": dirty_item.obj_id,
+                "obj_type": dirty_item.obj_type,
+                "action_type": dirty_item.action_type,
+                "count": max(count, 0),
+                "create_time": now,
+                "update_time": now,
+            }
+            for row_id, (dirty_item, count) in zip(ids, counts.items())
+        ]
+        stmt = insert(ActionCount).values(rows)
+        stmt = stmt.on_duplicate_key_update(count=stmt.inserted.count, update_time=stmt.inserted.update_time)
+        picture_likes = [
+            {"b_id": dirty_item.obj_id, "b_like_count": max(count, 0)}
+            for dirty_item, count in counts.items()
+            if dirty_item.obj_type == ObjectTypeEnum.PICTURE and dirty_item.action_type == ActionTypeEnum.LIKE
+        ]
+        article_ids = {
+            dirty_item.obj_id
+            for dirty_item in counts
+            if dirty_item.obj_type == ObjectTypeEnum.ARTICLE and dirty_item.action_type in ARTICLE_SCORE_ACTION_TYPES
+        }
         async with db.atomic() as session:
-            session.add(action_count)
-            if dirty_item.obj_type == ObjectTypeEnum.PICTURE and dirty_item.action_type == ActionTypeEnum.LIKE:
-                await session.execute(update(Picture).where(Picture.id == dirty_item.obj_id).values(like_count=count))
-            await session.flush()
-
-    async def _remove_synced_dirty_member(
-        self,
-        dirty_item: ActionCountDirtyItem,
-        expected_count: str,
-        member: str,
-    ) -> None:
+            await session.execute(stmt)
+            if picture_likes:
+                # Core executemany，图片已被删除时只影响 0 行，不会像 ORM 按主键批量更新那样抛出 StaleDataError
+                picture_table = Picture.__table__
+                await session.execute(
+                    update(picture_table)
+                    .where(picture_table.c.id == bindparam("b_id"))
+                    .values(like_count=bindparam("b_like_count")),
+                    picture_likes,
+                )
+        if article_ids:
+            await self.redis_util.redis.sadd(RedisConstant.ARTICLE_SCORE_DIRTY_SET_KEY, *article_ids)
+
+    async def _remove_synced_dirty_members(self, synced: dict[str, tuple[ActionCountDirtyItem, str]]) -> None:
         """
-        当 Redis 计数未变化时移除 dirty 标记。
+        对计数未变化的成员移除 dirty 标记，同步期间被修改的成员留待下次同步。
 
-        :param dirty_item: dirty 计数项。
-        :param expected_count: 已同步的 Redis 计数值。
-        :param member: dirty 集合成员。
+        :param synced: dirty 集合成员到 (dirty 项, 已同步的 Redis 计数值) 的映射。
         :return: None。
         """
-        await self.redis_util.redis.eval(
-            """
-            if redis.call("HGET", KEYS[1], ARGV[1]) == ARGV[2] then
-                return redis.call("SREM", KEYS[2], ARGV[3])
-            end
-            return 0
-            """,
-            2,
-            dirty_item.redis_hash_key,
-            RedisConstant.ACTION_COUNT_DIRTY_SET_KEY,
-            str(dirty_item.obj_id),
-            expected_count,
-            member,
-        )
+        keys = [RedisConstant.ACTION_COUNT_DIRTY_SET_KEY]
+        args = []
+        for member, (dirty_item, expected_count) in synced.items():
+            keys.append(dirty_item.redis_hash_key)
+            args.extend([str(dirty_item.obj_id), expected_count, member])
+        await self.redis_util.redis.eval(self.REMOVE_SYNCED_SCRIPT, len(keys), *keys, *args)
 
 
 async def sync_action_count(batch_size: int = 500) -> int:
     """
     同步 Redis 行为计数到数据库。
 
-    :param batch_size: 单次最多同步数量。
+    :param batch_size: 每批同步数量。
     :return: 成功同步的计数项数量。
     """
     task = GetBean(ActionCountSyncTask)
@@ -1,182 +1,207 @@
 from datetime import datetime
 from decimal import Decimal
+from typing import Any
 
-from elasticsearch import AsyncElasticsearch, helpers
-from sqlalchemy import case, select, update
+from sqlalchemy import Row, Select, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from apps.base.core.depend_inject import GetValue, logger
+from apps.base.constant.es_constant import BaseESConstant
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.depend_inject import GetBean, logger
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.enum.action import ActionTypeEnum, ObjectTypeEnum
 from apps.base.enum.article import ArticleStatusEnum
 from apps.base.models.action import ActionCount
 from apps.base.models.article import Article
+from apps.base.models.es_outbox import EsOutbox
+from apps.base.utils.redis_util import RedisUtil
 
 SCORE_QUANT = Decimal("0.000001")
-ARTICLE_INDEX = "article"
+ARTICLE_SCORE_ACTION_TYPES = (
+    ActionTypeEnum.VIEW,
+    ActionTypeEnum.LIKE,
+    ActionTypeEnum.COLLECT,
+    ActionTypeEnum.COMMENT,
+)
+SCORE_UPDATE_CHUNK_SIZE = 1000
 
 
-async def _sync_article_metrics_to_es(
-    client: AsyncElasticsearch,
-    article_ids: list[int],
-    count_map: dict[int, dict[ActionTypeEnum, int]],
-    hot_score_map: dict[int, Decimal],
-) -> None:
+async def _enqueue_es_sync(session: AsyncSession, article_ids: list[int]) -> None:
     """
-    将文章行为计数和热门分数批量同步到 ES。
+    在当前事务中递增文章 ES 版本号并写入发件箱，由发件箱中继按文章最新状态整篇写入 ES。
 
-    :param client: Elasticsearch 异步客户端。
+    分数同步不直接对 ES 做 partial update，partial update 会递增 ES 内部版本号，使编辑同步被版本冲突拒绝。
+
+    :param session: 当前事务会话。
     :param article_ids: 待同步文章 ID。
-    :param count_map: 文章行为计数映射。
-    :param hot_score_map: 文章热门分数映射。
     :return: None。
     """
-    documents = await client.mget(
-        index=ARTICLE_INDEX, ids=[str(article_id) for article_id in article_ids], source=False
+    await session.execute(
+        update(Article)
+        .where(Article.id.in_(article_ids))
+        .values(es_version=Article.es_version + 1)
+        .execution_options(synchronize_session=False)
     )
-    existing_article_ids = {int(document["_id"]) for document in documents["docs"] if document.get("found")}
-    missing_count = len(article_ids) - len(existing_article_ids)
-    if missing_count:
-        logger.info(f"跳过 {missing_count} 篇尚未写入 ES 的文章指标")
-    actions = []
-    for article_id in article_ids:
-        if article_id not in existing_article_ids:
-            continue
-        counts = count_map.get(article_id, {})
-        actions.append(
-            {
-                "_op_type": "update",
-                "_index": ARTICLE_INDEX,
-                "_id": article_id,
-                "doc": {
-                    "view_count": max(counts.get(ActionTypeEnum.VIEW, 0), 0),
-                    "like_count": max(counts.get(ActionTypeEnum.LIKE, 0), 0),
-                    "collect_count": max(counts.get(ActionTypeEnum.COLLECT, 0), 0),
-                    "comment_count": max(counts.get(ActionTypeEnum.COMMENT, 0), 0),
-                    "hot_score": float(hot_score_map[article_id]),
-                },
-            }
-        )
-    if not actions:
-        return
-    success_count, errors = await helpers.async_bulk(
-        client,
-        actions,
-        raise_on_error=False,
-        raise_on_exception=False,
+    session.add_all(
+        [EsOutbox(index_name=BaseESConstant.ARTICLE_INDEX, doc_id=article_id) for article_id in article_ids]
     )
-    if errors:
-        logger.warning(f"文章指标同步 ES 部分失败，成功 {success_count} 条，失败 {len(errors)} 条")
 
 
 def _calculate_scores(
-    article: Article, action_counts: dict[ActionTypeEnum, int], now: datetime
-) -> tuple[Decimal, Decimal]:
+    rows: list[Row[Any]], count_map: dict[int, dict[ActionTypeEnum, int]], now: datetime
+) -> tuple[list[Decimal], list[Decimal]]:
     """
-    根据文章行为计数计算热门分数和推荐分数。
+    按列批量计算一批文章的热门分数和推荐分数。
 
-    :param article: 文章对象。
-    :param action_counts: 行为类型对应的统计数量。
+    :param rows: 文章 (id, create_time, recommend_weight, hot_score, recommend_score) 行。
+    :param count_map: 文章行为计数映射。
     :param now: 当前计算时间。
-    :return: 热门分数和推荐分数。
+    :return: 与 rows 顺序一致的热门分数列表和推荐分数列表。
     """
-    view_count = max(action_counts.get(ActionTypeEnum.VIEW, 0), 0)
-    like_count = max(action_counts.get(ActionTypeEnum.LIKE, 0), 0)
-    collect_count = max(action_counts.get(ActionTypeEnum.COLLECT, 0), 0)
-    comment_count = max(action_counts.get(ActionTypeEnum.COMMENT, 0), 0)
-    age_hours = max((now - article.create_time).total_seconds() / 3600, 0)
-
-    interaction_score = view_count * 0.1 + like_count * 3 + collect_count * 5 + comment_count * 4
-    hot_score = interaction_score / ((age_hours + 2) ** 1.2)
-
-    quality_score = (like_count * 3 + collect_count * 6 + comment_count * 4) / (view_count + 100) * 1000
-    freshness_score = 100 / ((age_hours / 24 + 1) ** 0.5)
-    recommend_score = quality_score + freshness_score + article.recommend_weight
+    empty: dict[ActionTypeEnum, int] = {}
+    counts = [count_map.get(row.id, empty) for row in rows]
+    views = [max(c.get(ActionTypeEnum.VIEW, 0), 0) for c in counts]
+    likes = [max(c.get(ActionTypeEnum.LIKE, 0), 0) for c in counts]
+    collects = [max(c.get(ActionTypeEnum.COLLECT, 0), 0) for c in counts]
+    comments = [max(c.get(ActionTypeEnum.COMMENT, 0), 0) for c in counts]
+    age_hours = [max((now - row.create_time).total_seconds() / 3600, 0) for row in rows]
+
+    hot_scores = [
+        (view * 0.1 + like * 3 + collect * 5 + comment * 4) / ((age + 2) ** 1.2)
+        for view, like, collect, comment, age in zip(views, likes, collects, comments, age_hours)
+    ]
+    recommend_scores = [
+        (like * 3 + collect * 6 + comment * 4) / (view + 100) * 1000
+        + 100 / ((age / 24 + 1) ** 0.5)
+        + row.recommend_weight
+        for view, like, collect, comment, age, row in zip(views, likes, collects, comments, age_hours, rows)
+    ]
     return (
-        Decimal(str(hot_score)).quantize(SCORE_QUANT),
-        Decimal(str(recommend_score)).quantize(SCORE_QUANT),
+        [Decimal(str(score)).quantize(SCORE_QUANT) for score in hot_scores],
+        [Decimal(str(score)).quantize(SCORE_QUANT) for score in recommend_scores],
     )
 
 
+async def _load_action_counts(article_ids: list[int]) -> dict[int, dict[ActionTypeEnum, int]]:
+    """
+    批量读取文章行为计数。
+
+    :param article_ids: 文章 ID 列表。
+    :return: 文章行为计数映射。
+    """
+    rows = await db.all(
+        select(ActionCount.obj_id, ActionCount.action_type, ActionCount.count).where(
+            ActionCount.obj_type == ObjectTypeEnum.ARTICLE,
+            ActionCount.obj_id.in_(article_ids),
+            ActionCount.action_type.in_(ARTICLE_SCORE_ACTION_TYPES),
+        )
+    )
+    count_map: dict[int, dict[ActionTypeEnum, int]] = {}
+    for obj_id, action_type, count in rows:
+        count_map.setdefault(obj_id, {})[ActionTypeEnum(action_type)] = count
+    return count_map
+
+
+async def _refresh_rows(rows: list[Row[Any]], now: datetime, counts_changed: bool) -> int:
+    """
+    重算一批文章的分数，只写回分数有变化的行，并在同一事务中登记 ES 同步。
+
+    :param rows: 文章 (id, create_time, recommend_weight, hot_score, recommend_score) 行。
+    :param now: 当前计算时间。
+    :param counts_changed: 行为计数是否已变化，变化时即使热门分数不变也同步 ES 计数。
+    :return: 写回数据库的文章数量。
+    """
+    count_map = await _load_action_counts([row.id for row in rows])
+    hot_scores, recommend_scores = _calculate_scores(rows, count_map, now)
+    changed_rows = [
+        {"b_id": row.id, "b_hot_score": hot_score, "b_recommend_score": recommend_score}
+        for row, hot_score, recommend_score in zip(rows, hot_scores, recommend_scores)
+        if hot_score != row.hot_score or recommend_score != row.recommend_score
+    ]
+    if counts_changed:
+        es_article_ids = [row.id for row in rows]
+    else:
+        es_article_ids = [row.id for row, hot_score in zip(rows, hot_scores) if hot_score != row.hot_score]
+    if changed_rows or es_article_ids:
+        # Core executemany，文章在读取后被删除时只影响 0 行，不会像 ORM 按主键批量更新那样抛出 StaleDataError
+        article_table = Article.__table__
+        update_stmt = (
+            update(article_table)
+            .where(article_table.c.id == bindparam("b_id"))
+            .values(hot_score=bindparam("b_hot_score"), recommend_score=bindparam("b_recommend_score"))
+        )
+        async with db.atomic() as session:
+            for start in range(0, len(changed_rows), SCORE_UPDATE_CHUNK_SIZE):
+                await session.execute(update_stmt, changed_rows[start : start + SCORE_UPDATE_CHUNK_SIZE])
+            for start in range(0, len(es_article_ids), SCORE_UPDATE_CHUNK_SIZE):
+                await _enqueue_es_sync(session, es_article_ids[start : start + SCORE_UPDATE_CHUNK_SIZE])
+    return len(changed_rows)
+
+
+def _score_columns_stmt() -> Select[Any]:
+    """
+    构造计算分数所需列的查询，只查询已发布且未删除的文章。
+
+    :return: 查询语句。
+    """
+    return select(
+        Article.id, Article.create_time, Article.recommend_weight, Article.hot_score, Article.recommend_score
+    ).where(Article.status == ArticleStatusEnum.PUBLISHED, Article.is_deleted.is_(False))
+
+
 async def refresh_article_scores(batch_size: int = 500) -> int:
     """
-    分批刷新文章热门分数和推荐分数。
+    全量刷新文章热门分数和推荐分数，用于按时间衰减低频重算。
 
     :param batch_size: 单批处理的文章数量。
-    :return: 已刷新分数的文章数量。
+    :return: 分数有变化并写回的文章数量。
     """
     batch_size = max(batch_size, 1)
     last_article_id = 0
     refreshed_count = 0
     now = datetime.now()
-    es_client = AsyncElasticsearch(GetValue("es.url"))
-    try:
-        es_available = bool(await es_client.indices.exists(index=ARTICLE_INDEX))
-    except Exception:
-        logger.warning("检测文章 ES 索引失败，本轮仅刷新数据库排序分数", exc_info=True)
-        es_available = False
-    try:
-        while True:
-            articles = list(
-                await db.model_all(
-                    select(Article)
-                    .where(
-                        Article.id > last_article_id,
-                        Article.status == ArticleStatusEnum.PUBLISHED,
-                        Article.is_deleted.is_(False),
-                    )
-                    .order_by(Article.id)
-                    .limit(batch_size)
-                )
-            )
-            if not articles:
-                break
-
-            article_ids = [article.id for article in articles]
-            rows = await db.all(
-                select(ActionCount.obj_id, ActionCount.action_type, ActionCount.count).where(
-                    ActionCount.obj_type == ObjectTypeEnum.ARTICLE,
-                    ActionCount.obj_id.in_(article_ids),
-                    ActionCount.action_type.in_(
-                        [
-                            ActionTypeEnum.LIKE,
-                            ActionTypeEnum.COLLECT,
-                            ActionTypeEnum.VIEW,
-                            ActionTypeEnum.COMMENT,
-                        ]
-                    ),
-                )
-            )
-            count_map: dict[int, dict[ActionTypeEnum, int]] = {}
-            for obj_id, action_type, count in rows:
-                count_map.setdefault(obj_id, {})[ActionTypeEnum(action_type)] = count
-
-            hot_score_map: dict[int, Decimal] = {}
-            recommend_score_map: dict[int, Decimal] = {}
-            for article in articles:
-                hot_score, recommend_score = _calculate_scores(article, count_map.get(article.id, {}), now)
-                hot_score_map[article.id] = hot_score
-                recommend_score_map[article.id] = recommend_score
-
-            async with db.atomic() as session:
-                await session.execute(
-                    update(Article)
-                    .where(Article.id.in_(article_ids))
-                    .values(
-                        hot_score=case(hot_score_map, value=Article.id),
-                        recommend_score=case(recommend_score_map, value=Article.id),
-                    )
-                )
-            if es_available:
-                try:
-                    await _sync_article_metrics_to_es(es_client, article_ids, count_map, hot_score_map)
-                except Exception:
-                    logger.warning("文章指标同步 ES 失败，本轮继续刷新数据库排序分数", exc_info=True)
-            refreshed_count += len(articles)
-            last_article_id = article_ids[-1]
-    finally:
-        await es_client.close()
-
-    logger.info(f"文章排序分数刷新完成，共刷新 {refreshed_count} 篇文章")
+    while True:
+        stmt = _score_columns_stmt().where(Article.id > last_article_id).order_by(Article.id).limit(batch_size)
+        rows = list(await db.all(stmt))
+        if not rows:
+            break
+        refreshed_count += await _refresh_rows(rows, now, counts_changed=False)
+        last_article_id = rows[-1].id
+
+    logger.info(f"文章排序分数全量刷新完成，共更新 {refreshed_count} 篇文章")
+    return refreshed_count
+
+
+async def refresh_dirty_article_scores(batch_size: int = 500) -> int:
+    """
+    增量刷新行为计数有变化的文章分数。
+
+    行为计数同步任务会把计数变化的文章 ID 写入 dirty 集合，本任务分批弹出并重算，失败时放回集合。
+
+    :param batch_size: 单批处理的文章数量。
+    :return: 分数有变化并写回的文章数量。
+    """
+    batch_size = max(batch_size, 1)
+    redis = GetBean(RedisUtil).redis
+    refreshed_count = 0
+    now = datetime.now()
+    while True:
+        members = await redis.spop(RedisConstant.ARTICLE_SCORE_DIRTY_SET_KEY, batch_size)
+        if not members:
+            break
+        try:
+            article_ids = [int(member) for member in members]
+            rows = list(await db.all(_score_columns_stmt().where(Article.id.in_(article_ids))))
+            if rows:
+                refreshed_count += await _refresh_rows(rows, now, counts_changed=True)
+        except Exception:
+            await redis.sadd(RedisConstant.ARTICLE_SCORE_DIRTY_SET_KEY, *members)
+            raise
+        if len(members) < batch_size:
+            break
+
+    if refreshed_count:
+        logger.info(f"文章排序分数增量刷新完成，共更新 {refreshed_count} 篇文章")
     return refreshed_count
 
 
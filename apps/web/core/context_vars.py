@@ -2,10 +2,17 @@
 # @Author  : frank
 # @File    : context_vars.py
 from contextvars import ContextVar
+from typing import TYPE_CHECKING
 
 from starlette.requests import Request
 
+if TYPE_CHECKING:
+    from apps.web.core.websocket.profile_loader import UserProfileLoader
+
 
 class ContextVars:
     request = ContextVar[Request]("request")
     token_user_id = ContextVar[int]("token_user_id")
+    # 白名单中间件校验后的 token 声明，None 表示未校验，空字典表示未携带或无效
+    token_claims = ContextVar[dict | None]("token_claims", default=None)
+    user_profile_loader: "ContextVar[UserProfileLoader]" = ContextVar("user_profile_loader")
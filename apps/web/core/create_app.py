@@ -1,28 +1,33 @@
 import importlib
-import json
 import pkgutil
-import time
 from contextlib import asynccontextmanager
-from json import JSONDecodeError
 from typing import AsyncGenerator, Optional
 
 from fastapi import APIRouter, FastAPI
-from fastapi.concurrency import iterate_in_threadpool
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp
 
 from apps.base.core.depend_inject import GetBean, GetValue
+from apps.base.core.http_client import HttpClientPool
+from apps.base.core.http_log import BaseHttpLogMiddleware
+from apps.base.core.metrics import MetricsMiddleware, MetricsServer
+from apps.base.core.query_stats import QueryStatsMiddleware
+from apps.base.core.sqlalchemy.middleware import RequestSessionMiddleware
 from apps.base.core.sqlalchemy.session import close_sqlalchemy_engine, init_sqlalchemy_engine
 from apps.base.enum.error_code import ErrorCode
 from apps.base.exception.my_exception import MyException
 from apps.base.utils.response_util import ResponseUtil
+from apps.base.utils.snowflake import SnowflakeIDGenerator
 from apps.web.config.logger_config import logger
 from apps.web.config.server_config import init_container_config
 from apps.web.core.context_vars import ContextVars
+from apps.web.core.es.outbox_relay import ArticleEsOutboxRelay
 from apps.web.core.kafka.util import KafkaUtil
+from apps.web.core.websocket.profile_loader import UserProfileLoader
 from apps.web.utils.depends_util import DependsUtil
 from apps.web.utils.ws_util import manager
 
@@ -58,17 +63,29 @@ class CreateApp:
         :param app: FastAPI 应用实例
         :return: 生命周期异步生成器
         """
+        # 指标只在独立端口提供，不经过业务路由和白名单
+        metrics_server = MetricsServer.from_config(reuse_port=True)
         try:
             init_sqlalchemy_engine()
+            # 启动时申请雪花算法机器 ID 租约，请求中生成 ID 不再同步访问 Redis
+            SnowflakeIDGenerator.start()
+            if metrics_server:
+                await metrics_server.start()
             await manager.start()
             await GetBean(KafkaUtil).start_consumer()
+            await GetBean(ArticleEsOutboxRelay).start()
             yield
         finally:
             try:
+                await GetBean(ArticleEsOutboxRelay).stop()
                 await GetBean(KafkaUtil).stop()
                 await manager.stop()
+                await GetBean(HttpClientPool).close()
+                if metrics_server:
+                    await metrics_server.stop()
             finally:
                 await close_sqlalchemy_engine()
+                SnowflakeIDGenerator.close()
 
     def _register_router(self, router_name: str = "router", prefix: str = GetValue("app.context-path")):
         """
@@ -131,68 +148,20 @@ class CreateApp:
         添加中间件
         :return:
         """
+        self.app.add_middleware(RequestSessionMiddleware)  # type: ignore
+        self.app.add_middleware(QueryStatsMiddleware)  # type: ignore
         self.app.add_middleware(HttpLogMiddleware)  # type: ignore
+        self.app.add_middleware(MetricsMiddleware, app_name="web")  # type: ignore
         self.app.add_middleware(WhiteListMiddleware)  # type: ignore
 
 
-class HttpLogMiddleware(BaseHTTPMiddleware):
+class HttpLogMiddleware(BaseHttpLogMiddleware):
     """
     记录请求日志
     """
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        start_time = time.time()
-        self.add_context_vars(request)
-        request_body = await self.set_request_body(request)
-
-        response = await call_next(request)
-
-        if getattr(request.state, "log_request", None) is False:
-            request_data = "-"
-        else:
-            try:
-                request_data = json.dumps(json.loads(request_body), ensure_ascii=False)
-            except JSONDecodeError, UnicodeDecodeError:
-                request_data = await request.form()
-                if not request_data:
-                    request_data = "-"
-
-        response_body = await self.set_response_body(response)
-        if getattr(request.state, "log_response", None) is False:
-            response_data = "-"
-        else:
-            try:
-                response_data = json.dumps(json.loads(response_body), ensure_ascii=False)
-            except JSONDecodeError, UnicodeDecodeError:
-                response_data = response_body or "-"
-        request_data = request_data[:500]
-        response_data = response_data[:500]
-        process_time = time.time() - start_time
-        logger.info(
-            f"[{request.client.host}|{response.status_code}|{request.method}|{request.scope['path']}|"
-            f"{request_data}|{response_data}|耗时:{process_time}]"
-        )
-        return response
-
-    async def set_request_body(self, request: Request):
-        """
-        将请求数据变成可多次读取
-        """
-        # 只调用body()不调用stream()即可多次读取
-        # 调用form()之前也需要调用body()，这样才会缓存body数据值_body属性，这里预先调用body()
-        request_body = await request.body()
-        return request_body
-
-    async def set_response_body(self, response: Response):
-        """将响应数据变成可多次读取"""
-        response_body = b""
-        if hasattr(response, "body_iterator"):
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            response.body_iterator = iterate_in_threadpool([response_body])
-        else:
-            response_body = response.body
-        return response_body
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app, logger)
 
     def add_context_vars(self, request: Request):
         """
@@ -202,6 +171,14 @@ class HttpLogMiddleware(BaseHTTPMiddleware):
         """
         ContextVars.token_user_id.set(DependsUtil.get_user_id_from_request(request))
         ContextVars.request.set(request)
+        ContextVars.user_profile_loader.set(UserProfileLoader(manager.store))
+
+    def after_request(self) -> None:
+        """
+        输出请求级统计
+        :return:
+        """
+        ContextVars.user_profile_loader.get().log_stats()
 
 
 class WhiteListMiddleware(BaseHTTPMiddleware):
@@ -214,10 +191,11 @@ class WhiteListMiddleware(BaseHTTPMiddleware):
 
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         whitelist: list[str] = GetValue("app.whitelist") + self.base_whitelist
-        if not await self.is_in_whitelist(request, whitelist):
-            try:
-                DependsUtil.get_user_id_from_request(request, nullable=False)
-            except MyException as e:
+        try:
+            # 每个请求只在这里校验一次 token，后续中间件和接口从上下文读取声明
+            await DependsUtil.verify_request_token(request)
+        except MyException as e:
+            if not await self.is_in_whitelist(request, whitelist):
                 return ResponseUtil.fail_cmd(e.code, e.message)
         return await call_next(request)
 
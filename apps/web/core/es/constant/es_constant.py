@@ -9,8 +9,10 @@ from apps.web.vo.search_vo import ArticleRecommendVO, ArticleSearchVO, OrderType
 class ESConstant(BaseESConstant):
     """Web 搜索 Elasticsearch 常量与 DSL。"""
 
+    SHARD_DOC_MAX = 2**63 - 1
+
     @classmethod
-    def get_article_search_dsl(cls, article_search_vo: ArticleSearchVO):
+    def get_article_search_dsl(cls, article_search_vo: ArticleSearchVO, search_after: list | None = None):
         dsl = {
             "query": {
                 "bool": {
@@ -40,6 +42,12 @@ class ESConstant(BaseESConstant):
             ]
         else:
             dsl["sort"] = [{"_score": {"order": "desc"}}, {"id": {"order": "desc"}}]
+        if search_after is not None:
+            # point-in-time 查询会追加 _shard_doc 决胜字段；业务排序已以唯一 id 结尾，
+            # 决胜值取最大值即可跳过上一页最后一条，且不依赖上一页所在的 point-in-time
+            del dsl["from"]
+            dsl["sort"].append({"_shard_doc": "asc"})
+            dsl["search_after"] = [*search_after, cls.SHARD_DOC_MAX]
         return dsl
 
     @classmethod
@@ -0,0 +1,302 @@
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.depend_inject import Autowired, Component, logger
+from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.core.sqlalchemy.session import pin_primary
+from apps.base.enum.es_outbox import EsOutboxStatusEnum
+from apps.base.models.article import Article
+from apps.base.models.es_outbox import EsOutbox
+from apps.base.utils.html_util import HtmlUtil
+from apps.web.core.es.constant.es_constant import ESConstant
+from apps.web.core.es.utils.es_util import ESUtil
+from apps.web.dao.article_dao import ArticleDao
+from apps.web.utils.redis_util import WebRedisUtil
+
+
+@Component()
+class ArticleEsOutboxRelay:
+    """
+    文章 ES 同步发件箱中继。
+
+    文章变更时在同一事务中写入发件箱并递增文章的 es_version，中继任务用 SELECT ... FOR UPDATE SKIP LOCKED
+    分批领取并加租约，同一文章的多条变更合并为一次按数据库最新状态的写入。es_version 在文章行锁内递增，
+    按提交顺序单调增加，并与文章状态在同一次查询中读出，作为 external_gte 版本号写入 ES，
+    并发中继时旧状态不会覆盖新状态。失败按指数退避重试，超过次数后转为死信。
+    索引重建期间同时写入重建中的新索引。ES 文档的所有写入都必须经过发件箱，partial update 会递增 ES 内部版本号，
+    使其超过 es_version；写入被拒绝时重新读取两边的版本号，ES 版本号领先时对齐后重试，不直接丢弃。
+    """
+
+    es_util: ESUtil = Autowired()
+    article_dao: ArticleDao = Autowired()
+    redis_util: WebRedisUtil = Autowired()
+
+    BATCH_SIZE = 200
+    POLL_INTERVAL = 1.0
+    LEASE_SECONDS = 60
+    MAX_ATTEMPTS = 10
+    MAX_BACKOFF_SECONDS = 300
+
+    def __init__(self) -> None:
+        """
+        初始化发件箱中继。
+
+        :return: None
+        """
+        self._task: asyncio.Task[None] | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    @staticmethod
+    async def enqueue(session: AsyncSession, article_id: int) -> None:
+        """
+        在当前事务中递增文章 ES 版本号并登记文章同步，需要在文章变更的同一事务内调用。
+
+        :param session: 当前事务会话
+        :param article_id: 文章 ID
+        :return: None
+        """
+        await session.execute(
+            update(Article)
+            .where(Article.id == article_id)
+            .values(es_version=Article.es_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        session.add(EsOutbox(index_name=ESConstant.ARTICLE_INDEX, doc_id=article_id))
+
+    def notify(self) -> None:
+        """
+        唤醒本进程的中继任务，事务提交后调用以减少同步延迟。
+
+        :return: None
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """
+        启动中继后台任务。
+
+        :return: None
+        """
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="article-es-outbox-relay")
+
+    async def stop(self) -> None:
+        """
+        停止中继后台任务，已领取未完成的记录在租约到期后由其他进程重新领取。
+
+        :return: None
+        """
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self) -> None:
+        """
+        循环领取并同步发件箱记录。
+
+        :return: None
+        """
+        while True:
+            try:
+                relayed = await self.relay_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"文章 ES 发件箱中继异常 {e}")
+                relayed = 0
+            if relayed >= self.BATCH_SIZE:
+                continue
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.POLL_INTERVAL)
+            self._wakeup.clear()
+
+    async def relay_once(self) -> int:
+        """
+        领取一批发件箱记录并同步到 ES。
+
+        :return: 本批领取的记录数
+        """
+        claimed = await self._claim()
+        if not claimed:
+            return 0
+        groups: dict[int, list[Any]] = {}
+        for row in claimed:
+            groups.setdefault(row.doc_id, []).append(row)
+        errors = await self._bulk_sync(groups)
+
+        now = datetime.now()
+        done_ids = [row.id for doc_id, rows in groups.items() if doc_id not in errors for row in rows]
+        async with db.atomic() as session:
+            if done_ids:
+                await session.execute(delete(EsOutbox).where(EsOutbox.id.in_(done_ids)))
+            for doc_id, error in errors.items():
+                rows = groups[doc_id]
+                attempts = max(row.attempts for row in rows) + 1
+                backoff = min(2**attempts, self.MAX_BACKOFF_SECONDS)
+                status = EsOutboxStatusEnum.DEAD if attempts >= self.MAX_ATTEMPTS else EsOutboxStatusEnum.PENDING
+                await session.execute(
+                    update(EsOutbox)
+                    .where(EsOutbox.id.in_([row.id for row in rows]))
+                    .values(
+                        attempts=attempts,
+                        status=status.value,
+                        next_retry_time=now + timedelta(seconds=backoff),
+                        last_error=error[:500],
+                    )
+                )
+                if status == EsOutboxStatusEnum.DEAD:
+                    logger.error(f"文章[{doc_id}]同步 ES 失败 {attempts} 次，已转入死信: {error}")
+        return len(claimed)
+
+    async def _claim(self) -> list[Any]:
+        """
+        领取到期的待同步记录并设置租约，其他进程会跳过已锁定的记录。
+
+        :return: 发件箱记录 (id, doc_id, attempts) 列表
+        """
+        now = datetime.now()
+        async with db.atomic() as session:
+            rows = (
+                await session.execute(
+                    select(EsOutbox.id, EsOutbox.doc_id, EsOutbox.attempts)
+                    .where(
+                        EsOutbox.status == EsOutboxStatusEnum.PENDING.value,
+                        EsOutbox.index_name == ESConstant.ARTICLE_INDEX,
+                        EsOutbox.next_retry_time <= now,
+                    )
+                    .order_by(EsOutbox.id)
+                    .limit(self.BATCH_SIZE)
+                    .with_for_update(skip_locked=True)
+                )
+            ).all()
+            if rows:
+                await session.execute(
+                    update(EsOutbox)
+                    .where(EsOutbox.id.in_([row.id for row in rows]))
+                    .values(next_retry_time=now + timedelta(seconds=self.LEASE_SECONDS))
+                )
+        return list(rows)
+
+    async def _bulk_sync(self, groups: dict[int, list[Any]]) -> dict[int, str]:
+        """
+        按文章当前状态生成 bulk 请求并写入 ES。
+
+        :param groups: 文章 ID 到其发件箱记录的映射
+        :return: 同步失败的文章 ID 到失败原因的映射
+        """
+        doc_ids = list(groups)
+        try:
+            # 同步需要文章最新状态，不读可能延迟的只读副本；版本号与文章状态在同一次查询中读出
+            with pin_primary():
+                articles = await db.model_all(select(Article).where(Article.id.in_(doc_ids)))
+                records = await self.article_dao.get_article_detail_by_ids(articles=articles)
+        except Exception as e:
+            return {doc_id: f"读取文章失败: {e}" for doc_id in doc_ids}
+        versions = {article.id: article.es_version for article in articles}
+        documents = {record.id: record.model_dump() for record in records}
+        actions = []
+        for doc_id in groups:
+            action: dict[str, Any] = {"_index": ESConstant.ARTICLE_INDEX, "_id": doc_id}
+            document = documents.get(doc_id)
+            if document is None:
+                # 文章已物理删除，不会再有新状态，直接删除文档
+                action["_op_type"] = "delete"
+            else:
+                action["version"] = versions[doc_id]
+                action["version_type"] = "external_gte"
+                document["hot_score"] = float(document.get("hot_score") or 0)
+                document["content"] = HtmlUtil.remove_html_tags(document.get("content"))
+                action["_op_type"] = "index"
+                action["_source"] = document
+            actions.append(action)
+        try:
+            # 索引重建期间同时写入新索引，版本号相同，重建的批量写入不会覆盖
+            dual_index = await self.redis_util.redis.get(RedisConstant.ARTICLE_REINDEX_DUAL_WRITE_KEY)
+        except Exception as e:
+            return {doc_id: f"读取索引重建状态失败: {e}" for doc_id in doc_ids}
+        if dual_index:
+            actions.extend([{**action, "_index": dual_index} for action in actions])
+        try:
+            _, items = await self.es_util.helpers.async_bulk(
+                self.es_util.client, actions, raise_on_error=False, raise_on_exception=False
+            )
+        except Exception as e:
+            return {doc_id: f"ES 写入失败: {e}" for doc_id in doc_ids}
+        errors = {}
+        conflicts = set()
+        for item in items:
+            op_type, result = next(iter(item.items()))
+            status = result.get("status")
+            # 404: 删除的文档本就不存在；重建中新索引的 409: 双写已写入更新版本
+            if (op_type == "delete" and status == 404) or (status == 409 and result.get("_index") == dual_index):
+                continue
+            if status == 409:
+                conflicts.add(int(result["_id"]))
+                continue
+            error = str(result.get("error") or result.get("exception") or status)
+            if result.get("_id") is None:
+                # 整个分块请求失败时没有文档 ID
+                return {doc_id: error for doc_id in doc_ids}
+            errors[int(result["_id"])] = error
+        if conflicts:
+            errors.update(await self._resolve_conflicts({doc_id: versions[doc_id] for doc_id in conflicts}))
+        return errors
+
+    async def _resolve_conflicts(self, versions: dict[int, int]) -> dict[int, str]:
+        """
+        处理版本冲突：重新读取 ES 文档和文章的当前版本号，数据库已有更新版本时由后续记录同步；
+        ES 版本号领先于数据库时（如曾被 partial update 递增）把 es_version 对齐到 ES 版本号后重试。
+
+        :param versions: 冲突文章 ID 到本次写入版本号的映射
+        :return: 需要重试的文章 ID 到原因的映射
+        """
+        doc_ids = list(versions)
+        try:
+            documents = await self.es_util.client.mget(
+                index=ESConstant.ARTICLE_INDEX, ids=[str(doc_id) for doc_id in doc_ids], source=False
+            )
+            es_versions = {int(doc["_id"]): doc["_version"] for doc in documents["docs"] if doc.get("found")}
+            with pin_primary():
+                rows = await db.all(select(Article.id, Article.es_version).where(Article.id.in_(doc_ids)))
+        except Exception as e:
+            return {doc_id: f"读取冲突版本号失败: {e}" for doc_id in doc_ids}
+        current_versions = dict(rows)
+        errors = {}
+        aligned = {}
+        for doc_id, version in versions.items():
+            current_version = current_versions.get(doc_id)
+            es_version = es_versions.get(doc_id)
+            if current_version is not None and current_version > version:
+                # 文章已有更新的变更，由对应的发件箱记录同步
+                continue
+            if current_version is not None and es_version is not None and es_version > current_version:
+                aligned[doc_id] = es_version
+                errors[doc_id] = f"ES 版本号 {es_version} 领先于 es_version {current_version}，已对齐后重试"
+            else:
+                errors[doc_id] = f"版本冲突，ES 版本号 {es_version}，es_version {current_version}"
+        if aligned:
+            try:
+                async with db.atomic() as session:
+                    for doc_id, es_version in aligned.items():
+                        await session.execute(
+                            update(Article)
+                            .where(Article.id == doc_id, Article.es_version < es_version)
+                            .values(es_version=es_version)
+                            .execution_options(synchronize_session=False)
+                        )
+            except Exception as e:
+                return {doc_id: f"对齐 es_version 失败: {e}" for doc_id in doc_ids}
+            logger.warning(f"文章 ES 版本号领先于 es_version，已对齐: {aligned}")
+        return errors
@@ -10,3 +10,14 @@ class KafkaConfig:
     SEND_SMS_GROUP = "send_sms_group"
     SEND_NOTICE_TOPIC = "send_notice"
     SEND_NOTICE_GROUP = "send_notice_group"
+    # 消费者批量拉取和并发控制的默认值，可通过配置 kafka.consumer 覆盖
+    CONSUMER_MAX_RECORDS = 200
+    CONSUMER_TIMEOUT_MS = 1000
+    CONSUMER_CONCURRENCY = 20
+    CONSUMER_RETRY_BACKOFF_MS = 1000
+    # 同一条消息处理失败达到次数后投递到 topic 加后缀的死信 topic，并提交越过该消息
+    CONSUMER_MAX_ATTEMPTS = 5
+    DEAD_LETTER_TOPIC_SUFFIX = "_dlq"
+    # 通知批量写入
+    NOTICE_BATCH_MAX_ROWS = 500
+    NOTICE_BATCH_MAX_DELAY_MS = 50
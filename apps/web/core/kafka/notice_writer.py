@@ -0,0 +1,162 @@
+import asyncio
+from typing import Any
+
+from apps.base.core.depend_inject import logger
+from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.models.notice import Notice
+from apps.web.core.kafka.config import KafkaConfig
+from apps.web.dto.chat_dto import WSMessageDTO
+from apps.web.dto.notice_dto import NoticeSaveDTO
+from apps.web.dto.user_dto import UserBaseInfoDTO
+
+
+class NoticeBatchWriter:
+    """
+    通知批量写入器。
+
+    缓冲通知消息，达到 max_rows 条或等待 max_delay_ms 毫秒后用一条多行 INSERT 写入，
+    写入失败时异常传递给等待的 Future，由 Kafka 消费者重新投递；写入成功后逐条推送，
+    发起人资料按批次一次性查询，不同接收用户并发推送，同一用户按写入顺序推送。
+    """
+
+    def __init__(
+        self,
+        max_rows: int = KafkaConfig.NOTICE_BATCH_MAX_ROWS,
+        max_delay_ms: int = KafkaConfig.NOTICE_BATCH_MAX_DELAY_MS,
+    ) -> None:
+        """
+        初始化通知批量写入器。
+
+        :param max_rows: 单批最大行数
+        :param max_delay_ms: 单批最长等待毫秒数
+        :return: None
+        """
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._buffer: list[tuple[dict[str, Any], asyncio.Future[None]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def add(self, message: dict[str, Any]) -> asyncio.Future[None]:
+        """
+        添加一条通知。
+
+        :param message: 通知消息字典
+        :return: 所在批次写入完成时结束的 Future
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((message, future))
+        if len(self._buffer) >= self.max_rows:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+        return future
+
+    def _schedule_flush(self) -> None:
+        """
+        创建后台写入任务。
+
+        :return: None
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task[None]) -> None:
+        """
+        后台写入任务结束回调，写入异常已传递给各条通知的 Future，这里只取出异常避免重复告警。
+
+        :param task: 后台写入任务
+        :return: None
+        """
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def flush(self) -> None:
+        """
+        写入当前缓冲的全部通知并推送。
+
+        :return: None
+        :raises Exception: 写入失败时抛出
+        """
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            items, self._buffer = self._buffer, []
+            if not items:
+                return
+            try:
+                await db.bulk_create(Notice, [self._to_row(message) for message, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            for _, future in items:
+                if not future.done():
+                    future.set_result(None)
+        try:
+            await self._push([message for message, _ in items])
+        except Exception as e:
+            logger.exception(f"通知推送失败 {e}")
+
+    async def close(self) -> None:
+        """
+        刷出剩余通知并等待后台写入任务结束，写入失败的通知对应的 offset 未提交，重启后会重新消费。
+
+        :return: None
+        """
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.exception(f"关闭时写入通知失败 {e}")
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @staticmethod
+    def _to_row(message: dict[str, Any]) -> dict[str, Any]:
+        """
+        将通知消息转换为数据库行，去掉仅用于推送的冗余字段。
+
+        :param message: 通知消息字典
+        :return: 数据库行
+        """
+        row = dict(message)
+        row["detail"] = {key: value for key, value in (row.get("detail") or {}).items() if key != "from_user"}
+        return row
+
+    async def _push(self, messages: list[dict[str, Any]]) -> None:
+        """
+        推送本批次全部通知，按接收用户分组，不同用户并发推送，同一用户按写入顺序推送。
+
+        :param messages: 已写入的通知消息列表
+        :return: None
+        """
+        from apps.web.utils.ws_util import manager
+
+        user_notices: dict[int, list[NoticeSaveDTO]] = {}
+        for message in messages:
+            dto = NoticeSaveDTO.model_validate(message)
+            user_notices.setdefault(dto.user_id, []).append(dto)
+        # 系统通知没有发起人，展示接收人自己
+        from_users = await manager.get_user_infos(
+            list({dto.detail.from_user_id or dto.user_id for dtos in user_notices.values() for dto in dtos}),
+            UserBaseInfoDTO,
+        )
+
+        async def push_user(dtos: list[NoticeSaveDTO]) -> None:
+            for dto in dtos:
+                dto.detail.from_user = from_users.get(dto.detail.from_user_id or dto.user_id)
+                await manager.send_message(WSMessageDTO[NoticeSaveDTO](message=dto))
+
+        results = await asyncio.gather(*(push_user(dtos) for dtos in user_notices.values()), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"通知推送失败 {result}")
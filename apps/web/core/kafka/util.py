@@ -3,26 +3,29 @@
 # @File    : util.py
 import asyncio
 import json
+from contextlib import suppress
 from typing import Any, Coroutine
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, ConsumerRecord, TopicPartition
+from aiokafka.errors import IllegalStateError, KafkaError
 from dependency_injector.providers import Callable
 from kafka import KafkaAdminClient
 from kafka.admin import NewTopic
 from kafka.errors import TopicAlreadyExistsError
 
 from apps.base.core.depend_inject import Autowired, Component, Value, logger
-from apps.base.core.sqlalchemy.db_helper import db
-from apps.base.models.notice import Notice
+from apps.base.core.metrics import KAFKA_CONSUMER_LAG
 from apps.base.utils.email_util import EmailUtil
 from apps.base.utils.sms_util import SmsUtil
 from apps.web.core.kafka.config import KafkaConfig
+from apps.web.core.kafka.notice_writer import NoticeBatchWriter
 from apps.web.dto.notice_dto import NoticeSaveDTO
 
 
 @Component()
 class KafkaUtil:
     bootstrap_servers: str = Value("kafka.bootstrap_servers")
+    consumer_config: dict[str, int] | None = Value("kafka.consumer")
     email_util: EmailUtil = Autowired()
     sms_util: SmsUtil = Autowired()
 
@@ -38,6 +41,16 @@ class KafkaUtil:
         self.producer: AIOKafkaProducer | None = None
         self._consumer_dict: dict[str, AIOKafkaConsumer] = {}
         self._consumer_task_list: list[asyncio.Task] = []
+        consumer_config = self.consumer_config or {}
+        self.max_records = int(consumer_config.get("max_records") or KafkaConfig.CONSUMER_MAX_RECORDS)
+        self.timeout_ms = int(consumer_config.get("timeout_ms") or KafkaConfig.CONSUMER_TIMEOUT_MS)
+        self.concurrency = int(consumer_config.get("concurrency") or KafkaConfig.CONSUMER_CONCURRENCY)
+        self.retry_backoff = (
+            int(consumer_config.get("retry_backoff_ms") or KafkaConfig.CONSUMER_RETRY_BACKOFF_MS) / 1000
+        )
+        self.max_attempts = int(consumer_config.get("max_attempts") or KafkaConfig.CONSUMER_MAX_ATTEMPTS)
+        # (topic, 分区, offset) 到已失败次数的映射，成功或转入死信后移除
+        self._attempts: dict[tuple[str, int, int], int] = {}
 
     def __del__(self) -> None:
         """
@@ -50,16 +63,12 @@ class KafkaUtil:
             client.close()
 
     def _create_topics(self):
-        try:
-            self.client.create_topics(
-                [
-                    NewTopic(KafkaConfig.SEND_MAIL_TOPIC, num_partitions=1, replication_factor=1),
-                    NewTopic(KafkaConfig.SEND_SMS_TOPIC, num_partitions=1, replication_factor=1),
-                    NewTopic(KafkaConfig.SEND_NOTICE_TOPIC, num_partitions=1, replication_factor=1),
-                ]
-            )
-        except TopicAlreadyExistsError:
-            pass
+        topics = [KafkaConfig.SEND_MAIL_TOPIC, KafkaConfig.SEND_SMS_TOPIC, KafkaConfig.SEND_NOTICE_TOPIC]
+        for topic in topics + [f"{topic}{KafkaConfig.DEAD_LETTER_TOPIC_SUFFIX}" for topic in topics]:
+            try:
+                self.client.create_topics([NewTopic(topic, num_partitions=1, replication_factor=1)])
+            except TopicAlreadyExistsError:
+                pass
 
     async def _init_consumer(self, key: str, topic: str, group_id: str) -> AIOKafkaConsumer:
         """
@@ -74,7 +83,7 @@ class KafkaUtil:
             topic,
             bootstrap_servers=self.bootstrap_servers,
             auto_offset_reset="earliest",
-            enable_auto_commit=True,
+            enable_auto_commit=False,
             group_id=group_id,
             value_deserializer=lambda x: json.loads(x.decode("utf-8")),
         )
@@ -103,28 +112,158 @@ class KafkaUtil:
             self.producer_started = True
         await self.producer.send(topic, message)
 
-    async def _consume_messages(self, topic: str, group_id: str, callback: Callable[Coroutine]) -> None:
+    async def _consume_messages(
+        self, topic: str, group_id: str, callback: Callable[Coroutine], batch_callback: bool = False
+    ) -> None:
         """
-        持续消费指定 topic 的消息。
+        持续批量消费指定 topic 的消息。
+
+        每批消息在信号量限制的并发下处理，处理完成后每个分区只提交到第一条失败消息之前的 offset，
+        并把消费位置回退到失败消息，退避后重新拉取处理，保证至少一次投递；
+        同一条消息失败达到 max_attempts 次后转入死信 topic 并提交越过该消息，避免毒消息阻塞分区；
+        拉取或提交时出现 Kafka 异常（如再均衡导致提交失败）只记录日志并退避，消费循环不退出。
 
         :param topic: Kafka topic
         :param group_id: Kafka 消费组
         :param callback: 消息处理回调函数
+        :param batch_callback: 回调是否一次接收整批消息
         :return: None
         """
         key = f"{topic}:{group_id}"
         consumer = self._consumer_dict.get(key)
         if not consumer:
             consumer = await self._init_consumer(key, topic, group_id)
+        semaphore = asyncio.Semaphore(self.concurrency)
         try:
-            async for message in consumer:
-                logger.info(f"======consume_messages: {message.value}======")
-                asyncio.create_task(callback(message.value))
+            while True:
+                backoff = False
+                try:
+                    batches = await consumer.getmany(timeout_ms=self.timeout_ms, max_records=self.max_records)
+                    if not batches:
+                        continue
+                    logger.info(f"======consume_messages: topic={topic} count={sum(map(len, batches.values()))}======")
+                    offsets, failed = await self._process_batches(semaphore, callback, batches, batch_callback)
+                    for partition, offset in failed.items():
+                        # 分区已在再均衡中被回收时由新的消费者从已提交 offset 继续消费
+                        with suppress(IllegalStateError):
+                            consumer.seek(partition, offset)
+                    await consumer.commit(offsets)
+                    self._report_lag(consumer, group_id, offsets)
+                    backoff = bool(failed)
+                except KafkaError as e:
+                    logger.exception(f"Kafka 消费异常: topic={topic} {e}")
+                    backoff = True
+                if backoff:
+                    await asyncio.sleep(self.retry_backoff)
         finally:
             consumer = self._consumer_dict.pop(key, None)
             if consumer:
                 await consumer.stop()
 
+    async def _process_batches(
+        self,
+        semaphore: asyncio.Semaphore,
+        callback: Callable[Coroutine],
+        batches: dict[TopicPartition, list[ConsumerRecord]],
+        batch_callback: bool,
+    ) -> tuple[dict[TopicPartition, int], dict[TopicPartition, int]]:
+        """
+        处理一批消息，计算每个分区可以提交的 offset。
+
+        :param semaphore: 并发信号量
+        :param callback: 消息处理回调函数
+        :param batches: 分区到消息列表的映射
+        :param batch_callback: 回调是否一次接收整批消息
+        :return: 分区到待提交 offset 的映射，以及分区到第一条失败消息 offset 的映射
+        """
+        if batch_callback:
+            values = [record.value for records in batches.values() for record in records]
+            succeeded = await self._process_message(semaphore, callback, values)
+            results = {partition: [succeeded] * len(records) for partition, records in batches.items()}
+        else:
+            partition_results = await asyncio.gather(
+                *(
+                    asyncio.gather(*(self._process_message(semaphore, callback, record.value) for record in records))
+                    for records in batches.values()
+                )
+            )
+            results = dict(zip(batches, partition_results))
+        offsets: dict[TopicPartition, int] = {}
+        failed: dict[TopicPartition, int] = {}
+        for partition, records in batches.items():
+            offsets[partition] = records[-1].offset + 1
+            for record, succeeded in zip(records, results[partition]):
+                key = (partition.topic, partition.partition, record.offset)
+                if succeeded:
+                    self._attempts.pop(key, None)
+                    continue
+                # 同分区前面有待重试的消息时本条也会重新消费，只累计失败次数
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts < self.max_attempts or partition in failed:
+                    self._attempts[key] = attempts
+                    if partition not in failed:
+                        offsets[partition] = failed[partition] = record.offset
+                    continue
+                self._attempts.pop(key, None)
+                await self._dead_letter(partition, record, attempts)
+        return offsets, failed
+
+    async def _dead_letter(self, partition: TopicPartition, record: ConsumerRecord, attempts: int) -> None:
+        """
+        将多次处理失败的消息投递到死信 topic，投递失败时记录日志后跳过，调用方提交越过该消息。
+
+        :param partition: 消息所在分区
+        :param record: 处理失败的消息
+        :param attempts: 已失败次数
+        :return: None
+        """
+        location = f"topic={partition.topic} partition={partition.partition} offset={record.offset}"
+        logger.error(f"Kafka 消息处理失败 {attempts} 次，转入死信: {location}")
+        message = {
+            "topic": partition.topic,
+            "partition": partition.partition,
+            "offset": record.offset,
+            "attempts": attempts,
+            "value": record.value,
+        }
+        try:
+            await self.send_message(f"{partition.topic}{KafkaConfig.DEAD_LETTER_TOPIC_SUFFIX}", message)
+        except Exception as e:
+            logger.exception(f"Kafka 死信投递失败，跳过消息: {location} {record.value} {e}")
+
+    @staticmethod
+    def _report_lag(consumer: AIOKafkaConsumer, group_id: str, offsets: dict[Any, int]) -> None:
+        """
+        按最近一次拉取得到的高水位上报各分区消费延迟。
+
+        :param consumer: Kafka 消费者
+        :param group_id: Kafka 消费组
+        :param offsets: 分区到已提交 offset 的映射
+        :return: None
+        """
+        for partition, offset in offsets.items():
+            highwater = consumer.highwater(partition)
+            if highwater is not None:
+                lag = max(highwater - offset, 0)
+                KAFKA_CONSUMER_LAG.labels(partition.topic, partition.partition, group_id).set(lag)
+
+    async def _process_message(self, semaphore: asyncio.Semaphore, callback: Callable[Coroutine], value: Any) -> bool:
+        """
+        在并发限制内处理单条消息，处理失败记录日志，由调用方决定不提交并重新消费。
+
+        :param semaphore: 并发信号量
+        :param callback: 消息处理回调函数
+        :param value: 消息内容
+        :return: 是否处理成功
+        """
+        async with semaphore:
+            try:
+                await callback(value)
+            except Exception as e:
+                logger.exception(f"Kafka 消息处理失败: {value} {e}")
+                return False
+        return True
+
     async def start_consumer(self) -> None:
         """
         启动 Kafka 消费者任务。
@@ -164,7 +303,10 @@ class KafkaUtil:
                 ),
                 loop.create_task(
                     self._consume_messages(
-                        KafkaConfig.SEND_NOTICE_TOPIC, KafkaConfig.SEND_NOTICE_GROUP, AsyncTask.send_notice
+                        KafkaConfig.SEND_NOTICE_TOPIC,
+                        KafkaConfig.SEND_NOTICE_GROUP,
+                        AsyncTask.send_notice,
+                        batch_callback=True,
                     )
                 ),
             ]
@@ -181,6 +323,7 @@ class KafkaUtil:
         if self._consumer_task_list:
             await asyncio.gather(*self._consumer_task_list, return_exceptions=True)
             self._consumer_task_list.clear()
+        await AsyncTask.notice_writer.close()
         for consumer in list(self._consumer_dict.values()):
             await consumer.stop()
         self._consumer_dict.clear()
@@ -201,7 +344,14 @@ class KafkaUtil:
 
 
 class AsyncTask:
+    notice_writer = NoticeBatchWriter()
 
     @classmethod
-    async def send_notice(cls, message: dict[str, Any]):
-        await db.create(Notice(**message), return_value=False)
+    async def send_notice(cls, messages: list[dict[str, Any]]):
+        """
+        批量保存并推送通知。
+
+        :param messages: 通知消息列表
+        :return: None
+        """
+        await asyncio.gather(*(cls.notice_writer.add(message) for message in messages))
@@ -4,7 +4,13 @@ from pydantic import BaseModel, Field
 
 
 class WebSocketEnvelope(BaseModel):
-    """跨 worker 投递的 WebSocket 消息信封。"""
+    """跨 worker 投递的 WebSocket 消息信封。
+
+    variant_user_ids 中的用户收到 variant_payload，其余用户收到 payload，
+    用于只有少量字段因人而异的多人消息，一个信封即可投递给多个用户。
+    """
 
     payload: dict[str, Any]
     target_user_ids: list[int] | None = Field(default=None)
+    variant_payload: dict[str, Any] | None = Field(default=None)
+    variant_user_ids: list[int] | None = Field(default=None)
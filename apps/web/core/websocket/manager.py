@@ -10,6 +10,7 @@ from pydantic import ValidationError
 from starlette.websockets import WebSocket, WebSocketState
 
 from apps.base.core.depend_inject import GetBean
+from apps.base.core.metrics import WEBSOCKET_CONNECTIONS
 from apps.base.enum.chat import ContactTypeEnum
 from apps.web.core.websocket.data import WebSocketEnvelope
 from apps.web.core.websocket.message_handler import (
@@ -20,6 +21,7 @@ from apps.web.core.websocket.message_handler import (
     NoticeHandler,
     SystemMessageHandler,
 )
+from apps.web.core.websocket.profile_loader import UserProfileLoader
 from apps.web.core.websocket.redis_store import WebSocketRedisStore
 from apps.web.dto.base_dto import BaseDTO
 from apps.web.dto.chat_dto import ConversationDTO, GroupInfoDTO, WSMessageDTO
@@ -61,6 +63,7 @@ class WebSocketManager:
         self._subscriber_task: asyncio.Task[None] | None = None
         self._heartbeat_task: asyncio.Task[None] | None = None
         self._pubsub: Any | None = None
+        self.worker_id = uuid4().hex
 
     async def connect(self, websocket: WebSocket) -> None:
         """
@@ -73,10 +76,11 @@ class WebSocketManager:
         user_id = websocket.scope.get("user_id")
         if not isinstance(user_id, int):
             raise ValueError("WebSocket 连接缺少用户 ID")
-        connection_id = uuid4().hex
+        connection_id = self.store.build_connection_id(self.worker_id)
         websocket.scope["connection_id"] = connection_id
         async with self._lock:
             self._connections.setdefault(user_id, set()).add(websocket)
+            self._update_connection_gauge()
         try:
             await self.store.add_connection(user_id, connection_id)
         except Exception:
@@ -86,6 +90,7 @@ class WebSocketManager:
                     connections.discard(websocket)
                     if not connections:
                         self._connections.pop(user_id, None)
+                self._update_connection_gauge()
             if websocket.client_state == WebSocketState.CONNECTED:
                 with suppress(RuntimeError):
                     await websocket.close()
@@ -107,6 +112,7 @@ class WebSocketManager:
                     connections.discard(websocket)
                     if not connections:
                         self._connections.pop(user_id, None)
+                self._update_connection_gauge()
             if isinstance(connection_id, str):
                 try:
                     await self.store.remove_connection(user_id, connection_id)
@@ -116,6 +122,14 @@ class WebSocketManager:
             with suppress(RuntimeError):
                 await websocket.close()
 
+    def _update_connection_gauge(self) -> None:
+        """
+        更新本 worker 的 WebSocket 连接数指标，调用方需持有连接锁。
+
+        :return: None
+        """
+        WEBSOCKET_CONNECTIONS.set(sum(len(values) for values in self._connections.values()))
+
     async def handle_envelope(self, envelope: WebSocketEnvelope) -> None:
         """
         将 Redis 消息投递到本 worker 的匹配连接。
@@ -123,18 +137,24 @@ class WebSocketManager:
         :param envelope: 跨 worker 消息信封
         :return: None
         """
+        variant_user_ids = set(envelope.variant_user_ids or ())
         async with self._lock:
             if envelope.target_user_ids is None:
-                connections = [websocket for values in self._connections.values() for websocket in values]
+                connections = [
+                    (user_id, websocket) for user_id, values in self._connections.items() for websocket in values
+                ]
             else:
                 connections = [
-                    websocket
+                    (user_id, websocket)
                     for user_id in set(envelope.target_user_ids)
                     for websocket in self._connections.get(user_id, set())
                 ]
         if connections:
             await asyncio.gather(
-                *(websocket.send_json(envelope.payload) for websocket in connections),
+                *(
+                    websocket.send_json(envelope.variant_payload if user_id in variant_user_ids else envelope.payload)
+                    for user_id, websocket in connections
+                ),
                 return_exceptions=True,
             )
 
@@ -178,19 +198,45 @@ class WebSocketManager:
         self,
         message: WSMessageDTO[Any],
         target_user_ids: list[int] | None = None,
+        variant_message: WSMessageDTO[Any] | None = None,
+        variant_user_ids: list[int] | None = None,
     ) -> None:
         """
         通过 Redis 发布消息。
 
+        指定目标用户时只发布到目标用户连接所在 worker 的专属频道，未携带 worker ID 的旧连接走广播频道。
+        每个 worker 只发布一个信封，由 worker 在本地展开给各连接。
+
         :param message: WebSocket 消息
         :param target_user_ids: 目标用户 ID，None 表示广播
+        :param variant_message: 发给 variant_user_ids 中用户的消息
+        :param variant_user_ids: 接收 variant_message 的用户 ID
         :return: None
         """
-        envelope = WebSocketEnvelope(
-            payload=jsonable_encoder(message),
-            target_user_ids=target_user_ids,
+        payload = jsonable_encoder(message)
+        variant_payload = jsonable_encoder(variant_message) if variant_message is not None else None
+        variant_set = set(variant_user_ids or ()) if variant_payload is not None else set()
+
+        def build_envelope(user_ids: list[int] | None) -> WebSocketEnvelope:
+            variant_ids = [user_id for user_id in user_ids or variant_set if user_id in variant_set]
+            if not variant_ids:
+                return WebSocketEnvelope(payload=payload, target_user_ids=user_ids)
+            return WebSocketEnvelope(
+                payload=payload,
+                target_user_ids=user_ids,
+                variant_payload=variant_payload,
+                variant_user_ids=variant_ids,
+            )
+
+        if target_user_ids is None:
+            await self.store.publish(build_envelope(None))
+            return
+        workers, unresolved = await self.store.get_user_workers(target_user_ids)
+        await self.store.publish_to_workers(
+            {worker_id: build_envelope(user_ids) for worker_id, user_ids in workers.items()}
         )
-        await self.store.publish(envelope)
+        if unresolved:
+            await self.store.publish(build_envelope(unresolved))
 
     async def start(self) -> None:
         """
@@ -233,6 +279,7 @@ class WebSocketManager:
             await asyncio.gather(*remove_tasks, return_exceptions=True)
         async with self._lock:
             self._connections.clear()
+            self._update_connection_gauge()
         self._subscriber_task = None
         self._heartbeat_task = None
 
@@ -243,7 +290,7 @@ class WebSocketManager:
         :return: None
         """
         self._pubsub = self.store.get_redis().pubsub(ignore_subscribe_messages=True)
-        await self._pubsub.subscribe(self.store.CHANNEL)
+        await self._pubsub.subscribe(self.store.CHANNEL, self.store.worker_channel(self.worker_id))
 
     async def _close_pubsub(self) -> None:
         """
@@ -254,7 +301,7 @@ class WebSocketManager:
         if self._pubsub is None:
             return
         with suppress(Exception):
-            await self._pubsub.unsubscribe(self.store.CHANNEL)
+            await self._pubsub.unsubscribe(self.store.CHANNEL, self.store.worker_channel(self.worker_id))
         with suppress(Exception):
             await self._pubsub.aclose()
         self._pubsub = None
@@ -313,16 +360,20 @@ class WebSocketManager:
         :param clazz: 返回 DTO 类型
         :return: 用户资料 DTO
         """
-        profile = await self.store.get_user_profile(user_id)
-        if profile is None:
-            from apps.web.dao.user_dao import UserDao
-
-            user_dao = GetBean(UserDao)
-            user_info = await user_dao.get_user_info(user_id)
-            profile = jsonable_encoder(user_info)
-            await self.store.set_user_profile(user_id, profile)
+        profile = await UserProfileLoader.current(self.store).load(user_id)
         return clazz.model_validate(profile)
 
+    async def get_user_infos(self, user_ids: list[int], clazz: Type[T] = UserCommonInfoDTO) -> dict[int, T]:
+        """
+        批量获取 Redis 缓存的用户资料。
+
+        :param user_ids: 用户 ID 列表
+        :param clazz: 返回 DTO 类型
+        :return: 用户 ID 到用户资料 DTO 的映射
+        """
+        profiles = await UserProfileLoader.current(self.store).load_many(user_ids)
+        return {user_id: clazz.model_validate(profile) for user_id, profile in profiles.items()}
+
     async def update_user_info(self, user_id: int) -> None:
         """
         更新 Redis 用户资料缓存。
@@ -335,6 +386,7 @@ class WebSocketManager:
         user_dao = GetBean(UserDao)
         user_info = await user_dao.get_user_info(user_id)
         await self.store.set_user_profile(user_id, jsonable_encoder(user_info))
+        UserProfileLoader.current(self.store).clear(user_id)
 
     async def get_group_info(self, group_id: int, clazz: Type[T] = GroupInfoDTO) -> T | None:
         """
@@ -154,6 +154,9 @@ class ChatMessageHandler(BaseMessageHandler):
         """
         处理群聊消息，并按用户生成已读状态。
 
+        成员列表走 Redis 缓存，所有成员的会话停留状态、未读数增加和消息发布都批量执行，
+        Redis 往返次数与群成员数无关；消息每个 worker 只发布一份，已读和未读两种版本由 worker 本地分发。
+
         :param manager: WebSocket Manager
         :param message: 已保存的聊天消息
         :return: None
@@ -161,27 +164,26 @@ class ChatMessageHandler(BaseMessageHandler):
         from apps.web.dao.chat_dao import ChatDao
         from apps.web.utils.redis_util import WebRedisUtil
 
-        chat_dao = GetBean(ChatDao)
         redis_util = GetBean(WebRedisUtil)
-        member_ids = set(await chat_dao.get_group_members(message.message.contact_id))
-        member_ids.add(message.message.user_id)
-        group_profile = await manager.get_group_info(
-            message.message.contact_id,
-            GroupProfileDTO,
+        group_id = message.message.contact_id
+        sender_id = message.message.user_id
+        conversation_id = message.message.conversation_id
+        member_ids = await redis_util.Chat.get_group_members(group_id)
+        if member_ids is None:
+            member_ids = await GetBean(ChatDao).get_group_members(group_id)
+            await redis_util.Chat.refresh_group_members(group_id, member_ids)
+        recipient_ids = [member_id for member_id in dict.fromkeys(member_ids) if member_id != sender_id]
+        message.message.group_profile = await manager.get_group_info(group_id, GroupProfileDTO)
+        present_ids = await manager.store.get_conversation_presence(recipient_ids, conversation_id)
+        await redis_util.Chat.incr_conversation_unread_counts(
+            [member_id for member_id in recipient_ids if member_id not in present_ids],
+            conversation_id,
+        )
+        message.message.is_read = False
+        read_message = message.model_copy(update={"message": message.message.model_copy(update={"is_read": True})})
+        await manager.publish_message(
+            message,
+            [sender_id, *recipient_ids],
+            variant_message=read_message,
+            variant_user_ids=[sender_id, *present_ids],
         )
-        for member_id in member_ids:
-            user_message = message.model_copy(deep=True)
-            user_message.message.group_profile = group_profile
-            user_message.message.is_read = (
-                member_id == message.message.user_id
-                or await manager.store.is_in_conversation(
-                    member_id,
-                    message.message.conversation_id,
-                )
-            )
-            if not user_message.message.is_read:
-                await redis_util.Chat.incr_conversation_unread_count(
-                    member_id,
-                    message.message.conversation_id,
-                )
-            await manager.publish_message(user_message, [member_id])
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+from apps.base.core.depend_inject import GetBean
+from apps.web.core.context_vars import ContextVars
+from apps.web.core.websocket.redis_store import WebSocketRedisStore
+
+logger = logging.getLogger(__name__)
+
+
+class UserProfileLoader:
+    """
+    请求级用户资料批量加载器。
+
+    同一事件循环轮次内发起的 load 调用会合并为一次 Redis MGET 和一次数据库批量查询，
+    同一请求内重复的用户 ID 只查询一次。
+    """
+
+    def __init__(self, store: WebSocketRedisStore) -> None:
+        """
+        初始化用户资料加载器。
+
+        :param store: WebSocket Redis 状态仓库
+        :return: None
+        """
+        self.store = store
+        self._futures: dict[int, asyncio.Future[dict[str, Any] | None]] = {}
+        self._pending: list[int] = []
+        self._scheduled = False
+        self._tasks: set[asyncio.Task[None]] = set()
+        self.requested_count = 0
+        self.issued_count = 0
+        self.batch_count = 0
+
+    @classmethod
+    def current(cls, store: WebSocketRedisStore) -> "UserProfileLoader":
+        """
+        获取当前请求的加载器，不在请求上下文中时返回临时加载器。
+
+        :param store: WebSocket Redis 状态仓库
+        :return: 用户资料加载器
+        """
+        loader = ContextVars.user_profile_loader.get(None)
+        return loader if loader is not None else cls(store)
+
+    @property
+    def coalesced_count(self) -> int:
+        """
+        被合并或命中请求内缓存的查询次数。
+
+        :return: 合并次数
+        """
+        return self.requested_count - self.issued_count
+
+    async def load(self, user_id: int) -> dict[str, Any] | None:
+        """
+        加载单个用户资料。
+
+        :param user_id: 用户 ID
+        :return: 用户资料字典，用户不存在时返回 None
+        """
+        self.requested_count += 1
+        future = self._futures.get(user_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[user_id] = future
+            self._pending.append(user_id)
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._schedule_dispatch, loop)
+        return await asyncio.shield(future)
+
+    async def load_many(self, user_ids: list[int]) -> dict[int, dict[str, Any] | None]:
+        """
+        批量加载用户资料。
+
+        :param user_ids: 用户 ID 列表
+        :return: 用户 ID 到资料字典的映射
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        profiles = await asyncio.gather(*(self.load(user_id) for user_id in user_ids))
+        return dict(zip(user_ids, profiles))
+
+    def clear(self, user_id: int) -> None:
+        """
+        清除请求内已缓存的用户资料，资料更新后调用。
+
+        :param user_id: 用户 ID
+        :return: None
+        """
+        future = self._futures.get(user_id)
+        if future is not None and future.done():
+            self._futures.pop(user_id, None)
+
+    def _schedule_dispatch(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        在当前轮次的 load 调用全部登记后创建批量查询任务。
+
+        :param loop: 当前事件循环
+        :return: None
+        """
+        task = loop.create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self) -> None:
+        """
+        执行当前轮次累积的批量查询并回填结果。
+
+        :return: None
+        """
+        user_ids, self._pending, self._scheduled = self._pending, [], False
+        futures = [self._futures[user_id] for user_id in user_ids]
+        self.batch_count += 1
+        self.issued_count += len(user_ids)
+        try:
+            profiles = await self._load_profiles(user_ids)
+        except Exception as e:
+            for user_id, future in zip(user_ids, futures):
+                self._futures.pop(user_id, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for user_id, future in zip(user_ids, futures):
+            if not future.done():
+                future.set_result(profiles.get(user_id))
+
+    async def _load_profiles(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        先读 Redis，缺失部分批量回源数据库并回写缓存。
+
+        :param user_ids: 用户 ID 列表
+        :return: 用户 ID 到资料字典的映射
+        """
+        profiles = await self.store.get_user_profiles(user_ids)
+        misses = [user_id for user_id in user_ids if profiles.get(user_id) is None]
+        if not misses:
+            return profiles
+        from apps.web.dao.user_dao import UserDao
+
+        user_infos = await GetBean(UserDao).get_user_infos(misses)
+        loaded = {user_id: jsonable_encoder(user_info) for user_id, user_info in user_infos.items()}
+        if loaded:
+            await self.store.set_user_profiles(loaded)
+        profiles.update(loaded)
+        return profiles
+
+    def log_stats(self) -> None:
+        """
+        输出本次请求的资料查询统计。
+
+        :return: None
+        """
+        if self.requested_count:
+            logger.debug(
+                f"用户资料查询: 调用 {self.requested_count} 次, 实际查询 {self.issued_count} 个, "
+                f"合并 {self.coalesced_count} 次, 批次 {self.batch_count}"
+            )
@@ -2,6 +2,7 @@ import json
 import time
 from collections.abc import Callable
 from typing import Any
+from uuid import uuid4
 
 from redis.asyncio import Redis
 
@@ -14,10 +15,31 @@ class WebSocketRedisStore:
     """WebSocket 跨 worker 状态和消息的 Redis 存储。"""
 
     CHANNEL = "ws:message"
+    WORKER_CHANNEL_PREFIX = "ws:worker"
     CONNECTION_KEY_PREFIX = "ws:user:connections"
     CONNECTION_CONVERSATION_KEY = "ws:connection:conversation"
     USER_PROFILE_KEY_PREFIX = RedisConstant.USER_PROFILE_CACHE_KEY_PREFIX
     GROUP_PROFILE_KEY_PREFIX = "ws:group:profile"
+    PRESENCE_BATCH_SIZE = 500
+    # KEYS[1]: 连接会话哈希，KEYS[2..]: 用户连接集合；返回每个用户是否有有效连接停留在指定会话
+    CONVERSATION_PRESENCE_SCRIPT = """
+    local result = {}
+    for i = 2, #KEYS do
+        local present = 0
+        local connection_ids = redis.call('ZRANGEBYSCORE', KEYS[i], '(' .. ARGV[1], '+inf')
+        if #connection_ids > 0 then
+            local conversations = redis.call('HMGET', KEYS[1], unpack(connection_ids))
+            for _, conversation_id in ipairs(conversations) do
+                if conversation_id == ARGV[2] then
+                    present = 1
+                    break
+                end
+            end
+        end
+        result[i - 1] = present
+    end
+    return result
+    """
 
     def __init__(
         self,
@@ -69,9 +91,63 @@ class WebSocketRedisStore:
         """
         return f"{self.CONNECTION_KEY_PREFIX}:{user_id}"
 
+    def worker_channel(self, worker_id: str) -> str:
+        """
+        生成 worker 专属频道名。
+
+        :param worker_id: worker ID
+        :return: Redis 频道名
+        """
+        return f"{self.WORKER_CHANNEL_PREFIX}:{worker_id}"
+
+    @staticmethod
+    def build_connection_id(worker_id: str) -> str:
+        """
+        生成携带所属 worker ID 的连接 ID。
+
+        :param worker_id: worker ID
+        :return: 连接 ID
+        """
+        return f"{worker_id}:{uuid4().hex}"
+
+    @staticmethod
+    def parse_worker_id(connection_id: str) -> str | None:
+        """
+        从连接 ID 中解析所属 worker ID。
+
+        :param connection_id: 连接 ID
+        :return: worker ID，旧格式连接返回 None
+        """
+        worker_id, sep, _ = connection_id.rpartition(":")
+        return worker_id if sep and worker_id else None
+
+    async def get_user_workers(self, user_ids: list[int]) -> tuple[dict[str, list[int]], list[int]]:
+        """
+        使用 pipeline 查询用户有效连接所在的 worker。
+
+        :param user_ids: 用户 ID 列表
+        :return: worker ID 到用户 ID 列表的映射，以及无法解析 worker 的用户 ID 列表
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        now = self._time_provider()
+        async with self.get_redis().pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.zrangebyscore(self._connection_key(user_id), now, float("inf"))
+            results = await pipe.execute()
+        workers: dict[str, list[int]] = {}
+        unresolved: list[int] = []
+        for user_id, connection_ids in zip(user_ids, results):
+            user_workers = {self.parse_worker_id(connection_id) for connection_id in connection_ids}
+            if None in user_workers:
+                unresolved.append(user_id)
+                user_workers.discard(None)
+            for worker_id in user_workers:
+                workers.setdefault(worker_id, []).append(user_id)
+        return workers, unresolved
+
     async def add_connection(self, user_id: int, connection_id: str) -> None:
         """
-        添加或续期用户连接。
+        添加或续期用户连接，连接 ID 中携带所属 worker ID。
 
         :param user_id: 用户 ID
         :param connection_id: 连接 ID
@@ -164,6 +240,34 @@ class WebSocketRedisStore:
         )
         return conversation_id in current_conversations
 
+    async def get_conversation_presence(self, user_ids: list[int], conversation_id: str) -> set[int]:
+        """
+        批量判断用户是否有连接停留在指定会话，按批执行 Lua 脚本并通过一个 pipeline 发送。
+
+        与 is_in_conversation 不同，这里只按过期时间过滤连接，不清理过期连接。
+
+        :param user_ids: 用户 ID 列表
+        :param conversation_id: 会话 ID
+        :return: 停留在会话中的用户 ID 集合
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return set()
+        redis = self.get_redis()
+        script = redis.register_script(self.CONVERSATION_PRESENCE_SCRIPT)
+        now = self._time_provider()
+        async with redis.pipeline(transaction=False) as pipe:
+            for start in range(0, len(user_ids), self.PRESENCE_BATCH_SIZE):
+                batch = user_ids[start : start + self.PRESENCE_BATCH_SIZE]
+                await script(
+                    keys=[self.CONNECTION_CONVERSATION_KEY, *(self._connection_key(user_id) for user_id in batch)],
+                    args=[now, conversation_id],
+                    client=pipe,
+                )
+            results = await pipe.execute()
+        flags = [flag for batch_flags in results for flag in batch_flags]
+        return {user_id for user_id, flag in zip(user_ids, flags) if flag}
+
     async def _set_profile(self, key: str, profile: dict[str, Any]) -> None:
         """
         缓存资料字典。
@@ -207,6 +311,34 @@ class WebSocketRedisStore:
         """
         return await self._get_profile(f"{self.USER_PROFILE_KEY_PREFIX}:{user_id}")
 
+    async def get_user_profiles(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        """
+        批量获取用户资料缓存。
+
+        :param user_ids: 用户 ID 列表
+        :return: 命中缓存的用户 ID 到资料的映射
+        """
+        if not user_ids:
+            return {}
+        values = await self.get_redis().mget([f"{self.USER_PROFILE_KEY_PREFIX}:{user_id}" for user_id in user_ids])
+        return {user_id: json.loads(value) for user_id, value in zip(user_ids, values) if value}
+
+    async def set_user_profiles(self, profiles: dict[int, dict[str, Any]]) -> None:
+        """
+        使用 pipeline 批量缓存用户资料。
+
+        :param profiles: 用户 ID 到资料的映射
+        :return: None
+        """
+        async with self.get_redis().pipeline(transaction=False) as pipe:
+            for user_id, profile in profiles.items():
+                pipe.set(
+                    f"{self.USER_PROFILE_KEY_PREFIX}:{user_id}",
+                    json.dumps(profile, ensure_ascii=False, separators=(",", ":")),
+                    ex=self.profile_ttl,
+                )
+            await pipe.execute()
+
     async def set_group_profile(self, group_id: int, profile: dict[str, Any]) -> None:
         """
         缓存群组资料。
@@ -228,9 +360,23 @@ class WebSocketRedisStore:
 
     async def publish(self, envelope: WebSocketEnvelope) -> None:
         """
-        发布跨 worker WebSocket 消息。
+        广播跨 worker WebSocket 消息。
 
         :param envelope: 消息信封
         :return: None
         """
         await self.get_redis().publish(self.CHANNEL, envelope.model_dump_json())
+
+    async def publish_to_workers(self, envelopes: dict[str, WebSocketEnvelope]) -> None:
+        """
+        使用 pipeline 将消息发布到各 worker 专属频道。
+
+        :param envelopes: worker ID 到消息信封的映射
+        :return: None
+        """
+        if not envelopes:
+            return
+        async with self.get_redis().pipeline(transaction=False) as pipe:
+            for worker_id, envelope in envelopes.items():
+                pipe.publish(self.worker_channel(worker_id), envelope.model_dump_json())
+            await pipe.execute()
@@ -54,16 +54,19 @@ class ArticleDao:
             return []
         if not articles:
             articles = await db.model_all(select(Article).where(Article.id.in_(article_ids)))
+        metrics, user_map = await asyncio.gather(
+            self.redis_util.Article.get_articles_metrics([item.id for item in articles]),
+            manager.get_user_infos([item.user_id for item in articles], UserBaseInfoDTO),
+        )
         ret = []
         for item in articles:
             record = clazz.model_validate(item, from_attributes=True)
-            record.view_count, record.like_count, record.collect_count, record.comment_count = await asyncio.gather(
-                self.redis_util.Article.get_article_view_count(record.id),
-                self.redis_util.Article.get_article_like_count(record.id),
-                self.redis_util.Article.get_article_collect_count(record.id),
-                self.redis_util.Article.get_article_comment_count(record.id),
-            )
-            record.user = await manager.get_user_info(item.user_id, UserBaseInfoDTO)
+            article_metrics = metrics[record.id]
+            record.view_count = article_metrics.view_count
+            record.like_count = article_metrics.like_count
+            record.collect_count = article_metrics.collect_count
+            record.comment_count = article_metrics.comment_count
+            record.user = user_map[item.user_id]
             ret.append(record)
         return ret
 
@@ -42,6 +42,46 @@ class UserDao:
         dto.user_settings = user_settings
         return dto
 
+    async def get_user_infos(self, user_ids: list[int]) -> dict[int, CachedUserInfoDTO]:
+        """
+        批量获取用户基本信息。
+
+        :param user_ids: 用户 ID 列表。
+        :return: 用户 ID 到内部缓存用户信息的映射，不存在的用户不包含在内。
+        """
+        if not user_ids:
+            return {}
+        users, restrictions, user_settings = await asyncio.gather(
+            db.model_all(select(User).where(User.id.in_(user_ids))),
+            db.model_all(
+                select(UserRestriction).where(
+                    UserRestriction.user_id.in_(user_ids),
+                    UserRestriction.is_cancel.is_(False),
+                )
+            ),
+            db.model_all(
+                select(UserSettings).where(
+                    UserSettings.user_id.in_(user_ids),
+                    UserSettings.setting_key.in_(self.common_user_settings),
+                )
+            ),
+        )
+        restriction_dict: dict[int, list[UserRestriction]] = {}
+        for restriction in restrictions:
+            restriction_dict.setdefault(restriction.user_id, []).append(restriction)
+        settings_dict: dict[int, dict[UserSettingsEnum, str | bool]] = {}
+        for item in user_settings:
+            settings_dict.setdefault(item.user_id, {})[item.setting_key] = self._covert_bool_value(item.setting_value)
+        ret = {}
+        for user in users:
+            dto = CachedUserInfoDTO.model_validate(user, from_attributes=True)
+            dto.user_restrictions = CachedUserRestrictionDTO(
+                items=CachedUserRestrictionItemDTO.bulk_model_validate(restriction_dict.get(user.id, []))
+            )
+            dto.user_settings = settings_dict.get(user.id, {})
+            ret[user.id] = dto
+        return ret
+
     async def get_user_common_settings(self, user_id: int) -> dict[UserSettingsEnum, str | bool]:
         """
         获取用户的公开配置。
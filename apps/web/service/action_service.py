@@ -16,7 +16,6 @@ from apps.web.dao.chat_dao import ChatDao
 from apps.web.dao.picture_dao import PictureDao
 from apps.web.dao.user_dao import UserDao
 from apps.web.dto.action_dto import BlckListDTO, UserFollowInfoDTO
-from apps.web.dto.chat_dto import WSMessageDTO
 from apps.web.dto.notice_dto import NoticeSaveDTO
 from apps.web.dto.user_dto import UserBaseInfoDTO, UserSimpleInfoDTO
 from apps.web.utils.redis_util import WebRedisUtil
@@ -185,8 +184,6 @@ class ActionService:
         if user_id == notice_dto.user_id:
             return
         await self.kafka_util.send_notice(notice_dto)
-        notice_dto.detail.from_user = await manager.get_user_info(user_id, UserBaseInfoDTO)
-        await manager.send_message(WSMessageDTO[NoticeSaveDTO](message=notice_dto))
 
     async def _get_comment(self, comment_id: int) -> Comment | None:
         """
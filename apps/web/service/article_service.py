@@ -12,8 +12,7 @@ from apps.base.exception.my_exception import MyException
 from apps.base.models.article import Article
 from apps.base.utils.picture_util import PictureUtil
 from apps.web.core.context_vars import ContextVars
-from apps.web.core.es.constant.es_constant import ESConstant
-from apps.web.core.es.utils.es_util import ESUtil
+from apps.web.core.es.outbox_relay import ArticleEsOutboxRelay
 from apps.web.dao.article_dao import ArticleDao
 from apps.web.dao.user_dao import UserDao
 from apps.web.dto.article_dto import ArticleBaseInfoDTO, ArticleDTO
@@ -30,9 +29,9 @@ class ArticleService:
     source_service: SourceService = Autowired()
     redis_util: WebRedisUtil = Autowired()
     picture_util: PictureUtil = Autowired()
-    es_util: ESUtil = Autowired()
     user_dao: UserDao = Autowired()
     article_dao: ArticleDao = Autowired()
+    es_outbox_relay: ArticleEsOutboxRelay = Autowired()
 
     async def list_articles(self, current: int, size: int, article_query_vo: ArticleQueryVO) -> dict:
         """
@@ -109,7 +108,8 @@ class ArticleService:
             session.add(article)
             await session.flush()
             await session.refresh(article)
-            await self._update_article_to_es(article)
+            await self.es_outbox_relay.enqueue(session, article.id)
+        self.es_outbox_relay.notify()
         return article.id
 
     async def detail(self, article_id: int) -> ArticleDTO:
@@ -148,14 +148,11 @@ class ArticleService:
         if nex_article:
             article_dto.next_article = ArticleBaseInfoDTO.model_validate(nex_article, from_attributes=True)
         article_dto.newest_article_list = ArticleBaseInfoDTO.bulk_model_validate(newest_articles)
-        article_dto.view_count, article_dto.like_count, article_dto.collect_count, article_dto.comment_count = (
-            await asyncio.gather(
-                self.redis_util.Article.get_article_view_count(article_id),
-                self.redis_util.Article.get_article_like_count(article_id),
-                self.redis_util.Article.get_article_collect_count(article_id),
-                self.redis_util.Article.get_article_comment_count(article_id),
-            )
-        )
+        article_metrics = (await self.redis_util.Article.get_articles_metrics([article_id]))[article_id]
+        article_dto.view_count = article_metrics.view_count
+        article_dto.like_count = article_metrics.like_count
+        article_dto.collect_count = article_metrics.collect_count
+        article_dto.comment_count = article_metrics.comment_count
         article_dto.user = await manager.get_user_info(article.user_id, UserBaseInfoDTO)
         return article_dto
 
@@ -226,7 +223,8 @@ class ArticleService:
         async with db.atomic() as session:
             session.add(article)
             await session.flush()
-            await self._update_article_to_es(article)
+            await self.es_outbox_relay.enqueue(session, article.id)
+        self.es_outbox_relay.notify()
 
     async def article_count_info(self, article_query_vo: ArticleQueryVO) -> dict[int, int]:
         """
@@ -273,7 +271,8 @@ class ArticleService:
         async with db.atomic() as session:
             session.add(article)
             await session.flush()
-            await self._update_article_to_es(article)
+            await self.es_outbox_relay.enqueue(session, article.id)
+        self.es_outbox_relay.notify()
 
     async def remove_from_recycle(self, batch_vo: BatchVO) -> None:
         """
@@ -294,7 +293,8 @@ class ArticleService:
         async with db.atomic() as session:
             session.add(article)
             await session.flush()
-            await self._update_article_to_es(article)
+            await self.es_outbox_relay.enqueue(session, article.id)
+        self.es_outbox_relay.notify()
 
     async def move_to_draft(self, batch_vo: BatchVO) -> None:
         """
@@ -318,16 +318,5 @@ class ArticleService:
         async with db.atomic() as session:
             session.add(article)
             await session.flush()
-            await self._update_article_to_es(article)
-
-    async def _update_article_to_es(self, article: Article) -> None:
-        """
-        同步文章到 ES。
-
-        :param article: 文章模型。
-        :return: None。
-        """
-        item = (await self.article_dao.get_article_detail_by_ids(articles=[article]))[0]
-        document = item.model_dump()
-        document["hot_score"] = float(document.get("hot_score") or 0)
-        await self.es_util.client.index(index=ESConstant.ARTICLE_INDEX, id=article.id, document=document)
+            await self.es_outbox_relay.enqueue(session, article.id)
+        self.es_outbox_relay.notify()
@@ -66,10 +66,13 @@ class ChatService:
             ),
         )
         records = ConversationDTO.bulk_model_validate(conversations)
-        last_message_dict = await self.chat_dao.get_conversation_last_message(records)
+        last_message_dict, user_dict = await asyncio.gather(
+            self.chat_dao.get_conversation_last_message(records),
+            manager.get_user_infos([item.contact_id for item in records if item.contact_type == ContactTypeEnum.USER]),
+        )
         for conversation in records:
             if conversation.contact_type == ContactTypeEnum.USER:
-                conversation.user_profile = await manager.get_user_info(conversation.contact_id)
+                conversation.user_profile = user_dict[conversation.contact_id]
             else:
                 conversation.group_profile = await manager.get_group_info(conversation.contact_id)
             conversation.last_message = last_message_dict.get(conversation.conversation_id)
@@ -285,6 +288,12 @@ class ChatService:
             await manager.send_message(message)
             session.add(record)
             await session.flush()
+        # 入群提交后删除群成员缓存，群消息不会漏发给新成员
+        if (
+            handle_contact_apply_vo.status == ContactApplyStatusEnum.AGREE
+            and record.contact_type == ContactTypeEnum.GROUP
+        ):
+            await self.redis_util.Chat.invalidate_group_members(record.contact_id)
 
     async def list_contact(self, contact_type: ContactTypeEnum, current_page: int, page_size: int) -> dict:
         """
@@ -303,8 +312,9 @@ class ChatService:
             db.model_all(select(Contact).where(*filters).order_by(Contact.id.desc()).offset(offset).limit(limit)),
         )
         records = ContactDTO.bulk_model_validate(contacts)
+        user_dict = await manager.get_user_infos([contact.contact_id for contact in records], UserProfileDTO)
         for contact in records:
-            contact.user_profile = await manager.get_user_info(contact.contact_id, UserProfileDTO)
+            contact.user_profile = user_dict[contact.contact_id]
             contact.group_profile = await manager.get_group_info(contact.contact_id, GroupProfileDTO)
         return {"total": total, "records": records}
 
@@ -318,3 +328,5 @@ class ChatService:
         user_id = ContextVars.token_user_id.get()
         async with db.atomic() as session:
             await self.chat_dao.delete_contact(user_id, contact_vo.contact_id, session=session)
+        # 联系人是群组时即退群，提交后删除群成员缓存
+        await self.redis_util.Chat.invalidate_group_members(contact_vo.contact_id)
@@ -23,7 +23,6 @@ from apps.web.core.kafka.util import KafkaUtil
 from apps.web.dao.article_dao import ArticleDao
 from apps.web.dao.picture_dao import PictureDao
 from apps.web.dao.user_dao import UserDao
-from apps.web.dto.chat_dto import WSMessageDTO
 from apps.web.dto.comment_dto import CommentDTO
 from apps.web.dto.notice_dto import NoticeSaveDTO
 from apps.web.dto.user_dto import CachedUserInfoDTO, UserBaseInfoDTO
@@ -94,18 +93,23 @@ class CommentService:
             children_comments_dict[dto.first_level_id].append(dto)
         children_comments_count_dict = {item.first_level_id: item.comment_count for item in children_comments_count}
         # 查询出所有评论所属用户及回复的评论所属用户，供页面显示回复@xxx
+        user_ids = [comment.user_id for comment in first_level_comments]
+        for children in children_comments_dict.values():
+            user_ids.extend(child.user_id for child in children)
+            user_ids.extend(child.reply_user_id for child in children if child.first_level_id != child.parent_id)
+        user_dict = await manager.get_user_infos(user_ids, UserBaseInfoDTO)
         for comment in first_level_comments:
             comment.has_like = await self.redis_util.User.has_like_comment(user_id, comment.id)
             comment.like_count = await self.redis_util.Comment.get_comment_like_count(comment.id)
-            comment.user = await manager.get_user_info(comment.user_id, UserBaseInfoDTO)
+            comment.user = user_dict[comment.user_id]
             comment.children = children_comments_dict.get(comment.id, [])
             comment.children_count = children_comments_count_dict.get(comment.id, 0)
             for child in comment.children:
                 child.has_like = await self.redis_util.User.has_like_comment(user_id, child.id)
                 child.like_count = await self.redis_util.Comment.get_comment_like_count(child.id)
-                child.user = await manager.get_user_info(child.user_id, UserBaseInfoDTO)
+                child.user = user_dict[child.user_id]
                 if child.first_level_id != child.parent_id:  # 回复的是子评论
-                    child.reply_user = await manager.get_user_info(child.reply_user_id, UserBaseInfoDTO)
+                    child.reply_user = user_dict[child.reply_user_id]
         return {"total": total, "records": first_level_comments, "mainTotal": first_level_comment_count}
 
     async def list_children_comment(self, comment_id: int, current: int, size: int) -> dict:
@@ -124,12 +128,15 @@ class CommentService:
             db.model_all(select(Comment).where(*filters).order_by(Comment.id.desc()).offset(offset).limit(limit)),
         )
         records = CommentDTO.bulk_model_validate(comments)
+        user_ids = [comment.user_id for comment in records]
+        user_ids.extend(comment.reply_user_id for comment in records if comment.first_level_id != comment.parent_id)
+        user_dict = await manager.get_user_infos(user_ids, UserBaseInfoDTO)
         for comment in records:
             comment.has_like = await self.redis_util.User.has_like_comment(user_id, comment.id)
             comment.like_count = await self.redis_util.Comment.get_comment_like_count(comment.id)
-            comment.user = await manager.get_user_info(comment.user_id, UserBaseInfoDTO)
+            comment.user = user_dict[comment.user_id]
             if comment.first_level_id != comment.parent_id:  # 回复的是子评论
-                comment.reply_user = await manager.get_user_info(comment.reply_user_id, UserBaseInfoDTO)
+                comment.reply_user = user_dict[comment.reply_user_id]
         return {"total": total, "records": records}
 
     async def add(self, comment_add_vo: CommentAddVO) -> CommentDTO:
@@ -246,8 +253,6 @@ class CommentService:
         if user_id == notice_dto.user_id:
             return
         await self.kafka_util.send_notice(notice_dto)
-        notice_dto.detail.from_user = await manager.get_user_info(user_id, UserBaseInfoDTO)
-        await manager.send_message(WSMessageDTO[NoticeSaveDTO](message=notice_dto))
 
     def _build_first_level_children_stmt(
         self, obj_id: int, obj_type: ObjectTypeEnum, comment_ids: list[int]
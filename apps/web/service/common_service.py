@@ -7,6 +7,7 @@ from sqlalchemy import func, select
 from apps.base.constant.email_constant import EmailConstant
 from apps.base.constant.sms_constant import SmsConstant
 from apps.base.core.depend_inject import Autowired, Component, RefreshScope, Value, logger
+from apps.base.core.http_client import HttpClientPool
 from apps.base.core.sqlalchemy.db_helper import db
 from apps.base.enum.common import FeedbackTypeEnum, VerifyCodeTypeEnum
 from apps.base.enum.error_code import ErrorCode
@@ -26,6 +27,7 @@ from apps.web.vo.user_vo import ValidateAccountExistVO
 class CommonService:
     redis_util: WebRedisUtil = Autowired()
     kafka_util: KafkaUtil = Autowired()
+    http_client: HttpClientPool = Autowired()
     github_config: dict[str, Any] | None = Value("github")
 
     async def get_github_commits(self, repo: str, page: int, size: int) -> dict[str, Any]:
@@ -98,19 +100,20 @@ class CommonService:
 
         try:
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(headers=headers) as session:
-                async with session.get(url, params=params, timeout=timeout) as response:
-                    if response.status == 404:
-                        raise MyException(ErrorCode.DATA_NOT_EXISTS)
-                    if response.status in (403, 429):
-                        raise MyException(ErrorCode.SERVICE_ERROR)
-                    if response.status != 200:
-                        raise MyException(ErrorCode.SERVICE_ERROR)
-                    data = await response.json()
-                    if not isinstance(data, list):
-                        raise MyException(ErrorCode.SERVICE_ERROR)
-                    has_next = 'rel="next"' in response.headers.get("Link", "")
-                    return data, has_next
+            async with self.http_client.request(
+                "GET", url, params=params, headers=headers, timeout=timeout
+            ) as response:
+                if response.status == 404:
+                    raise MyException(ErrorCode.DATA_NOT_EXISTS)
+                if response.status in (403, 429):
+                    raise MyException(ErrorCode.SERVICE_ERROR)
+                if response.status != 200:
+                    raise MyException(ErrorCode.SERVICE_ERROR)
+                data = await response.json()
+                if not isinstance(data, list):
+                    raise MyException(ErrorCode.SERVICE_ERROR)
+                has_next = 'rel="next"' in response.headers.get("Link", "")
+                return data, has_next
         except MyException:
             raise
         except (aiohttp.ClientError, TimeoutError, TypeError, ValueError) as exc:
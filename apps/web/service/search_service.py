@@ -1,17 +1,22 @@
 import asyncio
+import base64
+import hashlib
+import json
 import logging
 import re
 import unicodedata
 
+from elasticsearch import NotFoundError
 from sqlalchemy import func, or_, select
 
 from apps.base.core.depend_inject import Autowired, Component
+from apps.base.core.es_reindex import ArticleReindexer
 from apps.base.core.sqlalchemy.db_helper import db
+from apps.base.exception.my_exception import MyException
 from apps.base.models.article import Article
 from apps.base.models.user import User
 from apps.web.core.es.constant.es_constant import ESConstant
 from apps.web.core.es.utils.es_util import ESUtil
-from apps.web.core.es.utils.html_util import HtmlUtil
 from apps.web.dao.article_dao import ArticleDao
 from apps.web.dto.article_dto import ArticleBaseInfoDTO, ArticleListDTO
 from apps.web.dto.user_dto import UserCommonInfoDTO
@@ -25,6 +30,8 @@ logger = logging.getLogger(__name__)
 @Component()
 class SearchService:
     HOT_SEARCH_STOP_WORDS = frozenset({"一个", "什么", "如何", "怎么", "这个", "那个"})
+    MAX_RESULT_WINDOW = 10000
+    PIT_KEEP_ALIVE = "2m"
 
     redis_util: WebRedisUtil = Autowired()
     es_util: ESUtil = Autowired()
@@ -35,21 +42,82 @@ class SearchService:
         """
         ES 根据关键词查找文章。
 
+        传入 cursor 时使用 point-in-time + search_after 游标翻页，否则按页码分页并缓存结果，
+        缓存未命中时同一查询的并发请求只有一个访问 ES。
+
         :param article_search_vo: 文章搜索参数。
-        :return: 文章分页结果。
+        :return: 文章分页结果，next_cursor 为下一页游标，没有下一页时为 None。
+        :raises MyException: 游标无效或页码超过 ES 最大结果窗口时抛出。
         """
-        page = await self.redis_util.ES.get_article_search_result(article_search_vo)
-        if page:
+        if article_search_vo.cursor:
+            page = await self._search_article_by_cursor(article_search_vo)
+        else:
+            if article_search_vo.current_page * article_search_vo.page_size > self.MAX_RESULT_WINDOW:
+                raise MyException.param_err("搜索页码过大，请使用游标翻页")
+            page = await self.redis_util.ES.load_article_search_result(
+                article_search_vo, lambda: self._search_article_by_page(article_search_vo)
+            )
             await self._record_hot_search(article_search_vo, page.get("total", 0))
-            await self._refresh_article_metrics(page.get("records", []))
-            return page
+        await self._refresh_article_metrics(page.get("records", []))
+        return page
+
+    async def _search_article_by_page(self, article_search_vo: ArticleSearchVO) -> dict:
+        """
+        按页码查询 ES 并写入搜索缓存。
+
+        :param article_search_vo: 文章搜索参数。
+        :return: 文章分页结果。
+        """
         resp = await self.es_util.client.search(
             index=ESConstant.ARTICLE_INDEX, **ESConstant.get_article_search_dsl(article_search_vo)
         )
+        page = self._build_article_page(resp, article_search_vo, None)
+        await self.redis_util.ES.cache_article_search_result(article_search_vo, page)
+        return page
+
+    async def _search_article_by_cursor(self, article_search_vo: ArticleSearchVO) -> dict:
+        """
+        使用 point-in-time 和 search_after 查询游标之后的一页，最后一页时关闭 point-in-time。
+
+        :param article_search_vo: 文章搜索参数。
+        :return: 文章分页结果。
+        :raises MyException: 游标无效时抛出。
+        """
+        client = self.es_util.client
+        search_after, pit_id = self._decode_search_cursor(article_search_vo)
+        dsl = ESConstant.get_article_search_dsl(article_search_vo, search_after=search_after)
+        if pit_id:
+            try:
+                resp = await client.search(pit={"id": pit_id, "keep_alive": self.PIT_KEEP_ALIVE}, **dsl)
+            except NotFoundError:
+                pit_id = None
+        if not pit_id:
+            opened = await client.open_point_in_time(index=ESConstant.ARTICLE_INDEX, keep_alive=self.PIT_KEEP_ALIVE)
+            pit_id = opened["id"]
+            resp = await client.search(pit={"id": pit_id, "keep_alive": self.PIT_KEEP_ALIVE}, **dsl)
+        pit_id = resp["pit_id"] if "pit_id" in resp else pit_id
+        page = self._build_article_page(resp, article_search_vo, pit_id)
+        if page["next_cursor"] is None:
+            try:
+                await client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning("关闭 ES point-in-time 失败: %s", e)
+        return page
+
+    def _build_article_page(self, resp: dict, article_search_vo: ArticleSearchVO, pit_id: str | None) -> dict:
+        """
+        将 ES 搜索响应转换为分页结果。
+
+        :param resp: ES 搜索响应。
+        :param article_search_vo: 文章搜索参数。
+        :param pit_id: point-in-time ID，按页码查询时为 None。
+        :return: 文章分页结果。
+        """
+        hits = resp["hits"]["hits"]
         total, records = 0, []
-        if resp["hits"]["hits"]:
+        if hits:
             total = resp["hits"]["total"]["value"]
-            for item in resp["hits"]["hits"]:
+            for item in hits:
                 record = item["_source"]
                 highlight_title = item["highlight"].get("title")
                 highlight_content = item["highlight"].get("content")
@@ -60,11 +128,55 @@ class SearchService:
                 else:
                     record["content"] = record["content"][:100]
                 records.append(ArticleListDTO.model_validate(record))
-        page = {"total": total, "records": records}
-        await self.redis_util.ES.cache_article_search_result(article_search_vo, page)
-        await self._record_hot_search(article_search_vo, total)
-        await self._refresh_article_metrics(records)
-        return page
+        next_cursor = None
+        if len(hits) == article_search_vo.page_size:
+            # 游标只保存业务排序值，point-in-time 查询的 _shard_doc 决胜值不跨 point-in-time 使用
+            sort = hits[-1]["sort"][:-1] if pit_id else hits[-1]["sort"]
+            next_cursor = self._encode_search_cursor(article_search_vo, sort, pit_id)
+        return {"total": total, "records": records, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _search_fingerprint(article_search_vo: ArticleSearchVO) -> str:
+        """
+        计算游标绑定的查询指纹，防止游标用于其他查询条件。
+
+        :param article_search_vo: 文章搜索参数。
+        :return: 查询指纹。
+        """
+        raw = f"{article_search_vo.keyword.strip()}:{article_search_vo.page_size}:{article_search_vo.order_type}"
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _encode_search_cursor(self, article_search_vo: ArticleSearchVO, sort: list, pit_id: str | None) -> str:
+        """
+        生成不透明的搜索游标。
+
+        :param article_search_vo: 文章搜索参数。
+        :param sort: 当前页最后一条记录的业务排序值。
+        :param pit_id: point-in-time ID。
+        :return: 搜索游标。
+        """
+        payload = {"q": self._search_fingerprint(article_search_vo), "sort": sort, "pit": pit_id}
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def _decode_search_cursor(self, article_search_vo: ArticleSearchVO) -> tuple[list, str | None]:
+        """
+        解析搜索游标。
+
+        :param article_search_vo: 文章搜索参数。
+        :return: search_after 排序值和 point-in-time ID。
+        :raises MyException: 游标无效或与查询条件不匹配时抛出。
+        """
+        cursor = article_search_vo.cursor
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            sort, pit_id = payload["sort"], payload.get("pit")
+            valid = payload["q"] == self._search_fingerprint(article_search_vo) and isinstance(sort, list)
+        except ValueError, TypeError, KeyError:
+            valid = False
+        if not valid:
+            raise MyException.param_err("无效的搜索游标")
+        return sort, pit_id
 
     async def _refresh_article_metrics(self, records: list[ArticleListDTO]) -> None:
         """
@@ -74,22 +186,19 @@ class SearchService:
         :return: None。
         """
 
-        async def refresh_record(record: ArticleListDTO) -> None:
-            metric_names = ("view_count", "like_count", "collect_count", "comment_count")
-            metrics = await asyncio.gather(
-                self.redis_util.Article.get_article_view_count(record.id),
-                self.redis_util.Article.get_article_like_count(record.id),
-                self.redis_util.Article.get_article_collect_count(record.id),
-                self.redis_util.Article.get_article_comment_count(record.id),
-                return_exceptions=True,
-            )
-            for metric_name, metric in zip(metric_names, metrics):
-                if isinstance(metric, BaseException):
-                    logger.warning("读取文章[%s]实时指标[%s]失败: %s", record.id, metric_name, metric)
-                    continue
-                setattr(record, metric_name, metric)
-
-        await asyncio.gather(*(refresh_record(record) for record in records))
+        if not records:
+            return
+        try:
+            metrics = await self.redis_util.Article.get_articles_metrics([record.id for record in records])
+        except Exception as e:
+            logger.warning("读取文章实时指标失败: %s", e)
+            return
+        for record in records:
+            article_metrics = metrics[record.id]
+            record.view_count = article_metrics.view_count
+            record.like_count = article_metrics.like_count
+            record.collect_count = article_metrics.collect_count
+            record.comment_count = article_metrics.comment_count
 
     @classmethod
     def _normalize_hot_search(cls, keyword: str, stop_words: set[str] | None = None) -> str | None:
@@ -197,29 +306,25 @@ class SearchService:
 
     async def init_article_index(self) -> None:
         """
-        初始化 article 索引。
+        重建 article 索引，重建完成后原子切换别名，期间搜索不受影响。
 
         :return: None。
         """
-        await self.es_util.client.indices.delete(index=ESConstant.ARTICLE_INDEX, ignore_unavailable=True)
-        await self.es_util.client.indices.create(
-            index=ESConstant.ARTICLE_INDEX, mappings=ESConstant.ARTICLE_INDEX_MAPPING
-        )
+        reindexer = ArticleReindexer(self.es_util.client, self.redis_util.redis, self._build_index_documents)
+        await reindexer.run()
         await self.redis_util.ES.clear_article_search_result()
-        stmt = select(Article).where(Article.is_deleted.is_(False))
-        size = 500
-        total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
-        pages = (total + size - 1) // size
-        for i in range(pages):
-            offset, limit = db.page(i + 1, size)
-            articles = await db.model_all(stmt.order_by(Article.id.desc()).offset(offset).limit(limit))
-            records = await self.article_dao.get_article_detail_by_ids(articles=articles)
-            ret = []
-            for record in records:
-                record.content = HtmlUtil.remove_html_tags(record.content)
-                record_dict = record.model_dump()
-                record_dict["hot_score"] = float(record_dict.get("hot_score") or 0)
-                record_dict["_index"] = ESConstant.ARTICLE_INDEX
-                record_dict["_id"] = record.id
-                ret.append(record_dict)
-            await self.es_util.helpers.async_bulk(self.es_util.client, ret)
+
+    async def _build_index_documents(self, articles: list[Article]) -> list[dict]:
+        """
+        将文章转换为索引文档，HTML 由重建器统一清洗。
+
+        :param articles: 文章列表。
+        :return: 索引文档列表。
+        """
+        records = await self.article_dao.get_article_detail_by_ids(articles=articles)
+        documents = []
+        for record in records:
+            document = record.model_dump()
+            document["hot_score"] = float(document.get("hot_score") or 0)
+            documents.append(document)
+        return documents
@@ -29,7 +29,6 @@ from apps.web.core.context_vars import ContextVars
 from apps.web.core.kafka.util import KafkaUtil
 from apps.web.dao.chat_dao import ChatDao
 from apps.web.dao.user_dao import UserDao
-from apps.web.dto.chat_dto import WSMessageDTO
 from apps.web.dto.notice_dto import NoticeSaveDTO
 from apps.web.dto.user_dto import (
     CachedUserInfoDTO,
@@ -387,14 +386,11 @@ class UserService:
             self.chat_dao.is_blocked(login_user_id, user_id),
             self.user_dao.get_user_common_settings(user_id),
         )
-        dto.article_view_count, dto.article_comment_count, dto.article_like_me_count, dto.article_collect_count = (
-            await asyncio.gather(
-                self.redis_util.Article.get_articles_view_count(my_article_ids),
-                self.redis_util.Article.get_articles_comment_count(my_article_ids),
-                self.redis_util.Article.get_articles_like_count(my_article_ids),
-                self.redis_util.Article.get_articles_collect_count(my_article_ids),
-            )
-        )
+        article_metrics = (await self.redis_util.Article.get_articles_metrics(my_article_ids)).values()
+        dto.article_view_count = sum(item.view_count for item in article_metrics)
+        dto.article_comment_count = sum(item.comment_count for item in article_metrics)
+        dto.article_like_me_count = sum(item.like_count for item in article_metrics)
+        dto.article_collect_count = sum(item.collect_count for item in article_metrics)
         return dto
 
     async def add_view_count(self, add_user_view_count_vo: AddUserViewCountVO):
@@ -900,5 +896,3 @@ class UserService:
         notice_dto.notice_type = NoticeTypeEnum.SYSTEM
         notice_dto.user_id = user.id
         await self.kafka_util.send_notice(notice_dto)
-        notice_dto.detail.from_user = await manager.get_user_info(user.id, UserBaseInfoDTO)
-        await manager.send_message(WSMessageDTO[NoticeSaveDTO](message=notice_dto))
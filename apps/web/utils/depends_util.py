@@ -3,8 +3,10 @@ import functools
 from fastapi import Header, Query
 from starlette.requests import Request
 
+from apps.base.core.depend_inject import GetBean
 from apps.base.enum.error_code import ErrorCode
 from apps.base.exception.my_exception import MyException
+from apps.web.core.context_vars import ContextVars
 from apps.web.utils.token_util import TokenUtil
 
 
@@ -14,7 +16,13 @@ class DependsUtil:
     @classmethod
     def get_user_id_from_token(cls, nullable: bool = False, token: str = Header(alias=TOKEN_NAME)):
         try:
-            user_id = TokenUtil.get_user_id(token)
+            # 优先使用白名单中间件校验后的声明，未经过中间件时由校验器验签
+            claims = ContextVars.token_claims.get()
+            if claims is None:
+                claims = TokenUtil.verifier.decode(token)
+            user_id = claims.get("user_id")
+            if user_id is None:
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
             return user_id
         except Exception as e:
             if nullable:
@@ -25,13 +33,34 @@ class DependsUtil:
     def token_user_id(cls, nullable: bool = False):
         return functools.partial(cls.get_user_id_from_token, nullable=nullable)
 
+    @classmethod
+    async def verify_request_token(cls, request: Request) -> dict:
+        """
+        校验请求 token 并将声明保存到上下文，同一请求后续获取用户 ID 时不再解析 token
+        :param request: 请求对象
+        :return: token 声明
+        :raises MyException: token 缺失或无效时抛出
+        """
+        ContextVars.token_claims.set({})
+        token = request.headers.get(cls.TOKEN_NAME)
+        if not token:
+            raise MyException(ErrorCode.TOKEN_IS_EMPTY)
+        claims = await TokenUtil.verifier.verify(token, GetBean("webRedisUtil").redis)
+        ContextVars.token_claims.set(claims)
+        return claims
+
     @classmethod
     def get_user_id_from_request(cls, request: Request, nullable: bool = True):
         try:
             token = request.headers.get(cls.TOKEN_NAME)
             if not token:
                 raise MyException(ErrorCode.TOKEN_IS_EMPTY)
-            user_id = TokenUtil.get_user_id(token)
+            claims = ContextVars.token_claims.get()
+            if claims is None:
+                claims = TokenUtil.verifier.decode(token)
+            user_id = claims.get("user_id")
+            if user_id is None:
+                raise MyException(ErrorCode.TOKEN_IS_INVALID)
             return user_id
         except Exception as e:
             if nullable:
@@ -39,6 +68,6 @@ class DependsUtil:
             raise e
 
     @classmethod
-    def ws_user_id(cls, token: str = Query()):
-        user_id = TokenUtil.get_user_id(token)
-        return user_id
+    async def ws_user_id(cls, token: str = Query()):
+        claims = await TokenUtil.verifier.verify(token, GetBean("webRedisUtil").redis)
+        return claims.get("user_id")
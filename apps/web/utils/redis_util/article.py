@@ -1,4 +1,6 @@
+import asyncio
 import time
+from dataclasses import dataclass
 
 from redis.asyncio import Redis
 from sqlalchemy import func, select
@@ -12,6 +14,138 @@ from apps.base.models.comment import Comment
 from apps.base.utils.action_count_util import mark_action_count_dirty
 
 
+@dataclass
+class ArticleMetrics:
+    """
+    文章实时计数。
+
+    :param view_count: 访问数。
+    :param like_count: 点赞数。
+    :param collect_count: 收藏数。
+    :param comment_count: 评论数。
+    """
+
+    view_count: int = 0
+    like_count: int = 0
+    collect_count: int = 0
+    comment_count: int = 0
+
+
+class ArticleMetricsBatchLoader:
+    """
+    文章计数批量加载器。
+
+    一次 pipeline 读取全部计数 hash，缺失项按计数类型各用一条分组 SQL 回源，再用一次 pipeline 回写 Redis，
+    使列表页的 Redis 往返次数与分页大小无关。
+    """
+
+    METRIC_HASH_KEYS: dict[str, str] = {
+        "view_count": RedisConstant.ARTICLE_VIEW_COUNT_MAP_KEY,
+        "like_count": RedisConstant.ARTICLE_LIKE_COUNT_MAP_KEY,
+        "collect_count": RedisConstant.ARTICLE_COLLECT_COUNT_MAP_KEY,
+        "comment_count": RedisConstant.ARTICLE_COMMENT_COUNT_MAP_KEY,
+    }
+    ACTION_METRIC_TYPES: dict[str, ActionTypeEnum] = {
+        "like_count": ActionTypeEnum.LIKE,
+        "collect_count": ActionTypeEnum.COLLECT,
+    }
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+
+    async def load(self, article_ids: list[int]) -> dict[int, ArticleMetrics]:
+        """
+        批量获取文章实时计数。
+
+        :param article_ids: 文章 ID 列表。
+        :return: 文章 ID 到实时计数的映射。
+        """
+        article_ids = list(dict.fromkeys(article_ids))
+        if not article_ids:
+            return {}
+        fields = [str(article_id) for article_id in article_ids]
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for hash_key in self.METRIC_HASH_KEYS.values():
+                pipe.hmget(hash_key, fields)
+            hash_values = await pipe.execute()
+
+        ret = {article_id: ArticleMetrics() for article_id in article_ids}
+        misses: dict[str, list[int]] = {}
+        for metric_name, values in zip(self.METRIC_HASH_KEYS, hash_values):
+            for article_id, value in zip(article_ids, values):
+                if value is None:
+                    misses.setdefault(metric_name, []).append(article_id)
+                else:
+                    setattr(ret[article_id], metric_name, int(value))
+        if not misses:
+            return ret
+
+        backfill = await self._load_from_db(misses)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for metric_name, counts in backfill.items():
+                for article_id, count in counts.items():
+                    setattr(ret[article_id], metric_name, count)
+                pipe.hset(
+                    self.METRIC_HASH_KEYS[metric_name],
+                    mapping={str(article_id): str(count) for article_id, count in counts.items()},
+                )
+            await pipe.execute()
+        return ret
+
+    async def _load_from_db(self, misses: dict[str, list[int]]) -> dict[str, dict[int, int]]:
+        """
+        按计数类型分组回源数据库。
+
+        :param misses: 计数名称到缺失文章 ID 列表的映射。
+        :return: 计数名称到文章计数的映射，未查到的文章计为 0。
+        """
+        metric_names = list(misses)
+        rows_list = await asyncio.gather(*(self._query_counts(name, misses[name]) for name in metric_names))
+        ret = {}
+        for metric_name, rows in zip(metric_names, rows_list):
+            counts = dict.fromkeys(misses[metric_name], 0)
+            counts.update({obj_id: int(count or 0) for obj_id, count in rows})
+            ret[metric_name] = counts
+        return ret
+
+    async def _query_counts(self, metric_name: str, article_ids: list[int]) -> list:
+        """
+        查询单一计数类型的文章分组计数。
+
+        :param metric_name: 计数名称。
+        :param article_ids: 文章 ID 列表。
+        :return: (文章 ID, 计数) 行列表。
+        """
+        if metric_name == "view_count":
+            stmt = select(ActionCount.obj_id, ActionCount.count).where(
+                ActionCount.obj_id.in_(article_ids),
+                ActionCount.obj_type == ObjectTypeEnum.ARTICLE,
+                ActionCount.action_type == ActionTypeEnum.VIEW,
+            )
+        elif metric_name == "comment_count":
+            stmt = (
+                select(Comment.obj_id, func.count(Comment.id))
+                .where(
+                    Comment.obj_id.in_(article_ids),
+                    Comment.obj_type == ObjectTypeEnum.ARTICLE,
+                    Comment.status == CommentStatusEnum.PASS,
+                )
+                .group_by(Comment.obj_id)
+            )
+        else:
+            stmt = (
+                select(Action.obj_id, func.count(Action.id))
+                .where(
+                    Action.obj_id.in_(article_ids),
+                    Action.obj_type == ObjectTypeEnum.ARTICLE,
+                    Action.action_type == self.ACTION_METRIC_TYPES[metric_name],
+                    Action.status.is_(True),
+                )
+                .group_by(Action.obj_id)
+            )
+        return list(await db.all(stmt))
+
+
 class ArticleMethod:
     """
     文章相关方法
@@ -19,6 +153,16 @@ class ArticleMethod:
 
     def __init__(self, redis: Redis):
         self._redis = redis
+        self.metrics_loader = ArticleMetricsBatchLoader(redis)
+
+    async def get_articles_metrics(self, article_ids: list[int]) -> dict[int, ArticleMetrics]:
+        """
+        批量获取文章实时计数。
+
+        :param article_ids: 文章 ID 列表。
+        :return: 文章 ID 到实时计数的映射。
+        """
+        return await self.metrics_loader.load(article_ids)
 
     async def get_article_like_count(self, article_id: int) -> int:
         """
@@ -47,7 +191,8 @@ class ArticleMethod:
         :param article_ids:
         :return:
         """
-        return sum([await self.get_article_like_count(article_id) for article_id in article_ids])
+        metrics = await self.get_articles_metrics(article_ids)
+        return sum(item.like_count for item in metrics.values())
 
     async def add_or_remove_article_like(self, user_id: int, article_id: int) -> bool:
         """
@@ -108,7 +253,8 @@ class ArticleMethod:
         :param article_ids:
         :return:
         """
-        return sum([await self.get_article_collect_count(article_id) for article_id in article_ids])
+        metrics = await self.get_articles_metrics(article_ids)
+        return sum(item.collect_count for item in metrics.values())
 
     async def add_or_remove_article_collect(self, user_id: int, article_id: int) -> bool:
         """
@@ -168,7 +314,8 @@ class ArticleMethod:
         :param article_ids:
         :return:
         """
-        return sum([await self.get_article_comment_count(article_id) for article_id in article_ids])
+        metrics = await self.get_articles_metrics(article_ids)
+        return sum(item.comment_count for item in metrics.values())
 
     async def incr_article_comment_count(self, article_id: int, count: int = 1) -> None:
         """
@@ -215,7 +362,8 @@ class ArticleMethod:
         :param article_ids:
         :return:
         """
-        return sum([await self.get_article_view_count(article_id) for article_id in article_ids])
+        metrics = await self.get_articles_metrics(article_ids)
+        return sum(item.view_count for item in metrics.values())
 
     async def incr_article_view_count(self, article_id: int) -> int:
         """
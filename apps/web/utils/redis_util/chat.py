@@ -137,6 +137,52 @@ class ChatMethod:
             return
         await self._redis.srem(key, str(contact_id))
 
+    def _group_member_key(self, group_id: int) -> str:
+        """
+        获取群成员缓存键。
+
+        :param group_id: 群组 ID
+        :return: Redis 群成员集合键
+        """
+        return f"{RedisConstant.GROUP_MEMBER_SET_KEY}:{group_id}"
+
+    async def get_group_members(self, group_id: int) -> list[int] | None:
+        """
+        获取群成员缓存。
+
+        :param group_id: 群组 ID
+        :return: 群成员 ID 列表，缓存不存在时返回 None
+        """
+        members = await self._redis.smembers(self._group_member_key(group_id))
+        if not members:
+            return None
+        return [int(member) for member in members if member != self.EMPTY_MEMBER]
+
+    async def refresh_group_members(self, group_id: int, member_ids: list[int], ex: int = 5 * 60) -> None:
+        """
+        刷新群成员缓存，成员变更后由 invalidate_group_members 删除，过期时间只是兜底。
+
+        :param group_id: 群组 ID
+        :param member_ids: 群成员 ID 列表
+        :param ex: 缓存秒数
+        :return: None
+        """
+        key = self._group_member_key(group_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.sadd(key, self.EMPTY_MEMBER, *(str(member_id) for member_id in member_ids))
+            pipe.expire(key, ex)
+            await pipe.execute()
+
+    async def invalidate_group_members(self, group_id: int) -> None:
+        """
+        删除群成员缓存，成员变更的事务提交后调用，下次发消息时从数据库重建。
+
+        :param group_id: 群组 ID
+        :return: None
+        """
+        await self._redis.delete(self._group_member_key(group_id))
+
     async def get_conversation_unread_count(self, user_id: int, conversation_id: str) -> int:
         """
         获取会话未读数量
@@ -158,6 +204,20 @@ class ChatMethod:
         key = f"{user_id}:{conversation_id}"
         return await self._redis.hincrby(RedisConstant.CONVERSATION_UNREAD_COUNT_MAP_KEY, key, 1)
 
+    async def incr_conversation_unread_counts(self, user_ids: list[int], conversation_id: str) -> None:
+        """
+        使用 pipeline 批量增加会话未读数量
+        :param user_ids:
+        :param conversation_id:
+        :return:
+        """
+        if not user_ids:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hincrby(RedisConstant.CONVERSATION_UNREAD_COUNT_MAP_KEY, f"{user_id}:{conversation_id}", 1)
+            await pipe.execute()
+
     async def reset_conversation_unread_count(self, user_id: int, conversation_id: str) -> int:
         """
         重置会话未读数量
@@ -2,6 +2,7 @@
 # @Author  : frank
 # @File    : es.py
 import json
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta
 from typing import Any
 
@@ -10,6 +11,7 @@ from redis.asyncio import Redis
 from apps.base.constant.redis_constant import RedisConstant
 from apps.base.dto.article_dto import ArticleBaseInfoDTO, ArticleListDTO
 from apps.base.dto.base_dto import BaseDTO
+from apps.base.utils.singleflight_util import SingleFlight
 from apps.base.vo.search_vo import ArticleSearchVO
 
 
@@ -20,6 +22,9 @@ class ESMethod:
 
     def __init__(self, redis: Redis):
         self._redis = redis
+        self._article_search_flight: SingleFlight[dict[str, Any]] = SingleFlight(
+            redis, RedisConstant.KEYWORDS_SEARCH_ARTICLE_LOCK_KEY
+        )
 
     async def save_daily_hot_word(self, word: str):
         """
@@ -68,7 +73,7 @@ class ESMethod:
         :param result:
         :return:
         """
-        key = f"{RedisConstant.KEYWORDS_SEARCH_ARTICLE_CACHE_KEY}:{article_search_vo.keyword.strip()}:{article_search_vo.current_page}:{article_search_vo.page_size}:{article_search_vo.order_type}"
+        key = f"{RedisConstant.KEYWORDS_SEARCH_ARTICLE_CACHE_KEY}:{self._article_search_key(article_search_vo)}"
         await self._redis.set(key, self._dump_page_result(result), timedelta(minutes=5))
 
     async def clear_article_search_result(self):
@@ -87,13 +92,44 @@ class ESMethod:
         :param article_search_vo:
         :return:
         """
-        key = f"{RedisConstant.KEYWORDS_SEARCH_ARTICLE_CACHE_KEY}:{article_search_vo.keyword.strip()}:{article_search_vo.current_page}:{article_search_vo.page_size}:{article_search_vo.order_type}"
+        key = f"{RedisConstant.KEYWORDS_SEARCH_ARTICLE_CACHE_KEY}:{self._article_search_key(article_search_vo)}"
         ret = await self._redis.get(key)
         if ret:
             ret = json.loads(ret)
             ret["records"] = ArticleListDTO.bulk_model_validate(ret.get("records", []))
         return ret
 
+    async def load_article_search_result(
+        self, article_search_vo: ArticleSearchVO, loader: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        """
+        获取关键字搜索结果，未命中时合并并发回源，同一查询只有一个请求访问 ES
+        :param article_search_vo:
+        :param loader: 回源函数，负责查询 ES 并写入缓存
+        :return:
+        """
+        ret = await self.get_article_search_result(article_search_vo)
+        if ret:
+            return ret
+        return await self._article_search_flight.do(
+            self._article_search_key(article_search_vo),
+            loader,
+            lambda: self.get_article_search_result(article_search_vo),
+        )
+
+    @staticmethod
+    def _article_search_key(article_search_vo: ArticleSearchVO) -> str:
+        """
+        生成关键字搜索缓存 key 后缀。
+
+        :param article_search_vo: 文章搜索参数。
+        :return: keyword:page:size:order 形式的 key 后缀。
+        """
+        return (
+            f"{article_search_vo.keyword.strip()}:{article_search_vo.current_page}:"
+            f"{article_search_vo.page_size}:{article_search_vo.order_type}"
+        )
+
     @staticmethod
     def _dump_page_result(result: dict[str, Any]) -> str:
         """
@@ -106,4 +142,7 @@ class ESMethod:
             record.model_dump(mode="json") if isinstance(record, BaseDTO) else record
             for record in result.get("records", [])
         ]
-        return json.dumps({"total": result.get("total", 0), "records": records}, ensure_ascii=False)
+        data = {"total": result.get("total", 0), "records": records}
+        if "next_cursor" in result:
+            data["next_cursor"] = result["next_cursor"]
+        return json.dumps(data, ensure_ascii=False)
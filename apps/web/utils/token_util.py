@@ -1,10 +1,14 @@
 from jose import jwt
 from jose.constants import ALGORITHMS
 
+from apps.base.utils.token_verifier import TokenVerifier
+
 
 class TokenUtil:
     secret_key = "nAm1aVIe"
     algorithm = ALGORITHMS.HS256
+    # 前台 token 没有 exp 且没有退出登录接口，不使用吊销列表
+    verifier = TokenVerifier(secret_key, algorithm)
 
     @classmethod
     def create_token(cls, user_id: int, username: str):
@@ -14,12 +18,12 @@ class TokenUtil:
 
     @classmethod
     def get_user_id(cls, token: str):
-        payload = jwt.decode(token, key=cls.secret_key)
+        payload = cls.verifier.decode(token)
         return payload.get("user_id")
 
     @classmethod
     def get_username(cls, token: str):
-        payload = jwt.decode(token, key=cls.secret_key)
+        payload = cls.verifier.decode(token)
         return payload.get("username")
 
 
@@ -0,0 +1,64 @@
+import pytest
+
+from apps.admin.core.context_vars import AdminContextVars
+from apps.admin.utils import depends_util as depends_util_module
+from apps.admin.utils.depends_util import AdminDependsUtil
+from apps.admin.utils.token_util import AdminTokenUtil
+from apps.base.exception.my_exception import MyException
+
+
+class MemoryRedis:
+    """
+    只记录吊销成员的 Redis，吊销列表同步和精确确认都从这里读取。
+    """
+
+    def __init__(self) -> None:
+        self.denied: dict[str, int] = {}
+
+    async def eval(self, script: str, numkeys: int, *args: str) -> int:
+        self.denied[args[numkeys]] = len(self.denied) + 1
+        return len(self.denied)
+
+    async def get(self, key: str) -> str:
+        return str(len(self.denied))
+
+    async def zrangebyscore(self, key: str, low: str, high: str, withscores: bool) -> list[tuple[str, int]]:
+        return list(self.denied.items())
+
+    async def zscore(self, key: str, member: str) -> int | None:
+        return self.denied.get(member)
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> MemoryRedis:
+    memory_redis = MemoryRedis()
+
+    class RedisUtil:
+        redis = memory_redis
+
+    monkeypatch.setattr(depends_util_module, "GetBean", lambda name: RedisUtil)
+    return memory_redis
+
+
+@pytest.mark.asyncio
+async def test_user_id_comes_from_verified_claims(redis):
+    token = AdminTokenUtil.create_token(1, "admin")
+
+    # 中间件校验失败（如 token 已吊销）时上下文为空声明，不再自行解析 token
+    reset = AdminContextVars.token_claims.set({})
+    try:
+        assert await AdminDependsUtil.get_user_id_from_token(nullable=True, token=token) is None
+        with pytest.raises(MyException):
+            await AdminDependsUtil.get_user_id_from_token(token=token)
+    finally:
+        AdminContextVars.token_claims.reset(reset)
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_rejected_without_middleware_claims(redis):
+    token = AdminTokenUtil.create_token(2, "admin")
+    assert await AdminDependsUtil.get_user_id_from_token(token=token) == 2
+
+    await AdminTokenUtil.verifier.revoke(token, redis)
+
+    assert await AdminDependsUtil.get_user_id_from_token(nullable=True, token=token) is None
@@ -0,0 +1,188 @@
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, AsyncIterator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.admin.utils import permission_cache as permission_cache_module
+from apps.admin.utils.permission_cache import AdminPermissionCache
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.models.user import Menu, Role, RoleMenu, UserRole
+
+
+class MemoryPubSub:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self.redis.subscribers.setdefault(channel, []).append(self)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self.redis.subscribers.get(channel, []).remove(self)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def listen(self) -> AsyncIterator[dict[str, Any]]:
+        while True:
+            yield await self.queue.get()
+
+
+class MemoryPipeline:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def sadd(self, key: str, *members: str) -> None:
+        self.commands.append(("sadd", (key, *members)))
+
+    def expire(self, key: str, ex: int) -> None:
+        self.commands.append(("expire", (key, ex)))
+
+    async def execute(self) -> list[Any]:
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class MemoryRedis:
+    """
+    多个 worker 共享的内存 Redis，publish 把消息投递到已订阅的 MemoryPubSub。
+    """
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.subscribers: dict[str, list[MemoryPubSub]] = {}
+        self.smembers_calls = 0
+
+    def pipeline(self, transaction: bool) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages: bool) -> MemoryPubSub:
+        return MemoryPubSub(self)
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def incr(self, key: str) -> int:
+        value = int(self.strings.get(key, 0)) + 1
+        self.strings[key] = str(value)
+        return value
+
+    async def publish(self, channel: str, data: Any) -> int:
+        subscribers = self.subscribers.get(channel, [])
+        for pubsub in subscribers:
+            pubsub.queue.put_nowait({"type": "message", "data": str(data)})
+        return len(subscribers)
+
+    async def smembers(self, key: str) -> set[str]:
+        self.smembers_calls += 1
+        return set(self.sets.get(key, set()))
+
+    async def sadd(self, key: str, *members: str) -> int:
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    async def expire(self, key: str, ex: int) -> bool:
+        return True
+
+
+@pytest_asyncio.fixture
+async def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'permission.db'}")
+    async with engine.begin() as conn:
+        tables = [Menu.__table__, Role.__table__, RoleMenu.__table__, UserRole.__table__]
+        await conn.run_sync(Menu.metadata.create_all, tables=tables)
+        await conn.execute(
+            insert(Menu),
+            [
+                {"id": 1, "parent_id": 0, "code": "article:list", "name": "文章", "menu_type": 1, "is_active": True},
+                {"id": 2, "parent_id": 0, "code": "article:delete", "name": "删除", "menu_type": 2, "is_active": True},
+            ],
+        )
+        await conn.execute(insert(Role), [{"id": 1, "code": "editor", "name": "编辑", "is_active": True}])
+        await conn.execute(insert(RoleMenu), [{"id": 1, "role_id": 1, "menu_id": 1}])
+        await conn.execute(insert(UserRole), [{"id": 1, "user_id": 7, "role_id": 1}])
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(permission_cache_module, "db", helper)
+    yield helper
+    await engine.dispose()
+
+
+def make_cache(redis: MemoryRedis) -> AdminPermissionCache:
+    cache = object.__new__(AdminPermissionCache)
+    cache.redis_util = SimpleNamespace(redis=redis)
+    cache._local, cache._version, cache._pubsub, cache._subscriber_task = OrderedDict(), None, None, None
+    return cache
+
+
+async def settle() -> None:
+    # 让订阅任务处理完已投递的消息
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_permissions_are_served_from_local_cache_then_redis(helper):
+    redis = MemoryRedis()
+    first, second = make_cache(redis), make_cache(redis)
+
+    assert await first.has_permission(7, "article:list")
+    assert not await first.has_permission(7, "article:delete")
+    assert redis.smembers_calls == 1
+
+    # 另一个 worker 直接读取物化到 Redis 的权限集合，不再查库
+    await helper.execute(update(Role).values(is_active=False))
+    assert await second.get_permissions(7) == frozenset({"article:list"})
+    # 没有任何权限的用户也缓存空集合
+    assert await second.get_permissions(8) == frozenset()
+    assert await second.get_permissions(8) == frozenset()
+    assert redis.smembers_calls == 3
+
+
+@pytest.mark.asyncio
+async def test_invalidation_is_broadcast_to_every_worker(helper):
+    redis = MemoryRedis()
+    workers = [make_cache(redis) for _ in range(2)]
+    for worker in workers:
+        await worker.start()
+    try:
+        for worker in workers:
+            assert not await worker.has_permission(7, "article:delete")
+
+        await helper.execute(insert(RoleMenu).values(id=2, role_id=1, menu_id=2))
+        await workers[0].invalidate()
+        await settle()
+
+        assert redis.strings[RedisConstant.ADMIN_PERMISSION_VERSION_KEY] == "1"
+        for worker in workers:
+            assert worker._version == 1
+            assert await worker.has_permission(7, "article:delete")
+    finally:
+        for worker in workers:
+            await worker.stop()
+
+
+@pytest.mark.asyncio
+async def test_without_subscription_version_is_read_on_every_check(helper):
+    redis = MemoryRedis()
+    cache, other = make_cache(redis), make_cache(redis)
+    assert await cache.get_permissions(7) == frozenset({"article:list"})
+
+    await helper.execute(update(Menu).where(Menu.id == 1).values(is_active=False))
+    await other.invalidate()
+
+    # 未订阅时每次从 Redis 读版本号，本地缓存的旧版本条目不再命中
+    assert await cache.get_permissions(7) == frozenset()
@@ -0,0 +1,152 @@
+import random
+import time
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import Index, Integer, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Mapped, mapped_column
+
+from apps.base.core.sqlalchemy.base_model import BaseModel
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.exception.my_exception import MyException
+
+
+class KeysetItem(BaseModel):
+    __tablename__ = "t_test_keyset_item"
+    __table_args__ = (Index("idx_test_keyset_item_score", "score", "id"),)
+
+    score: Mapped[int] = mapped_column(Integer)
+
+
+async def make_helper(path: Path, count: int, scores: int) -> tuple[AsyncDBHelper, list[tuple[int, int]]]:
+    """
+    创建 SQLite 数据库并写入 count 条分数在 [0, scores) 内重复的数据。
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(KeysetItem.metadata.create_all, tables=[KeysetItem.__table__])
+        rng = random.Random(7)
+        rows = [{"id": item_id, "score": rng.randrange(scores)} for item_id in range(1, count + 1)]
+        await conn.execute(insert(KeysetItem), rows)
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    helper.cursor_secret = lambda: b"test-cursor-secret"
+    return helper, [(row["id"], row["score"]) for row in rows]
+
+
+@pytest_asyncio.fixture
+async def small(tmp_path: Path) -> AsyncGenerator[tuple[AsyncDBHelper, list[tuple[int, int]]], None]:
+    helper, rows = await make_helper(tmp_path / "small.db", 503, 7)
+    yield helper, rows
+    await helper.session_factory.kw["bind"].dispose()
+
+
+async def walk(helper: AsyncDBHelper, order_cols: list, size: int) -> list[int]:
+    ids: list[int] = []
+    cursor = None
+    while True:
+        page = await helper.keyset_page(select(KeysetItem), order_cols, after=cursor, size=size)
+        ids.extend(item.id for item in page.records)
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "order_cols, key",
+    [
+        ([KeysetItem.score.desc(), KeysetItem.id.desc()], lambda row: (-row[1], -row[0])),
+        ([KeysetItem.score.asc(), KeysetItem.id.asc()], lambda row: (row[1], row[0])),
+        ([KeysetItem.score.desc(), KeysetItem.id.asc()], lambda row: (-row[1], row[0])),
+        # 排序值从查询结果中取，不要求排序字段是模型属性
+        ([(KeysetItem.score % 3).desc(), KeysetItem.id.asc()], lambda row: (-(row[1] % 3), row[0])),
+        ([KeysetItem.score.label("rank").desc(), KeysetItem.id.desc()], lambda row: (-row[1], -row[0])),
+    ],
+    ids=["desc", "asc", "mixed", "expression", "label"],
+)
+async def test_keyset_walk_is_stable_with_duplicate_sort_keys(small, order_cols, key):
+    helper, rows = small
+
+    ids = await walk(helper, order_cols, size=10)
+
+    assert ids == [row[0] for row in sorted(rows, key=key)]
+
+
+@pytest.mark.asyncio
+async def test_keyset_page_returns_total(small):
+    helper, rows = small
+
+    page = await helper.keyset_page(select(KeysetItem), [KeysetItem.id.desc()], size=5, with_total=True)
+
+    assert page.total == len(rows)
+    assert [item.id for item in page.records] == [503, 502, 501, 500, 499]
+
+
+@pytest.mark.asyncio
+async def test_tampered_or_foreign_cursor_is_rejected(small):
+    helper, _ = small
+    order_cols = [KeysetItem.score.desc(), KeysetItem.id.desc()]
+    page = await helper.keyset_page(select(KeysetItem), order_cols, size=10)
+    payload, signature = page.next_cursor.rsplit(".", 1)
+
+    with pytest.raises(MyException):
+        await helper.keyset_page(select(KeysetItem), order_cols, after=f"{payload}x.{signature}", size=10)
+    with pytest.raises(MyException):
+        await helper.keyset_page(select(KeysetItem), [KeysetItem.id.desc()], after=page.next_cursor, size=10)
+
+
+def test_cursor_secret_is_required():
+    with pytest.raises(ValueError):
+        AsyncDBHelper().cursor_secret()
+
+
+async def best_of(runs: int, query: Callable[[], Awaitable[list[int]]]) -> tuple[float, list[int]]:
+    best = float("inf")
+    ids: list[int] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        ids = await query()
+        best = min(best, time.perf_counter() - start)
+    return best, ids
+
+
+@pytest.mark.asyncio
+async def test_benchmark_offset_vs_keyset(tmp_path: Path):
+    size = 10
+    helper, _ = await make_helper(tmp_path / "bench.db", 10_000 * size, 1000)
+    stmt = select(KeysetItem)
+    order_cols = [KeysetItem.score.desc(), KeysetItem.id.desc()]
+    report = []
+    try:
+        for current in (1, 100, 10_000):
+            offset, limit = helper.page(current, size)
+
+            async def offset_query() -> list[int]:
+                records = await helper.model_all(stmt.order_by(*order_cols).offset(offset).limit(limit))
+                return [item.id for item in records]
+
+            # 上一页按页码定位时返回的游标，之后按游标翻页
+            cursor = None
+            if current > 1:
+                previous_offset, _ = helper.page(current - 1, size)
+                previous = await helper.keyset_page(stmt.offset(previous_offset), order_cols, size=size)
+                cursor = previous.next_cursor
+
+            async def keyset_query() -> list[int]:
+                page = await helper.keyset_page(stmt, order_cols, after=cursor, size=size)
+                return [item.id for item in page.records]
+
+            offset_time, offset_ids = await best_of(5, offset_query)
+            keyset_time, keyset_ids = await best_of(5, keyset_query)
+            assert keyset_ids == offset_ids
+            report.append((current, offset_time, keyset_time))
+    finally:
+        await helper.session_factory.kw["bind"].dispose()
+
+    for current, offset_time, keyset_time in report:
+        print(f"page {current:>6}: offset {offset_time * 1000:8.2f} ms  keyset {keyset_time * 1000:8.2f} ms")
+    _, deep_offset, deep_keyset = report[-1]
+    assert deep_keyset < deep_offset
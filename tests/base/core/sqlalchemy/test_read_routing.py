@@ -0,0 +1,199 @@
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import String, insert, select, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Mapped, mapped_column
+
+from apps.base.core.depend_inject import ContainerUtil
+from apps.base.core.sqlalchemy import db_helper as db_helper_module
+from apps.base.core.sqlalchemy.base_model import BaseModel
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.core.sqlalchemy.session import SqlAlchemySessionManager, pin_primary
+
+
+class RouteItem(BaseModel):
+    __tablename__ = "t_test_route_item"
+
+    source: Mapped[str] = mapped_column(String(32))
+
+
+SOURCE = select(RouteItem.source).where(RouteItem.id == 1)
+
+
+async def make_database(path: Path, source: str) -> str:
+    """
+    创建只有一行数据的 SQLite 数据库，数据内容标明所在的库。
+    """
+    url = f"sqlite+aiosqlite:///{path}"
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(RouteItem.metadata.create_all, tables=[RouteItem.__table__])
+        await conn.execute(insert(RouteItem), [{"id": 1, "source": source}])
+    await engine.dispose()
+    return url
+
+
+async def make_manager(
+    monkeypatch: pytest.MonkeyPatch, url: str, replicas: list[dict[str, Any]], **options: Any
+) -> SqlAlchemySessionManager:
+    config = {"url": url, "replicas": replicas, **options}
+    monkeypatch.setattr(ContainerUtil, "_values", {"app.db.sqlalchemy": config})
+    manager = SqlAlchemySessionManager()
+    # 副本状态由测试显式控制，不启动后台健康检查
+    monkeypatch.setattr(manager, "_ensure_health_check", lambda: None)
+    monkeypatch.setattr(db_helper_module, "get_session_manager", lambda: manager)
+    monkeypatch.setattr(db_helper_module, "get_session_factory", lambda: manager.session_factory)
+    return manager
+
+
+@pytest_asyncio.fixture
+async def routed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> AsyncGenerator[tuple[AsyncDBHelper, SqlAlchemySessionManager], None]:
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    replica = await make_database(tmp_path / "replica.db", "replica")
+    manager = await make_manager(monkeypatch, primary, [{"url": replica, "name": "replica1"}])
+    yield AsyncDBHelper(), manager
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_and_are_counted_per_engine(routed):
+    helper, manager = routed
+
+    assert [await helper.scalar(SOURCE) for _ in range(3)] == ["replica"] * 3
+
+    stats = manager.engine_stats()
+    assert stats["replica1"]["queries"] == 3 and stats["replica1"]["checkouts"] >= 1
+    assert stats["primary"]["queries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_transaction_and_read_your_writes_go_to_primary(routed):
+    helper, manager = routed
+
+    with pin_primary():
+        assert await helper.scalar(SOURCE) == "primary"
+    async with helper.atomic() as session:
+        assert await session.scalar(SOURCE) == "primary"
+        await session.execute(update(RouteItem).where(RouteItem.id == 1).values(source="written"))
+    # 写入后的读己之写窗口内读主库，能读到刚提交的数据
+    assert await helper.scalar(SOURCE) == "written"
+    assert manager.engine_stats()["replica1"]["queries"] == 0
+
+    manager.read_your_writes_window = 0
+    assert await helper.scalar(SOURCE) == "replica"
+
+
+@pytest.mark.asyncio
+async def test_request_scope_reuses_one_connection_per_engine(routed):
+    helper, manager = routed
+
+    async with helper.request_scope() as scope:
+        assert [await helper.scalar(SOURCE) for _ in range(4)] == ["replica"] * 4
+        with pin_primary():
+            assert await helper.scalar(SOURCE) == "primary"
+
+    assert scope.connections == 2 and scope.reused == 3
+    assert scope.sessions == {}
+
+
+@pytest.mark.asyncio
+async def test_weighted_round_robin_skips_unhealthy_and_lagging_replicas(tmp_path, monkeypatch):
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    replicas = [
+        {"url": await make_database(tmp_path / "a.db", "a"), "name": "a", "weight": 2},
+        {"url": await make_database(tmp_path / "b.db", "b"), "name": "b"},
+    ]
+    manager = await make_manager(monkeypatch, primary, replicas, replica_max_lag=1)
+    a, b = manager.replicas
+    try:
+        assert [manager.pick_read_replica().name for _ in range(6)] == ["a", "b", "a"] * 2
+
+        b.lag = 10
+        assert {manager.pick_read_replica().name for _ in range(3)} == {"a"}
+
+        a.healthy = False
+        assert manager.pick_read_replica() is None
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_replica_falls_back_to_primary_and_recovers(tmp_path, monkeypatch):
+    primary = await make_database(tmp_path / "primary.db", "primary")
+    replica_path = tmp_path / "down" / "replica.db"
+    # 副本所在目录不存在，连接时抛出 OperationalError
+    manager = await make_manager(monkeypatch, primary, [{"url": f"sqlite+aiosqlite:///{replica_path}"}])
+    helper = AsyncDBHelper()
+    replica = manager.replicas[0]
+    try:
+        assert await helper.scalar(SOURCE) == "primary"
+        assert not replica.healthy
+        checkouts = manager.engine_stats()["replica1"]["checkouts"]
+
+        # 标记不可用后不再尝试副本
+        assert await helper.scalar(SOURCE) == "primary"
+        async with helper.request_scope():
+            assert await helper.scalar(SOURCE) == "primary"
+        assert manager.engine_stats()["replica1"]["checkouts"] == checkouts
+
+        # 健康检查确认副本恢复后重新读副本
+        replica_path.parent.mkdir()
+        await make_database(replica_path, "replica")
+        await manager.check_replica(replica)
+        assert replica.healthy
+        assert await helper.scalar(SOURCE) == "replica"
+    finally:
+        await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_background_task_does_not_use_closed_request_scope(routed):
+    helper, manager = routed
+    started, release = asyncio.Event(), asyncio.Event()
+    results: list[str] = []
+
+    async def background() -> None:
+        started.set()
+        await release.wait()
+        results.append(await helper.scalar(SOURCE))
+
+    async with helper.request_scope() as scope:
+        # 请求内创建的后台任务继承了作用域上下文
+        task = asyncio.create_task(background())
+        await started.wait()
+    release.set()
+    await task
+
+    assert results == ["replica"]
+    assert scope.connections == 0 and scope.sessions == {}
+    assert manager.engine.pool.checkedout() == manager.replicas[0].engine.pool.checkedout() == 0
+
+
+@pytest.mark.asyncio
+async def test_scope_close_waits_for_in_flight_query(routed):
+    helper, _ = routed
+    in_query, release = asyncio.Event(), asyncio.Event()
+    results: list[str] = []
+
+    async def query() -> None:
+        async with helper.read_session() as session:
+            in_query.set()
+            await release.wait()
+            results.append(await session.scalar(SOURCE))
+
+    async with helper.request_scope() as scope:
+        task = asyncio.create_task(query())
+        await in_query.wait()
+        closing = asyncio.create_task(scope.close())
+        await asyncio.sleep(0.01)
+        assert not closing.done() and scope.sessions
+        release.set()
+        await asyncio.gather(task, closing)
+
+    assert results == ["replica"] and scope.sessions == {}
@@ -0,0 +1,144 @@
+import inspect
+import threading
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+from dependency_injector import providers
+
+from apps.base.core.depend_inject import (
+    Autowired,
+    BeanFunc,
+    Component,
+    ContainerUtil,
+    GetBean,
+    GetValue,
+    RefreshScope,
+    Value,
+    container,
+)
+
+BASE_CONFIG = {"snapshot-test": {"endpoint": "a", "name": "blog"}}
+
+
+class LockedOut:
+    """
+    进入即失败的锁，用于断言快照命中时不再加锁。
+    """
+
+    def __enter__(self) -> None:
+        raise AssertionError("快照命中时不应加锁")
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def isolated(monkeypatch: pytest.MonkeyPatch) -> Generator[list[str], None, None]:
+    """
+    使用独立的配置和快照，测试结束后移除测试中注册的组件。
+    """
+    config = providers.Configuration()
+    config.from_dict(BASE_CONFIG)
+    monkeypatch.setattr(container, "config", config)
+    monkeypatch.setattr(ContainerUtil, "_base_config", BASE_CONFIG)
+    monkeypatch.setattr(ContainerUtil, "_beans", {})
+    monkeypatch.setattr(ContainerUtil, "_values", {})
+    refresh_scope = dict(container.refresh_scope.kwargs)
+    rv_dependent = dict(container.rv_dependent_dict.kwargs)
+    names: list[str] = []
+    yield names
+    for name in names:
+        container.providers.pop(name, None)
+    container.refresh_scope.set_kwargs(refresh_scope)
+    container.rv_dependent_dict.set_kwargs(rv_dependent)
+
+
+def test_singleton_is_served_from_the_snapshot_without_the_lock(isolated, monkeypatch):
+    @Component("snapshotSingleton")
+    class SnapshotSingleton:
+        pass
+
+    @Component("snapshotFactory", singleton=False)
+    class SnapshotFactory:
+        pass
+
+    isolated.extend(["snapshotSingleton", "snapshotFactory"])
+
+    bean = GetBean(SnapshotSingleton)
+    assert GetBean("snapshotSingleton") is bean
+    beans = ContainerUtil._beans
+    monkeypatch.setattr(ContainerUtil, "_lock", LockedOut())
+    assert GetBean(SnapshotSingleton) is bean and GetBean("snapshotSingleton") is bean
+
+    # 非单例每次新建，不进入快照；快照写时复制，已发布的字典不会被修改
+    monkeypatch.setattr(ContainerUtil, "_lock", threading.RLock())
+    assert GetBean(SnapshotFactory) is not GetBean(SnapshotFactory)
+    assert ContainerUtil._beans is beans and set(beans) == {SnapshotSingleton, "snapshotSingleton"}
+
+
+def test_config_values_are_cached_only_after_the_server_config_loaded(isolated, monkeypatch):
+    monkeypatch.setattr(ContainerUtil, "_values", None)
+    assert GetValue("snapshot-test.endpoint") == "a"
+    assert ContainerUtil._values is None
+
+    monkeypatch.setattr(ContainerUtil, "_values", {})
+    assert GetValue("snapshot-test.endpoint") == "a"
+    assert GetValue("snapshot-test.missing") is None
+    assert ContainerUtil._values == {"snapshot-test.endpoint": "a"}
+    monkeypatch.setattr(ContainerUtil, "_lock", LockedOut())
+    assert GetValue("snapshot-test.endpoint") == "a"
+
+
+def test_refresh_rebuilds_affected_beans_and_their_dependents(isolated):
+    closed: list[str] = []
+
+    @Component("snapshotClient")
+    @RefreshScope("snapshot-test.endpoint")
+    class SnapshotClient:
+        endpoint: str = Value("snapshot-test.endpoint")
+
+        def close(self) -> None:
+            closed.append(self.endpoint)
+
+    @Component("snapshotService")
+    class SnapshotService:
+        client: SnapshotClient = Autowired()
+
+    @Component("snapshotOther")
+    class SnapshotOther:
+        name: str = Value("snapshot-test.name")
+
+    isolated.extend(["snapshotClient", "snapshotService", "snapshotOther"])
+    service, other = GetBean(SnapshotService), GetBean(SnapshotOther)
+    assert service.client.endpoint == "a"
+
+    ContainerUtil._update_config_and_bean({"content": "snapshot-test:\n  endpoint: b\n"})
+
+    new_service = GetBean(SnapshotService)
+    assert closed == ["a"]
+    assert new_service is not service and new_service.client is not service.client
+    assert new_service.client.endpoint == "b" and GetValue("snapshot-test.endpoint") == "b"
+    # 未受影响的组件保持原实例，基础配置保留
+    assert GetBean(SnapshotOther) is other and GetValue("snapshot-test.name") == "blog"
+
+
+def test_invalid_refresh_keeps_the_current_config(isolated):
+    assert GetValue("snapshot-test.endpoint") == "a"
+
+    ContainerUtil._update_config_and_bean({"content": "- not\n- a dict\n"})
+
+    assert GetValue("snapshot-test.endpoint") == "a"
+
+
+@pytest.mark.asyncio
+async def test_bean_func_is_a_coroutine_dependency(isolated):
+    @Component("snapshotController")
+    class SnapshotController:
+        pass
+
+    isolated.append("snapshotController")
+    dependency = BeanFunc(SnapshotController)
+
+    assert inspect.iscoroutinefunction(dependency)
+    assert await dependency() is GetBean(SnapshotController)
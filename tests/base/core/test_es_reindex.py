@@ -0,0 +1,248 @@
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, AsyncIterator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.constant.es_constant import BaseESConstant
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core import es_reindex as es_reindex_module
+from apps.base.core.es_reindex import ArticleReindexer
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.article import ArticleStatusEnum
+from apps.base.models.article import Article
+from apps.web.core.es import outbox_relay as outbox_relay_module
+from apps.web.core.es.outbox_relay import ArticleEsOutboxRelay
+
+ALIAS = BaseESConstant.ARTICLE_INDEX
+DUAL_WRITE = RedisConstant.ARTICLE_REINDEX_DUAL_WRITE_KEY
+
+
+class FakeIndices:
+    def __init__(self, es: "FakeES") -> None:
+        self.es = es
+        self.settings: dict[str, list[dict[str, Any]]] = {}
+        self.aliases: dict[str, str] = {}
+
+    async def create(self, index: str, mappings: dict[str, Any], settings: dict[str, Any]) -> None:
+        self.es.documents[index] = {}
+        self.settings[index] = [settings]
+
+    async def put_settings(self, index: str, settings: dict[str, Any]) -> None:
+        self.settings[index].append(settings)
+
+    async def refresh(self, index: str) -> None:
+        pass
+
+    async def delete(self, index: str, ignore_unavailable: bool) -> None:
+        self.es.documents.pop(index, None)
+
+    async def exists_alias(self, name: str) -> bool:
+        return name in self.aliases.values()
+
+    async def get_alias(self, name: str) -> dict[str, Any]:
+        return {index: {} for index, alias in self.aliases.items() if alias == name}
+
+    async def exists(self, index: str) -> bool:
+        return index in self.es.documents
+
+    async def update_aliases(self, actions: list[dict[str, Any]]) -> None:
+        self.es.alias_actions.append(actions)
+        for action in actions:
+            (name, target), *_ = action.items()
+            if name == "remove":
+                del self.aliases[target["index"]]
+            elif name == "remove_index":
+                del self.es.documents[target["index"]]
+            else:
+                self.aliases[target["index"]] = target["alias"]
+
+
+class FakeES:
+    """
+    按 external_gte 语义写入的内存 ES，documents 按物理索引保存 (版本号, 文档)，写入别名时写到别名指向的索引。
+    """
+
+    def __init__(self) -> None:
+        self.documents: dict[str, dict[int, tuple[int, dict[str, Any]]]] = {}
+        self.alias_actions: list[list[dict[str, Any]]] = []
+        self.indices = FakeIndices(self)
+        self.failing_ids: set[int] = set()
+
+    def write(self, action: dict[str, Any]) -> dict[str, Any]:
+        index = next((name for name, alias in self.indices.aliases.items() if alias == action["_index"]), None)
+        documents = self.documents[index or action["_index"]]
+        doc_id = int(action["_id"])
+        current = documents.get(doc_id)
+        if doc_id in self.failing_ids:
+            status = 400
+        elif current is not None and action["version"] < current[0]:
+            status = 409
+        else:
+            documents[doc_id] = (action["version"], action["_source"])
+            status = 201
+        return {"index": {"_index": action["_index"], "_id": str(doc_id), "status": status}}
+
+    async def async_streaming_bulk(
+        self, client: Any, actions: AsyncIterator[dict[str, Any]], **kwargs: Any
+    ) -> AsyncIterator[tuple[bool, dict[str, Any]]]:
+        async for action in actions:
+            item = self.write(action)
+            yield item["index"]["status"] < 300, item
+
+    async def async_bulk(self, client: Any, actions: list[dict[str, Any]], **kwargs: Any) -> tuple[int, list]:
+        errors = [item for item in map(self.write, actions) if item["index"]["status"] >= 300]
+        return len(actions) - len(errors), errors
+
+
+class MemoryRedis:
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.strings[key] = value
+
+    async def delete(self, key: str) -> None:
+        self.strings.pop(key, None)
+
+
+def article(article_id: int, **values: Any) -> dict[str, Any]:
+    return {
+        "id": article_id,
+        "user_id": 1,
+        "title": f"article {article_id}",
+        "cover": "",
+        "category_id": 1,
+        "content": f"<p>article <b>{article_id}</b></p>",
+        "original_url": "",
+        "status": ArticleStatusEnum.PUBLISHED,
+        "create_time": datetime(2026, 1, 1),
+        "is_deleted": False,
+        **values,
+    }
+
+
+async def build_documents(articles: list[Article]) -> list[dict[str, Any]]:
+    return [{"id": item.id, "title": item.title, "content": item.content} for item in articles]
+
+
+@pytest_asyncio.fixture
+async def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'reindex.db'}")
+    async with engine.begin() as conn:
+        # 分片流式读取期间还要写入文章，WAL 模式下读写互不阻塞
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await conn.run_sync(Article.metadata.create_all, tables=[Article.__table__])
+        await conn.execute(insert(Article), [article(i, is_deleted=i == 4) for i in range(1, 11)])
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(es_reindex_module, "db", helper)
+    monkeypatch.setattr(outbox_relay_module, "db", helper)
+    yield helper
+    await engine.dispose()
+
+
+@pytest.fixture
+def es(monkeypatch: pytest.MonkeyPatch) -> FakeES:
+    es = FakeES()
+    monkeypatch.setattr(es_reindex_module, "helpers", es)
+    return es
+
+
+def make_relay(es: FakeES, redis: MemoryRedis) -> ArticleEsOutboxRelay:
+    async def get_article_detail_by_ids(articles: list[Article]) -> list[SimpleNamespace]:
+        return [
+            SimpleNamespace(
+                id=item.id, model_dump=lambda item=item: {"id": item.id, "title": item.title, "content": item.content}
+            )
+            for item in articles
+        ]
+
+    relay = object.__new__(ArticleEsOutboxRelay)
+    relay.es_util = SimpleNamespace(client=es, helpers=es)
+    relay.article_dao = SimpleNamespace(get_article_detail_by_ids=get_article_detail_by_ids)
+    relay.redis_util = SimpleNamespace(redis=redis)
+    return relay
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("existing", ["alias", "index"])
+async def test_slices_load_every_article_and_switch_the_alias(helper, es, existing):
+    if existing == "alias":
+        es.documents["article_v1"] = {}
+        es.indices.aliases["article_v1"] = ALIAS
+    else:
+        # 最早的版本直接使用名为 article 的物理索引
+        es.documents[ALIAS] = {}
+    redis = MemoryRedis()
+    reindexer = ArticleReindexer(es, redis, build_documents, slices=3, chunk_size=2)
+
+    index_name, progress = await reindexer.run()
+
+    assert sorted(es.documents[index_name]) == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+    assert es.documents[index_name][2] == (0, {"id": 2, "title": "article 2", "content": "article 2"})
+    assert (progress.done, progress.failed, progress.total) == (9, 0, 9)
+    assert es.indices.settings[index_name] == [ArticleReindexer.LOAD_SETTINGS, ArticleReindexer.RESTORE_SETTINGS]
+    assert es.indices.aliases == {index_name: ALIAS}
+    remove = (
+        {"remove": {"index": "article_v1", "alias": ALIAS}}
+        if existing == "alias"
+        else {"remove_index": {"index": ALIAS}}
+    )
+    assert es.alias_actions == [[remove, {"add": {"index": index_name, "alias": ALIAS, "is_write_index": True}}]]
+    assert DUAL_WRITE not in redis.strings
+
+
+@pytest.mark.asyncio
+async def test_changes_during_the_rebuild_are_dual_written_and_not_overwritten(helper, es):
+    es.documents["article_v1"] = {}
+    es.indices.aliases["article_v1"] = ALIAS
+    redis = MemoryRedis()
+    relay = make_relay(es, redis)
+    dual_written: list[str] = []
+
+    async def build_documents_with_edit(articles: list[Article]) -> list[dict[str, Any]]:
+        if not dual_written:
+            # 重建进行中文章被编辑，发件箱中继同步时双写到新索引
+            dual_written.append(redis.strings[DUAL_WRITE])
+            await helper.execute(update(Article).where(Article.id == 5).values(title="edited", es_version=1))
+            assert await relay._bulk_sync({5: [SimpleNamespace(id=1, doc_id=5, attempts=0)]}) == {}
+        return await build_documents(articles)
+
+    index_name, progress = await ArticleReindexer(es, redis, build_documents_with_edit, slices=2, chunk_size=2).run()
+
+    assert dual_written == [index_name]
+    # 批量写入使用版本 0，被拒绝后计为完成，双写的新数据保留
+    assert es.documents[index_name][5] == (
+        1,
+        {"id": 5, "title": "edited", "content": "article 5", "hot_score": 0.0},
+    )
+    assert es.documents["article_v1"][5][0] == 1
+    assert (progress.done, progress.failed) == (9, 0)
+
+    # 重建结束后不再双写
+    await helper.execute(update(Article).where(Article.id == 6).values(title="later", es_version=1))
+    await relay._bulk_sync({6: [SimpleNamespace(id=2, doc_id=6, attempts=0)]})
+    assert es.documents[index_name][6][1]["title"] == "later"
+    assert 6 not in es.documents["article_v1"]
+
+
+@pytest.mark.asyncio
+async def test_failed_documents_keep_the_old_alias_and_drop_the_new_index(helper, es):
+    es.documents["article_v1"] = {}
+    es.indices.aliases["article_v1"] = ALIAS
+    es.failing_ids = {7}
+    redis = MemoryRedis()
+
+    with pytest.raises(RuntimeError):
+        await ArticleReindexer(es, redis, build_documents, slices=2).run()
+
+    assert list(es.documents) == ["article_v1"]
+    assert es.indices.aliases == {"article_v1": ALIAS}
+    assert DUAL_WRITE not in redis.strings
@@ -0,0 +1,154 @@
+import asyncio
+import socket
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from apps.base.core.depend_inject import ContainerUtil
+from apps.base.core.http_client import CircuitOpenError, HttpClientPool
+
+
+class Upstream:
+    """
+    本地上游服务，记录每个请求的方法和客户端端口，flaky 接口前 failures 次返回 503。
+    """
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, str, int]] = []
+        self.failures = 0
+        self.app = web.Application()
+        self.app.router.add_route("*", "/{name}", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.calls.append((request.method, name, request.transport.get_extra_info("peername")[1]))
+        if name == "flaky" and self.failures > 0:
+            self.failures -= 1
+            return web.Response(status=503)
+        return web.json_response({"name": name})
+
+
+def make_pool(monkeypatch: pytest.MonkeyPatch, **config: Any) -> HttpClientPool:
+    monkeypatch.setattr(ContainerUtil, "_values", {"app.http-client": {"backoff-base": 0.001, **config}})
+    return HttpClientPool()
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://localhost:{port}/"
+
+
+@pytest_asyncio.fixture
+async def upstream() -> AsyncGenerator[tuple[Upstream, TestServer], None]:
+    upstream = Upstream()
+    server = TestServer(upstream.app)
+    await server.start_server()
+    yield upstream, server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_requests_share_one_session_and_keep_alive_connection(upstream, monkeypatch):
+    upstream, server = upstream
+    pool = make_pool(monkeypatch)
+
+    for name in ("a", "b", "c"):
+        async with pool.request("GET", server.make_url(f"/{name}")) as response:
+            assert await response.json() == {"name": name}
+    session = pool.session
+
+    # 连接在退出上下文时归还连接池，三次请求复用同一条长连接
+    assert len({port for _, _, port in upstream.calls}) == 1
+    assert session.connector._acquired == set()
+
+    await pool.close()
+    assert session.closed and pool._session is None
+    await pool.close()
+    # 关闭后再次使用时重新创建会话
+    async with pool.request("GET", server.make_url("/d")) as response:
+        assert response.status == 200
+    assert pool.session is not session
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idempotent_requests_are_retried_on_gateway_errors(upstream, monkeypatch):
+    upstream, server = upstream
+    pool = make_pool(monkeypatch, retries=2)
+    try:
+        upstream.failures = 2
+        async with pool.request("GET", server.make_url("/flaky")) as response:
+            assert response.status == 200
+        assert [method for method, _, _ in upstream.calls] == ["GET"] * 3
+
+        # 非幂等请求不重试，直接返回上游响应
+        upstream.calls.clear()
+        upstream.failures = 1
+        async with pool.request("POST", server.make_url("/flaky")) as response:
+            assert response.status == 503
+        assert len(upstream.calls) == 1
+
+        # 重试用尽时返回最后一次响应
+        upstream.failures = 5
+        async with pool.request("GET", server.make_url("/flaky")) as response:
+            assert response.status == 503
+        assert upstream.failures == 2
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_consecutive_failures_and_half_opens(upstream, monkeypatch):
+    upstream, server = upstream
+    pool = make_pool(monkeypatch, retries=0, **{"breaker-failures": 2, "breaker-reset": 0.05})
+    url = closed_port_url()
+    try:
+        for _ in range(2):
+            with pytest.raises(aiohttp.ClientConnectionError):
+                async with pool.request("GET", url):
+                    pass
+        with pytest.raises(CircuitOpenError):
+            async with pool.request("GET", url):
+                pass
+        # 熔断按主机隔离
+        async with pool.request("GET", server.make_url("/ok")) as response:
+            assert response.status == 200
+
+        # 冷却后放行一次请求，仍失败时重新打开
+        await asyncio.sleep(0.06)
+        with pytest.raises(aiohttp.ClientConnectionError):
+            async with pool.request("GET", url):
+                pass
+        with pytest.raises(CircuitOpenError):
+            async with pool.request("GET", url):
+                pass
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_errors_are_retried_before_raising(monkeypatch):
+    pool = make_pool(monkeypatch, retries=2, **{"breaker-failures": 10})
+    attempts = 0
+    request = aiohttp.ClientSession.request
+
+    async def counting_request(self: aiohttp.ClientSession, *args: Any, **kwargs: Any) -> aiohttp.ClientResponse:
+        nonlocal attempts
+        attempts += 1
+        return await request(self, *args, **kwargs)
+
+    monkeypatch.setattr(aiohttp.ClientSession, "request", counting_request)
+    try:
+        with pytest.raises(aiohttp.ClientConnectionError):
+            async with pool.request("GET", closed_port_url()):
+                pass
+        assert attempts == 3
+    finally:
+        await pool.close()
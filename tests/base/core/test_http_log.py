@@ -0,0 +1,108 @@
+import json
+from typing import Any, AsyncIterator
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from apps.base.core.depend_inject import ContainerUtil
+from apps.base.core.http_log import BaseHttpLogMiddleware, BodyTee
+
+MAX_BODY_SIZE = 64
+
+
+class ListLogger:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def info(self, message: str) -> None:
+        self.lines.append(message)
+
+    def warning(self, message: str) -> None:
+        self.lines.append(message)
+
+
+def make_app() -> FastAPI:
+    api = FastAPI()
+
+    @api.post("/echo")
+    async def echo(request: Request) -> dict[str, Any]:
+        body = await request.body()
+        return {"size": len(body)}
+
+    @api.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def events() -> AsyncIterator[bytes]:
+            for i in range(3):
+                yield f"data: {i}\n\n".encode()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @api.get("/api/{name}")
+    async def api_route(name: str) -> str:
+        return name
+
+    return api
+
+
+async def run(
+    monkeypatch: pytest.MonkeyPatch, config: dict[str, Any], requests: list[tuple[str, str, bytes | None]]
+) -> tuple[list[httpx.Response], list[str]]:
+    monkeypatch.setattr(ContainerUtil, "_values", {"app.http-log": config})
+    logger = ListLogger()
+    middleware = BaseHttpLogMiddleware(make_app(), logger)
+    responses = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+        for method, path, content in requests:
+            headers = {"content-type": "application/json"} if content is not None else {}
+            responses.append(await client.request(method, path, content=content, headers=headers))
+    # 日志在后台队列中格式化，关闭时刷出
+    await middleware.close()
+    return responses, logger.lines
+
+
+def test_body_tee_keeps_only_the_prefix():
+    tee = BodyTee(4)
+    for chunk in (b"ab", b"", b"cdef", b"gh"):
+        tee.write(chunk)
+
+    assert bytes(tee.buffer) == b"abcd" and tee.size == 8 and tee.truncated
+
+
+@pytest.mark.asyncio
+async def test_large_body_is_streamed_through_and_only_prefix_is_logged(monkeypatch):
+    body = json.dumps({"text": "x" * 10_000}).encode()
+
+    (response,), (line,) = await run(monkeypatch, {"max-body-size": MAX_BODY_SIZE}, [("POST", "/echo", body)])
+
+    assert response.json() == {"size": len(body)}
+    request_data = line.split("|")[4]
+    # 截断的 JSON 不再解析，原样记录前缀
+    assert request_data == body[:MAX_BODY_SIZE].decode()
+    assert line.split("|")[5] == json.dumps({"size": len(body)})
+
+
+@pytest.mark.asyncio
+async def test_small_json_is_reencoded_and_event_stream_is_not_captured(monkeypatch):
+    (echo, stream), (echo_line, stream_line) = await run(
+        monkeypatch, {}, [("POST", "/echo", b'{ "a" : 1 }'), ("GET", "/stream", None)]
+    )
+
+    assert echo.status_code == stream.status_code == 200
+    assert echo_line.split("|")[4] == '{"a": 1}'
+    # 流式响应原样透传，日志中不记录 body
+    assert stream.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+    assert stream_line.split("|")[5] == "-"
+
+
+@pytest.mark.asyncio
+async def test_sample_rates_match_exact_paths_before_prefixes(monkeypatch):
+    config = {"sample-rates": {"/api/*": 0, "/api/keep": 1}}
+
+    responses, lines = await run(
+        monkeypatch, config, [("GET", "/api/drop", None), ("GET", "/api/keep", None), ("GET", "/stream", None)]
+    )
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert [line.split("|")[3] for line in lines] == ["/api/keep", "/stream"]
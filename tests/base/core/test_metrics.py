@@ -0,0 +1,115 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from apps.base.core.metrics import MULTIPROC_DIR_ENV, Histogram, MetricsMiddleware, MetricsServer
+
+ROOT = Path(__file__).parents[3]
+BUCKETS = (0.1, 0.5, 1.0)
+SCRAPE_HISTOGRAM = Histogram("test_scrape_duration_seconds", "测试用直方图", ("job",), buckets=BUCKETS)
+# 另一个 worker 进程：注册同名直方图并记录观测值后退出
+WORKER_CODE = f"""
+from apps.base.core.metrics import Histogram
+Histogram("test_worker_duration_seconds", "测试用直方图", ("job",), buckets={BUCKETS}).labels("sync").observe(0.7)
+"""
+
+
+async def scrape(port: int, path: str = "/metrics") -> tuple[str, dict[str, float]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = (await reader.read()).decode()
+    writer.close()
+    await writer.wait_closed()
+    head, body = response.split("\r\n\r\n", 1)
+    status = head.split("\r\n", 1)[0]
+    samples = {}
+    for line in body.splitlines() if status.endswith("200 OK") else []:
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return status, samples
+
+
+def server_port(server: MetricsServer) -> int:
+    return server._server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_scrape_returns_cumulative_histogram_buckets():
+    for value in (0.05, 0.1, 0.3, 0.8, 2.0):
+        SCRAPE_HISTOGRAM.labels("sync").observe(value)
+    server = MetricsServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        status, samples = await scrape(server_port(server))
+        not_found, _ = await scrape(server_port(server), "/openapi.json")
+    finally:
+        await server.stop()
+
+    assert status == "HTTP/1.1 200 OK" and "404" in not_found
+    name = "test_scrape_duration_seconds"
+    # 等于上界的观测值计入该桶，每个桶都是累计计数
+    assert samples[f'{name}_bucket{{job="sync",le="0.1"}}'] == 2
+    assert samples[f'{name}_bucket{{job="sync",le="0.5"}}'] == 3
+    assert samples[f'{name}_bucket{{job="sync",le="1.0"}}'] == 4
+    assert samples[f'{name}_bucket{{job="sync",le="+Inf"}}'] == 5
+    assert samples[f'{name}_count{{job="sync"}}'] == 5
+    assert samples[f'{name}_sum{{job="sync"}}'] == pytest.approx(3.25)
+
+
+@pytest.mark.asyncio
+async def test_workers_share_port_and_scrape_aggregates_all_processes(tmp_path, monkeypatch):
+    monkeypatch.setenv(MULTIPROC_DIR_ENV, str(tmp_path))
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    subprocess.run([sys.executable, "-c", WORKER_CODE], cwd=ROOT, env=env, check=True)
+    worker_histogram = Histogram("test_worker_duration_seconds", "测试用直方图", ("job",), buckets=BUCKETS)
+    worker_histogram.labels("sync").observe(0.2)
+
+    first = MetricsServer("127.0.0.1", 0, reuse_port=True)
+    await first.start()
+    second = MetricsServer("127.0.0.1", server_port(first), reuse_port=True)
+    await second.start()
+    try:
+        _, samples = await scrape(server_port(first))
+    finally:
+        await second.stop()
+        await first.stop()
+
+    name = "test_worker_duration_seconds"
+    assert samples[f'{name}_bucket{{job="sync",le="0.1"}}'] == 0
+    assert samples[f'{name}_bucket{{job="sync",le="0.5"}}'] == 1
+    assert samples[f'{name}_bucket{{job="sync",le="1.0"}}'] == 2
+    assert samples[f'{name}_count{{job="sync"}}'] == 2
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template():
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    async def item(item_id: int) -> int:
+        return item_id
+
+    app = MetricsMiddleware(api, app_name="test")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for item_id in (1, 2):
+            assert (await client.get(f"/items/{item_id}")).status_code == 200
+        assert (await client.get("/metrics")).status_code == 404
+
+    server = MetricsServer("127.0.0.1", 0)
+    await server.start()
+    try:
+        _, samples = await scrape(server_port(server))
+    finally:
+        await server.stop()
+
+    prefix = 'http_request_duration_seconds_count{app="test",method="GET"'
+    assert samples[f'{prefix},route="/items/{{item_id}}",status="200"}}'] == 2
+    assert samples[f'{prefix},route="unmatched",status="404"}}'] == 1
@@ -0,0 +1,139 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from apps.base.core import query_stats as query_stats_module
+from apps.base.core.depend_inject import ContainerUtil
+from apps.base.core.query_stats import (
+    STATS_HEADER,
+    QueryStatsMiddleware,
+    instrument_engine,
+    record_redis_command,
+    redis_fingerprint,
+    sql_fingerprint,
+    track_queries,
+)
+
+
+class ListLogger:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def warning(self, message: str) -> None:
+        self.lines.append(message)
+
+
+@pytest.fixture
+def logs(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    logger = ListLogger()
+    monkeypatch.setattr(query_stats_module, "logger", logger)
+    return logger.lines
+
+
+def configure(monkeypatch: pytest.MonkeyPatch, config: dict[str, Any]) -> None:
+    monkeypatch.setattr(ContainerUtil, "_values", {"app.query-stats": config})
+
+
+@pytest_asyncio.fixture
+async def engine() -> AsyncGenerator[AsyncEngine, None]:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    instrument_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE article (id INTEGER PRIMARY KEY, title TEXT)"))
+        await conn.execute(text("INSERT INTO article VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    await engine.dispose()
+
+
+def test_fingerprints_ignore_literals_in_lists_and_whitespace():
+    assert sql_fingerprint("SELECT *\n  FROM article WHERE id = 1 AND title = 'it''s'") == sql_fingerprint(
+        "SELECT * FROM article WHERE id = 22 AND title = 'x'"
+    )
+    assert sql_fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?)"
+    assert sql_fingerprint("SELECT * FROM t WHERE id IN (%s,%s)") == sql_fingerprint("SELECT * FROM t WHERE id IN (%s)")
+    assert sql_fingerprint("SELECT * FROM t2") != sql_fingerprint("SELECT * FROM t3 WHERE a = 1")
+    assert redis_fingerprint(["get", "article:12:view"]) == redis_fingerprint(["GET", "article:7:view"])
+    assert redis_fingerprint(["GET", "article:12:view"]) == "REDIS GET article:?:view"
+    assert redis_fingerprint(["PING"]) == "REDIS PING" and redis_fingerprint([]) == "REDIS"
+
+
+@pytest.mark.asyncio
+async def test_loop_of_single_row_queries_is_reported_as_repeated(engine, logs, monkeypatch):
+    configure(monkeypatch, {})
+    with track_queries() as stats:
+        async with engine.connect() as conn:
+            for article_id in (1, 2, 3):
+                await conn.execute(text(f"SELECT title FROM article WHERE id = {article_id}"))
+            await conn.execute(text("SELECT count(*) FROM article"))
+        record_redis_command(["GET", "user:1"], 0.001)
+
+    assert (stats.sql_count, stats.redis_count) == (4, 1)
+    assert stats.sql_time > 0
+    assert stats.repeated(2) == [("SELECT title FROM article WHERE id = ?", 3)]
+    assert stats.repeated(3) == []
+    assert logs == []
+
+    # 上下文外的调用不计数
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    assert stats.sql_count == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_does_not_leak_its_start_time(engine, monkeypatch):
+    configure(monkeypatch, {})
+    with track_queries() as stats:
+        async with engine.connect() as conn:
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing"))
+            await conn.execute(text("SELECT 1"))
+            assert conn.sync_connection.info.get("query_start_time") == []
+
+    assert stats.sql_count == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_calls_are_logged(logs, monkeypatch):
+    configure(monkeypatch, {"slow-redis-ms": 5})
+
+    record_redis_command(["GET", "fast"], 0.001)
+    record_redis_command(["HGETALL", "slow"], 0.01)
+
+    assert len(logs) == 1 and "REDIS HGETALL slow" in logs[0]
+
+
+@pytest.mark.asyncio
+async def test_middleware_warns_about_n_plus_one_and_returns_the_header(engine, logs, monkeypatch):
+    configure(monkeypatch, {"header": True, "repeat-threshold": 2})
+    api = FastAPI()
+
+    @api.get("/articles")
+    async def articles() -> list[str]:
+        titles = []
+        async with engine.connect() as conn:
+            for article_id in (1, 2, 3):
+                titles.append((await conn.execute(text(f"SELECT title FROM article WHERE id = {article_id}"))).scalar())
+        return titles
+
+    @api.get("/one")
+    async def one() -> str:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT title FROM article WHERE id = 1"))).scalar()
+
+    transport = httpx.ASGITransport(app=QueryStatsMiddleware(api))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/articles")
+        assert response.json() == ["a", "b", "c"]
+        assert response.headers[STATS_HEADER].startswith("sql=3;")
+        assert len(logs) == 1 and "/articles" in logs[0] and "3 次" in logs[0]
+
+        # 统计按请求隔离
+        response = await client.get("/one")
+        assert response.headers[STATS_HEADER].startswith("sql=1;")
+        assert len(logs) == 1
@@ -0,0 +1,52 @@
+import random
+import re
+
+import pytest
+
+from apps.base.utils.html_util import HtmlUtil
+
+TAGS = ["<p>", "</p>", "<div class='a'>", "</div>", '<a href="/x?y=1">', "</a>", "<br/>", "<img src=x>", "<B>"]
+TEXTS = ["ab", " ", "中文", "\n", "x y", "> ", "1", "\n\n"]
+
+
+def old_remove_html_tags(text: str) -> str:
+    # 旧实现：换行替换为空格后逐个删除标签
+    return re.sub(r"<[^>]+>", "", text.replace("\n", " "))
+
+
+def random_html(rng: random.Random) -> str:
+    return "".join(rng.choice(TAGS if rng.random() < 0.4 else TEXTS) for _ in range(rng.randrange(0, 30)))
+
+
+def test_matches_the_old_regex_on_well_formed_input():
+    rng = random.Random(14)
+    texts = [random_html(rng) for _ in range(2000)]
+
+    assert [HtmlUtil.remove_html_tags(text) for text in texts] == [old_remove_html_tags(text) for text in texts]
+    assert HtmlUtil.remove_html_tags_batch(texts[:50]) == [old_remove_html_tags(text) for text in texts[:50]]
+
+
+def test_max_length_is_a_prefix_of_the_full_text():
+    rng = random.Random(15)
+    for _ in range(500):
+        text = random_html(rng) + "&amp;" + random_html(rng)
+        full = HtmlUtil.remove_html_tags(text)
+        max_length = rng.randrange(0, len(full) + 2)
+        assert HtmlUtil.remove_html_tags(text, max_length) == full[:max_length]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (None, ""),
+        ("", ""),
+        ("plain text", "plain text"),
+        ("<p>a</p><script type='x'>alert('<b>')</script>b<STYLE>p{}</style >c", "abc"),
+        ("a<!-- <p>hidden</p> -->b", "ab"),
+        ("&lt;tag&gt; &amp;amp; &#20013;&#x6587; &nbsp;&unknown;", "<tag> &amp; 中文 \xa0&unknown;"),
+        ("intro\n```python\nprint(1)\n```\n~~~\nx\n~~~", "intro  print(1)   x "),
+        ("`inline` and ~tilde~", "`inline` and ~tilde~"),
+    ],
+)
+def test_special_content(text, expected):
+    assert HtmlUtil.remove_html_tags(text) == expected
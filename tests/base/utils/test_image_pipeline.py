@@ -0,0 +1,87 @@
+import asyncio
+import io
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+
+from apps.base.core.depend_inject import ContainerUtil
+from apps.base.utils.image_pipeline import ImagePipeline, ImagePipelineBusyError, ThumbnailVariant, render_thumbnails
+
+
+def encode(image: Image.Image, image_format: str, **params: object) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format=image_format, **params)
+    return output.getvalue()
+
+
+def webp_size(body: bytes) -> tuple[int, int]:
+    with Image.open(io.BytesIO(body)) as image:
+        assert image.format == "WEBP"
+        return image.size
+
+
+@pytest_asyncio.fixture
+async def pipeline(monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[ImagePipeline, None]:
+    monkeypatch.setattr(ContainerUtil, "_values", {"app.image-pipeline": {"workers": 1, "admission-timeout": 0.05}})
+    pipeline = ImagePipeline()
+    yield pipeline
+    pipeline.close()
+
+
+def test_variants_are_rendered_from_one_decode_in_the_requested_order():
+    body = encode(Image.new("RGB", (2000, 1000), "red"), "JPEG")
+
+    thumbs = render_thumbnails(body, ((320, 82, 4), (1280, 82, 4), (4000, 82, 0)))
+
+    # 比原图宽的规格不放大
+    assert [webp_size(thumb) for thumb in thumbs] == [(320, 160), (1280, 640), (2000, 1000)]
+
+
+def test_exif_orientation_and_palette_images_are_normalised():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 顺时针旋转 90 度
+    rotated = encode(Image.new("RGB", (200, 100)), "JPEG", exif=exif)
+    palette = encode(Image.new("P", (100, 50)), "PNG")
+
+    assert webp_size(render_thumbnails(rotated, ((1000, 82, 4),))[0]) == (100, 200)
+    assert webp_size(render_thumbnails(palette, ((40, 82, 4),))[0]) == (40, 20)
+
+
+@pytest.mark.asyncio
+async def test_rendering_runs_in_the_process_pool_without_blocking_the_loop(pipeline):
+    body = encode(Image.effect_noise((1600, 1600), 64).convert("RGB"), "PNG")
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    try:
+        thumbs = await pipeline.render(body, [ThumbnailVariant(max_width=320), ThumbnailVariant(max_width=800)])
+    finally:
+        ticker.cancel()
+
+    assert [webp_size(thumb) for thumb in thumbs] == [(320, 320), (800, 800)]
+    assert ticks > 0
+    assert pipeline._pool is not None and pipeline._slots._value == pipeline.max_pending
+    pipeline.close()
+    assert pipeline._pool is None
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_after_the_admission_timeout(pipeline):
+    body = encode(Image.new("RGB", (64, 64)), "PNG")
+    pipeline._slots = asyncio.Semaphore(1)
+    await pipeline._slots.acquire()
+
+    with pytest.raises(ImagePipelineBusyError):
+        await pipeline.thumbnail(body, ThumbnailVariant(max_width=32))
+
+    # 空位释放后恢复处理
+    pipeline._slots.release()
+    assert webp_size(await pipeline.thumbnail(body, ThumbnailVariant(max_width=32))) == (32, 32)
@@ -0,0 +1,113 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from apps.base.utils.singleflight_util import SingleFlight
+
+
+class MemoryRedis:
+    """
+    多个进程共享的内存 Redis，只实现锁和缓存用到的 SET/GET/EVAL，忽略过期时间。
+    """
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def set(self, key: str, value: str, ex: Any = None, px: int | None = None, nx: bool = False) -> bool:
+        if nx and key in self.strings:
+            return False
+        self.strings[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        # 只用于释放锁：token 一致时删除
+        if self.strings.get(key) == token:
+            del self.strings[key]
+            return 1
+        return 0
+
+
+class Source:
+    """
+    回源计数器，回源时先让出事件循环，模拟慢查询，再写入缓存。
+    """
+
+    def __init__(self, redis: MemoryRedis, key: str = "cache") -> None:
+        self.redis = redis
+        self.key = key
+        self.calls = 0
+
+    async def load(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        await self.redis.set(self.key, "value")
+        return "value"
+
+    async def cached(self) -> str | None:
+        return await self.redis.get(self.key)
+
+
+def make_flight(redis: MemoryRedis, lock_ttl_ms: int = 1000) -> SingleFlight[str]:
+    return SingleFlight(redis, "lock", lock_ttl_ms=lock_ttl_ms, poll_interval_ms=1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_in_one_process_share_one_load():
+    redis = MemoryRedis()
+    flight, source = make_flight(redis), Source(redis)
+
+    results = await asyncio.gather(*(flight.do("k", source.load, source.cached) for _ in range(20)))
+
+    assert results == ["value"] * 20
+    assert source.calls == 1
+    # 回源结束后释放锁并移除登记
+    assert redis.strings == {"cache": "value"} and flight._tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_processes_sharing_redis_wait_for_the_lock_holder():
+    redis = MemoryRedis()
+    flights, source = [make_flight(redis) for _ in range(3)], Source(redis)
+
+    results = await asyncio.gather(
+        *(flight.do("k", source.load, source.cached) for flight in flights for _ in range(5))
+    )
+
+    assert results == ["value"] * 15
+    assert source.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_loads_by_itself_when_the_lock_holder_never_fills_the_cache():
+    redis = MemoryRedis()
+    # 其他进程持有锁后崩溃，锁直到过期前都不会释放
+    redis.strings["lock:k"] = "other"
+    flight, source = make_flight(redis, lock_ttl_ms=20), Source(redis)
+
+    assert await flight.do("k", source.load, source.cached) == "value"
+    assert source.calls == 1
+    assert redis.strings["lock:k"] == "other"
+
+
+@pytest.mark.asyncio
+async def test_failed_load_is_raised_to_every_caller_and_not_remembered():
+    redis = MemoryRedis()
+    flight, source = make_flight(redis), Source(redis)
+    calls = 0
+
+    async def fail() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("es down")
+
+    results = await asyncio.gather(*(flight.do("k", fail, source.cached) for _ in range(3)), return_exceptions=True)
+
+    assert calls == 1 and all(isinstance(result, RuntimeError) for result in results)
+    assert "lock:k" not in redis.strings
+    # 失败不会缓存，下一次调用重新回源
+    assert await flight.do("k", source.load, source.cached) == "value"
@@ -0,0 +1,149 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from apps.base.utils import snowflake as snowflake_module
+from apps.base.utils.snowflake import MAX_NODE_ID, SnowflakeIDGenerator, WorkerIdLease
+
+ROOT = Path(__file__).parents[3]
+# 启动后报告机器 ID，等所有进程都持有租约后再生成 ID
+WORKER_CODE = """
+import sys, time
+from pathlib import Path
+from apps.base.utils.snowflake import SnowflakeIDGenerator
+print(SnowflakeIDGenerator.start(), flush=True)
+go = Path(sys.argv[1])
+while not go.exists():
+    time.sleep(0.01)
+ids = [SnowflakeIDGenerator.generate_id() for _ in range(20000)] + SnowflakeIDGenerator.next_ids(20000)
+print(" ".join(map(str, ids)), flush=True)
+"""
+
+
+class FakeRedis:
+    """
+    多个客户端共享的内存 Redis，只实现租约用到的 SET NX EX 和两个脚本。
+    """
+
+    def __init__(self, store: dict[str, str], set_delay: float = 0) -> None:
+        self.store = store
+        self.set_delay = set_delay
+        self.lock = threading.Lock()
+
+    def set(self, key: str, value: str, nx: bool, ex: int) -> bool:
+        time.sleep(self.set_delay)
+        with self.lock:
+            if key in self.store:
+                return False
+            self.store[key] = value
+            return True
+
+    def eval(self, script: str, numkeys: int, key: str, token: str, *args: Any) -> int:
+        with self.lock:
+            current = self.store.get(key)
+            if script == WorkerIdLease.RELEASE_SCRIPT:
+                return int(current == token and self.store.pop(key) is not None)
+            if current is None:
+                self.store[key] = token
+            return int(self.store[key] == token)
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def redis_store(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    store: dict[str, str] = {}
+    monkeypatch.setattr(WorkerIdLease, "_redis_config", staticmethod(lambda: {"host": "fake"}))
+    monkeypatch.setattr(snowflake_module, "Redis", lambda **kwargs: FakeRedis(store))
+    return store
+
+
+@pytest.fixture
+def generator():
+    SnowflakeIDGenerator.close()
+    yield SnowflakeIDGenerator
+    SnowflakeIDGenerator.close()
+
+
+def test_processes_get_distinct_node_ids_and_never_duplicate_ids(tmp_path):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "SNOWFLAKE_LOCK_DIR": str(tmp_path)}
+    go = tmp_path / "go"
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER_CODE, str(go)], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True
+        )
+        for _ in range(4)
+    ]
+    try:
+        node_ids = [int(worker.stdout.readline()) for worker in workers]
+        go.touch()
+        outputs = [worker.communicate(timeout=60)[0] for worker in workers]
+    finally:
+        for worker in workers:
+            worker.kill()
+
+    assert len(set(node_ids)) == len(workers)
+    ids = [int(value) for output in outputs for value in output.split()]
+    assert len(ids) == len(set(ids)) == 40000 * len(workers)
+    assert {(value >> 12) & MAX_NODE_ID for value in ids} == set(node_ids)
+
+
+def test_leases_in_redis_do_not_share_node_ids(redis_store):
+    leases = [WorkerIdLease() for _ in range(50)]
+    try:
+        node_ids = [lease.acquire() for lease in leases]
+    finally:
+        for lease in leases:
+            lease.release()
+
+    assert len(set(node_ids)) == len(leases)
+    assert redis_store == {}
+
+
+def test_lease_validity_is_measured_from_before_the_request(redis_store):
+    lease = WorkerIdLease(ttl=60)
+    before = time.monotonic()
+    lease._claim(FakeRedis(redis_store, set_delay=0.2))
+
+    # Redis 响应慢时，本地有效期按发出请求前的时间计算并扣除安全余量，早于 key 的实际过期时间
+    assert time.monotonic() - before >= 0.2
+    assert 0 < lease._valid_until - before <= 60 - WorkerIdLease.SAFETY_MARGIN + 0.1
+
+
+class ShortLease(WorkerIdLease):
+    SAFETY_MARGIN = 1
+
+    def __init__(self) -> None:
+        super().__init__(ttl=3)
+
+
+def test_generator_switches_node_when_lease_is_taken_over(redis_store, generator, monkeypatch):
+    monkeypatch.setattr(snowflake_module, "WorkerIdLease", ShortLease)
+    first_node = generator.start()
+    before = generator.next_ids(100)
+
+    # 其他进程占用了本进程的机器 ID，后台续期线程重新抢占新的 ID
+    redis_store[generator._lease._key(first_node)] = "other"
+    deadline = time.monotonic() + 5
+    while (generator._lease.node_id == first_node or not generator._lease.valid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    after = generator.next_ids(100)
+
+    assert generator._lease.node_id != first_node
+    assert {(value >> 12) & MAX_NODE_ID for value in after} == {generator._lease.node_id}
+    assert min(after) > max(before)
+
+
+def test_expired_lease_fails_fast_instead_of_blocking(redis_store, generator):
+    generator.start()
+    generator._lease._valid_until = 0.0
+
+    with pytest.raises(RuntimeError):
+        generator.next_ids(1)
@@ -0,0 +1,247 @@
+import math
+import time
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from jose import jwt
+from redis.exceptions import RedisError
+
+from apps.base.exception.my_exception import MyException
+from apps.base.utils.token_verifier import TokenVerifier
+
+SECRET = "test-secret"
+ALGORITHM = "HS256"
+DENY_KEY = "token:deny:test"
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现校验器用到的命令，eval 按 REVOKE_SCRIPT 的语义执行。
+    """
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.down = False
+
+    def _check(self) -> None:
+        if self.down:
+            raise RedisError("down")
+
+    async def get(self, key: str) -> str | None:
+        self._check()
+        return self.strings.get(key)
+
+    async def zscore(self, key: str, member: str) -> float | None:
+        self._check()
+        return self.zsets.get(key, {}).get(member)
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self._check()
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrangebyscore(self, key: str, low: str, high: str, withscores: bool) -> list[tuple[str, float]]:
+        self._check()
+        exclusive, low_value = low.startswith("("), float(low.lstrip("("))
+        return sorted(
+            (
+                (member, score)
+                for member, score in self.zsets.get(key, {}).items()
+                if (score > low_value if exclusive else score >= low_value) and score <= float(high)
+            ),
+            key=lambda item: item[1],
+        )
+
+    async def eval(self, script: str, numkeys: int, *args: Any) -> int:
+        self._check()
+        assert script == TokenVerifier.REVOKE_SCRIPT
+        (deny_key, seq_key, exp_key), (member, exp, trim_before, batch) = args[:numkeys], args[numkeys:]
+        deny, exps = self.zsets.setdefault(deny_key, {}), self.zsets.setdefault(exp_key, {})
+        expired = sorted((m for m, score in exps.items() if score <= float(trim_before)), key=exps.get)
+        for expired_member in expired[: int(batch)]:
+            deny.pop(expired_member, None)
+            exps.pop(expired_member, None)
+        if seq_key not in self.strings and deny:
+            self.strings[seq_key] = str(math.ceil(max(deny.values())))
+        seq = int(self.strings.get(seq_key, 0)) + 1
+        self.strings[seq_key] = str(seq)
+        deny[member], exps[member] = seq, float(exp)
+        return seq
+
+    async def flushall(self) -> None:
+        self.strings.clear()
+        self.zsets.clear()
+
+
+@pytest_asyncio.fixture(params=["memory", "fakeredis"])
+async def redis(request: pytest.FixtureRequest) -> AsyncGenerator[Any, None]:
+    if request.param == "memory":
+        yield MemoryRedis()
+        return
+    # 安装了 fakeredis 和 lupa 时用真实的 Lua 脚本再跑一遍
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+def make_verifier(**kwargs: Any) -> TokenVerifier:
+    return TokenVerifier(SECRET, ALGORITHM, DENY_KEY, deny_refresh_interval=0, **kwargs)
+
+
+def make_token(user_id: int = 1, ttl: float | None = 3600) -> str:
+    payload: dict[str, Any] = {"user_id": user_id}
+    if ttl is not None:
+        payload["exp"] = int(time.time() + ttl)
+    return jwt.encode(payload, key=SECRET, algorithm=ALGORITHM)
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected_after_being_cached(redis):
+    verifier = make_verifier()
+    token = make_token(ttl=1)
+    assert (await verifier.verify(token, redis))["user_id"] == 1
+
+    while time.time() < jwt.get_unverified_claims(token)["exp"]:
+        time.sleep(0.05)
+
+    with pytest.raises(MyException):
+        await verifier.verify(token, redis)
+
+
+@pytest.mark.asyncio
+async def test_tampered_token_is_rejected_even_when_original_is_cached(redis):
+    verifier = make_verifier()
+    token = make_token()
+    await verifier.verify(token, redis)
+    header, _, signature = token.split(".")
+    forged_payload = jwt.encode({"user_id": 2, "exp": int(time.time()) + 3600}, key=SECRET).split(".")[1]
+
+    for forged in (
+        f"{header}.{forged_payload}.{signature}",
+        jwt.encode({"user_id": 1}, key="other-secret", algorithm=ALGORITHM),
+        f"{token[:-2]}xx",
+    ):
+        with pytest.raises(MyException):
+            await verifier.verify(forged, redis)
+    assert (await verifier.verify(token, redis))["user_id"] == 1
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_rejected_by_every_process_even_when_cached(redis):
+    worker, other = make_verifier(), make_verifier()
+    token, untouched = make_token(1), make_token(2)
+    for verifier in (worker, other):
+        await verifier.verify(token, redis)
+        await verifier.verify(untouched, redis)
+
+    await other.revoke(token, redis)
+
+    for verifier in (other, worker):
+        with pytest.raises(MyException):
+            await verifier.verify(token, redis)
+        assert (await verifier.verify(untouched, redis))["user_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_incremental_sync_sees_every_revocation_in_commit_order(redis):
+    worker = make_verifier()
+    tokens = [make_token(user_id) for user_id in range(6)]
+    revokers = [make_verifier() for _ in tokens]
+    await worker.verify(tokens[0], redis)
+
+    # 每次同步之间都有新的吊销，增量同步不遗漏任何一条
+    for token, revoker in zip(tokens, revokers):
+        await revoker.revoke(token, redis)
+        with pytest.raises(MyException):
+            await worker.verify(token, redis)
+        worker._deny_bloom.bits[:] = bytes(len(worker._deny_bloom.bits))
+        worker._deny_synced_at = float("-inf")
+
+    # Redis 被清空重建后序号从头开始，仍然能同步到新的吊销
+    await redis.flushall()
+    fresh = make_token(99)
+    await make_verifier().revoke(fresh, redis)
+    with pytest.raises(MyException):
+        await worker.verify(fresh, redis)
+
+
+@pytest.mark.asyncio
+async def test_revocations_after_legacy_timestamp_scores_are_synced(redis):
+    worker = make_verifier()
+    legacy, token = make_token(1, ttl=None), make_token(2)
+    # 旧版本以吊销时间戳为分值写入的记录
+    await redis.zadd(DENY_KEY, {worker.digest(legacy).hex(): time.time()})
+    await worker.verify(token, redis)
+
+    await make_verifier().revoke(token, redis)
+
+    for revoked in (legacy, token):
+        with pytest.raises(MyException):
+            await worker.verify(revoked, redis)
+
+
+@pytest.mark.asyncio
+async def test_revoke_trims_entries_whose_tokens_have_expired(redis):
+    verifier = make_verifier()
+    grace = TokenVerifier.DENY_TRIM_GRACE
+    stale = make_token(1, ttl=3600)
+    forever = make_token(2, ttl=None)
+    await verifier.revoke(stale, redis)
+    await verifier.revoke(forever, redis)
+    # 模拟 token 过期并超过宽限时间
+    await redis.eval(
+        TokenVerifier.REVOKE_SCRIPT,
+        3,
+        DENY_KEY,
+        f"{DENY_KEY}:seq",
+        f"{DENY_KEY}:exp",
+        "old",
+        time.time() - grace - 1,
+        0,
+        0,
+    )
+
+    await verifier.revoke(make_token(3), redis)
+
+    members = {member for member, _ in await redis.zrangebyscore(DENY_KEY, "-inf", "+inf", withscores=True)}
+    assert "old" not in members
+    assert {verifier.digest(stale).hex(), verifier.digest(forever).hex()} <= members
+    assert len(members) == 3
+
+
+@pytest.mark.asyncio
+async def test_revoking_invalid_token_is_a_no_op(redis):
+    verifier = make_verifier()
+
+    await verifier.revoke("not-a-token", redis)
+
+    assert await redis.zrangebyscore(DENY_KEY, "-inf", "+inf", withscores=True) == []
+
+
+@pytest.mark.asyncio
+async def test_bloom_hit_is_treated_as_revoked_when_redis_is_down():
+    redis = MemoryRedis()
+    verifier = make_verifier()
+    token = make_token()
+    await verifier.revoke(token, redis)
+    redis.down = True
+
+    with pytest.raises(MyException):
+        await verifier.verify(token, redis)
+    assert (await verifier.verify(make_token(2), redis))["user_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_verifier_without_deny_list_never_touches_redis():
+    verifier = TokenVerifier(SECRET, ALGORITHM)
+    redis = MemoryRedis()
+    redis.down = True
+
+    assert (await verifier.verify(make_token(), redis))["user_id"] == 1
+    with pytest.raises(MyException):
+        await verifier.verify(make_token(ttl=-1), redis)
+    with pytest.raises(RuntimeError):
+        await verifier.revoke(make_token(), redis)
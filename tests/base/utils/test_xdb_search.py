@@ -0,0 +1,104 @@
+import random
+import struct
+from pathlib import Path
+
+import pytest
+
+from apps.base.utils import xdb_search
+from apps.base.utils.ip_util import IpUtil
+from apps.base.utils.xdb_search import InvalidIpError, XdbFileError, XdbSearcher
+
+# (起始 IP, 结束 IP, 地区)，第二段跨越多个 /16 前缀
+SEGMENTS = [
+    (XdbSearcher.ip2long("1.0.0.0"), XdbSearcher.ip2long("1.0.0.255"), "中国|0|福建省|福州市|电信"),
+    (XdbSearcher.ip2long("1.0.1.0"), XdbSearcher.ip2long("1.3.255.255"), "中国|0|广东省|深圳市|联通"),
+    (XdbSearcher.ip2long("8.8.8.8"), XdbSearcher.ip2long("8.8.8.8"), "美国|0|0|0|Google"),
+]
+
+
+def build_xdb(path: Path, segments: list[tuple[int, int, str]]) -> None:
+    """
+    按 xdb 格式生成测试文件：头部、向量索引、地区数据、段索引，段按 /16 前缀拆分。
+    """
+    vector_size = xdb_search.VectorIndexRows * xdb_search.VectorIndexCols * xdb_search.VectorIndexSize
+    data = bytearray()
+    data_ptrs: dict[str, tuple[int, int]] = {}
+    for _, _, region in segments:
+        if region not in data_ptrs:
+            encoded = region.encode()
+            data_ptrs[region] = (len(encoded), xdb_search.HeaderInfoLength + vector_size + len(data))
+            data += encoded
+    pieces = []
+    for start, end, region in segments:
+        while start <= end:
+            piece_end = min(end, start | 0xFFFF)
+            pieces.append((start, piece_end, region))
+            start = piece_end + 1
+    segment_base = xdb_search.HeaderInfoLength + vector_size + len(data)
+    vector = [0] * (xdb_search.VectorIndexRows * xdb_search.VectorIndexCols * 2)
+    segment_index = bytearray()
+    for i, (start, end, region) in enumerate(pieces):
+        ptr = segment_base + i * xdb_search.SegmentIndexSize
+        idx = (start >> 16) * 2
+        if vector[idx] == 0:
+            vector[idx] = ptr
+        vector[idx + 1] = ptr
+        data_len, data_ptr = data_ptrs[region]
+        segment_index += struct.pack("<IIHI", start, end, data_len, data_ptr)
+    path.write_bytes(
+        bytes(xdb_search.HeaderInfoLength) + struct.pack(f"<{len(vector)}I", *vector) + data + segment_index
+    )
+
+
+def expected_region(ip: int) -> str:
+    return next((region for start, end, region in SEGMENTS if start <= ip <= end), "")
+
+
+@pytest.fixture
+def searcher(tmp_path: Path):
+    path = tmp_path / "ip2region.xdb"
+    build_xdb(path, SEGMENTS)
+    searcher = XdbSearcher(str(path), cache_size=16)
+    yield searcher
+    searcher.close()
+
+
+def test_search_matches_a_linear_scan(searcher):
+    rng = random.Random(3)
+    ips = [ip for start, end, _ in SEGMENTS for ip in (start - 1, start, end, end + 1)]
+    ips += [rng.randrange(SEGMENTS[0][0] - 1000, SEGMENTS[1][1] + 1000) for _ in range(2000)]
+    ips += [rng.randrange(0, 0xFFFFFFFF) for _ in range(2000)]
+
+    assert [searcher.search(ip) for ip in ips] == [expected_region(ip) for ip in ips]
+    assert searcher.search("1.2.3.4") == "中国|0|广东省|深圳市|联通"
+    assert searcher.search(str(XdbSearcher.ip2long("8.8.8.8"))) == "美国|0|0|0|Google"
+
+
+def test_search_many_keeps_order_and_hits_the_cache(searcher):
+    ips = ["1.0.0.1", "8.8.8.8", "9.9.9.9", "1.0.0.1", "8.8.8.8"]
+
+    assert searcher.search_many(ips) == [expected_region(XdbSearcher.ip2long(ip)) for ip in ips]
+    info = searcher.cache_info()
+    assert (info.hits, info.misses) == (2, 3)
+
+
+@pytest.mark.parametrize("ip", ["::1", "1.2.3.256", "abc", "", -1, 2**32])
+def test_invalid_ip_is_rejected(searcher, ip):
+    with pytest.raises(InvalidIpError):
+        searcher.search(ip)
+
+
+def test_unreadable_or_truncated_file_raises(tmp_path):
+    with pytest.raises(XdbFileError):
+        XdbSearcher(str(tmp_path / "missing.xdb"))
+    truncated = tmp_path / "truncated.xdb"
+    truncated.write_bytes(bytes(1024))
+    with pytest.raises(XdbFileError):
+        XdbSearcher(str(truncated))
+
+
+def test_ip_util_formats_address_and_ignores_ipv6(searcher, monkeypatch):
+    monkeypatch.setattr(IpUtil, "_searcher", searcher)
+
+    assert IpUtil.get_address_from_ip("1.0.0.8") == "福建省"
+    assert IpUtil.get_address_from_ip("::1") == ""
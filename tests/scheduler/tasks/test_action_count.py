@@ -0,0 +1,234 @@
+import itertools
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.action import ActionTypeEnum, ObjectTypeEnum
+from apps.base.models.action import ActionCount
+from apps.base.models.picture import Picture
+from apps.base.utils.action_count_util import build_action_count_dirty_member
+from apps.scheduler.tasks import action_count as action_count_module
+from apps.scheduler.tasks.action_count import ActionCountSyncTask
+
+DIRTY = RedisConstant.ACTION_COUNT_DIRTY_SET_KEY
+ARTICLE_LIKES = RedisConstant.ARTICLE_LIKE_COUNT_MAP_KEY
+ARTICLE_VIEWS = RedisConstant.ARTICLE_VIEW_COUNT_MAP_KEY
+PICTURE_LIKES = RedisConstant.PICTURE_LIKE_COUNT_MAP_KEY
+
+
+class SqliteUpsert(sqlite.Insert):
+    """
+    用 SQLite 的 ON CONFLICT 实现任务中使用的 MySQL on_duplicate_key_update。
+    """
+
+    inherit_cache = True
+
+    @property
+    def inserted(self) -> Any:
+        return self.excluded
+
+    def on_duplicate_key_update(self, **values: Any) -> "SqliteUpsert":
+        return self.on_conflict_do_update(index_elements=["obj_id", "obj_type", "action_type"], set_=values)
+
+
+class MemoryPipeline:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, list[str]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def hmget(self, key: str, fields: list[str]) -> None:
+        self.commands.append((key, fields))
+
+    async def execute(self) -> list[list[str | None]]:
+        self.redis.hmget_calls += 1
+        return [[self.redis.hashes.get(key, {}).get(field) for field in fields] for key, fields in self.commands]
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现同步任务用到的命令，SSCAN 在首次调用时对集合拍快照并按 count 分页。
+    """
+
+    def __init__(self) -> None:
+        self.sets: dict[str, set[str]] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.scan_pages: list[int] = []
+        self.hmget_calls = 0
+        self._scan: list[str] = []
+
+    async def sscan(self, key: str, cursor: int, count: int) -> tuple[int, list[str]]:
+        if cursor == 0:
+            self._scan = sorted(self.sets.get(key, set()))
+        page = self._scan[cursor : cursor + count]
+        self.scan_pages.append(len(page))
+        next_cursor = cursor + count
+        return (next_cursor if next_cursor < len(self._scan) else 0), page
+
+    def pipeline(self, transaction: bool) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    async def sadd(self, key: str, *members: Any) -> int:
+        values = self.sets.setdefault(key, set())
+        added = {str(member) for member in members} - values
+        values.update(added)
+        return len(added)
+
+    async def srem(self, key: str, *members: str) -> int:
+        values = self.sets.setdefault(key, set())
+        removed = values & set(members)
+        values.difference_update(removed)
+        return len(removed)
+
+    async def eval(self, script: str, numkeys: int, *args: str) -> int:
+        assert script == ActionCountSyncTask.REMOVE_SYNCED_SCRIPT
+        keys, argv = args[:numkeys], args[numkeys:]
+        removed = 0
+        for i, hash_key in enumerate(keys[1:]):
+            field, expected, member = argv[i * 3 : i * 3 + 3]
+            if self.hashes.get(hash_key, {}).get(field) == expected:
+                removed += await self.srem(keys[0], member)
+        return removed
+
+    async def mark(self, hash_key: str, obj_type: int, action_type: int, obj_id: int, count: int | None) -> str:
+        if count is not None:
+            self.hashes.setdefault(hash_key, {})[str(obj_id)] = str(count)
+        member = build_action_count_dirty_member(hash_key, obj_type, action_type, obj_id)
+        await self.sadd(DIRTY, member)
+        return member
+
+
+@pytest_asyncio.fixture
+async def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'action_count.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(ActionCount.metadata.create_all, tables=[ActionCount.__table__, Picture.__table__])
+        await conn.execute(insert(Picture), [{"id": 1, "user_id": 1, "album_id": 1, "url": "a.png", "like_count": 0}])
+        await conn.execute(
+            insert(ActionCount),
+            [{"id": 1, "obj_id": 10, "obj_type": ObjectTypeEnum.ARTICLE, "action_type": ActionTypeEnum.LIKE}],
+        )
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    ids = itertools.count(100)
+    monkeypatch.setattr(action_count_module, "db", helper)
+    monkeypatch.setattr(action_count_module, "insert", SqliteUpsert)
+    monkeypatch.setattr(
+        action_count_module, "SnowflakeIDGenerator", SimpleNamespace(next_ids=lambda n: list(itertools.islice(ids, n)))
+    )
+    yield helper
+    await engine.dispose()
+
+
+def make_task(redis: MemoryRedis) -> ActionCountSyncTask:
+    task = object.__new__(ActionCountSyncTask)
+    task.redis_util = SimpleNamespace(redis=redis)
+    return task
+
+
+async def saved_counts(helper: AsyncDBHelper) -> dict[tuple[int, int, int], int]:
+    rows = await helper.all(
+        select(ActionCount.obj_id, ActionCount.obj_type, ActionCount.action_type, ActionCount.count)
+    )
+    return {(obj_id, obj_type, action_type): count for obj_id, obj_type, action_type, count in rows}
+
+
+@pytest.mark.asyncio
+async def test_sync_upserts_counts_in_sscan_batches_and_clears_dirty_set(helper):
+    redis = MemoryRedis()
+    for article_id in range(10, 15):
+        await redis.mark(ARTICLE_LIKES, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE, article_id, article_id)
+    await redis.mark(ARTICLE_VIEWS, ObjectTypeEnum.ARTICLE, ActionTypeEnum.VIEW, 10, -3)
+    await redis.mark(PICTURE_LIKES, ObjectTypeEnum.PICTURE, ActionTypeEnum.LIKE, 1, 7)
+    # 计数已不存在和格式无效的成员直接移除
+    await redis.mark(ARTICLE_LIKES, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE, 99, None)
+    await redis.sadd(DIRTY, "invalid")
+
+    assert await make_task(redis).execute(batch_size=3) == 7
+
+    assert redis.scan_pages == [3, 3, 3] and redis.hmget_calls == 3
+    counts = await saved_counts(helper)
+    # 已有记录按唯一键更新，负数计数按 0 保存
+    assert counts == {
+        **{(article_id, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE): article_id for article_id in range(10, 15)},
+        (10, ObjectTypeEnum.ARTICLE, ActionTypeEnum.VIEW): 0,
+        (1, ObjectTypeEnum.PICTURE, ActionTypeEnum.LIKE): 7,
+    }
+    assert await helper.scalar(select(Picture.like_count).where(Picture.id == 1)) == 7
+    assert redis.sets[DIRTY] == set()
+    assert redis.sets[RedisConstant.ARTICLE_SCORE_DIRTY_SET_KEY] == {str(article_id) for article_id in range(10, 15)}
+
+
+@pytest.mark.asyncio
+async def test_deleted_picture_does_not_fail_the_batch(helper):
+    redis = MemoryRedis()
+    await redis.mark(PICTURE_LIKES, ObjectTypeEnum.PICTURE, ActionTypeEnum.LIKE, 1, 2)
+    # 图片已被删除，按主键更新影响 0 行
+    await redis.mark(PICTURE_LIKES, ObjectTypeEnum.PICTURE, ActionTypeEnum.LIKE, 404, 5)
+    await redis.mark(ARTICLE_LIKES, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE, 11, 1)
+
+    assert await make_task(redis).execute() == 3
+
+    assert await helper.scalar(select(Picture.like_count).where(Picture.id == 1)) == 2
+    assert (await saved_counts(helper))[(404, ObjectTypeEnum.PICTURE, ActionTypeEnum.LIKE)] == 5
+    assert redis.sets[DIRTY] == set()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_keeps_dirty_members_and_other_batches_sync(helper, monkeypatch):
+    redis = MemoryRedis()
+    for article_id in range(10, 14):
+        await redis.mark(ARTICLE_LIKES, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE, article_id, 1)
+    task = make_task(redis)
+    save = task._save_action_counts
+    calls = 0
+
+    async def flaky_save(counts: dict) -> None:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("lock wait timeout")
+        await save(counts)
+
+    monkeypatch.setattr(task, "_save_action_counts", flaky_save)
+
+    assert await task.execute(batch_size=2) == 2
+
+    like = (ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE)
+    # 第一批 (10, 11) 回滚，10 保持原有计数
+    assert await saved_counts(helper) == {(10, *like): 0, (12, *like): 1, (13, *like): 1}
+    assert {int(member.rsplit(":", 1)[1]) for member in redis.sets[DIRTY]} == {10, 11}
+
+    # 下一轮同步补上失败的批次
+    assert await task.execute(batch_size=2) == 2
+    assert redis.sets[DIRTY] == set()
+
+
+@pytest.mark.asyncio
+async def test_count_changed_during_sync_stays_dirty(helper, monkeypatch):
+    redis = MemoryRedis()
+    member = await redis.mark(ARTICLE_LIKES, ObjectTypeEnum.ARTICLE, ActionTypeEnum.LIKE, 10, 1)
+    task = make_task(redis)
+    save = task._save_action_counts
+
+    async def save_then_like(counts: dict) -> None:
+        await save(counts)
+        # 写库后、移除 dirty 标记前又有新的点赞
+        redis.hashes[ARTICLE_LIKES]["10"] = "2"
+
+    monkeypatch.setattr(task, "_save_action_counts", save_then_like)
+
+    assert await task.execute() == 1
+    assert redis.sets[DIRTY] == {member}
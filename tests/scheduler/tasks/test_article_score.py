@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.action import ActionTypeEnum, ObjectTypeEnum
+from apps.base.enum.article import ArticleStatusEnum
+from apps.base.models.action import ActionCount
+from apps.base.models.article import Article
+from apps.base.models.es_outbox import EsOutbox
+from apps.base.utils.snowflake import SnowflakeIDGenerator
+from apps.scheduler.tasks import article_score as article_score_module
+from apps.scheduler.tasks.article_score import SCORE_QUANT, refresh_article_scores, refresh_dirty_article_scores
+
+NOW = datetime(2026, 1, 1, 12)
+DIRTY = RedisConstant.ARTICLE_SCORE_DIRTY_SET_KEY
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz: Any = None) -> datetime:
+        return NOW
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现 dirty 集合用到的 SPOP 和 SADD，SPOP 按成员排序弹出便于断言。
+    """
+
+    def __init__(self) -> None:
+        self.sets: dict[str, set[str]] = {}
+
+    async def spop(self, key: str, count: int) -> list[str]:
+        members = sorted(self.sets.get(key, set()))[:count]
+        self.sets.get(key, set()).difference_update(members)
+        return members
+
+    async def sadd(self, key: str, *members: Any) -> int:
+        self.sets.setdefault(key, set()).update(str(member) for member in members)
+        return len(members)
+
+
+def article(article_id: int, **values: Any) -> dict[str, Any]:
+    return {
+        "id": article_id,
+        "user_id": 1,
+        "title": f"article {article_id}",
+        "cover": "",
+        "category_id": 1,
+        "content": "",
+        "original_url": "",
+        "status": ArticleStatusEnum.PUBLISHED,
+        "create_time": NOW - timedelta(hours=10),
+        "recommend_weight": 0,
+        "is_deleted": False,
+        **values,
+    }
+
+
+def counts(article_id: int, **action_counts: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": article_id * 10 + ActionTypeEnum[name.upper()],
+            "obj_id": article_id,
+            "obj_type": ObjectTypeEnum.ARTICLE,
+            "action_type": ActionTypeEnum[name.upper()],
+            "count": count,
+        }
+        for name, count in action_counts.items()
+    ]
+
+
+@pytest_asyncio.fixture
+async def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    monkeypatch.setenv("SNOWFLAKE_LOCK_DIR", str(tmp_path))
+    SnowflakeIDGenerator.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'article_score.db'}")
+    async with engine.begin() as conn:
+        tables = [Article.__table__, ActionCount.__table__, EsOutbox.__table__]
+        await conn.run_sync(Article.metadata.create_all, tables=tables)
+        await conn.execute(
+            insert(Article),
+            [
+                article(1),
+                article(2),
+                article(3, recommend_weight=50),
+                article(4, status=ArticleStatusEnum.DRAFT),
+                article(5, is_deleted=True),
+            ],
+        )
+        await conn.execute(
+            insert(ActionCount), counts(1, view=100, like=10) + counts(2, like=1, comment=2) + counts(4, like=9)
+        )
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(article_score_module, "db", helper)
+    monkeypatch.setattr(article_score_module, "datetime", FixedDatetime)
+    yield helper
+    await engine.dispose()
+    SnowflakeIDGenerator.close()
+
+
+@pytest.fixture
+def redis(monkeypatch: pytest.MonkeyPatch) -> MemoryRedis:
+    redis = MemoryRedis()
+    monkeypatch.setattr(article_score_module, "GetBean", lambda cls: SimpleNamespace(redis=redis))
+    return redis
+
+
+def quantize(score: float) -> Decimal:
+    return Decimal(str(score)).quantize(SCORE_QUANT)
+
+
+async def scores(helper: AsyncDBHelper) -> dict[int, tuple[Decimal, Decimal, int]]:
+    rows = await helper.all(select(Article.id, Article.hot_score, Article.recommend_score, Article.es_version))
+    return {article_id: (hot, recommend, version) for article_id, hot, recommend, version in rows}
+
+
+async def outbox_ids(helper: AsyncDBHelper) -> list[int]:
+    return sorted(await helper.model_all(select(EsOutbox.doc_id)))
+
+
+@pytest.mark.asyncio
+async def test_full_refresh_scores_published_articles_and_skips_unchanged_rows(helper):
+    assert await refresh_article_scores(batch_size=2) == 3
+
+    saved = await scores(helper)
+    # 发布 10 小时，热门分数按小时衰减，推荐分数按天衰减并加上推荐权重
+    assert saved[1][0] == quantize((100 * 0.1 + 10 * 3) / 12**1.2)
+    assert saved[2][0] == quantize((1 * 3 + 2 * 4) / 12**1.2)
+    assert saved[3][:2] == (0, quantize(100 / (10 / 24 + 1) ** 0.5 + 50))
+    assert saved[4][:2] == saved[5][:2] == (0, 0)
+    # 热门分数有变化的文章登记 ES 同步
+    assert await outbox_ids(helper) == [1, 2]
+    assert saved[1][2] == saved[2][2] == 1 and saved[3][2] == 0
+
+    # 分数没有变化时不写库，也不再登记 ES 同步
+    assert await refresh_article_scores() == 0
+    assert await outbox_ids(helper) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_dirty_refresh_only_recomputes_dirty_articles_and_syncs_their_counts(helper, redis):
+    await refresh_article_scores()
+    await helper.execute(delete(EsOutbox))
+    await redis.sadd(DIRTY, 2, 3, 4, 404)
+
+    assert await refresh_dirty_article_scores(batch_size=2) == 0
+
+    # 计数变化的文章即使分数不变也同步 ES；草稿和不存在的文章忽略
+    assert await outbox_ids(helper) == [2, 3]
+    assert redis.sets[DIRTY] == set()
+
+
+@pytest.mark.asyncio
+async def test_dirty_refresh_puts_members_back_when_a_batch_fails(helper, redis, monkeypatch):
+    await redis.sadd(DIRTY, 1, 2)
+
+    async def fail(*args: Any, **kwargs: Any) -> int:
+        raise RuntimeError("deadlock")
+
+    monkeypatch.setattr(article_score_module, "_refresh_rows", fail)
+
+    with pytest.raises(RuntimeError):
+        await refresh_dirty_article_scores()
+    assert redis.sets[DIRTY] == {"1", "2"}
+
+
+@pytest.mark.asyncio
+async def test_article_deleted_during_refresh_does_not_fail_the_batch(helper, monkeypatch):
+    load = article_score_module._load_action_counts
+
+    async def load_then_delete(article_ids: list[int]) -> dict:
+        # 读取文章后、写回分数前文章被物理删除
+        await helper.execute(delete(Article).where(Article.id == 2))
+        return await load(article_ids)
+
+    monkeypatch.setattr(article_score_module, "_load_action_counts", load_then_delete)
+
+    assert await refresh_article_scores() == 3
+
+    assert set(await scores(helper)) == {1, 3, 4, 5}
+    assert (await scores(helper))[1][0] > 0
+    assert await helper.scalar(select(func.count()).select_from(EsOutbox)) == 2
@@ -0,0 +1,295 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.action import ActionTypeEnum, ObjectTypeEnum
+from apps.base.enum.article import ArticleStatusEnum
+from apps.base.models.action import ActionCount
+from apps.base.models.article import Article
+from apps.base.models.es_outbox import EsOutbox
+from apps.base.utils.snowflake import SnowflakeIDGenerator
+from apps.scheduler.tasks import article_score as article_score_module
+from apps.web.core.es import outbox_relay as outbox_relay_module
+from apps.web.core.es.constant.es_constant import ESConstant
+from apps.web.core.es.outbox_relay import ArticleEsOutboxRelay
+
+
+class FakeES:
+    """
+    按 external_gte 语义处理 bulk 写入的 ES，与 raise_on_error=False 的 async_bulk 一样只返回失败项。
+    partial update 与真实 ES 一样把内部版本号加一。
+    """
+
+    def __init__(self) -> None:
+        self.documents: dict[int, tuple[int, dict[str, Any]]] = {}
+
+    async def async_bulk(self, client: Any, actions: list[dict[str, Any]], **kwargs: Any) -> tuple[int, list]:
+        errors = []
+        for action in actions:
+            doc_id, op_type = int(action["_id"]), action["_op_type"]
+            current = self.documents.get(doc_id)
+            if op_type == "delete":
+                status = 200 if self.documents.pop(doc_id, None) else 404
+            elif op_type == "update":
+                if current is None:
+                    status = 404
+                else:
+                    self.documents[doc_id] = (current[0] + 1, {**current[1], **action["doc"]})
+                    status = 200
+            elif current is not None and action["version"] < current[0]:
+                status = 409
+            else:
+                self.documents[doc_id] = (action["version"], action["_source"])
+                status = 201
+            if status >= 300:
+                errors.append({op_type: {"_index": action["_index"], "_id": str(doc_id), "status": status}})
+        return len(actions) - len(errors), errors
+
+    async def mget(self, index: str, ids: list[str], source: bool) -> dict[str, Any]:
+        docs = []
+        for doc_id in ids:
+            current = self.documents.get(int(doc_id))
+            docs.append(
+                {"_id": doc_id, "found": False}
+                if current is None
+                else {"_id": doc_id, "found": True, "_version": current[0]}
+            )
+        return {"docs": docs}
+
+    async def partial_update(self, doc_id: int, doc: dict[str, Any]) -> None:
+        """
+        模拟旧版本分数任务直接对 ES 做的 partial update。
+        """
+        await self.async_bulk(
+            None, [{"_op_type": "update", "_index": ESConstant.ARTICLE_INDEX, "_id": doc_id, "doc": doc}]
+        )
+
+
+class FakeArticleStore:
+    """
+    模拟文章表，每次提交递增 es_version，读取时返回当前快照。
+    """
+
+    def __init__(self) -> None:
+        self.articles: dict[int, SimpleNamespace] = {}
+
+    def commit(self, article_id: int, title: str) -> SimpleNamespace:
+        previous = self.articles.get(article_id)
+        self.articles[article_id] = SimpleNamespace(
+            id=article_id, title=title, es_version=(previous.es_version if previous else 0) + 1
+        )
+        return self.articles[article_id]
+
+    def snapshot(self) -> list[SimpleNamespace]:
+        return [SimpleNamespace(**vars(article)) for article in self.articles.values()]
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> FakeArticleStore:
+    article_store = FakeArticleStore()
+
+    async def model_all(stmt: Any) -> list[SimpleNamespace]:
+        return article_store.snapshot()
+
+    async def all(stmt: Any) -> list[tuple[int, int]]:
+        return [(article.id, article.es_version) for article in article_store.articles.values()]
+
+    monkeypatch.setattr(outbox_relay_module.db, "model_all", model_all)
+    monkeypatch.setattr(outbox_relay_module.db, "all", all)
+    return article_store
+
+
+def make_relay(es: FakeES) -> ArticleEsOutboxRelay:
+    async def get_article_detail_by_ids(articles: list[SimpleNamespace]) -> list[SimpleNamespace]:
+        return [
+            SimpleNamespace(
+                id=article.id,
+                model_dump=lambda article=article: {
+                    "id": article.id,
+                    "title": article.title,
+                    "hot_score": getattr(article, "hot_score", 0),
+                },
+            )
+            for article in articles
+        ]
+
+    async def get(key: str) -> None:
+        return None
+
+    relay = object.__new__(ArticleEsOutboxRelay)
+    relay.es_util = SimpleNamespace(client=es, helpers=SimpleNamespace(async_bulk=es.async_bulk))
+    relay.article_dao = SimpleNamespace(get_article_detail_by_ids=get_article_detail_by_ids)
+    relay.redis_util = SimpleNamespace(redis=SimpleNamespace(get=get))
+    return relay
+
+
+def outbox_row(row_id: int, doc_id: int) -> SimpleNamespace:
+    return SimpleNamespace(id=row_id, doc_id=doc_id, attempts=0)
+
+
+@pytest.mark.asyncio
+async def test_outbox_row_committed_late_with_smaller_id_is_not_superseded(store):
+    es = FakeES()
+    relay = make_relay(es)
+
+    # 发件箱 ID 101 的事务先提交并同步
+    store.commit(1, "v1")
+    assert await relay._bulk_sync({1: [outbox_row(101, 1)]}) == {}
+    # ID 更小的 100 号记录所在事务后提交，文章状态更新
+    store.commit(1, "v2")
+    assert await relay._bulk_sync({1: [outbox_row(100, 1)]}) == {}
+
+    assert es.documents[1][0] == 2 and es.documents[1][1]["title"] == "v2"
+
+
+@pytest.mark.asyncio
+async def test_stale_relay_does_not_overwrite_newer_document(store, monkeypatch):
+    es = FakeES()
+    store.commit(1, "v1")
+    stale_snapshot = store.snapshot()
+    store.commit(1, "v2")
+
+    await make_relay(es)._bulk_sync({1: [outbox_row(2, 1)]})
+
+    # 先读到旧状态的中继较晚写入 ES，被版本号拒绝
+    async def stale_model_all(stmt: Any) -> list[SimpleNamespace]:
+        return stale_snapshot
+
+    monkeypatch.setattr(outbox_relay_module.db, "model_all", stale_model_all)
+    assert await make_relay(es)._bulk_sync({1: [outbox_row(1, 1)]}) == {}
+
+    assert es.documents[1][0] == 2 and es.documents[1][1]["title"] == "v2"
+
+
+@pytest.mark.asyncio
+async def test_coalesced_rows_sync_latest_state_and_missing_article_is_deleted(store):
+    es = FakeES()
+    relay = make_relay(es)
+    store.commit(1, "v1")
+    store.commit(2, "other")
+    await relay._bulk_sync({1: [outbox_row(1, 1)], 2: [outbox_row(2, 2)]})
+    store.commit(1, "v2")
+    store.commit(1, "v3")
+    del store.articles[2]
+
+    assert await relay._bulk_sync({1: [outbox_row(3, 1), outbox_row(4, 1)], 2: [outbox_row(5, 2)]}) == {}
+
+    assert list(es.documents) == [1]
+    assert es.documents[1][0] == 3 and es.documents[1][1]["title"] == "v3"
+
+
+@pytest_asyncio.fixture
+async def database(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    monkeypatch.setenv("SNOWFLAKE_LOCK_DIR", str(tmp_path))
+    SnowflakeIDGenerator.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}")
+    async with engine.begin() as conn:
+        tables = [Article.__table__, EsOutbox.__table__, ActionCount.__table__]
+        await conn.run_sync(Article.metadata.create_all, tables=tables)
+        await conn.execute(
+            insert(Article),
+            [
+                {
+                    "id": 1,
+                    "user_id": 1,
+                    "title": "v1",
+                    "cover": "",
+                    "category_id": 1,
+                    "content": "",
+                    "original_url": "",
+                    "status": ArticleStatusEnum.PUBLISHED,
+                    "create_time": datetime.now() - timedelta(hours=1),
+                }
+            ],
+        )
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(outbox_relay_module, "db", helper)
+    monkeypatch.setattr(article_score_module, "db", helper)
+    yield helper
+    await engine.dispose()
+    SnowflakeIDGenerator.close()
+
+
+async def edit(helper: AsyncDBHelper, title: str) -> None:
+    async with helper.atomic() as session:
+        await session.execute(update(Article).where(Article.id == 1).values(title=title))
+        await ArticleEsOutboxRelay.enqueue(session, 1)
+
+
+async def refresh_score(helper: AsyncDBHelper, views: int) -> None:
+    async with helper.atomic() as session:
+        await session.execute(update(Article).where(Article.id == 1).values(hot_score=0))
+        await session.execute(
+            insert(ActionCount).prefix_with("OR REPLACE"),
+            [
+                {
+                    "id": 1,
+                    "obj_id": 1,
+                    "obj_type": ObjectTypeEnum.ARTICLE,
+                    "action_type": ActionTypeEnum.VIEW,
+                    "count": views,
+                }
+            ],
+        )
+    rows = list(await helper.all(article_score_module._score_columns_stmt()))
+    await article_score_module._refresh_rows(rows, datetime.now(), counts_changed=True)
+
+
+async def outbox_rows(helper: AsyncDBHelper) -> list[Any]:
+    return list(await helper.all(select(EsOutbox.doc_id, EsOutbox.attempts, EsOutbox.last_error)))
+
+
+@pytest.mark.asyncio
+async def test_score_refresh_before_edit_does_not_drop_the_edit(database):
+    es = FakeES()
+    relay = make_relay(es)
+    await edit(database, "v1")
+    await relay.relay_once()
+
+    # 分数任务和编辑都经过发件箱递增同一个版本号，编辑不会被版本冲突拒绝
+    await refresh_score(database, views=100)
+    await relay.relay_once()
+    hot_score = es.documents[1][1]["hot_score"]
+    assert hot_score > 0
+    await edit(database, "v2")
+    await relay.relay_once()
+
+    version, document = es.documents[1]
+    assert version == await database.scalar(select(Article.es_version)) == 3
+    assert document["title"] == "v2" and document["hot_score"] == hot_score
+    assert await outbox_rows(database) == []
+
+
+@pytest.mark.asyncio
+async def test_conflict_with_version_bumped_by_partial_update_is_realigned(database):
+    es = FakeES()
+    relay = make_relay(es)
+    await edit(database, "v1")
+    await relay.relay_once()
+    # 旧版本分数任务的 partial update 使 ES 内部版本号领先于 es_version
+    await es.partial_update(1, {"hot_score": 1.0})
+    await es.partial_update(1, {"hot_score": 2.0})
+
+    await edit(database, "v2")
+    await relay.relay_once()
+
+    # 冲突时重新读取版本号并对齐，记录保留等待重试，而不是直接删除
+    assert es.documents[1][0] == 3 and es.documents[1][1]["title"] == "v1"
+
+    assert await database.scalar(select(Article.es_version)) == 3
+    [(doc_id, attempts, last_error)] = await outbox_rows(database)
+    assert doc_id == 1 and attempts == 1 and "已对齐" in last_error
+
+    async with database.atomic() as session:
+        await session.execute(update(EsOutbox).values(next_retry_time=datetime.now() - timedelta(seconds=1)))
+    await relay.relay_once()
+
+    assert es.documents[1][0] == 3 and es.documents[1][1]["title"] == "v2"
+    assert await outbox_rows(database) == []
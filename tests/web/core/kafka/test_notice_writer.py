@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from apps.web.core.kafka import notice_writer as notice_writer_module
+from apps.web.core.kafka.notice_writer import NoticeBatchWriter
+
+
+def make_notice(user_id: int, title: str, from_user_id: int | None = None) -> dict[str, Any]:
+    detail = {"from_user_id": from_user_id} if from_user_id else {}
+    return {"user_id": user_id, "title": title, "content": title, "detail": detail}
+
+
+@pytest.fixture
+def inserted(monkeypatch: pytest.MonkeyPatch) -> list[list[dict[str, Any]]]:
+    batches: list[list[dict[str, Any]]] = []
+
+    async def bulk_create(model: Any, rows: list[dict[str, Any]]) -> None:
+        batches.append(rows)
+
+    monkeypatch.setattr(notice_writer_module.db, "bulk_create", bulk_create)
+    return batches
+
+
+@pytest.fixture
+def pushed(monkeypatch: pytest.MonkeyPatch) -> list[list[dict[str, Any]]]:
+    batches: list[list[dict[str, Any]]] = []
+
+    async def push(self: NoticeBatchWriter, messages: list[dict[str, Any]]) -> None:
+        batches.append(messages)
+
+    monkeypatch.setattr(NoticeBatchWriter, "_push", push)
+    return batches
+
+
+@pytest.mark.asyncio
+async def test_notices_are_written_in_one_batch(inserted, pushed):
+    writer = NoticeBatchWriter(max_rows=3, max_delay_ms=10_000)
+    notices = [make_notice(user_id, f"n{user_id}") for user_id in range(3)]
+
+    await asyncio.gather(*(writer.add(notice) for notice in notices))
+
+    assert [[row["title"] for row in rows] for rows in inserted] == [["n0", "n1", "n2"]]
+    assert pushed == [notices]
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_buffered_notices(inserted, pushed):
+    writer = NoticeBatchWriter(max_rows=100, max_delay_ms=10_000)
+    future = writer.add(make_notice(1, "pending"))
+
+    await writer.close()
+
+    assert future.done() and future.exception() is None
+    assert [row["title"] for rows in inserted for row in rows] == ["pending"]
+
+
+@pytest.mark.asyncio
+async def test_write_failure_is_raised_to_waiters(monkeypatch, pushed):
+    async def bulk_create(model: Any, rows: list[dict[str, Any]]) -> None:
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(notice_writer_module.db, "bulk_create", bulk_create)
+    writer = NoticeBatchWriter(max_rows=2, max_delay_ms=10_000)
+
+    with pytest.raises(RuntimeError, match="db down"):
+        await asyncio.gather(writer.add(make_notice(1, "a")), writer.add(make_notice(2, "b")))
+    assert pushed == []
+
+
+@pytest.mark.asyncio
+async def test_push_sends_every_notice_in_order(monkeypatch, inserted):
+    from apps.web.utils.ws_util import manager
+
+    sent: list[tuple[int, str, int | None]] = []
+
+    async def get_user_infos(user_ids: list[int], clazz: Any) -> dict[int, Any]:
+        return {user_id: clazz(id=user_id) for user_id in user_ids}
+
+    async def send_message(message: Any) -> None:
+        notice = message.message
+        sent.append((notice.user_id, notice.title, notice.detail.from_user.id))
+
+    monkeypatch.setattr(manager, "get_user_infos", get_user_infos)
+    monkeypatch.setattr(manager, "send_message", send_message)
+    writer = NoticeBatchWriter(max_rows=4, max_delay_ms=10_000)
+    notices = [make_notice(1, "a", 7), make_notice(2, "b"), make_notice(1, "c", 8), make_notice(1, "d")]
+
+    await asyncio.gather(*(writer.add(notice) for notice in notices))
+    await writer.close()
+
+    assert [item for item in sent if item[0] == 1] == [(1, "a", 7), (1, "c", 8), (1, "d", 1)]
+    assert [item for item in sent if item[0] == 2] == [(2, "b", 2)]
@@ -0,0 +1,271 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from aiokafka import TopicPartition
+from aiokafka.errors import CommitFailedError
+
+from apps.web.core.kafka.config import KafkaConfig
+from apps.web.core.kafka.util import KafkaUtil
+
+TOPIC = "test_topic"
+GROUP = "test_group"
+KEY = f"{TOPIC}:{GROUP}"
+
+
+class FakeConsumer:
+    """
+    进程内模拟的 Kafka 消费者，按分区保存消息日志、消费位置和已提交 offset。
+    """
+
+    def __init__(self, log: dict[TopicPartition, list[Any]], committed: dict[TopicPartition, int] | None = None):
+        self.log = log
+        self.committed = dict(committed or {partition: 0 for partition in log})
+        self.position = dict(self.committed)
+        self.commit_history: list[dict[TopicPartition, int]] = []
+        self.getmany_errors: list[Exception] = []
+        self.commit_errors: list[Exception] = []
+        self.stopped = False
+
+    async def getmany(self, timeout_ms: int, max_records: int) -> dict[TopicPartition, list[SimpleNamespace]]:
+        await asyncio.sleep(0)
+        if self.getmany_errors:
+            raise self.getmany_errors.pop(0)
+        batches = {}
+        for partition, values in self.log.items():
+            start = self.position[partition]
+            records = [
+                SimpleNamespace(offset=offset, value=values[offset])
+                for offset in range(start, min(start + max_records, len(values)))
+            ]
+            if records:
+                batches[partition] = records
+                self.position[partition] = records[-1].offset + 1
+        return batches
+
+    def seek(self, partition: TopicPartition, offset: int) -> None:
+        self.position[partition] = offset
+
+    async def commit(self, offsets: dict[TopicPartition, int]) -> None:
+        if self.commit_errors:
+            raise self.commit_errors.pop(0)
+        self.commit_history.append(dict(offsets))
+        self.committed.update(offsets)
+
+    def highwater(self, partition: TopicPartition) -> int:
+        return len(self.log[partition])
+
+    def drained(self) -> bool:
+        return all(self.committed[partition] == len(values) for partition, values in self.log.items())
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+
+def make_util(
+    consumer: FakeConsumer, concurrency: int = 5, max_attempts: int = KafkaConfig.CONSUMER_MAX_ATTEMPTS
+) -> KafkaUtil:
+    util = object.__new__(KafkaUtil)
+    util.max_records = 10
+    util.timeout_ms = 0
+    util.concurrency = concurrency
+    util.retry_backoff = 0
+    util.max_attempts = max_attempts
+    util._attempts = {}
+    util._consumer_dict = {KEY: consumer}
+    util.sent = []
+
+    async def send_message(topic: str, message: Any) -> None:
+        util.sent.append((topic, message))
+
+    util.send_message = send_message
+    return util
+
+
+async def run_until(util: KafkaUtil, callback, done, batch_callback: bool = False) -> None:
+    task = asyncio.create_task(util._consume_messages(TOPIC, GROUP, callback, batch_callback=batch_callback))
+    try:
+        for _ in range(1000):
+            if done() or task.done():
+                break
+            await asyncio.sleep(0)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def make_log(partitions: int, count: int) -> dict[TopicPartition, list[str]]:
+    return {
+        TopicPartition(TOPIC, partition): [f"{partition}-{offset}" for offset in range(count)]
+        for partition in range(partitions)
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_record_is_not_committed_and_redelivered():
+    log = make_log(2, 25)
+    consumer = FakeConsumer(log)
+    attempts: dict[str, int] = {}
+
+    async def callback(value: str) -> None:
+        attempts[value] = attempts.get(value, 0) + 1
+        if value == "0-13" and attempts[value] < 3:
+            raise RuntimeError("boom")
+
+    await run_until(make_util(consumer), callback, consumer.drained)
+
+    assert consumer.drained()
+    assert attempts["0-13"] == 3
+    assert all(value in attempts for values in log.values() for value in values)
+    # 失败消息修复前，分区 0 的提交不会越过它
+    failing_partition = TopicPartition(TOPIC, 0)
+    committed = [offsets[failing_partition] for offsets in consumer.commit_history if failing_partition in offsets]
+    assert committed == sorted(committed)
+    assert committed.count(13) >= 2
+    assert committed[-1] == 25
+
+
+@pytest.mark.asyncio
+async def test_batch_callback_failure_rewinds_whole_batch():
+    log = make_log(1, 5)
+    consumer = FakeConsumer(log)
+    calls: list[list[str]] = []
+
+    async def callback(values: list[str]) -> None:
+        calls.append(values)
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+
+    await run_until(make_util(consumer), callback, consumer.drained, batch_callback=True)
+
+    assert consumer.drained()
+    assert calls[0] == calls[1] == log[TopicPartition(TOPIC, 0)]
+
+
+@pytest.mark.asyncio
+async def test_crash_after_failure_resumes_from_committed_offset():
+    log = make_log(3, 30)
+    first = FakeConsumer(log)
+    processed: list[str] = []
+
+    async def failing(value: str) -> None:
+        if value == "1-7":
+            raise RuntimeError("boom")
+        processed.append(value)
+
+    # 第一个消费者持续失败后崩溃，新的消费者从已提交 offset 接着消费
+    await run_until(make_util(first, max_attempts=100), failing, lambda: len(first.commit_history) >= 10)
+    assert first.committed[TopicPartition(TOPIC, 1)] == 7
+    second = FakeConsumer(log, first.committed)
+
+    async def succeeding(value: str) -> None:
+        processed.append(value)
+
+    await run_until(make_util(second), succeeding, second.drained)
+
+    assert second.drained()
+    assert set(processed) == {value for values in log.values() for value in values}
+
+
+@pytest.mark.asyncio
+async def test_kafka_errors_do_not_stop_consumer():
+    log = make_log(1, 20)
+    consumer = FakeConsumer(log)
+    consumer.getmany_errors.append(CommitFailedError("rebalance"))
+    consumer.commit_errors.append(CommitFailedError("rebalance"))
+    processed: list[str] = []
+
+    async def callback(value: str) -> None:
+        processed.append(value)
+
+    await run_until(make_util(consumer), callback, consumer.drained)
+
+    assert consumer.drained()
+    assert set(processed) == set(log[TopicPartition(TOPIC, 0)])
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    log = make_log(4, 50)
+    consumer = FakeConsumer(log)
+    running = peak = 0
+
+    async def callback(value: str) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+
+    await run_until(make_util(consumer, concurrency=3), callback, consumer.drained)
+
+    assert consumer.drained()
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_poison_record_is_dead_lettered_after_max_attempts():
+    log = make_log(2, 20)
+    consumer = FakeConsumer(log)
+    util = make_util(consumer, max_attempts=3)
+    attempts: dict[str, int] = {}
+
+    async def callback(value: str) -> None:
+        attempts[value] = attempts.get(value, 0) + 1
+        if value == "1-4":
+            raise RuntimeError("bad payload")
+
+    await run_until(util, callback, consumer.drained)
+
+    # 失败 3 次后转入死信并提交越过该消息，分区内后续消息正常消费
+    assert consumer.drained()
+    assert attempts["1-4"] == 3
+    assert all(value in attempts for values in log.values() for value in values)
+    assert util.sent == [
+        (
+            f"{TOPIC}{KafkaConfig.DEAD_LETTER_TOPIC_SUFFIX}",
+            {"topic": TOPIC, "partition": 1, "offset": 4, "attempts": 3, "value": "1-4"},
+        )
+    ]
+    assert util._attempts == {}
+
+
+@pytest.mark.asyncio
+async def test_record_is_skipped_when_dead_letter_publish_fails():
+    log = make_log(1, 5)
+    consumer = FakeConsumer(log)
+    util = make_util(consumer, max_attempts=2)
+
+    async def callback(value: str) -> None:
+        if value == "0-2":
+            raise RuntimeError("bad payload")
+
+    async def send_message(topic: str, message: Any) -> None:
+        raise RuntimeError("broker down")
+
+    util.send_message = send_message
+
+    await run_until(util, callback, consumer.drained)
+
+    assert consumer.drained()
+    assert util._attempts == {}
+
+
+@pytest.mark.asyncio
+async def test_failing_batch_callback_dead_letters_every_record():
+    log = make_log(1, 3)
+    consumer = FakeConsumer(log)
+    util = make_util(consumer, max_attempts=2)
+    calls = 0
+
+    async def callback(values: list[str]) -> None:
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("db down")
+
+    await run_until(util, callback, consumer.drained, batch_callback=True)
+
+    assert consumer.drained()
+    assert calls == 2
+    assert [message["value"] for _, message in util.sent] == log[TopicPartition(TOPIC, 0)]
@@ -0,0 +1,261 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.chat import (
+    ChatGroupTypeEnum,
+    ChatMessageTypeEnum,
+    ContactApplyStatusEnum,
+    ContactTypeEnum,
+    WSMessageTypeEnum,
+)
+from apps.base.models.chat import Contact, ContactApplyRecord
+from apps.base.utils.snowflake import SnowflakeIDGenerator
+from apps.web.core.context_vars import ContextVars
+from apps.web.core.websocket.message_handler import chat_handler as chat_handler_module
+from apps.web.core.websocket.message_handler.chat_handler import ChatMessageHandler
+from apps.web.dao.chat_dao import ChatDao
+from apps.web.dto.chat_dto import ChatMessageDTO, GroupProfileDTO, WSMessageDTO
+from apps.web.service import chat_service as chat_service_module
+from apps.web.service.chat_service import ChatService
+from apps.web.utils.redis_util import WebRedisUtil
+from apps.web.utils.redis_util.chat import ChatMethod
+from apps.web.vo.chat_vo import ContactVO, HandleContactApplyVO
+
+GROUP_ID = 900
+SENDER_ID = 1
+
+
+class MemoryPipeline:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args: self.commands.append((name, args))
+
+    async def execute(self) -> list[Any]:
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现群聊消息和群成员缓存用到的命令。
+    """
+
+    def __init__(self) -> None:
+        self.sets: dict[str, set[str]] = {}
+        self.hashes: dict[str, dict[str, int]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def pipeline(self, transaction: bool) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    async def smembers(self, key: str) -> set[str]:
+        return set(self.sets.get(key, set()))
+
+    async def sadd(self, key: str, *members: str) -> int:
+        self.sets.setdefault(key, set()).update(members)
+        return len(members)
+
+    async def exists(self, key: str) -> int:
+        return int(key in self.sets)
+
+    async def delete(self, key: str) -> int:
+        self.ttls.pop(key, None)
+        return int(self.sets.pop(key, None) is not None)
+
+    async def expire(self, key: str, ex: int) -> bool:
+        self.ttls[key] = ex
+        return True
+
+    async def hincrby(self, key: str, field: str, amount: int) -> int:
+        values = self.hashes.setdefault(key, {})
+        values[field] = values.get(field, 0) + amount
+        return values[field]
+
+
+class FakeChatDao:
+    def __init__(self, members: list[int]) -> None:
+        self.members = members
+        self.loads = 0
+
+    async def get_group_members(self, group_id: int) -> list[int]:
+        self.loads += 1
+        return list(self.members)
+
+
+class FakeManager:
+    """
+    只记录发布调用的 WebSocket Manager，present_ids 是停留在群会话中的用户。
+    """
+
+    def __init__(self, present_ids: set[int]) -> None:
+        self.store = SimpleNamespace(get_conversation_presence=self.get_conversation_presence)
+        self.present_ids = present_ids
+        self.published: list[dict[str, Any]] = []
+
+    async def get_conversation_presence(self, user_ids: list[int], conversation_id: str) -> set[int]:
+        return self.present_ids & set(user_ids)
+
+    async def get_group_info(self, group_id: int, clazz: type) -> GroupProfileDTO:
+        return GroupProfileDTO(id=group_id, avatar="", name="group", group_type=ChatGroupTypeEnum.PUBLIC)
+
+    async def publish_message(self, message: WSMessageDTO, target_user_ids: list[int], **variant: Any) -> None:
+        self.published.append({"message": message, "target_user_ids": target_user_ids, **variant})
+
+
+@pytest.fixture
+def chat(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    redis = MemoryRedis()
+    redis_util = SimpleNamespace(Chat=ChatMethod(redis))
+    chat_dao = FakeChatDao([SENDER_ID, 2, 3, 4])
+    beans = {WebRedisUtil: redis_util, ChatDao: chat_dao}
+    monkeypatch.setattr(chat_handler_module, "GetBean", lambda cls: beans[cls])
+    return SimpleNamespace(redis=redis, redis_util=redis_util, chat_dao=chat_dao)
+
+
+def group_message() -> WSMessageDTO[ChatMessageDTO]:
+    return WSMessageDTO[ChatMessageDTO](
+        message_type=WSMessageTypeEnum.CHAT_MESSAGE,
+        message=ChatMessageDTO(
+            id=1,
+            user_id=SENDER_ID,
+            contact_id=GROUP_ID,
+            contact_type=ContactTypeEnum.GROUP,
+            conversation_id=str(GROUP_ID),
+            message_type=ChatMessageTypeEnum.TEXT,
+            content="hi",
+        ),
+    )
+
+
+def member_key() -> str:
+    return f"{RedisConstant.GROUP_MEMBER_SET_KEY}:{GROUP_ID}"
+
+
+def unread_counts(redis: MemoryRedis) -> dict[str, int]:
+    return redis.hashes.get(RedisConstant.CONVERSATION_UNREAD_COUNT_MAP_KEY, {})
+
+
+@pytest.mark.asyncio
+async def test_group_message_is_published_once_with_read_variant_for_present_members(chat):
+    manager = FakeManager(present_ids={3})
+
+    await ChatMessageHandler()._handle_group_message(manager, group_message())
+
+    (published,) = manager.published
+    assert published["target_user_ids"] == [SENDER_ID, 2, 3, 4]
+    # 发送者和停留在会话中的成员收到已读版本，其余成员收到未读版本并增加未读数
+    assert published["variant_user_ids"] == [SENDER_ID, 3]
+    assert published["message"].message.is_read is False
+    assert published["variant_message"].message.is_read is True
+    assert unread_counts(chat.redis) == {f"2:{GROUP_ID}": 1, f"4:{GROUP_ID}": 1}
+    assert published["message"].message.group_profile.name == "group"
+
+
+@pytest.mark.asyncio
+async def test_group_members_are_cached_with_ttl(chat):
+    manager = FakeManager(present_ids=set())
+    handler = ChatMessageHandler()
+
+    for _ in range(3):
+        await handler._handle_group_message(manager, group_message())
+
+    assert chat.chat_dao.loads == 1
+    assert chat.redis.ttls[member_key()] == 5 * 60
+    # 缓存命中时成员顺序不固定
+    assert all(sorted(published["target_user_ids"]) == [SENDER_ID, 2, 3, 4] for published in manager.published)
+
+    # 成员为空的群也缓存空标记，不会每条消息都查库
+    await chat.redis_util.Chat.refresh_group_members(GROUP_ID, [])
+    assert await chat.redis_util.Chat.get_group_members(GROUP_ID) == []
+
+
+@pytest.mark.asyncio
+async def test_invalidated_member_cache_is_reloaded_on_next_message(chat):
+    manager = FakeManager(present_ids=set())
+    handler = ChatMessageHandler()
+    await handler._handle_group_message(manager, group_message())
+
+    chat.chat_dao.members.append(5)
+    await chat.redis_util.Chat.invalidate_group_members(GROUP_ID)
+    await handler._handle_group_message(manager, group_message())
+
+    assert chat.chat_dao.loads == 2
+    assert manager.published[-1]["target_user_ids"] == [SENDER_ID, 2, 3, 4, 5]
+
+
+@pytest_asyncio.fixture
+async def service(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, chat: SimpleNamespace
+) -> AsyncGenerator[ChatService, None]:
+    monkeypatch.setenv("SNOWFLAKE_LOCK_DIR", str(tmp_path))
+    SnowflakeIDGenerator.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Contact.metadata.create_all, tables=[Contact.__table__, ContactApplyRecord.__table__])
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(chat_service_module, "db", helper)
+
+    async def get_user_info(user_id: int, clazz: type) -> None:
+        return None
+
+    async def send_message(message: WSMessageDTO) -> None:
+        pass
+
+    async def delete_contact(user_id: int, contact_id: int, session: Any) -> None:
+        pass
+
+    monkeypatch.setattr(
+        chat_service_module, "manager", SimpleNamespace(get_user_info=get_user_info, send_message=send_message)
+    )
+    # 缓存中已有入群前的成员列表
+    await chat.redis_util.Chat.refresh_group_members(GROUP_ID, [SENDER_ID, 2])
+    chat_service = object.__new__(ChatService)
+    chat_service.redis_util = chat.redis_util
+    chat_service.chat_dao = SimpleNamespace(delete_contact=delete_contact)
+    token = ContextVars.token_user_id.set(GROUP_ID)
+    yield chat_service
+    ContextVars.token_user_id.reset(token)
+    await engine.dispose()
+    SnowflakeIDGenerator.close()
+
+
+@pytest.mark.asyncio
+async def test_agreeing_group_apply_invalidates_member_cache(chat, service):
+    await chat_service_module.db.execute(
+        insert(ContactApplyRecord).values(
+            id=1,
+            user_id=7,
+            contact_id=GROUP_ID,
+            contact_type=ContactTypeEnum.GROUP,
+            content="",
+            status=ContactApplyStatusEnum.PENDING,
+        )
+    )
+
+    await service.handle_contact_apply(HandleContactApplyVO(contact_id=7, status=ContactApplyStatusEnum.AGREE))
+
+    assert member_key() not in chat.redis.sets
+    assert await chat_service_module.db.scalar(select(Contact.contact_id).where(Contact.user_id == GROUP_ID)) == 7
+
+
+@pytest.mark.asyncio
+async def test_leaving_group_invalidates_member_cache(chat, service):
+    await service.delete_contact(ContactVO(contact_id=GROUP_ID))
+
+    assert member_key() not in chat.redis.sets
@@ -0,0 +1,166 @@
+from typing import Any
+
+import pytest
+from starlette.websockets import WebSocketState
+
+from apps.web.core.websocket.data import WebSocketEnvelope
+from apps.web.core.websocket.manager import WebSocketManager
+from apps.web.core.websocket.redis_store import WebSocketRedisStore
+from apps.web.dto.chat_dto import WSMessageDTO
+
+
+class MemoryPipeline:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def zrangebyscore(self, key: str, low: float, high: float) -> None:
+        self.commands.append(("zrangebyscore", (key, low, high)))
+
+    def publish(self, channel: str, data: str) -> None:
+        self.commands.append(("publish", (channel, data)))
+
+    async def execute(self) -> list[Any]:
+        return [await getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现连接登记和 Pub/Sub 发布，published 按顺序记录 (频道, 消息)。
+    """
+
+    def __init__(self) -> None:
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.published: list[tuple[str, str]] = []
+
+    def pipeline(self, transaction: bool) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key: str, member: str) -> None:
+        self.zsets.get(key, {}).pop(member, None)
+
+    async def hdel(self, key: str, *fields: str) -> None:
+        pass
+
+    async def zrangebyscore(self, key: str, low: float, high: float) -> list[str]:
+        return [member for member, score in self.zsets.get(key, {}).items() if low <= score <= high]
+
+    async def publish(self, channel: str, data: str) -> int:
+        self.published.append((channel, data))
+        return 1
+
+
+class FakeWebSocket:
+    def __init__(self, user_id: int) -> None:
+        self.scope: dict[str, Any] = {"user_id": user_id}
+        self.client_state = WebSocketState.CONNECTING
+        self.sent: list[dict[str, Any]] = []
+
+    async def accept(self) -> None:
+        self.client_state = WebSocketState.CONNECTED
+
+    async def send_json(self, data: dict[str, Any]) -> None:
+        self.sent.append(data)
+
+    async def close(self) -> None:
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+class Cluster:
+    """
+    共享同一个 Redis 的多个 worker，deliver 模拟 Pub/Sub 把已发布的消息投递给订阅了该频道的 worker。
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.now = 1000.0
+        self.redis = MemoryRedis()
+        store = WebSocketRedisStore(lambda: self.redis, time_provider=lambda: self.now)
+        self.managers = [WebSocketManager(store=store, handlers=[]) for _ in range(workers)]
+
+    async def connect(self, worker: int, user_id: int) -> FakeWebSocket:
+        websocket = FakeWebSocket(user_id)
+        await self.managers[worker].connect(websocket)
+        return websocket
+
+    async def deliver(self) -> list[str]:
+        published, self.redis.published = self.redis.published, []
+        for channel, data in published:
+            for manager in self.managers:
+                if channel in (manager.store.CHANNEL, manager.store.worker_channel(manager.worker_id)):
+                    await manager.handle_envelope(WebSocketEnvelope.model_validate_json(data))
+        return [channel for channel, _ in published]
+
+
+def message(text: str) -> WSMessageDTO[str]:
+    return WSMessageDTO[str](message=text)
+
+
+@pytest.mark.asyncio
+async def test_targeted_message_is_published_once_per_worker_holding_a_target():
+    cluster = Cluster(workers=3)
+    a, b = cluster.managers[0], cluster.managers[1]
+    alice = await cluster.connect(0, 1)
+    bob_phone, bob_laptop = await cluster.connect(0, 2), await cluster.connect(1, 2)
+    carol = await cluster.connect(2, 3)
+
+    await a.publish_message(message("hi"), [1, 2, 4])
+    channels = await cluster.deliver()
+
+    # 不广播，worker 2 上只有非目标用户，不收到任何消息；离线用户 4 被忽略
+    assert sorted(channels) == sorted([a.store.worker_channel(a.worker_id), b.store.worker_channel(b.worker_id)])
+    assert [sent["message"] for sent in alice.sent + bob_phone.sent + bob_laptop.sent] == ["hi"] * 3
+    assert carol.sent == []
+
+
+@pytest.mark.asyncio
+async def test_variant_payload_goes_only_to_variant_users():
+    cluster = Cluster(workers=2)
+    alice, bob = await cluster.connect(0, 1), await cluster.connect(1, 2)
+
+    await cluster.managers[0].publish_message(message("unread"), [1, 2], message("read"), [2])
+    await cluster.deliver()
+
+    assert [sent["message"] for sent in alice.sent] == ["unread"]
+    assert [sent["message"] for sent in bob.sent] == ["read"]
+
+
+@pytest.mark.asyncio
+async def test_expired_and_legacy_connections():
+    cluster = Cluster(workers=2)
+    manager = cluster.managers[0]
+    alice = await cluster.connect(1, 1)
+    # 没有 worker ID 的旧格式连接只能走广播频道
+    await manager.store.add_connection(2, "legacy-connection")
+
+    await manager.publish_message(message("hi"), [1, 2])
+    assert await cluster.deliver() == [
+        manager.store.worker_channel(cluster.managers[1].worker_id),
+        manager.store.CHANNEL,
+    ]
+    assert len(alice.sent) == 1
+
+    # 连接过期后不再按用户路由
+    cluster.now += manager.store.connection_ttl + 1
+    await manager.publish_message(message("late"), [1])
+    assert await cluster.deliver() == []
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_routing_to_the_worker():
+    cluster = Cluster(workers=2)
+    websocket = await cluster.connect(1, 1)
+
+    await cluster.managers[1].disconnect(websocket)
+    await cluster.managers[0].publish_message(message("hi"), [1])
+
+    assert await cluster.deliver() == []
+    assert websocket.client_state == WebSocketState.DISCONNECTED
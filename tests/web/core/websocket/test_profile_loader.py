@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from apps.web.core.context_vars import ContextVars
+from apps.web.core.websocket import profile_loader as profile_loader_module
+from apps.web.core.websocket.profile_loader import UserProfileLoader
+
+
+class FakeStore:
+    """
+    内存用户资料缓存，记录每次批量读写的用户 ID。
+    """
+
+    def __init__(self, profiles: dict[int, dict[str, Any]]) -> None:
+        self.profiles = profiles
+        self.reads: list[list[int]] = []
+        self.writes: list[list[int]] = []
+
+    async def get_user_profiles(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        self.reads.append(list(user_ids))
+        return {user_id: self.profiles[user_id] for user_id in user_ids if user_id in self.profiles}
+
+    async def set_user_profiles(self, profiles: dict[int, dict[str, Any]]) -> None:
+        self.writes.append(list(profiles))
+        self.profiles.update(profiles)
+
+
+class FakeUserDao:
+    def __init__(self, user_ids: set[int]) -> None:
+        self.user_ids = user_ids
+        self.calls: list[list[int]] = []
+        self.error: Exception | None = None
+
+    async def get_user_infos(self, user_ids: list[int]) -> dict[int, dict[str, Any]]:
+        self.calls.append(list(user_ids))
+        if self.error:
+            raise self.error
+        return {
+            user_id: {"id": user_id, "nickname": f"db-{user_id}"} for user_id in user_ids if user_id in self.user_ids
+        }
+
+
+@pytest.fixture
+def user_dao(monkeypatch: pytest.MonkeyPatch) -> FakeUserDao:
+    dao = FakeUserDao({1, 2, 3, 4})
+    monkeypatch.setattr(profile_loader_module, "GetBean", lambda cls: dao)
+    return dao
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_coalesced_into_one_batch(user_dao):
+    store = FakeStore({1: {"id": 1, "nickname": "cached-1"}})
+    loader = UserProfileLoader(store)
+
+    profiles = await asyncio.gather(*(loader.load(user_id) for user_id in (1, 2, 1, 3, 2, 99)))
+
+    assert [profile and profile["nickname"] for profile in profiles] == [
+        "cached-1",
+        "db-2",
+        "cached-1",
+        "db-3",
+        "db-2",
+        None,
+    ]
+    # 一次 MGET、一次数据库批量查询、一次 pipeline 回写，不存在的用户不回写
+    assert store.reads == [[1, 2, 3, 99]]
+    assert user_dao.calls == [[2, 3, 99]]
+    assert store.writes == [[2, 3]]
+    assert (loader.requested_count, loader.issued_count, loader.batch_count) == (6, 4, 1)
+    assert loader.coalesced_count == 2
+
+
+@pytest.mark.asyncio
+async def test_repeated_loads_in_a_request_hit_the_loader_until_cleared(user_dao):
+    store = FakeStore({})
+    loader = UserProfileLoader(store)
+
+    await loader.load(1)
+    assert await loader.load_many([1, 1]) == {1: {"id": 1, "nickname": "db-1"}}
+    assert loader.batch_count == 1
+
+    # 资料更新后清除，下次读取重新查询
+    store.profiles[1] = {"id": 1, "nickname": "renamed"}
+    loader.clear(1)
+    assert (await loader.load(1))["nickname"] == "renamed"
+    assert loader.batch_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_waiter_and_is_retried(user_dao):
+    loader = UserProfileLoader(FakeStore({}))
+    user_dao.error = RuntimeError("db down")
+
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    user_dao.error = None
+    assert (await loader.load(1))["nickname"] == "db-1"
+    assert user_dao.calls == [[1, 2], [1]]
+
+
+@pytest.mark.asyncio
+async def test_current_returns_the_request_loader():
+    store = FakeStore({})
+    request_loader = UserProfileLoader(store)
+
+    assert UserProfileLoader.current(store) is not UserProfileLoader.current(store)
+    token = ContextVars.user_profile_loader.set(request_loader)
+    try:
+        assert UserProfileLoader.current(store) is request_loader
+    finally:
+        ContextVars.user_profile_loader.reset(token)
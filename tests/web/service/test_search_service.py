@@ -0,0 +1,240 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import NotFoundError
+
+from apps.base.enum.article import ArticleStatusEnum
+from apps.base.exception.my_exception import MyException
+from apps.web.service.search_service import SearchService
+from apps.web.utils.redis_util.es import ESMethod
+from apps.web.vo.search_vo import ArticleSearchVO, OrderTypeEnum
+
+# 7 篇文章，相关度分数有并列，热门分数有缺失，验证翻页时按 id 决胜
+SCORES = [2.0, 2.0, 2.0, 1.5, 1.0, 1.0, 1.0]
+HOT_SCORES = [5.0, None, 5.0, 1.0, None, 9.0, 1.0]
+
+
+def article(article_id: int) -> dict[str, Any]:
+    return {
+        "id": article_id,
+        "user_id": 1,
+        "title": f"python {article_id}",
+        "cover": "",
+        "category_id": 1,
+        "tag_list": [],
+        "content": "python",
+        "is_markdown": True,
+        "is_original": True,
+        "status": ArticleStatusEnum.PUBLISHED,
+        "create_time": f"2026-01-0{article_id}T00:00:00",
+        "hot_score": HOT_SCORES[article_id - 1] or 0,
+    }
+
+
+class FakeElasticsearch:
+    """
+    内存 ES，按 DSL 的 sort 排序并支持 from、search_after 和 point-in-time 快照。
+    """
+
+    def __init__(self, documents: list[dict[str, Any]]) -> None:
+        self.documents = documents
+        self.pits: dict[str, list[dict[str, Any]]] = {}
+        self.closed: list[str] = []
+        self.searches: list[dict[str, Any]] = []
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> dict[str, str]:
+        pit_id = f"pit-{len(self.pits) + len(self.closed)}"
+        self.pits[pit_id] = list(self.documents)
+        return {"id": pit_id}
+
+    async def close_point_in_time(self, id: str) -> None:
+        del self.pits[id]
+        self.closed.append(id)
+
+    async def search(self, index: str | None = None, pit: dict[str, str] | None = None, **dsl: Any) -> dict[str, Any]:
+        self.searches.append(dsl)
+        await asyncio.sleep(0)
+        if pit is None:
+            documents = self.documents
+        elif pit["id"] in self.pits:
+            documents = self.pits[pit["id"]]
+        else:
+            meta = ApiResponseMeta(404, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "localhost", 9200))
+            raise NotFoundError("point in time expired", meta, {})
+        fields = [(name, spec["order"]) for sort in dsl["sort"] for name, spec in sort.items() if name != "_shard_doc"]
+
+        def sort_values(document: dict[str, Any]) -> list[Any]:
+            return [self.sort_value(document, name) for name, _ in fields]
+
+        def sort_key(values: list[Any]) -> tuple:
+            # 缺失值排在最后
+            return tuple(
+                (value is None, 0 if value is None else (value if order == "asc" else -value))
+                for value, (_, order) in zip(values, fields)
+            )
+
+        ordered = sorted(documents, key=lambda document: sort_key(sort_values(document)))
+        if "search_after" in dsl:
+            after = sort_key(dsl["search_after"][: len(fields)])
+            ordered = [document for document in ordered if sort_key(sort_values(document)) > after]
+        else:
+            ordered = ordered[dsl["from"] :]
+        hits = []
+        for document in ordered[: dsl["size"]]:
+            sort = sort_values(document) + ([documents.index(document)] if pit else [])
+            hits.append({"_source": dict(document), "highlight": {}, "sort": sort})
+        resp = {"hits": {"total": {"value": len(documents)}, "hits": hits}}
+        if pit:
+            resp["pit_id"] = pit["id"]
+        return resp
+
+    @staticmethod
+    def sort_value(document: dict[str, Any], name: str) -> Any:
+        if name == "_score":
+            return SCORES[document["id"] - 1]
+        if name == "hot_score":
+            return HOT_SCORES[document["id"] - 1]
+        if name == "create_time":
+            return document["id"]
+        return document[name]
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现搜索缓存、回源锁和热搜统计用到的命令。
+    """
+
+    def __init__(self) -> None:
+        self.strings: dict[str, str] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.strings.get(key)
+
+    async def set(self, key: str, value: str, ex: Any = None, px: int | None = None, nx: bool = False) -> bool:
+        if nx and key in self.strings:
+            return False
+        self.strings[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str) -> int:
+        if self.strings.get(key) == token:
+            del self.strings[key]
+            return 1
+        return 0
+
+    async def zincrby(self, key: str, amount: float, member: str) -> float:
+        zset = self.zsets.setdefault(key, {})
+        zset[member] = zset.get(member, 0) + amount
+        return zset[member]
+
+    async def expire(self, key: str, ex: Any) -> bool:
+        return True
+
+
+class ArticleMetrics:
+    async def get_articles_metrics(self, article_ids: list[int]) -> dict[int, SimpleNamespace]:
+        return {
+            article_id: SimpleNamespace(view_count=article_id, like_count=0, collect_count=0, comment_count=0)
+            for article_id in article_ids
+        }
+
+
+class SearchConfig:
+    async def get_published_search_analysis(self) -> SimpleNamespace:
+        return SimpleNamespace(hot_search_stop_words=[])
+
+
+def make_service(es: FakeElasticsearch) -> SearchService:
+    service = object.__new__(SearchService)
+    service.es_util = SimpleNamespace(client=es)
+    service.redis_util = SimpleNamespace(ES=ESMethod(MemoryRedis()), Article=ArticleMetrics())
+    service.config_service = SearchConfig()
+    return service
+
+
+def search_vo(order_type: OrderTypeEnum = OrderTypeEnum.BY_RELEVANCE, **values: Any) -> ArticleSearchVO:
+    return ArticleSearchVO(
+        **{"keyword": "python", "current_page": 1, "page_size": 3, "order_type": order_type, **values}
+    )
+
+
+def ids(page: dict[str, Any]) -> list[int]:
+    return [record.id for record in page["records"]]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("order_type", list(OrderTypeEnum))
+async def test_cursor_walk_matches_page_walk(order_type):
+    es = FakeElasticsearch([article(article_id) for article_id in range(1, 8)])
+    service = make_service(es)
+
+    by_page = []
+    for current_page in (1, 2, 3):
+        page = await service.get_es_article_list(search_vo(order_type, current_page=current_page))
+        by_page += ids(page)
+    by_cursor, cursor = [], None
+    while True:
+        page = await service.get_es_article_list(search_vo(order_type, cursor=cursor))
+        by_cursor += ids(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(by_page) == list(range(1, 8))
+    assert by_cursor == by_page
+    # 翻页结束后关闭 point-in-time，游标查询不携带 from
+    assert es.pits == {} and len(es.closed) == 1
+    assert all("from" not in dsl for dsl in es.searches if "search_after" in dsl)
+    # 搜索结果用 Redis 实时计数补全
+    assert [record.view_count for record in page["records"]] == ids(page)
+
+
+@pytest.mark.asyncio
+async def test_cursor_is_bound_to_the_query_and_rejects_garbage():
+    service = make_service(FakeElasticsearch([article(article_id) for article_id in range(1, 8)]))
+    cursor = (await service.get_es_article_list(search_vo()))["next_cursor"]
+
+    for vo in (
+        search_vo(OrderTypeEnum.BY_HOT_SCORE, cursor=cursor),
+        search_vo(keyword="java", cursor=cursor),
+        search_vo(cursor="not-a-cursor"),
+        search_vo(cursor=cursor[:-4]),
+    ):
+        with pytest.raises(MyException) as exc_info:
+            await service.get_es_article_list(vo)
+        assert exc_info.value.message == "无效的搜索游标"
+
+
+@pytest.mark.asyncio
+async def test_expired_point_in_time_is_reopened():
+    es = FakeElasticsearch([article(article_id) for article_id in range(1, 8)])
+    service = make_service(es)
+    first = await service.get_es_article_list(search_vo())
+    second = await service.get_es_article_list(search_vo(cursor=first["next_cursor"]))
+    es.pits.clear()
+
+    third = await service.get_es_article_list(search_vo(cursor=second["next_cursor"]))
+
+    assert ids(first) + ids(second) + ids(third) == [3, 2, 1, 4, 7, 6, 5]
+    assert len(es.closed) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_page_searches_hit_es_once_and_deep_pages_are_rejected():
+    es = FakeElasticsearch([article(article_id) for article_id in range(1, 8)])
+    service = make_service(es)
+
+    pages = await asyncio.gather(*(service.get_es_article_list(search_vo()) for _ in range(10)))
+
+    assert len(es.searches) == 1
+    assert all(ids(page) == [3, 2, 1] for page in pages)
+    cached = json.loads(next(iter(service.redis_util.ES._redis.strings.values())))
+    assert cached["next_cursor"] == pages[0]["next_cursor"]
+    with pytest.raises(MyException):
+        await service.get_es_article_list(search_vo(current_page=SearchService.MAX_RESULT_WINDOW // 3 + 1))
+    assert len(es.searches) == 1
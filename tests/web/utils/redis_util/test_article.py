@@ -0,0 +1,135 @@
+from pathlib import Path
+from typing import Any, AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.base.constant.redis_constant import RedisConstant
+from apps.base.core.sqlalchemy.db_helper import AsyncDBHelper
+from apps.base.enum.action import ActionTypeEnum, ObjectTypeEnum
+from apps.base.enum.comment import CommentStatusEnum
+from apps.base.models.action import Action, ActionCount
+from apps.base.models.comment import Comment
+from apps.web.utils.redis_util import article as article_module
+from apps.web.utils.redis_util.article import ArticleMethod, ArticleMetrics
+
+
+class MemoryPipeline:
+    def __init__(self, redis: "MemoryRedis") -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def hmget(self, key: str, fields: list[str]) -> None:
+        self.commands.append(("hmget", (key, fields), {}))
+
+    def hset(self, key: str, mapping: dict[str, str]) -> None:
+        self.commands.append(("hset", (key,), {"mapping": mapping}))
+
+    async def execute(self) -> list[Any]:
+        self.redis.round_trips += 1
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class MemoryRedis:
+    """
+    内存 Redis，只实现批量加载用到的 hash 命令，round_trips 统计往返次数。
+    """
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction: bool) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    async def hmget(self, key: str, fields: list[str]) -> list[str | None]:
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hset(self, key: str, mapping: dict[str, str]) -> int:
+        self.hashes.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+
+@pytest_asyncio.fixture
+async def helper(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncDBHelper, None]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'article.db'}")
+    article = {"obj_type": ObjectTypeEnum.ARTICLE}
+    async with engine.begin() as conn:
+        tables = [Action.__table__, ActionCount.__table__, Comment.__table__]
+        await conn.run_sync(Action.metadata.create_all, tables=tables)
+        await conn.execute(
+            insert(ActionCount),
+            [{"id": 1, "obj_id": 1, "action_type": ActionTypeEnum.VIEW, "count": 30, **article}],
+        )
+        await conn.execute(
+            insert(Action),
+            [
+                {"id": 1, "user_id": 1, "obj_id": 1, "action_type": ActionTypeEnum.LIKE, "status": True, **article},
+                {"id": 2, "user_id": 2, "obj_id": 1, "action_type": ActionTypeEnum.LIKE, "status": True, **article},
+                # 已取消的点赞不计数
+                {"id": 3, "user_id": 3, "obj_id": 1, "action_type": ActionTypeEnum.LIKE, "status": False, **article},
+                {"id": 4, "user_id": 1, "obj_id": 2, "action_type": ActionTypeEnum.COLLECT, "status": True, **article},
+            ],
+        )
+        await conn.execute(
+            insert(Comment),
+            [
+                {"id": 1, "user_id": 1, "obj_id": 2, "content": "a", "status": CommentStatusEnum.PASS, **article},
+                {"id": 2, "user_id": 1, "obj_id": 2, "content": "b", "status": CommentStatusEnum.DELETE, **article},
+            ],
+        )
+    helper = AsyncDBHelper(async_sessionmaker(engine, expire_on_commit=False))
+    monkeypatch.setattr(article_module, "db", helper)
+    yield helper
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cached_metrics_are_read_in_one_pipeline(helper):
+    redis = MemoryRedis()
+    for hash_key in article_module.ArticleMetricsBatchLoader.METRIC_HASH_KEYS.values():
+        redis.hashes[hash_key] = {str(article_id): str(article_id * 10) for article_id in range(1, 21)}
+
+    metrics = await ArticleMethod(redis).get_articles_metrics(list(range(1, 21)) + [1])
+
+    assert redis.round_trips == 1
+    assert list(metrics) == list(range(1, 21))
+    assert metrics[3] == ArticleMetrics(view_count=30, like_count=30, collect_count=30, comment_count=30)
+
+
+@pytest.mark.asyncio
+async def test_misses_are_backfilled_with_grouped_queries_and_written_back(helper):
+    redis = MemoryRedis()
+    redis.hashes[RedisConstant.ARTICLE_LIKE_COUNT_MAP_KEY] = {"2": "5"}
+
+    metrics = await ArticleMethod(redis).get_articles_metrics([1, 2, 3])
+
+    assert redis.round_trips == 2
+    assert metrics == {
+        1: ArticleMetrics(view_count=30, like_count=2),
+        2: ArticleMetrics(like_count=5, collect_count=1, comment_count=1),
+        3: ArticleMetrics(),
+    }
+    # 没有数据的文章也回写 0，下次不再回源
+    assert redis.hashes[RedisConstant.ARTICLE_VIEW_COUNT_MAP_KEY] == {"1": "30", "2": "0", "3": "0"}
+    assert redis.hashes[RedisConstant.ARTICLE_LIKE_COUNT_MAP_KEY] == {"1": "2", "2": "5", "3": "0"}
+
+    redis.round_trips = 0
+    assert await ArticleMethod(redis).get_articles_metrics([1, 2, 3]) == metrics
+    assert redis.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_id_list_does_not_touch_redis(helper):
+    redis = MemoryRedis()
+
+    assert await ArticleMethod(redis).get_articles_metrics([]) == {}
+    assert redis.round_trips == 0